@@ -1,10 +1,55 @@
 """Base class for specialized sub-agents."""
 
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage, HumanMessage
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, SystemMessage, HumanMessage, ToolMessage
 from langgraph.prebuilt import create_react_agent
+from pydantic import BaseModel, Field
+
+from config import (
+    AGENT_ARTIFACT_MIN_TOKENS,
+    AGENT_OUTPUT_TOKEN_CAPS,
+    DEFAULT_AGENT_OUTPUT_TOKENS,
+    TASK_PLAN_TOOLS,
+)
+from context_window import clip_to_tokens, estimate_tokens
+from graph_cache import get_or_compile, runtime_tool
+from model_router import (
+    chat_model, initial_tiers, is_valid_reply, next_tier, record_fallback, tier_for,
+)
+from tools.artifacts import awrite_artifact
+from tools.memo import memoize_tools
+
+
+class AgentResult(BaseModel):
+    """What a sub-agent hands back to the orchestrator."""
+
+    agent: str
+    summary: str = Field(description="The agent's answer, at most its token cap")
+    artifacts: List[str] = Field(
+        default_factory=list, description="Sandbox-relative paths of full outputs saved by this run"
+    )
+    truncated: bool = Field(default=False, description="True if the answer was cut to the cap")
+    error: Optional[str] = None
+
+    def render(self) -> str:
+        """Text returned to the orchestrator as the agent tool's output."""
+        if not self.artifacts:
+            return self.summary
+        listed = "\n".join(f"- {path}" for path in self.artifacts)
+        return (
+            f"{self.summary}\n\n"
+            f"[Full output saved; call read_artifact only if the summary is not enough]\n{listed}"
+        )
+
 
-from config import DEFAULT_MODEL
+def _has_side_effects(messages: List[Any]) -> bool:
+    """Whether the run in *messages* called a tool that is not read-only."""
+    return any(
+        call["name"] not in TASK_PLAN_TOOLS
+        for m in messages if isinstance(m, AIMessage)
+        for call in m.tool_calls
+    )
 
 
 class BaseAgent:
@@ -12,28 +57,106 @@ class BaseAgent:
 
     Subclasses override ``system_prompt`` to define the agent's persona.
     The orchestrator wraps each agent's ``run()`` method as a LangChain Tool.
+    Deterministic tools are memoized across all agents (see tools/memo.py).
+
+    Results are capped at the agent's entry in ``AGENT_OUTPUT_TOKEN_CAPS``;
+    anything longer, and every large raw tool output, is saved as a sandbox
+    artifact that the orchestrator can page through on demand.
+
+    The ReAct graph is compiled once per process for each agent class, model
+    tier and tool set (see graph_cache.py); every run passes this instance's
+    tools. The tier comes from the ``agent:<name>`` role in model_router.py.
+    A run whose answer fails validation is repeated on the next tier if it
+    only called read-only tools (``TASK_PLAN_TOOLS``); otherwise repeating
+    it would repeat its side effects, so only the final answer is asked of
+    the next tier's model, from the run's messages.
     """
 
+    name: str = "agent"
     system_prompt: str = "You are a helpful assistant."
 
     def __init__(self, tools):
-        self.tools = tools
-        llm = ChatOpenAI(model=DEFAULT_MODEL)
-        self._graph = create_react_agent(llm, tools)
+        self.tools = memoize_tools(tools)
+        self._tools_by_name = {t.name: t for t in self.tools}
+        self.output_token_cap = AGENT_OUTPUT_TOKEN_CAPS.get(self.name, DEFAULT_AGENT_OUTPUT_TOKENS)
+        self.role = f"agent:{self.name}"
+        self._graphs: Dict[str, Any] = {}
+        # Compile up front, so a turn only pays for fallback tiers it uses
+        for tier in initial_tiers(self.role):
+            self._graph_for(tier)
+
+    def _graph_for(self, tier: str):
+        """The shared ReAct graph of this agent's tools on *tier*'s model."""
+        if tier not in self._graphs:
+            self._graphs[tier] = get_or_compile(
+                ("agent", type(self).__name__, tier, tuple(self._tools_by_name)),
+                lambda: create_react_agent(
+                    chat_model(tier), [runtime_tool(t, "agent_tools") for t in self.tools]
+                ),
+            )
+        return self._graphs[tier]
 
     async def run(self, task: str, context: str = "") -> str:
         """Execute *task* using this agent's tool set and return the result."""
+        return (await self.run_structured(task, context)).render()
+
+    async def run_structured(self, task: str, context: str = "") -> AgentResult:
+        """Execute *task* and return a size-capped :class:`AgentResult`."""
         system_content = self.system_prompt
         if context:
             system_content += f"\n\nContext from the orchestrator:\n{context}"
+        # ~0.75 words per token
+        system_content += (
+            f"\n\nYour final answer goes to an orchestrator, not the user: keep it under "
+            f"{self.output_token_cap * 3 // 4} words with the findings, names, numbers, "
+            "URLs and file paths it needs. Do not paste raw documents or tool output."
+        )
+
+        tier = tier_for(self.role, task)
+        while True:
+            try:
+                # A top-level key is merged into the inherited "configurable"
+                result = await self._graph_for(tier).ainvoke(
+                    {
+                        "messages": [
+                            SystemMessage(content=system_content),
+                            HumanMessage(content=task),
+                        ]
+                    },
+                    {"agent_tools": self._tools_by_name},
+                )
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                return AgentResult(agent=self.name, summary=f"Error: Agent failed - {error}", error=error)
+
+            messages = result["messages"]
+            answer = messages[-1]
+            bigger = next_tier(tier)
+            if bigger is None or is_valid_reply(answer):
+                break
+            record_fallback(self.role, tier, bigger)
+            if _has_side_effects(messages):
+                # Re-running the graph would repeat those calls: the bigger
+                # model only writes the answer from what the run gathered
+                try:
+                    answer = await chat_model(bigger).ainvoke(messages[:-1])
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                    return AgentResult(agent=self.name, summary=f"Error: Agent failed - {error}", error=error)
+                messages = messages[:-1] + [answer]
+                break
+            tier = bigger
+
+        # File writes (and the prune of old artifacts) run off the event loop
+        artifacts = [
+            await awrite_artifact(self.name, m.name or "tool", m.content)
+            for m in messages
+            if isinstance(m, ToolMessage) and isinstance(m.content, str)
+            and estimate_tokens([m]) > AGENT_ARTIFACT_MIN_TOKENS
+        ]
+        if estimate_tokens([answer]) <= self.output_token_cap:
+            return AgentResult(agent=self.name, summary=answer.content, artifacts=artifacts)
 
-        try:
-            result = await self._graph.ainvoke({
-                "messages": [
-                    SystemMessage(content=system_content),
-                    HumanMessage(content=task),
-                ]
-            })
-            return result["messages"][-1].content
-        except Exception as e:
-            return f"Error: Agent failed - {type(e).__name__}: {e}"
+        artifacts.insert(0, await awrite_artifact(self.name, "answer", answer.content))
+        summary = clip_to_tokens(answer.content, self.output_token_cap) + "\n[… answer truncated]"
+        return AgentResult(agent=self.name, summary=summary, artifacts=artifacts, truncated=True)
@@ -5,6 +5,7 @@ from tools.browser import playwright_tools
 
 
 class BrowserAgent(BaseAgent):
+    name = "browser"
     system_prompt = (
         "You are a browser automation specialist. Navigate websites, "
         "click links, fill forms, take screenshots, and extract content "
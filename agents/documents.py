@@ -4,6 +4,7 @@ from agents.base import BaseAgent
 
 
 class DocumentsAgent(BaseAgent):
+    name = "documents"
     system_prompt = (
         "You are a document and file specialist. Read, write, and manage "
         "files in the sandbox directory. Create PDFs, work with spreadsheets "
@@ -4,6 +4,7 @@ from agents.base import BaseAgent
 
 
 class InterviewCoachAgent(BaseAgent):
+    name = "interview"
     system_prompt = (
         "You are an interview coach. You run mock interview sessions for the candidate "
         "to practice for real job interviews, tied to specific jobs in the pipeline.\n\n"
@@ -4,6 +4,7 @@ from agents.base import BaseAgent
 
 
 class JobSearchAgent(BaseAgent):
+    name = "jobsearch"
     system_prompt = (
         "You are a job search specialist helping the candidate find roles, "
         "manage their profile, and prepare tailored applications. "
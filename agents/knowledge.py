@@ -4,6 +4,7 @@ from agents.base import BaseAgent
 
 
 class KnowledgeAgent(BaseAgent):
+    name = "knowledge"
     system_prompt = (
         "You are a knowledge base specialist. Search, index, list, and "
         "manage the user's personal document collection. Use semantic search "
@@ -4,6 +4,7 @@ from agents.base import BaseAgent
 
 
 class LocationAgent(BaseAgent):
+    name = "location"
     system_prompt = (
         "You are a location and real estate specialist. Analyze addresses "
         "for family suitability, find nearby amenities with walking times, "
@@ -4,6 +4,7 @@ from agents.base import BaseAgent
 
 
 class ResearchAgent(BaseAgent):
+    name = "research"
     system_prompt = (
         "You are a research specialist. Use your tools to find information "
         "from the web, Wikipedia, arXiv, and YouTube transcripts. "
@@ -4,6 +4,7 @@ from agents.base import BaseAgent
 
 
 class SystemAgent(BaseAgent):
+    name = "system"
     system_prompt = (
         "You are a system utilities specialist. Schedule recurring background "
         "tasks with cron expressions, send push notifications, and run Python "
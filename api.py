@@ -0,0 +1,353 @@
+"""
+Headless HTTP API for ApexFlow.
+
+Serves the same assistant as the Gradio UI without a browser in the loop,
+so it can sit behind a gateway, be called by other services and be load
+tested directly.  Every session is served by the process-wide
+``SharedRuntime`` (see serving.py), so turns go through the same admission
+control and fair queue as the UI in shared mode.
+
+Turns are streamed as Server-Sent Events carrying the delta events from
+streaming.py:
+
+    event: append            data: {"role": "assistant", "content": "Hel"}
+    event: patch             data: {"content": "lo"}
+    event: done              data: {}
+
+Run with:  uv run python api.py --port 8000   (or: uv run uvicorn api:app)
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional
+
+from fastapi import FastAPI, Header, HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from langchain_community.chat_message_histories import SQLChatMessageHistory
+from langchain_core.messages import AIMessage, HumanMessage
+from pydantic import BaseModel, Field
+from sqlalchemy import create_engine
+
+import events
+
+from config import (
+    API_HOST,
+    API_PORT,
+    API_RUN_SCHEDULER,
+    DB_PATH,
+    SCHEDULER_API_RATE_LIMITS,
+    SCHEDULER_DEFAULT_APIS,
+    SCHEDULER_DEFAULT_JITTER_SECONDS,
+    SCHEDULER_DEFAULT_MISFIRE_GRACE_SECONDS,
+    SCHEDULER_MODE,
+)
+from scheduler import (
+    TaskRunner,
+    _add_task,
+    _get_run_result,
+    _get_task,
+    _list_runs,
+    _list_tasks,
+    _parse_apis,
+    _remove_task,
+    listen_for_events,
+    metrics_text,
+    scheduler_metrics,
+    stop_listening,
+    tasks_version,
+    update_tasks,
+    validate_cron,
+)
+from serving import ServerBusy, get_runtime
+from session_manager import SessionManager
+
+log = logging.getLogger(__name__)
+
+runtime = get_runtime()
+session_manager = SessionManager()
+task_runner = TaskRunner()
+# In "external" mode task_worker.py runs the tasks; the API only stores them
+_run_scheduler = API_RUN_SCHEDULER and SCHEDULER_MODE == "in_process"
+_history_engine = create_engine(f"sqlite:///{DB_PATH}")
+_knowledge_base = None
+
+
+def get_knowledge_base():
+    """Create the KnowledgeBase on first use (it needs the embeddings client)."""
+    global _knowledge_base
+    if _knowledge_base is None:
+        from knowledge import KnowledgeBase
+        _knowledge_base = KnowledgeBase()
+    return _knowledge_base
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Events from API calls (job status, indexing) trigger tasks whichever process runs them
+    listen_for_events()
+    if _run_scheduler:
+        await task_runner.start()
+    await runtime.start()
+    yield
+    await runtime.stop()
+    if _run_scheduler:
+        task_runner.stop()
+    stop_listening()
+
+
+app = FastAPI(title="ApexFlow API", lifespan=lifespan)
+
+
+# ---------------------------------------------------------------------------
+# Request schemas
+# ---------------------------------------------------------------------------
+
+class SessionCreate(BaseModel):
+    name: Optional[str] = Field(default=None, description="Display name; generated when omitted")
+
+
+class SessionRename(BaseModel):
+    name: str = Field(min_length=1)
+
+
+class TurnRequest(BaseModel):
+    message: str = Field(min_length=1)
+    success_criteria: str = ""
+    user_id: Optional[str] = Field(
+        default=None, description="Caller identity for per-user fair queueing; defaults to the session"
+    )
+    bypass_cache: bool = Field(default=False, description="Always run the agents, even for a cached request")
+
+
+class TaskCreate(BaseModel):
+    description: str = Field(min_length=1)
+    cron: str = Field(default="", description="Cron expression, e.g. '0 8 * * *'")
+    event: str = Field(default="", description="Event trigger instead of cron, e.g. 'file:knowledge/*.pdf'")
+    notify: bool = False
+    priority: int = Field(default=0, description="Higher runs first when tasks queue up")
+    jitter_seconds: int = Field(default=SCHEDULER_DEFAULT_JITTER_SECONDS, ge=0)
+    misfire_grace_seconds: int = Field(default=SCHEDULER_DEFAULT_MISFIRE_GRACE_SECONDS, ge=1)
+    coalesce: bool = True
+    max_instances: int = Field(default=1, ge=1)
+    apis: str = Field(default=SCHEDULER_DEFAULT_APIS, description="External APIs used, e.g. 'llm,search'")
+    monitor: str = Field(default="", description="URL or search query; the task only runs when it changed")
+
+
+class TaskBulkUpdate(BaseModel):
+    action: Literal["enable", "disable", "delete"]
+    ids: List[str] = Field(min_length=1, max_length=500)
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _require_session(session_id: str) -> dict:
+    session = session_manager.get_session(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail=f"Unknown session '{session_id}'")
+    return session
+
+
+def _sse(event: str, data) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode()
+
+
+def _sse_delta(event: dict) -> bytes:
+    if event["op"] == "append":
+        return _sse("append", event["message"])
+    return _sse("patch", {"content": event["content"]})
+
+
+# ---------------------------------------------------------------------------
+# Health
+# ---------------------------------------------------------------------------
+
+@app.get("/health")
+def health():
+    health = {"status": "ok", "runtime_ready": runtime.sidekick is not None, **runtime.scheduler.stats()}
+    if _run_scheduler:
+        health["tasks"] = task_runner.stats()
+    return health
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Scheduler metrics in the Prometheus text format (alert on lag_seconds / due_tasks)."""
+    return PlainTextResponse(metrics_text(scheduler_metrics()),
+                             media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# ---------------------------------------------------------------------------
+# Sessions
+# ---------------------------------------------------------------------------
+
+@app.get("/sessions")
+def list_sessions():
+    return [
+        {"id": id_, "name": name, "created_at": created_at}
+        for id_, name, created_at in session_manager.list_sessions()
+    ]
+
+
+@app.post("/sessions", status_code=201)
+def create_session(body: SessionCreate):
+    return session_manager.get_session(session_manager.create_session(body.name))
+
+
+@app.get("/sessions/{session_id}")
+def get_session(session_id: str):
+    return _require_session(session_id)
+
+
+@app.patch("/sessions/{session_id}")
+def rename_session(session_id: str, body: SessionRename):
+    _require_session(session_id)
+    session_manager.rename_session(session_id, body.name)
+    return session_manager.get_session(session_id)
+
+
+@app.delete("/sessions/{session_id}", status_code=204)
+def delete_session(session_id: str):
+    if not session_manager.delete_session(session_id):
+        raise HTTPException(status_code=404, detail=f"Unknown session '{session_id}'")
+
+
+@app.get("/sessions/{session_id}/messages")
+def get_messages(session_id: str):
+    _require_session(session_id)
+    history = SQLChatMessageHistory(session_id=session_id, connection=_history_engine)
+    messages = []
+    for msg in history.messages:
+        if isinstance(msg, HumanMessage):
+            messages.append({"role": "user", "content": msg.content})
+        elif isinstance(msg, AIMessage):
+            messages.append({"role": "assistant", "content": msg.content})
+    return messages
+
+
+@app.post("/sessions/{session_id}/turns")
+async def run_turn(session_id: str, body: TurnRequest):
+    """Run one turn and stream it as Server-Sent Events."""
+    _require_session(session_id)
+    deltas = runtime.stream_deltas(
+        session_id, body.message, body.success_criteria, body.user_id, body.bypass_cache
+    )
+    try:
+        # Admission happens before the first event, so a full queue is a clean 503
+        first = await deltas.__anext__()
+    except ServerBusy as e:
+        return JSONResponse({"detail": str(e)}, status_code=503, headers={"Retry-After": "5"})
+
+    async def stream():
+        try:
+            yield _sse_delta(first)
+            async for event in deltas:
+                yield _sse_delta(event)
+            yield _sse("done", {})
+        except Exception as e:
+            log.exception("Turn for session %s failed", session_id)
+            yield _sse("error", {"detail": f"{type(e).__name__}: {e}"})
+        finally:
+            await deltas.aclose()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ---------------------------------------------------------------------------
+# Scheduled tasks
+# ---------------------------------------------------------------------------
+
+@app.get("/tasks")
+def list_tasks(if_none_match: Optional[str] = Header(default=None)):
+    # The ETag is the tasks' change counter, so polling clients get a 304
+    # without the tasks being read while nothing changed
+    etag = f'"tasks-{tasks_version()}"'
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(jsonable_encoder(_list_tasks()), headers={"ETag": etag})
+
+
+@app.post("/tasks", status_code=201)
+def create_task(body: TaskCreate):
+    cron, event = body.cron.strip(), body.event.strip()
+    if bool(cron) == bool(event):
+        raise HTTPException(status_code=422, detail="Give either a cron expression or an event trigger")
+    if cron:
+        valid, err = validate_cron(cron)
+        if not valid:
+            raise HTTPException(status_code=422, detail=f"Invalid cron expression: {err}")
+    else:
+        valid, err = events.validate(event)
+        if not valid:
+            raise HTTPException(status_code=422, detail=f"Invalid event trigger: {err}")
+    unknown = sorted(set(_parse_apis(body.apis)) - set(SCHEDULER_API_RATE_LIMITS))
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown API(s): {', '.join(unknown)}")
+    task_id = _add_task(body.description.strip(), cron, notify=body.notify,
+                        priority=body.priority, jitter_seconds=body.jitter_seconds,
+                        misfire_grace_seconds=body.misfire_grace_seconds, coalesce=body.coalesce,
+                        max_instances=body.max_instances, apis=body.apis, monitor=body.monitor,
+                        event=event)
+    if _run_scheduler:
+        task_runner.add(task_id)
+    return _get_task(task_id)
+
+
+@app.post("/tasks/bulk")
+def bulk_update_tasks(body: TaskBulkUpdate):
+    done = update_tasks(body.action, body.ids)
+    unknown = [task_id for task_id in dict.fromkeys(body.ids) if task_id not in done]
+    return {"action": body.action, "updated": done, "unknown": unknown}
+
+
+@app.get("/tasks/{task_id}/runs")
+def list_task_runs(task_id: str, limit: int = Query(default=20, ge=1, le=500)):
+    if _get_task(task_id) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown task '{task_id}'")
+    return _list_runs(task_id, limit=limit)
+
+
+@app.get("/tasks/runs/{run_id}/result")
+def get_task_run_result(run_id: int):
+    result = _get_run_result(run_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No stored result for run {run_id}")
+    return {"run_id": run_id, "result": result}
+
+
+@app.delete("/tasks/{task_id}", status_code=204)
+def delete_task(task_id: str):
+    if not _remove_task(task_id):
+        raise HTTPException(status_code=404, detail=f"Unknown task '{task_id}'")
+    if _run_scheduler:
+        task_runner.remove(task_id)
+
+
+# ---------------------------------------------------------------------------
+# Knowledge base
+# ---------------------------------------------------------------------------
+
+@app.get("/knowledge/search")
+async def search_knowledge(q: str = Query(min_length=1), k: int = Query(default=5, ge=1, le=50)):
+    # Embedding the query and the Chroma lookup are blocking calls
+    results = await asyncio.to_thread(get_knowledge_base().search_results, q, k)
+    return {"query": q, "results": results}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the ApexFlow HTTP API.")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -1,19 +1,27 @@
 import base64
 import os
 import shutil
+from datetime import datetime
 import gradio as gr
 from sidekick import Sidekick
 from session_manager import SessionManager
-from scheduler import _list_tasks, _remove_task, TaskRunner
+from scheduler import (
+    _list_tasks, listen_for_events, run_stats, scheduler_metrics, tasks_version, update_tasks, TaskRunner,
+)
 from knowledge import KnowledgeBase
-from config import DB_PATH, SANDBOX_DIR
+from config import DB_PATH, RESPONSE_CACHE_ENABLED, SANDBOX_DIR, SCHEDULER_MODE, SERVING_MODE
+from serving import get_runtime
 import jobs
 import interview
+import model_router
+import response_cache
+import tracing
 from langchain_community.chat_message_histories import SQLChatMessageHistory
 from langchain_core.messages import HumanMessage, AIMessage
 
 session_manager = SessionManager()
 task_runner = TaskRunner()
+runtime = get_runtime() if SERVING_MODE == "shared" else None
 
 with open("ApexFlow.png", "rb") as _f:
     _logo_b64 = base64.b64encode(_f.read()).decode()
@@ -37,11 +45,24 @@ def get_history_for_session(session_id):
     return result
 
 
-async def initial_setup():
-    await task_runner.start()
-    session_id = session_manager.get_or_create_latest()
+async def open_session(session_id):
+    """Return the object that serves *session_id*'s turns for the configured serving mode."""
+    if runtime is not None:
+        await runtime.start()
+        return runtime.session(session_id)
     sidekick = Sidekick(session_id=session_id)
     await sidekick.setup()
+    return sidekick
+
+
+async def initial_setup():
+    # Events from this process (job status, indexing) trigger tasks whichever process runs them
+    listen_for_events()
+    # In "external" mode task_worker.py runs the tasks; the UI only adds and shows them
+    if SCHEDULER_MODE == "in_process":
+        await task_runner.start()
+    session_id = session_manager.get_or_create_latest()
+    sidekick = await open_session(session_id)
     history = get_history_for_session(session_id)
     choices = get_dropdown_choices()
     session_info = session_manager.get_session(session_id)
@@ -55,15 +76,20 @@ async def initial_setup():
     )
 
 
-async def process_message(sidekick, message, success_criteria, history):
-    async for updated_history in sidekick.run_superstep(message, success_criteria, history):
-        yield updated_history, sidekick, "", load_scheduled_tasks()
+async def process_message(sidekick, message, success_criteria, history, bypass_cache=False,
+                          seen_tasks_version=-1):
+    # Only the chat changes while streaming; the task table is refreshed once
+    # at the end, and only if the turn changed a task
+    async for updated_history in sidekick.run_superstep(
+        message, success_criteria, history, bypass_cache=bypass_cache
+    ):
+        yield updated_history, sidekick, "", gr.skip(), gr.skip()
+    yield gr.skip(), sidekick, "", *refresh_scheduled_tasks(seen_tasks_version)
 
 
 async def switch_session(session_id, old_sidekick):
     free_resources(old_sidekick)
-    sidekick = Sidekick(session_id=session_id)
-    await sidekick.setup()
+    sidekick = await open_session(session_id)
     history = get_history_for_session(session_id)
     session_info = session_manager.get_session(session_id)
     session_name = session_info["name"] if session_info else ""
@@ -73,8 +99,7 @@ async def switch_session(session_id, old_sidekick):
 async def create_new_session(old_sidekick):
     free_resources(old_sidekick)
     session_id = session_manager.create_session()
-    sidekick = Sidekick(session_id=session_id)
-    await sidekick.setup()
+    sidekick = await open_session(session_id)
     choices = get_dropdown_choices()
     return (
         sidekick,
@@ -97,8 +122,7 @@ async def delete_and_switch(session_id, old_sidekick):
     session_manager.delete_session(session_id)
 
     new_session_id = session_manager.get_or_create_latest()
-    sidekick = Sidekick(session_id=new_session_id)
-    await sidekick.setup()
+    sidekick = await open_session(new_session_id)
     history = get_history_for_session(new_session_id)
     choices = get_dropdown_choices()
     session_info = session_manager.get_session(new_session_id)
@@ -114,8 +138,7 @@ async def delete_and_switch(session_id, old_sidekick):
 
 async def reset(session_id, old_sidekick):
     free_resources(old_sidekick)
-    sidekick = Sidekick(session_id=session_id)
-    await sidekick.setup()
+    sidekick = await open_session(session_id)
     return "", "", [], sidekick
 
 
@@ -136,20 +159,85 @@ def load_scheduled_tasks():
         rows.append([
             t["id"],
             t["description"],
-            t["cron_expr"],
+            t["cron_expr"] or f"on {t['event']}",
             "enabled" if t["enabled"] else "disabled",
             t["last_run"] or "never",
             "yes" if t["notify"] else "no",
+            t["priority"],
+            _format_epoch(t["next_run_at"]) if t["enabled"] else "",
+            t["running_on"] or "",
+            t["misfires"],
         ])
     return rows
 
 
-def cancel_task_and_refresh(task_id):
-    """Cancel a task by ID and return updated table rows."""
-    task_id = task_id.strip()
-    if task_id:
-        _remove_task(task_id)
-    return load_scheduled_tasks(), ""
+def refresh_scheduled_tasks(seen_version):
+    """Task rows and the tasks version; the rows are skipped if nothing changed since *seen_version*."""
+    version = tasks_version()
+    if version == seen_version:
+        return gr.skip(), seen_version
+    return load_scheduled_tasks(), version
+
+
+def _format_epoch(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M") if ts else ""
+
+
+def load_task_pool_summary():
+    """Return a one-line summary of the scheduled-task pool."""
+    if SCHEDULER_MODE != "in_process":
+        return "**Task pool:** tasks are run by `task_worker.py`; *Running On* shows active runs"
+    s = task_runner.stats()
+    return (
+        f"**Task pool:** {s['running']}/{s['workers']} running, {s['queued']} queued "
+        f"(peak {s['max_depth']}, limit {s['max_queued']}) · wait p50 {s['wait_p50_ms']:.0f} ms, "
+        f"p95 {s['wait_p95_ms']:.0f} ms · {s['completed']} completed, {s['rejected']} dropped, "
+        f"{s['skipped_overlap']} skipped (still running)"
+    )
+
+
+def load_scheduler_health():
+    """Return a one-line health summary of the scheduler (what GET /metrics exposes)."""
+    m = scheduler_metrics()
+    due = f"{m['due']} due now"
+    if m["due"]:
+        due += f" (oldest {m['lag_seconds']:.0f} s late)"
+    return (
+        f"**Scheduler health:** {due} · {m['running']} running · {m['misfires']} misfires · "
+        f"{m['failed']}/{m['runs']} runs failed in the last {m['window_hours']:g} h · "
+        f"{m['enabled']} enabled, {m['disabled']} paused"
+    )
+
+
+def load_task_run_stats():
+    """Return per-task run counts, failures, durations and tokens over the last 7 days."""
+    stats = run_stats(since_hours=24 * 7)
+    rows = [
+        [
+            t["task_id"], t["description"], t["runs"], t["failed"], t["last_status"],
+            f"{t['p50_ms'] / 1000:.1f}", f"{t['p95_ms'] / 1000:.1f}", f"{t['max_ms'] / 1000:.1f}",
+            t["input_tokens"], t["output_tokens"],
+        ]
+        for t in stats["tasks"]
+    ]
+    summary = (
+        f"**Runs (7 days):** {stats['runs']} runs, {stats['failed']} failed · "
+        f"{stats['mean_concurrency']:.2f} running on average, peak {stats['peak_concurrency']}"
+    )
+    return rows, summary
+
+
+def update_tasks_and_refresh(action, task_ids, seen_version):
+    """Apply *action* to the comma-separated *task_ids*; return the refreshed table and a status line."""
+    ids = [task_id.strip() for task_id in task_ids.split(",") if task_id.strip()]
+    if not ids:
+        return gr.skip(), seen_version, "Enter one or more task IDs."
+    done = update_tasks(action, ids)
+    unknown = [task_id for task_id in ids if task_id not in done]
+    status = f"{action.capitalize()}d {len(done)} task(s)"
+    if unknown:
+        status += f"; unknown: {', '.join(unknown)}"
+    return (*refresh_scheduled_tasks(seen_version), status)
 
 
 def upload_to_knowledge_base(files):
@@ -229,6 +317,62 @@ def load_interview_sessions_table():
     return rows
 
 
+# ── Traces panel helpers ─────────────────────────────────────────────────────
+
+def load_trace_choices():
+    """Return a dropdown of recent turns, newest first."""
+    choices = []
+    for t in tracing.list_traces(limit=30):
+        started = datetime.fromtimestamp(t["started_at"]).strftime("%b %d %H:%M:%S")
+        label = f"{started} · {t['duration_ms'] / 1000:.1f}s · {t['llm_calls']} LLM calls · {t['tokens']} tok"
+        choices.append((label, t["trace_id"]))
+    return gr.Dropdown(choices=choices, value=choices[0][1] if choices else None)
+
+
+def load_trace_waterfall(trace_id):
+    """Return waterfall rows for the selected turn."""
+    if not trace_id:
+        return []
+    return tracing.waterfall_rows(trace_id)
+
+
+def load_trace_summary():
+    """Return per-span aggregates over the last 24 hours."""
+    return [
+        [
+            r["kind"], r["name"], r["calls"], r["errors"],
+            f"{r['p50_ms']:.0f}", f"{r['p95_ms']:.0f}",
+            r["input_tokens"], r["cached_tokens"], r["output_tokens"],
+        ]
+        for r in tracing.summarize(since_hours=24)
+    ]
+
+
+def load_model_tiers():
+    """Return latency, cost and fallbacks per model tier over the last 24 hours."""
+    return [
+        [
+            r["tier"], r["model"], r["calls"], r["fallbacks"],
+            f"{r['p50_ms']:.0f}", f"{r['p95_ms']:.0f}",
+            r["input_tokens"], r["output_tokens"],
+            f"{r['cost_usd']:.4f}", f"{r['cost_per_call_usd']:.5f}",
+        ]
+        for r in model_router.tier_report(since_hours=24)
+    ]
+
+
+def load_cache_summary():
+    """Return a one-line summary of response cache hits and savings."""
+    if not RESPONSE_CACHE_ENABLED:
+        return ""
+    s = response_cache.stats()
+    return (
+        f"**Response cache:** {s['hit_rate']:.0%} hit rate over {s['lookups']} lookups "
+        f"({s['exact_hit']} exact, {s['semantic_hit']} similar, {s['bypass']} bypassed) · "
+        f"saved {s['saved_tokens']} tokens and {s['saved_seconds']:.0f}s · {s['entries']} entries"
+    )
+
+
 def upload_application_sources(files):
     """Copy uploaded CV/LinkedIn PDFs to the sandbox root."""
     if not files:
@@ -362,6 +506,8 @@ with gr.Blocks(title="ApexFlow", theme=gr.themes.Default(primary_hue="purple"))
     # State
     sidekick = gr.State(delete_callback=free_resources)
     current_session_id = gr.State()
+    # tasks_version the task table was last rendered at (-1: never)
+    seen_tasks_version = gr.State(-1)
 
     # Session bar
     with gr.Group():
@@ -387,15 +533,29 @@ with gr.Blocks(title="ApexFlow", theme=gr.themes.Default(primary_hue="purple"))
     # Scheduled Tasks panel
     with gr.Accordion("Scheduled Tasks", open=False):
         scheduled_tasks_table = gr.Dataframe(
-            headers=["ID", "Description", "Schedule", "Status", "Last Run", "Notify"],
-            datatype=["str", "str", "str", "str", "str", "str"],
+            headers=["ID", "Description", "Schedule", "Status", "Last Run", "Notify", "Priority",
+                     "Next Run", "Running On", "Misfires"],
+            datatype=["str", "str", "str", "str", "str", "str", "number", "str", "str", "number"],
             interactive=False,
             label="Background Tasks",
         )
+        scheduler_health = gr.Markdown()
+        task_pool_summary = gr.Markdown()
+        task_runs_table = gr.Dataframe(
+            headers=["ID", "Description", "Runs", "Failed", "Last status", "p50 s", "p95 s", "Max s",
+                     "Tokens in", "Tokens out"],
+            datatype=["str", "str", "number", "number", "str", "str", "str", "str", "number", "number"],
+            interactive=False,
+            label="Run history (slowest first)",
+        )
+        task_runs_summary = gr.Markdown()
         with gr.Row():
-            cancel_task_id = gr.Textbox(label="Task ID to cancel", placeholder="e.g. a1b2c3d4", scale=3)
-            cancel_task_btn = gr.Button("Cancel Task", variant="stop", scale=1)
+            task_ids_input = gr.Textbox(label="Task IDs", placeholder="e.g. a1b2c3d4, e5f6a7b8", scale=3)
+            pause_tasks_btn = gr.Button("Pause", variant="secondary", scale=1)
+            resume_tasks_btn = gr.Button("Resume", variant="secondary", scale=1)
+            cancel_task_btn = gr.Button("Cancel Tasks", variant="stop", scale=1)
             refresh_tasks_btn = gr.Button("Refresh", variant="secondary", scale=1)
+        task_action_status = gr.Markdown()
 
     # Knowledge Base panel
     with gr.Accordion("Knowledge Base", open=False):
@@ -471,6 +631,33 @@ with gr.Blocks(title="ApexFlow", theme=gr.themes.Default(primary_hue="purple"))
             wrap=True,
         )
 
+    # Traces panel (local span store, see tracing.py)
+    with gr.Accordion("Traces", open=False):
+        with gr.Row():
+            trace_select = gr.Dropdown(label="Turn", choices=[], interactive=True, scale=4)
+            refresh_traces_btn = gr.Button("Refresh", variant="secondary", scale=1)
+        trace_waterfall = gr.Dataframe(
+            headers=["Start (ms)", "Duration (ms)", "Span", "Kind", "Tokens", "Timeline"],
+            datatype=["str", "str", "str", "str", "str", "str"],
+            interactive=False,
+            label="Waterfall",
+            wrap=False,
+        )
+        trace_summary = gr.Dataframe(
+            headers=["Kind", "Name", "Calls", "Errors", "p50 ms", "p95 ms", "Tokens in", "Cached", "Tokens out"],
+            datatype=["str", "str", "number", "number", "str", "str", "number", "number", "number"],
+            interactive=False,
+            label="Last 24 hours",
+        )
+        model_tiers = gr.Dataframe(
+            headers=["Tier", "Model", "Calls", "Fallbacks", "p50 ms", "p95 ms",
+                     "Tokens in", "Tokens out", "Cost $", "$ per call"],
+            datatype=["str", "str", "number", "number", "str", "str", "number", "number", "str", "str"],
+            interactive=False,
+            label="Model tiers (last 24 hours)",
+        )
+        cache_summary = gr.Markdown(visible=RESPONSE_CACHE_ENABLED)
+
     # Chat
     with gr.Row():
         chatbot = gr.Chatbot(label="ApexFlow", height=400, type="messages")
@@ -483,6 +670,8 @@ with gr.Blocks(title="ApexFlow", theme=gr.themes.Default(primary_hue="purple"))
             success_criteria = gr.Textbox(
                 show_label=False, placeholder="OPTIONAL: What are your success criteria?"
             )
+        with gr.Row(visible=RESPONSE_CACHE_ENABLED):
+            bypass_cache = gr.Checkbox(label="Fresh answer (skip the response cache)", value=False)
     with gr.Row():
         reset_button = gr.Button("Reset", variant="secondary", elem_id="reset-btn")
         go_button = gr.Button("Go!", variant="primary")
@@ -528,18 +717,18 @@ with gr.Blocks(title="ApexFlow", theme=gr.themes.Default(primary_hue="purple"))
 
     message.submit(
         process_message,
-        inputs=[sidekick, message, success_criteria, chatbot],
-        outputs=[chatbot, sidekick, message, scheduled_tasks_table],
+        inputs=[sidekick, message, success_criteria, chatbot, bypass_cache, seen_tasks_version],
+        outputs=[chatbot, sidekick, message, scheduled_tasks_table, seen_tasks_version],
     )
     success_criteria.submit(
         process_message,
-        inputs=[sidekick, message, success_criteria, chatbot],
-        outputs=[chatbot, sidekick, message, scheduled_tasks_table],
+        inputs=[sidekick, message, success_criteria, chatbot, bypass_cache, seen_tasks_version],
+        outputs=[chatbot, sidekick, message, scheduled_tasks_table, seen_tasks_version],
     )
     go_button.click(
         process_message,
-        inputs=[sidekick, message, success_criteria, chatbot],
-        outputs=[chatbot, sidekick, message, scheduled_tasks_table],
+        inputs=[sidekick, message, success_criteria, chatbot, bypass_cache, seen_tasks_version],
+        outputs=[chatbot, sidekick, message, scheduled_tasks_table, seen_tasks_version],
     )
     reset_button.click(
         reset,
@@ -548,13 +737,27 @@ with gr.Blocks(title="ApexFlow", theme=gr.themes.Default(primary_hue="purple"))
     )
 
     # Scheduled tasks panel wiring
-    ui.load(load_scheduled_tasks, inputs=[], outputs=[scheduled_tasks_table])
-    refresh_tasks_btn.click(load_scheduled_tasks, inputs=[], outputs=[scheduled_tasks_table])
-    cancel_task_btn.click(
-        cancel_task_and_refresh,
-        inputs=[cancel_task_id],
-        outputs=[scheduled_tasks_table, cancel_task_id],
+    ui.load(refresh_scheduled_tasks, inputs=[seen_tasks_version],
+            outputs=[scheduled_tasks_table, seen_tasks_version])
+    ui.load(load_scheduler_health, inputs=[], outputs=[scheduler_health])
+    ui.load(load_task_pool_summary, inputs=[], outputs=[task_pool_summary])
+    ui.load(load_task_run_stats, inputs=[], outputs=[task_runs_table, task_runs_summary])
+    # An explicit refresh always re-reads (Running On also changes when leases expire)
+    refresh_tasks_btn.click(lambda: refresh_scheduled_tasks(-1), inputs=[],
+                            outputs=[scheduled_tasks_table, seen_tasks_version]).then(
+        load_scheduler_health, inputs=[], outputs=[scheduler_health]
+    ).then(
+        load_task_pool_summary, inputs=[], outputs=[task_pool_summary]
+    ).then(
+        load_task_run_stats, inputs=[], outputs=[task_runs_table, task_runs_summary]
     )
+    for button, action in [(pause_tasks_btn, "disable"), (resume_tasks_btn, "enable"),
+                           (cancel_task_btn, "delete")]:
+        button.click(
+            lambda task_ids, seen, _action=action: update_tasks_and_refresh(_action, task_ids, seen),
+            inputs=[task_ids_input, seen_tasks_version],
+            outputs=[scheduled_tasks_table, seen_tasks_version, task_action_status],
+        )
 
 
     # Knowledge base panel wiring
@@ -582,6 +785,18 @@ with gr.Blocks(title="ApexFlow", theme=gr.themes.Default(primary_hue="purple"))
     refresh_jobs_btn.click(load_jobs_table, inputs=[jobs_status_filter], outputs=[jobs_table])
     jobs_status_filter.change(load_jobs_table, inputs=[jobs_status_filter], outputs=[jobs_table])
 
+    # Traces panel wiring
+    ui.load(load_trace_choices, inputs=[], outputs=[trace_select])
+    ui.load(load_trace_summary, inputs=[], outputs=[trace_summary])
+    ui.load(load_model_tiers, inputs=[], outputs=[model_tiers])
+    ui.load(load_cache_summary, inputs=[], outputs=[cache_summary])
+    refresh_traces_btn.click(load_trace_choices, inputs=[], outputs=[trace_select]).then(
+        load_trace_summary, inputs=[], outputs=[trace_summary]
+    ).then(load_model_tiers, inputs=[], outputs=[model_tiers]).then(
+        load_cache_summary, inputs=[], outputs=[cache_summary]
+    )
+    trace_select.change(load_trace_waterfall, inputs=[trace_select], outputs=[trace_waterfall])
+
     # Interview practice panel wiring
     ui.load(load_interview_sessions_table, inputs=[], outputs=[interviews_table])
     refresh_interviews_btn.click(
@@ -590,4 +805,7 @@ with gr.Blocks(title="ApexFlow", theme=gr.themes.Default(primary_hue="purple"))
 
 
 if __name__ == "__main__":
+    if runtime is not None:
+        # Turns are admitted by the runtime's fair queue, not one at a time by Gradio
+        ui.queue(default_concurrency_limit=None)
     ui.launch(inbrowser=True)
\ No newline at end of file
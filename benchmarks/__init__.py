@@ -0,0 +1 @@
+"""Record/replay harness and benchmarks for the ApexFlow orchestrator."""
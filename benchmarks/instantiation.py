@@ -0,0 +1,78 @@
+"""
+Sidekick instantiation benchmark.
+
+Times ``Sidekick()`` plus ``setup()`` (sub-agents, tool sets, compiled graphs)
+with replayed tool sets and no browser, and reports how many graphs were
+compiled.  The first instance in a process compiles the shared graphs; every
+later one should only copy them (see graph_cache.py).
+
+Usage:
+    python -m benchmarks.instantiation              # 20 instances
+    python -m benchmarks.instantiation --runs 50 --json
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import graph_cache
+from benchmarks.replay import ReplaySession, SimulatedLatency
+from benchmarks.runner import _isolated_cwd, _replayed, load_scenario
+
+
+async def _instantiate():
+    from sidekick import Sidekick
+
+    start = time.perf_counter()
+    sidekick = Sidekick(session_id="bench-instantiation")
+    await sidekick.setup(include_browser=False)
+    elapsed = time.perf_counter() - start
+    await sidekick.aclose()
+    return elapsed
+
+
+async def measure(runs: int = 20, scenario: str = "single_delegation") -> Dict[str, Any]:
+    """Build *runs* Sidekicks after a first (cold) one and summarise their setup times."""
+    session = ReplaySession(load_scenario(scenario)["fixture"], SimulatedLatency(0, 0, 0))
+    with _isolated_cwd(), _replayed(session):
+        compiled_before = graph_cache.compile_count
+        cold = await _instantiate()
+        compiled_cold = graph_cache.compile_count - compiled_before
+        warm = [await _instantiate() for _ in range(runs)]
+        compiled_warm = graph_cache.compile_count - compiled_before - compiled_cold
+    return {
+        "runs": runs,
+        "cold_ms": round(cold * 1000, 1),
+        "mean_ms": round(statistics.mean(warm) * 1000, 1),
+        "min_ms": round(min(warm) * 1000, 1),
+        "max_ms": round(max(warm) * 1000, 1),
+        "graphs_compiled_cold": compiled_cold,
+        "graphs_compiled_warm": compiled_warm,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Time Sidekick instantiation and setup.")
+    parser.add_argument("--runs", type=int, default=20, help="Instances to build after the first one")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(measure(args.runs))
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"first instance: {result['cold_ms']:.1f} ms ({result['graphs_compiled_cold']} graphs compiled)")
+    print(f"next {result['runs']}: mean {result['mean_ms']:.1f} ms, min {result['min_ms']:.1f} ms, "
+          f"max {result['max_ms']:.1f} ms ({result['graphs_compiled_warm']} graphs compiled)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Concurrent-user load test with a stubbed (replayed) LLM.
+
+Simulates N users each sending M turns at the same time, either through one
+``SharedRuntime`` (``--mode shared``) or through one Sidekick per user, the
+way app.py works in per-session mode (``--mode per-session``).  Reports
+throughput, turn latency percentiles, admission-control rejections, open file
+descriptors and peak RSS.
+
+Usage:
+    python -m benchmarks.load_test --users 50 --turns 3
+    python -m benchmarks.load_test --users 50 --mode per-session
+    python -m benchmarks.load_test --users 200 --max-active 8 --max-queued 64 --json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.replay import ReplaySession, SimulatedLatency
+from benchmarks.runner import _isolated_cwd, _replayed, load_scenario
+from serving import BUSY_MESSAGE
+
+
+def _open_fds() -> int:
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return -1
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def _user(serve, user: int, turns: int, scenario: Dict[str, Any],
+                latencies: List[float], outcome: Dict[str, int]):
+    history: List[Dict[str, Any]] = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        async for history in serve(user, scenario["message"], scenario.get("success_criteria", ""), history):
+            pass
+        if history and history[-1]["content"] == BUSY_MESSAGE:
+            outcome["rejected"] += 1
+        else:
+            outcome["completed"] += 1
+            latencies.append(time.perf_counter() - start)
+
+
+async def run_load(mode: str, users: int, turns: int, scenario_name: str,
+                   latency: SimulatedLatency, max_active: int, max_queued: int) -> Dict[str, Any]:
+    from serving import SharedRuntime
+    from sidekick import Sidekick
+
+    scenario = load_scenario(scenario_name)
+    session = ReplaySession(scenario["fixture"], latency)
+    latencies: List[float] = []
+    outcome = {"completed": 0, "rejected": 0}
+    fds_before = _open_fds()
+    peak_fds = fds_before
+
+    with _isolated_cwd(), _replayed(session):
+        runtime = None
+        sidekicks: List[Any] = []
+        setup_start = time.perf_counter()
+        if mode == "shared":
+            runtime = SharedRuntime(max_active=max_active, max_queued=max_queued, browser_pool_size=0)
+            await runtime.start(include_browser=False)
+            handles = [runtime.session(f"user-{i}") for i in range(users)]
+        else:
+            for i in range(users):
+                sidekick = Sidekick(session_id=f"user-{i}")
+                await sidekick.setup(include_browser=False)
+                sidekicks.append(sidekick)
+            handles = sidekicks
+        setup_s = time.perf_counter() - setup_start
+
+        def serve(user, message, criteria, history):
+            return handles[user].run_superstep(message, criteria, history)
+
+        async def sample_fds():
+            nonlocal peak_fds
+            while True:
+                peak_fds = max(peak_fds, _open_fds())
+                await asyncio.sleep(0.05)
+
+        sampler = asyncio.create_task(sample_fds())
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(*(
+                _user(serve, i, turns, scenario, latencies, outcome) for i in range(users)
+            ))
+        finally:
+            elapsed = time.perf_counter() - start
+            sampler.cancel()
+            if runtime:
+                await runtime.stop()
+            for sidekick in sidekicks:
+                await sidekick.aclose()
+
+    return {
+        "mode": mode,
+        "users": users,
+        "turns_per_user": turns,
+        "completed": outcome["completed"],
+        "rejected": outcome["rejected"],
+        "setup_s": round(setup_s, 2),
+        "elapsed_s": round(elapsed, 2),
+        "turns_per_s": round(outcome["completed"] / elapsed, 2) if elapsed else None,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 1) if latencies else None,
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 1) if latencies else None,
+        "llm_calls": session.llm_calls,
+        "peak_open_fds": peak_fds,
+        "fds_before": fds_before,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "misses": len(session.misses),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Load-test the orchestrator with a replayed LLM.")
+    parser.add_argument("--mode", choices=["shared", "per-session"], default="shared")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=2, help="Turns sent by each user, one after another")
+    parser.add_argument("--scenario", default="single_delegation")
+    parser.add_argument("--max-active", type=int, default=8, help="Shared mode: concurrently running turns")
+    parser.add_argument("--max-queued", type=int, default=64, help="Shared mode: turns allowed to wait")
+    parser.add_argument("--first-token-ms", type=float, default=300.0)
+    parser.add_argument("--per-token-ms", type=float, default=10.0)
+    parser.add_argument("--tool-ms", type=float, default=100.0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    latency = SimulatedLatency(
+        first_token=args.first_token_ms / 1000,
+        per_token=args.per_token_ms / 1000,
+        tool=args.tool_ms / 1000,
+    )
+    result = asyncio.run(run_load(
+        args.mode, args.users, args.turns, args.scenario, latency, args.max_active, args.max_queued,
+    ))
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        for key, value in result.items():
+            print(f"{key:<16}{value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+Deterministic record/replay stand-ins for LLMs and tools.
+
+Recording: attach a ``FixtureRecorder`` callback to a real run.  It captures
+every chat-model request/response pair and every tool call/output, and
+``to_fixture()`` returns them as a JSON-serialisable dict.
+
+Replaying: ``ReplayChatModel`` and ``replay_tools()`` answer from such a
+fixture with configurable simulated latency, so a full ``run_superstep`` can
+be benchmarked without network access or API keys.
+
+Requests are matched by a readable key derived from the last non-system
+message (``request_key``), so fixtures can also be written by hand and the
+volatile trailing system prompt (timestamps) never breaks matching.
+"""
+
+import asyncio
+import json
+import re
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional
+from unittest.mock import patch
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_core.tools import BaseTool, StructuredTool, Tool
+
+from graph_cache import DISPATCH_TAG
+
+_KEY_CHARS = 300
+
+
+def request_key(messages: List[Any]) -> str:
+    """Return the matching key for a chat request: type and text of its last non-system message."""
+    for m in reversed(messages):
+        if isinstance(m, SystemMessage):
+            continue
+        text = m.content if isinstance(m.content, str) else json.dumps(m.content)
+        return f"{m.type}:{' '.join(text.split())[:_KEY_CHARS]}"
+    return "empty"
+
+
+def args_key(name: str, args: Any) -> str:
+    """Canonical key for a tool call; single-argument calls match on the value alone."""
+    if isinstance(args, dict) and len(args) == 1:
+        args = next(iter(args.values()))
+    if isinstance(args, str):
+        args = " ".join(args.split())
+    return f"{name}:{json.dumps(args, sort_keys=True, default=str)}"
+
+
+# ---------------------------------------------------------------------------
+# Recording
+# ---------------------------------------------------------------------------
+
+class FixtureRecorder(BaseCallbackHandler):
+    """Callback handler that captures LLM and tool traffic of a real run."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.llm: list[dict] = []
+        self.tools: list[dict] = []
+        self._pending: dict[Any, Any] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._pending[run_id] = request_key(messages[0])
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        key = self._pending.pop(run_id, None)
+        if key is None:
+            return
+        message = response.generations[0][0].message
+        self.llm.append({
+            "key": key,
+            "response": {
+                "content": message.content,
+                "tool_calls": [
+                    {"name": tc["name"], "args": tc["args"], "id": tc["id"]}
+                    for tc in getattr(message, "tool_calls", None) or []
+                ],
+                "usage": getattr(message, "usage_metadata", None),
+            },
+        })
+
+    def on_tool_start(self, serialized, input_str, *, run_id, tags=None, inputs=None, **kwargs):
+        if DISPATCH_TAG in (tags or []):
+            return
+        name = (serialized or {}).get("name") or kwargs.get("name", "tool")
+        self._pending[run_id] = (name, inputs if inputs is not None else input_str)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        pending = self._pending.pop(run_id, None)
+        if pending is None:
+            return
+        name, args = pending
+        self.tools.append({
+            "name": name,
+            "args": args,
+            "output": str(getattr(output, "content", output)),
+        })
+
+    def to_fixture(self) -> dict:
+        return {"llm": self.llm, "tools": self.tools}
+
+
+# ---------------------------------------------------------------------------
+# Replaying
+# ---------------------------------------------------------------------------
+
+class SimulatedLatency:
+    """Delays applied while replaying (all in seconds)."""
+
+    def __init__(self, first_token: float = 0.0, per_token: float = 0.0, tool: float = 0.0):
+        self.first_token = first_token
+        self.per_token = per_token
+        self.tool = tool
+
+
+class ReplaySession:
+    """Fixture lookup plus call counters shared by all replay stand-ins of a run."""
+
+    def __init__(self, fixture: dict, latency: Optional[SimulatedLatency] = None):
+        self.fixture = fixture
+        self.latency = latency or SimulatedLatency()
+        self.llm_calls = 0
+        self.tool_calls = 0
+        self.misses: list[str] = []
+        self._llm: dict[str, deque] = defaultdict(deque)
+        for entry in fixture.get("llm", []):
+            self._llm[entry["key"]].append(entry["response"])
+        self._tools: dict[str, deque] = defaultdict(deque)
+        for entry in fixture.get("tools", []):
+            self._tools[args_key(entry["name"], entry["args"])].append(entry["output"])
+
+    @staticmethod
+    def _take(queue: deque) -> Any:
+        # Consume in order, but keep the last answer for repeated requests
+        return queue.popleft() if len(queue) > 1 else queue[0]
+
+    def has_response(self, key: str) -> bool:
+        return bool(self._llm.get(key))
+
+    def llm_response(self, key: str) -> Optional[dict]:
+        self.llm_calls += 1
+        queue = self._llm.get(key)
+        if queue:
+            return self._take(queue)
+        self.misses.append(key)
+        return self.fixture.get("default_response")
+
+    def structured_default(self, schema_name: str) -> Optional[dict]:
+        return self.fixture.get("structured", {}).get(schema_name)
+
+    def tool_output(self, name: str, args: Any) -> str:
+        self.tool_calls += 1
+        key = args_key(name, args)
+        queue = self._tools.get(key)
+        if queue:
+            return self._take(queue)
+        self.misses.append(key)
+        return f"[replay] no recorded output for {key}"
+
+
+def _to_message(response: dict) -> AIMessage:
+    return AIMessage(
+        content=response.get("content", ""),
+        tool_calls=[
+            {"name": tc["name"], "args": tc.get("args", {}), "id": tc.get("id") or f"call_{i}"}
+            for i, tc in enumerate(response.get("tool_calls", []))
+        ],
+        usage_metadata=response.get("usage") or None,
+    )
+
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model that answers from a ReplaySession instead of a provider."""
+
+    session: Any
+    model_name: str = "replay"
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _lookup(self, messages: List[Any]) -> AIMessage:
+        key = request_key(messages)
+        response = self.session.llm_response(key)
+        if response is None:
+            raise KeyError(f"No recorded LLM response for request {key!r}")
+        return _to_message(response)
+
+    def _total_delay(self, message: AIMessage) -> float:
+        lat = self.session.latency
+        return lat.first_token + lat.per_token * len(re.findall(r"\S+", message.content or ""))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self._lookup(messages)
+        time.sleep(self._total_delay(message))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self._lookup(messages)
+        await asyncio.sleep(self._total_delay(message))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._lookup(messages)
+        lat = self.session.latency
+        await asyncio.sleep(lat.first_token)
+        for token in re.findall(r"\S+\s*", message.content or ""):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+            await asyncio.sleep(lat.per_token)
+        if message.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content="",
+                tool_call_chunks=[
+                    {"name": tc["name"], "args": json.dumps(tc["args"]), "id": tc["id"], "index": i}
+                    for i, tc in enumerate(message.tool_calls)
+                ],
+            ))
+        if message.usage_metadata:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=message.usage_metadata))
+
+    def bind_tools(self, tools, **kwargs):
+        # Tool calls come from the fixture, so binding is a no-op.
+        return self
+
+    def with_structured_output(self, schema, **kwargs):
+        async def _parse(messages, config: RunnableConfig):
+            default = self.session.structured_default(schema.__name__)
+            if default is not None and not self.session.has_response(request_key(messages)):
+                # Structured calls (evaluator, profile extraction) embed volatile
+                # context in their prompt, so fixtures usually give one answer per schema.
+                self.session.llm_calls += 1
+                await asyncio.sleep(self.session.latency.first_token)
+                return schema.model_validate(default)
+            message = await self.ainvoke(messages, config=config)
+            if message.tool_calls:
+                return schema.model_validate(message.tool_calls[0]["args"])
+            return schema.model_validate_json(message.content)
+
+        return RunnableLambda(_parse, name=f"replay_structured_{schema.__name__}")
+
+
+def replay_tools(tools: List[BaseTool], session: ReplaySession) -> List[BaseTool]:
+    """Return stand-ins with the same names and schemas that replay recorded outputs."""
+    stand_ins = []
+    for tool in tools:
+        name = tool.name
+
+        def _call(*args, _name=name, **kwargs):
+            time.sleep(session.latency.tool)
+            return session.tool_output(_name, args[0] if args else kwargs)
+
+        async def _acall(*args, _name=name, **kwargs):
+            await asyncio.sleep(session.latency.tool)
+            return session.tool_output(_name, args[0] if args else kwargs)
+
+        if isinstance(tool, Tool):
+            stand_ins.append(Tool(name=name, description=tool.description, func=_call, coroutine=_acall))
+        else:
+            stand_ins.append(StructuredTool(
+                name=name,
+                description=tool.description,
+                args_schema=tool.args_schema,
+                func=_call,
+                coroutine=_acall,
+            ))
+    return stand_ins
+
+
+@contextmanager
+def replay_models(session: ReplaySession) -> Iterator[None]:
+    """Make every chat model handed out by model_router.py a replay model."""
+    def factory(*args, **kwargs):
+        return ReplayChatModel(session=session, model_name=kwargs.get("model", "replay"))
+
+    with patch("model_router.ChatOpenAI", factory):
+        yield
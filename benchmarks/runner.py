@@ -0,0 +1,242 @@
+"""
+Benchmark runner for end-to-end orchestrator turns.
+
+Replays scripted multi-agent scenarios (benchmarks/scenarios/*.json) through
+``Sidekick.run_superstep`` with recorded LLM and tool responses, and reports
+time-to-first-token, total turn latency, LLM/tool call counts and peak
+Python memory.
+
+Usage:
+    python -m benchmarks.runner                       # all scenarios
+    python -m benchmarks.runner single_delegation --first-token-ms 400 --per-token-ms 15
+    python -m benchmarks.runner --json                # machine-readable output
+    python -m benchmarks.runner single_delegation --record   # re-record with live APIs
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from unittest.mock import patch
+
+from langchain_core.tools import Tool
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import graph_cache
+import model_router
+import response_cache
+import tracing
+from tools import memo as tool_memo
+from benchmarks.replay import (
+    FixtureRecorder,
+    ReplaySession,
+    SimulatedLatency,
+    replay_models,
+    replay_tools,
+)
+
+SCENARIOS_DIR = Path(__file__).resolve().parent / "scenarios"
+
+# Tool-set factories imported into sidekick; each is swapped for replay stand-ins
+TOOL_GETTERS = [
+    "get_research_tools",
+    "get_documents_tools",
+    "get_knowledge_tools",
+    "get_location_tools",
+    "get_system_tools",
+    "get_jobsearch_tools",
+    "get_interview_tools",
+]
+
+
+def load_scenario(name: str) -> Dict[str, Any]:
+    with open(SCENARIOS_DIR / f"{name}.json") as f:
+        return json.load(f)
+
+
+def list_scenarios() -> List[str]:
+    return sorted(p.stem for p in SCENARIOS_DIR.glob("*.json"))
+
+
+@contextmanager
+def _isolated_cwd():
+    """Run in a scratch directory so the benchmark never touches real databases."""
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="apexflow-bench-") as tmp:
+        os.chdir(tmp)
+        try:
+            yield tmp
+        finally:
+            # Module-level connections (and the tool memo) point into the scratch directory
+            tracing.close()
+            response_cache.close()
+            tool_memo.close()
+            os.chdir(previous)
+
+
+def _fixture_tools(session: ReplaySession) -> List[Tool]:
+    """Stand-ins named after the fixture's recorded tools, for tool sets that need API keys."""
+    names = sorted({entry["name"] for entry in session.fixture.get("tools", [])})
+    return replay_tools(
+        [Tool(name=n, func=lambda q: "", description=f"Replayed {n} tool.") for n in names],
+        session,
+    )
+
+
+@contextmanager
+def _replayed(session: ReplaySession):
+    import sidekick
+
+    def wrap(getter):
+        def replayed_getter():
+            try:
+                tools = getter()
+            except Exception:
+                tools = []
+            return replay_tools(tools, session) or _fixture_tools(session)
+        return replayed_getter
+
+    # Compiled graphs and shared models are built with the model class of the
+    # moment, so replay models must not outlive this session (and vice versa)
+    graph_cache.clear()
+    model_router.clear()
+    with ExitStack() as stack:
+        stack.callback(graph_cache.clear)
+        stack.callback(model_router.clear)
+        stack.enter_context(replay_models(session))
+        for name in TOOL_GETTERS:
+            stack.enter_context(patch.object(sidekick, name, wrap(getattr(sidekick, name))))
+        yield
+
+
+async def _run_turn(sidekick: Any, scenario: Dict[str, Any]) -> Dict[str, Any]:
+    """Drive one run_superstep and time it from the caller's point of view."""
+    history: List[Dict[str, Any]] = []
+    start = time.perf_counter()
+    first_token: Optional[float] = None
+    updates = 0
+    async for history in sidekick.run_superstep(
+        scenario["message"], scenario.get("success_criteria", ""), []
+    ):
+        updates += 1
+        if first_token is None and any(
+            m["role"] == "assistant" and not m.get("metadata") and m.get("content")
+            for m in history
+        ):
+            first_token = time.perf_counter() - start
+    total = time.perf_counter() - start
+    return {
+        "ttft_ms": round(first_token * 1000, 1) if first_token is not None else None,
+        "total_ms": round(total * 1000, 1),
+        "ui_updates": updates,
+        "final_reply": next(
+            (m["content"] for m in reversed(history)
+             if m["role"] == "assistant" and not m.get("metadata")),
+            "",
+        ),
+    }
+
+
+async def run_scenario(name: str, latency: SimulatedLatency) -> Dict[str, Any]:
+    """Replay one scenario and return its measurements."""
+    from sidekick import Sidekick
+
+    scenario = load_scenario(name)
+    session = ReplaySession(scenario["fixture"], latency)
+    with _isolated_cwd(), _replayed(session):
+        tracemalloc.start()
+        sidekick = Sidekick(session_id=f"bench-{name}")
+        try:
+            await sidekick.setup(include_browser=False)
+            result = await _run_turn(sidekick, scenario)
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            await sidekick.aclose()
+    result.update({
+        "scenario": name,
+        "llm_calls": session.llm_calls,
+        "tool_calls": session.tool_calls,
+        "peak_mb": round(peak / 1e6, 2),
+        "misses": session.misses,
+    })
+    return result
+
+
+async def record_scenario(name: str) -> Dict[str, Any]:
+    """Run a scenario against the live APIs and store the captured fixture."""
+    from sidekick import Sidekick
+
+    scenario = load_scenario(name)
+    recorder = FixtureRecorder()
+    with _isolated_cwd():
+        sidekick = Sidekick(session_id=f"record-{name}")
+        sidekick.callbacks.append(recorder)
+        try:
+            await sidekick.setup(include_browser=False)
+            await _run_turn(sidekick, scenario)
+        finally:
+            await sidekick.aclose()
+    scenario["fixture"] = {**scenario.get("fixture", {}), **recorder.to_fixture()}
+    with open(SCENARIOS_DIR / f"{name}.json", "w") as f:
+        json.dump(scenario, f, indent=2)
+        f.write("\n")
+    return scenario["fixture"]
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _print_table(results: List[Dict[str, Any]]):
+    header = f"{'scenario':<24}{'ttft ms':>10}{'total ms':>11}{'llm':>6}{'tools':>7}{'peak MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        ttft = f"{r['ttft_ms']:.1f}" if r["ttft_ms"] is not None else "-"
+        print(f"{r['scenario']:<24}{ttft:>10}{r['total_ms']:>11.1f}"
+              f"{r['llm_calls']:>6}{r['tool_calls']:>7}{r['peak_mb']:>9.2f}")
+        for miss in r["misses"]:
+            print(f"  ! unmatched request: {miss[:90]}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark orchestrator turns with replayed LLM/tool responses.")
+    parser.add_argument("scenarios", nargs="*", help="Scenario names (default: all)")
+    parser.add_argument("--first-token-ms", type=float, default=300.0, help="Simulated LLM time to first token")
+    parser.add_argument("--per-token-ms", type=float, default=10.0, help="Simulated LLM time per output token")
+    parser.add_argument("--tool-ms", type=float, default=100.0, help="Simulated latency of each tool call")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--record", action="store_true", help="Record fixtures from live APIs instead of replaying")
+    args = parser.parse_args(argv)
+
+    names = args.scenarios or list_scenarios()
+    if args.record:
+        for name in names:
+            fixture = asyncio.run(record_scenario(name))
+            print(f"recorded {name}: {len(fixture['llm'])} LLM calls, {len(fixture['tools'])} tool calls")
+        return
+
+    latency = SimulatedLatency(
+        first_token=args.first_token_ms / 1000,
+        per_token=args.per_token_ms / 1000,
+        tool=args.tool_ms / 1000,
+    )
+    results = [asyncio.run(run_scenario(name, latency)) for name in names]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        _print_table(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,9 +9,237 @@ CHECKPOINTS_DB_PATH = "sidekick_checkpoints.db"
 TASKS_DB_PATH = "sidekick_scheduled_tasks.db"
 JOBS_DB_PATH = "sidekick_jobs.db"
 INTERVIEW_DB_PATH = "sidekick_interviews.db"
+TRACES_DB_PATH = "sidekick_traces.db"
+# SQLite access (storage.py): pragmas applied to every connection — WAL lets
+# readers run next to the writer, busy_timeout (ms) makes concurrent writers
+# wait instead of failing. Blocking database calls from async code run on a
+# STORAGE_WORKERS-thread executor.
+STORAGE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "temp_store": "MEMORY",
+    "cache_size": -8000,
+}
+STORAGE_WORKERS = 4
 SANDBOX_DIR = "sandbox"
 JOB_APPLICATIONS_DIR = "sandbox/job_applications"
 DEFAULT_MODEL = "gpt-5.2-chat-latest"
 
+# Model routing (see model_router.py). Every LLM call has a role whose tier in
+# MODEL_ROLE_TIERS picks the model from MODEL_TIERS (ordered small to large).
+# "auto" lets a heuristic classifier choose per request: at most
+# MODEL_CLASSIFIER_MAX_SMALL_WORDS words, one question and none of the hints
+# goes to the smallest tier. A reply that fails validation is retried on the
+# next larger tier when MODEL_FALLBACK_ENABLED.
+MODEL_TIERS = {
+    "small": "gpt-5-mini",
+    "large": DEFAULT_MODEL,
+}
+MODEL_ROLE_TIERS = {
+    "worker": "large",
+    "evaluator": "small",
+    "summary": "large",
+    "profile": "small",
+    "task_replay": "large",
+    "agent:research": "large",
+    "agent:browser": "large",
+    "agent:documents": "auto",
+    "agent:knowledge": "small",
+    "agent:location": "small",
+    "agent:system": "small",
+    "agent:jobsearch": "large",
+    "agent:interview": "large",
+}
+DEFAULT_MODEL_TIER = "large"
+MODEL_FALLBACK_ENABLED = True
+MODEL_CLASSIFIER_MAX_SMALL_WORDS = 25
+MODEL_CLASSIFIER_COMPLEX_HINTS = [
+    "analy", "compare", "explain", "why", "plan", "strategy", "design", "debug",
+    "code", "write", "draft", "report", "research", "evaluate", "pros and cons",
+]
+# USD per 1M input / output tokens, for the per-tier cost report
+MODEL_PRICES = {
+    "gpt-5-mini": (0.25, 2.00),
+    "gpt-5.2-chat-latest": (1.75, 14.00),
+}
+
+# Worker context window: token budget per model (falls back to the default),
+# number of most recent user turns always sent verbatim, the size above
+# which older tool outputs are replaced by a summary, and how many of those
+# summaries (and rolling conversation summaries) are kept for reuse.
+CONTEXT_TOKEN_BUDGETS = {
+    "gpt-5.2-chat-latest": 32000,
+}
+DEFAULT_CONTEXT_TOKEN_BUDGET = 24000
+CONTEXT_RECENT_TURNS = 3
+CONTEXT_TOOL_OUTPUT_MAX_TOKENS = 1500
+CONTEXT_SUMMARY_CACHE_SIZE = 512
+
+# Evaluator loop (only runs when the user gives success criteria)
+MAX_EVALUATION_ROUNDS = 3
+
+# Local span tracing of every turn (see tracing.py and the Traces panel).
+# Spans older than TRACE_RETENTION_DAYS are deleted on the first flush of a
+# process and then every TRACE_PRUNE_EVERY_FLUSHES turns.
+TRACING_ENABLED = True
+TRACE_RETENTION_DAYS = 14
+TRACE_PRUNE_EVERY_FLUSHES = 50
+
+# Chat streaming: worker tokens are coalesced and flushed as one delta at most
+# every STREAM_FLUSH_INTERVAL_MS, or sooner once STREAM_FLUSH_MAX_CHARS pile up.
+STREAM_FLUSH_INTERVAL_MS = 50
+STREAM_FLUSH_MAX_CHARS = 512
+
+# Serving mode for app.py: "per_session" builds a Sidekick (graph, browser,
+# connections) per browser session; "shared" serves every session from one
+# runtime with admission control and a per-user fair queue (see serving.py).
+SERVING_MODE = "per_session"
+SERVING_MAX_ACTIVE_TURNS = 8
+SERVING_MAX_QUEUED_TURNS = 64
+BROWSER_POOL_SIZE = 2
+# Per-thread chat histories kept open by one Sidekick, and worker LLM usage
+# records it remembers
+HISTORY_CACHE_SIZE = 256
+LLM_USAGE_HISTORY = 500
+# Past chat messages (3 exchanges) quoted in the worker's memory context
+MEMORY_CONTEXT_MESSAGES = 6
+
+# Scheduled task execution (scheduler.py): at most SCHEDULER_POOL_SIZE tasks
+# run at once, up to SCHEDULER_MAX_QUEUED more wait (higher priority first), and
+# fires that find the queue full are dropped. Queue wait times of the last
+# SCHEDULER_WAIT_SAMPLES runs are kept for the metrics.
+SCHEDULER_POOL_SIZE = 2
+SCHEDULER_MAX_QUEUED = 50
+SCHEDULER_WAIT_SAMPLES = 500
+# Where scheduled tasks run: "in_process" (APScheduler inside app.py / api.py)
+# or "external" (task_worker.py processes; the UI only adds tasks and shows
+# their results). Every run is leased in the tasks database for
+# SCHEDULER_LEASE_SECONDS (renewed while it runs), so several runners never
+# execute the same run twice and a crashed runner's tasks are picked up again.
+SCHEDULER_MODE = "in_process"
+SCHEDULER_POLL_SECONDS = 15
+SCHEDULER_LEASE_SECONDS = 600
+# Defaults of the per-task run policies (see schedule_task). Jitter delays each
+# run by up to that many seconds so tasks sharing a schedule don't start in
+# the same second; a fire that could not start on time (runner down or busy)
+# still runs if it is at most the grace time late, and with coalescing only
+# once however many fires were missed.
+SCHEDULER_DEFAULT_JITTER_SECONDS = 60
+SCHEDULER_DEFAULT_MISFIRE_GRACE_SECONDS = 300
+# Run starts allowed per external API across all runners: name -> (starts,
+# per seconds). Tasks name the APIs they use; a run over a limit waits.
+SCHEDULER_API_RATE_LIMITS = {"llm": (20, 60), "search": (10, 60)}
+SCHEDULER_DEFAULT_APIS = "llm"
+# Scheduler metrics (GET /metrics, Scheduled Tasks panel): run counts,
+# failures and durations cover the last SCHEDULER_METRICS_WINDOW_HOURS
+SCHEDULER_METRICS_WINDOW_HOURS = 24
+# Event-triggered tasks (events.py): runners check file triggers and pick up
+# events emitted in other processes every SCHEDULER_EVENT_POLL_SECONDS; a task
+# keeps at most SCHEDULER_MAX_PENDING_EVENTS events for its next run
+SCHEDULER_EVENT_POLL_SECONDS = 10
+SCHEDULER_MAX_PENDING_EVENTS = 20
+# Monitoring tasks (monitoring.py): the pre-check's page-fetch timeout and how
+# much of the changed source the agent is shown
+MONITOR_FETCH_TIMEOUT = 20
+MONITOR_EXCERPT_CHARS = 4000
+# Scheduled-task plans (task_plans.py): a successful run whose tool calls were
+# all in TASK_PLAN_TOOLS (read-only) is stored as the task's plan; later runs
+# call those tools directly and use one LLM call ("task_replay" role) for the
+# result. Every TASK_PLAN_MAX_REPLAYS replays a full run re-plans the task.
+TASK_PLANS_ENABLED = True
+TASK_PLAN_TOOLS = [
+    "search", "wikipedia", "arxiv", "get_youtube_transcript",
+    "read_pdf", "read_spreadsheet", "read_file", "list_directory",
+    "search_knowledge_base", "list_knowledge_base",
+]
+TASK_PLAN_MAX_REPLAYS = 20
+TASK_PLAN_OUTPUT_CHARS = 6000
+# Run history of scheduled tasks (task_runs in TASKS_DB_PATH). Runs are kept
+# for TASK_RUNS_RETENTION_DAYS; the full result text only for each task's
+# latest TASK_RUN_RESULTS_PER_TASK runs (older runs keep a short preview).
+TASK_RUNS_RETENTION_DAYS = 90
+TASK_RUN_RESULTS_PER_TASK = 20
+TASK_RUN_PREVIEW_CHARS = 200
+
+# Headless HTTP API (api.py). API_RUN_SCHEDULER only applies while
+# SCHEDULER_MODE is "in_process"; leases keep a run from executing twice when
+# both the UI and the API schedule tasks from one database.
+API_HOST = "127.0.0.1"
+API_PORT = 8000
+API_RUN_SCHEDULER = True
+
+# Opt-in cache of final answers to repeated requests (see response_cache.py).
+# Requests match exactly or by embedding similarity >= RESPONSE_CACHE_SIMILARITY,
+# with the same success criteria, RESPONSE_CACHE_PROFILE_KEYS facts and recent
+# thread messages. An answer lives for the shortest TTL (seconds) of the agents
+# it used; 0 means answers involving that agent are never cached. Answers the
+# worker gave without an agent (chit-chat, follow-ups) use
+# RESPONSE_CACHE_NO_AGENT_TTL.
+RESPONSE_CACHE_ENABLED = False
+RESPONSE_CACHE_DB_PATH = "sidekick_response_cache.db"
+RESPONSE_CACHE_SIMILARITY = 0.93
+RESPONSE_CACHE_EMBEDDING_MODEL = "text-embedding-3-small"
+RESPONSE_CACHE_MAX_ENTRIES = 2000
+RESPONSE_CACHE_DEFAULT_TTL = 24 * 3600
+RESPONSE_CACHE_NO_AGENT_TTL = 0
+RESPONSE_CACHE_AGENT_TTLS = {
+    "research": 15 * 60,
+    "browser": 15 * 60,
+    "jobsearch": 3600,
+    "knowledge": 24 * 3600,
+    "location": 7 * 24 * 3600,
+    "documents": 0,
+    "system": 0,
+    "interview": 0,
+}
+RESPONSE_CACHE_PROFILE_KEYS = ("name", "location", "language", "preferred_output_format")
+
+# Memoization of deterministic sub-agent tools (see tools/memo.py): results
+# are reused for the tool's TTL in seconds; sandbox file readers are also
+# invalidated when the file changes. Tools not listed are never memoized.
+TOOL_MEMO_ENABLED = True
+TOOL_MEMO_DB_PATH = "sidekick_tool_memo.db"
+TOOL_MEMO_MEMORY_ENTRIES = 512
+TOOL_MEMO_TTLS = {
+    "search": 10 * 60,
+    "wikipedia": 7 * 24 * 3600,
+    "arxiv": 7 * 24 * 3600,
+    "get_youtube_transcript": 30 * 24 * 3600,
+    "read_pdf": 30 * 24 * 3600,
+    "read_spreadsheet": 30 * 24 * 3600,
+    "read_file": 30 * 24 * 3600,
+}
+
+# Fast-path tools: read-only, single-step tools of an agent that the
+# orchestrator may call directly instead of delegating, which saves the
+# sub-agent's two LLM round-trips. Only add tools without side effects whose
+# raw output the orchestrator can answer from.
+FAST_PATH_TOOLS = {
+    "system": ["list_scheduled_tasks"],
+    "knowledge": ["list_knowledge_base", "search_knowledge_base"],
+    "documents": ["read_file", "list_directory"],
+}
+
+# Sub-agent results: the answer an agent hands back to the orchestrator is
+# capped per agent (estimated tokens). Longer answers and large raw tool
+# outputs are saved under AGENT_ARTIFACTS_DIR and referenced by path; the
+# orchestrator pages through them with read_artifact only when it needs to.
+AGENT_OUTPUT_TOKEN_CAPS = {
+    "research": 1200,
+    "browser": 1000,
+    "documents": 800,
+    "knowledge": 1000,
+    "location": 1200,
+    "system": 600,
+    "jobsearch": 1500,
+    "interview": 1500,
+}
+DEFAULT_AGENT_OUTPUT_TOKENS = 1000
+AGENT_ARTIFACT_MIN_TOKENS = 2000
+AGENT_ARTIFACTS_DIR = "sandbox/agent_outputs"
+AGENT_ARTIFACTS_MAX_FILES = 200
+ARTIFACT_PAGE_CHARS = 8000
+
 # Adzuna country for job search (de, gb, us, fr, etc.)
 ADZUNA_COUNTRY = "de"
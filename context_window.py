@@ -0,0 +1,247 @@
+"""
+Token-budgeted conversation window for the orchestrator worker.
+
+The checkpointed thread keeps every message forever, including the full
+result of every delegated agent.  Sending all of it on each worker step makes
+latency and cost grow without bound, so the worker sends a *view* of the
+thread instead:
+
+- the most recent user turns are kept verbatim;
+- large tool outputs in older turns are replaced by a short summary;
+- when that is still over budget, older turns are folded into a rolling
+  summary that is extended incrementally as the window moves forward.
+
+Summaries are cached by content hash in an LRU of
+``CONTEXT_SUMMARY_CACHE_SIZE`` entries, so a message is normally summarised
+once per process.  The checkpoint itself is never modified.
+"""
+
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from config import (
+    CONTEXT_RECENT_TURNS,
+    CONTEXT_SUMMARY_CACHE_SIZE,
+    CONTEXT_TOKEN_BUDGETS,
+    CONTEXT_TOOL_OUTPUT_MAX_TOKENS,
+    DEFAULT_CONTEXT_TOKEN_BUDGET,
+    DEFAULT_MODEL,
+)
+
+log = logging.getLogger(__name__)
+
+# Rough chars-per-token ratio for English/code; precise enough for budgeting
+# and avoids a tokenizer download.
+_CHARS_PER_TOKEN = 4
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(messages: List[Any]) -> int:
+    """Approximate the prompt tokens used by *messages*."""
+    total = 0
+    for m in messages:
+        content = m.content if isinstance(m.content, str) else str(m.content)
+        total += len(content) // _CHARS_PER_TOKEN + _MESSAGE_OVERHEAD_TOKENS
+        for tc in getattr(m, "tool_calls", None) or []:
+            total += len(str(tc.get("args", ""))) // _CHARS_PER_TOKEN
+    return total
+
+
+def clip_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut *text* to roughly *max_tokens*, preferring a line or word boundary."""
+    limit = max_tokens * _CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    boundary = max(cut.rfind("\n"), cut.rfind(" "))
+    return cut[:boundary] if boundary > limit // 2 else cut
+
+
+def budget_for_model(model: str) -> int:
+    """Return the configured worker context budget for *model*."""
+    return CONTEXT_TOKEN_BUDGETS.get(model, DEFAULT_CONTEXT_TOKEN_BUDGET)
+
+
+def split_turns(messages: List[Any]) -> List[List[Any]]:
+    """Group messages into turns, each starting at a HumanMessage.
+
+    Cutting only at turn boundaries guarantees that a ToolMessage is never
+    separated from the AIMessage whose tool call it answers.
+    """
+    turns: List[List[Any]] = []
+    for m in messages:
+        if isinstance(m, HumanMessage) or not turns:
+            turns.append([m])
+        else:
+            turns[-1].append(m)
+    return turns
+
+
+def _digest(*parts: str) -> str:
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p.encode("utf-8", errors="replace"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def _render(messages: List[Any]) -> str:
+    lines = []
+    for m in messages:
+        if isinstance(m, HumanMessage):
+            lines.append(f"User: {m.content}")
+        elif isinstance(m, ToolMessage):
+            lines.append(f"Result from {m.name or 'agent'}: {m.content}")
+        elif isinstance(m, AIMessage):
+            if m.tool_calls:
+                calls = ", ".join(f"{tc['name']}({tc['args']})" for tc in m.tool_calls)
+                lines.append(f"Assistant delegated: {calls}")
+            if m.content:
+                lines.append(f"Assistant: {m.content}")
+    return "\n".join(lines)
+
+
+class ContextWindow:
+    """Builds a budget-bounded view of a conversation for one model."""
+
+    def __init__(
+        self,
+        model: str = DEFAULT_MODEL,
+        budget: Optional[int] = None,
+        recent_turns: int = CONTEXT_RECENT_TURNS,
+        tool_output_max_tokens: int = CONTEXT_TOOL_OUTPUT_MAX_TOKENS,
+        summarizer=None,
+        cache_size: int = CONTEXT_SUMMARY_CACHE_SIZE,
+    ):
+        self.model = model
+        self.budget = budget or budget_for_model(model)
+        self.recent_turns = recent_turns
+        self.tool_output_max_tokens = tool_output_max_tokens
+        self._summarizer = summarizer
+        # digest -> summary text (LRU); shared by tool outputs and rolling summaries
+        self._cache_size = cache_size
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+
+    def _cached(self, key: str) -> Optional[str]:
+        if key not in self._cache:
+            return None
+        self._cache.move_to_end(key)
+        return self._cache[key]
+
+    def _remember(self, key: str, summary: str):
+        self._cache[key] = summary
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def _get_summarizer(self):
+        if self._summarizer is None:
+            from model_router import chat_model, tier_for
+            self._summarizer = chat_model(tier_for("summary"))
+        return self._summarizer
+
+    async def _summarize(self, instruction: str, text: str) -> str:
+        response = await self._get_summarizer().ainvoke([
+            SystemMessage(content=instruction),
+            HumanMessage(content=text),
+        ])
+        return response.content
+
+    # -- tool outputs ---------------------------------------------------------
+
+    async def _compact_tool_output(self, message: ToolMessage) -> ToolMessage:
+        key = _digest("tool", message.content)
+        summary = self._cached(key)
+        if summary is None:
+            summary = await self._summarize(
+                "Summarise this tool output for an assistant that may need to refer "
+                "back to it later. Keep names, numbers, URLs, file paths and conclusions. "
+                "Be concise.",
+                message.content,
+            )
+            self._remember(key, summary)
+        return message.model_copy(update={
+            "content": f"[Summarised — original output omitted]\n{summary}",
+        })
+
+    async def _compact_turns(self, turns: List[List[Any]]) -> List[List[Any]]:
+        """Replace oversized tool outputs in *turns* by cached summaries."""
+        limit = self.tool_output_max_tokens * _CHARS_PER_TOKEN
+        jobs = {}
+        for ti, turn in enumerate(turns):
+            for mi, m in enumerate(turn):
+                if isinstance(m, ToolMessage) and isinstance(m.content, str) and len(m.content) > limit:
+                    jobs[(ti, mi)] = self._compact_tool_output(m)
+        if not jobs:
+            return turns
+        compacted = dict(zip(jobs, await asyncio.gather(*jobs.values())))
+        return [
+            [compacted.get((ti, mi), m) for mi, m in enumerate(turn)]
+            for ti, turn in enumerate(turns)
+        ]
+
+    # -- rolling summary ------------------------------------------------------
+
+    async def _rolling_summary(self, turns: List[List[Any]]) -> str:
+        """Summarise *turns*, reusing the longest already-summarised prefix."""
+        keys = []
+        key = "root"
+        for turn in turns:
+            key = _digest(key, _render(turn))
+            keys.append(key)
+
+        cached_upto, previous = 0, ""
+        for i in range(len(keys), 0, -1):
+            if keys[i - 1] in self._cache:
+                cached_upto, previous = i, self._cached(keys[i - 1])
+                break
+
+        if cached_upto == len(turns):
+            return previous
+
+        new_text = "\n\n".join(_render(t) for t in turns[cached_upto:])
+        prompt = new_text if not previous else (
+            f"Summary so far:\n{previous}\n\nNew conversation to fold in:\n{new_text}"
+        )
+        summary = await self._summarize(
+            "Maintain a running summary of a conversation between a user and an AI "
+            "assistant. Preserve user goals, decisions, facts about the user, open "
+            "questions and the key results of delegated work. Be concise.",
+            prompt,
+        )
+        self._remember(keys[-1], summary)
+        log.info("Folded %d turn(s) into the rolling conversation summary", len(turns) - cached_upto)
+        return summary
+
+    # -- public API -----------------------------------------------------------
+
+    async def prepare(self, messages: List[Any]) -> Tuple[str, List[Any]]:
+        """Return ``(summary, messages)`` fitting this window's token budget.
+
+        ``summary`` is empty when nothing had to be folded away.  The newest
+        turn is always returned verbatim.
+        """
+        if estimate_tokens(messages) <= self.budget:
+            return "", list(messages)
+
+        turns = split_turns(messages)
+        current = turns[-1:]
+        previous = await self._compact_turns(turns[:-1])
+        turns = previous + current
+        if estimate_tokens([m for t in turns for m in t]) <= self.budget:
+            return "", [m for t in turns for m in t]
+
+        keep = max(self.recent_turns, 1)
+        older, recent = turns[:-keep], turns[-keep:]
+
+        # Drop further turns into the summary until the window fits
+        while len(recent) > 1 and estimate_tokens([m for t in recent for m in t]) > self.budget:
+            older.append(recent.pop(0))
+
+        summary = await self._rolling_summary(older) if older else ""
+        return summary, [m for t in recent for m in t]
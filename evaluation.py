@@ -0,0 +1,58 @@
+"""
+Helpers for the orchestrator's optional evaluator loop.
+
+The evaluator only runs when the user supplies success criteria.  To keep it
+cheap it sees only the part of the conversation added since its previous
+verdict, identical (criteria, response) pairs reuse a cached verdict, and
+the loop is capped at ``MAX_EVALUATION_ROUNDS`` per superstep.
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+from langchain_core.messages import HumanMessage
+
+
+def conversation_delta(messages: List[Any], evaluated_upto: int = 0) -> List[Any]:
+    """Return the messages the evaluator has not seen yet.
+
+    ``evaluated_upto`` is the message count recorded with the previous
+    verdict.  When it is 0 (first round of a superstep) the delta starts at
+    the latest user message, i.e. the current turn.
+    """
+    if evaluated_upto:
+        return messages[evaluated_upto:]
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return messages[i:]
+    return list(messages)
+
+
+class VerdictCache:
+    """Small LRU cache of evaluator verdicts keyed by (criteria, response)."""
+
+    def __init__(self, max_entries: int = 256):
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+
+    @staticmethod
+    def _key(criteria: str, response: str) -> str:
+        return hashlib.sha256(f"{criteria}\x00{response}".encode("utf-8")).hexdigest()
+
+    def get(self, criteria: str, response: str) -> Optional[Any]:
+        key = self._key(criteria, response)
+        if key not in self._entries:
+            return None
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, criteria: str, response: str, verdict: Any):
+        key = self._key(criteria, response)
+        self._entries[key] = verdict
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
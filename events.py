@@ -0,0 +1,138 @@
+"""
+Events that trigger scheduled tasks, as an alternative to a cron schedule.
+
+A task with an ``event`` trigger runs when a matching event happens.  A
+trigger is ``<kind>:<pattern>``, the fnmatch-style pattern matching the
+event's key (``*`` when omitted):
+
+- ``file:<glob>`` — a file under ``SANDBOX_DIR`` matching the glob (e.g.
+  ``knowledge/*.pdf``) was added or modified; runners find these with a
+  cheap stat scan (``snapshot``), no agent involved;
+- ``job_status:<status>`` — a job moved to that pipeline status (jobs.py);
+- ``kb_indexed:<filename>`` — the knowledge base indexed a document.
+
+Producers call ``emit``; the scheduler subscribes and turns matching events
+into due runs of the tasks.  Emitting without subscribers does nothing, and
+a failing subscriber is logged, never raised to the producer.
+"""
+
+import fnmatch
+import logging
+import os
+from typing import Callable, Dict, Optional
+
+from config import SANDBOX_DIR
+
+log = logging.getLogger(__name__)
+
+# Event kind -> what a trigger of that kind waits for (the pattern fills in)
+EVENT_KINDS = {
+    "file": "a file matching '{}' is added or changed in the sandbox",
+    "job_status": "a job moves to status '{}'",
+    "kb_indexed": "the knowledge base indexes '{}'",
+}
+
+Handler = Callable[[str, str, str], None]
+
+_handlers: list[Handler] = []
+
+_WILDCARDS = set("*?[")
+
+
+# ---------------------------------------------------------------------------
+# Triggers
+# ---------------------------------------------------------------------------
+
+def parse(trigger: str) -> tuple[str, str]:
+    """Split *trigger* into its kind and pattern."""
+    kind, _, pattern = trigger.strip().partition(":")
+    return kind.strip(), pattern.strip() or "*"
+
+
+def validate(trigger: str) -> tuple[bool, str]:
+    """Validate an event trigger. Returns (is_valid, error_message)."""
+    kind, pattern = parse(trigger)
+    if kind not in EVENT_KINDS:
+        return False, f"unknown event '{kind}'; expected one of {', '.join(EVENT_KINDS)}"
+    if kind == "file":
+        if ":" not in trigger or not trigger.partition(":")[2].strip():
+            return False, "a file trigger needs a glob, e.g. 'file:knowledge/*.pdf'"
+        if os.path.isabs(pattern) or ".." in pattern.split("/"):
+            return False, "the glob must be relative to the sandbox"
+    return True, ""
+
+
+def describe(trigger: str) -> str:
+    kind, pattern = parse(trigger)
+    return EVENT_KINDS.get(kind, kind + " '{}'").format(pattern)
+
+
+def matches(trigger: str, kind: str, key: str) -> bool:
+    """Whether the event (*kind*, *key*) fires *trigger*."""
+    trigger_kind, pattern = parse(trigger)
+    return trigger_kind == kind and fnmatch.fnmatchcase(key, pattern)
+
+
+# ---------------------------------------------------------------------------
+# Dispatch
+# ---------------------------------------------------------------------------
+
+def subscribe(handler: Handler):
+    """Call ``handler(kind, key, detail)`` for every event emitted in this process."""
+    if handler not in _handlers:
+        _handlers.append(handler)
+
+
+def unsubscribe(handler: Handler):
+    if handler in _handlers:
+        _handlers.remove(handler)
+
+
+def emit(kind: str, key: str, detail: str = ""):
+    """Publish an event; *detail* is a sentence describing it for the triggered task."""
+    for handler in list(_handlers):
+        try:
+            handler(kind, key, detail or f"{kind} {key}")
+        except Exception:
+            log.exception("Handler of %s event '%s' failed", kind, key)
+
+
+# ---------------------------------------------------------------------------
+# File triggers
+# ---------------------------------------------------------------------------
+
+def snapshot(pattern: str, root: Optional[str] = None) -> Dict[str, float]:
+    """Modification times of the files matching *pattern*, by path relative to *root*.
+
+    *root* defaults to ``SANDBOX_DIR``.  Only the directory below the pattern's wildcard-free prefix is walked,
+    so ``knowledge/*.pdf`` never stats the rest of the sandbox.
+    """
+    root = root or SANDBOX_DIR
+    parts = pattern.split("/")
+    static = []
+    for part in parts[:-1]:
+        if _WILDCARDS & set(part):
+            break
+        static.append(part)
+    base = os.path.join(root, *static)
+    if not os.path.isdir(base):
+        return {}
+    found = {}
+    for dirpath, _, filenames in os.walk(base):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            rel = os.path.relpath(path, root).replace(os.sep, "/")
+            if fnmatch.fnmatchcase(rel, pattern):
+                try:
+                    found[rel] = os.stat(path).st_mtime
+                except OSError:
+                    continue  # removed while scanning
+    return found
+
+
+def changed_files(before: Dict[str, float], after: Dict[str, float]) -> list[str]:
+    """Events for files added or modified between two snapshots."""
+    return [
+        f"file {path} was {'added' if path not in before else 'modified'}"
+        for path, mtime in sorted(after.items()) if before.get(path) != mtime
+    ]
@@ -0,0 +1,73 @@
+"""
+Process-wide cache of compiled LangGraph graphs.
+
+Compiling a graph is the expensive part of building a Sidekick: every
+``ToolNode`` derives a pydantic schema for each of its tools, and the
+orchestrator plus seven sub-agents each own one.  The topology is the same
+for every instance, so graphs are compiled once per process, keyed by kind
+and tool names, and parameterised at run time instead:
+
+- tool nodes hold ``runtime_tool`` stand-ins that look the real tool up in
+  the run's config (``config["configurable"][<registry>][<name>]``), so each
+  instance still calls its own tools (its own browser, memo, agents);
+- orchestrator nodes find their Sidekick in ``config["configurable"]``;
+- each Sidekick gets a cheap ``copy()`` of the compiled graph carrying its
+  own checkpointer.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool, StructuredTool, Tool
+
+log = logging.getLogger(__name__)
+
+# Tag on runtime_tool stand-ins; callback handlers skip these runs so each
+# tool call is recorded once (for the real tool)
+DISPATCH_TAG = "graph_cache:dispatch"
+
+_compiled: Dict[Hashable, Any] = {}
+_lock = threading.Lock()
+compile_count = 0
+
+
+def get_or_compile(key: Hashable, build: Callable[[], Any]) -> Any:
+    """Return the cached object for *key*, calling *build* on first use."""
+    global compile_count
+    with _lock:
+        if key not in _compiled:
+            _compiled[key] = build()
+            compile_count += 1
+            log.debug("Compiled %r", key)
+        return _compiled[key]
+
+
+def clear():
+    """Forget every compiled graph (e.g. after swapping model or tool factories)."""
+    with _lock:
+        _compiled.clear()
+
+
+def runtime_tool(template: BaseTool, registry: str) -> BaseTool:
+    """A stand-in with *template*'s name and schema that runs the tool named the
+    same in ``config["configurable"][registry]`` of the current run."""
+    name = template.name
+
+    async def _acall(*args, config: RunnableConfig, **kwargs):
+        tool = config["configurable"][registry][name]
+        return await tool.ainvoke(args[0] if args else kwargs, config)
+
+    if isinstance(template, Tool) or template.args_schema is None:
+        # Single string input (Tool, or a BaseTool without a schema)
+        return Tool(name=name, description=template.description, func=None, coroutine=_acall,
+                    tags=[DISPATCH_TAG])
+    return StructuredTool(
+        name=name,
+        description=template.description,
+        args_schema=template.args_schema,
+        func=None,
+        coroutine=_acall,
+        tags=[DISPATCH_TAG],
+    )
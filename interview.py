@@ -11,6 +11,7 @@ import uuid
 from datetime import datetime
 from typing import Optional
 
+import storage
 from config import INTERVIEW_DB_PATH
 
 DB_PATH = INTERVIEW_DB_PATH
@@ -48,37 +49,19 @@ _CREATE_TURNS_SQL = """
 """
 
 
-_conn: Optional[sqlite3.Connection] = None
-_conn_db_path: Optional[str] = None
+def _ensure_schema(conn: sqlite3.Connection):
+    conn.execute(_CREATE_SESSIONS_SQL)
+    conn.execute(_CREATE_TURNS_SQL)
 
 
 def _get_connection(db_path: str = None) -> sqlite3.Connection:
-    global _conn, _conn_db_path
     if db_path:
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        conn.execute(_CREATE_SESSIONS_SQL)
-        conn.execute(_CREATE_TURNS_SQL)
-        conn.commit()
-        return conn
-    if _conn is None or _conn_db_path != DB_PATH:
-        if _conn is not None:
-            _conn.close()
-        _conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-        _conn.row_factory = sqlite3.Row
-        _conn.execute(_CREATE_SESSIONS_SQL)
-        _conn.execute(_CREATE_TURNS_SQL)
-        _conn.commit()
-        _conn_db_path = DB_PATH
-    return _conn
+        return storage.connect(db_path, _ensure_schema)
+    return storage.database(DB_PATH, _ensure_schema).connection()
 
 
 def close():
-    global _conn, _conn_db_path
-    if _conn:
-        _conn.close()
-        _conn = None
-        _conn_db_path = None
+    storage.close(DB_PATH)
 
 
 # ---------------------------------------------------------------------------
@@ -98,26 +81,27 @@ def create_session(
     session_id = str(uuid.uuid4())[:8]
     now = datetime.now().isoformat()
     conn = _get_connection(db_path)
-    conn.execute(
-        """
-        INSERT INTO interview_sessions (id, job_id, title, plan_json, created_at, updated_at)
-        VALUES (?, ?, ?, ?, ?, ?)
-        """,
-        (session_id, job_id, title, json.dumps(plan, ensure_ascii=False), now, now),
-    )
-    # Pre-seed turns for each planned question
-    for i, q in enumerate(plan):
+    # The session and its turns are written in one transaction
+    with storage.transaction(conn):
         conn.execute(
             """
-            INSERT INTO interview_turns (id, session_id, idx, question, category, created_at)
+            INSERT INTO interview_sessions (id, job_id, title, plan_json, created_at, updated_at)
             VALUES (?, ?, ?, ?, ?, ?)
             """,
-            (
-                str(uuid.uuid4())[:8], session_id, i,
-                q.get("question", ""), q.get("category", ""), now,
-            ),
+            (session_id, job_id, title, json.dumps(plan, ensure_ascii=False), now, now),
         )
-    conn.commit()
+        # Pre-seed turns for each planned question
+        for i, q in enumerate(plan):
+            conn.execute(
+                """
+                INSERT INTO interview_turns (id, session_id, idx, question, category, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    str(uuid.uuid4())[:8], session_id, i,
+                    q.get("question", ""), q.get("category", ""), now,
+                ),
+            )
     if db_path:
         conn.close()
     return session_id
@@ -16,6 +16,8 @@ import uuid
 from datetime import datetime
 from typing import Optional
 
+import events
+import storage
 from config import JOBS_DB_PATH
 
 DB_PATH = JOBS_DB_PATH
@@ -80,30 +82,15 @@ _CREATE_REQUIREMENTS_SQL = """
 # Connection management
 # ---------------------------------------------------------------------------
 
-_conn: Optional[sqlite3.Connection] = None
-_conn_db_path: Optional[str] = None
-
-
 def _get_connection(db_path: str = None) -> sqlite3.Connection:
     """Return a SQLite connection with all tables created.
 
     Custom ``db_path`` (for tests) creates a fresh connection each time.
-    Production reuses a module-level connection.
+    Production uses this thread's connection from the shared pool.
     """
-    global _conn, _conn_db_path
     if db_path:
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        _ensure_schema(conn)
-        return conn
-    if _conn is None or _conn_db_path != DB_PATH:
-        if _conn is not None:
-            _conn.close()
-        _conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-        _conn.row_factory = sqlite3.Row
-        _ensure_schema(_conn)
-        _conn_db_path = DB_PATH
-    return _conn
+        return storage.connect(db_path, _ensure_schema)
+    return storage.database(DB_PATH, _ensure_schema).connection()
 
 
 def _ensure_schema(conn: sqlite3.Connection):
@@ -114,12 +101,8 @@ def _ensure_schema(conn: sqlite3.Connection):
 
 
 def close():
-    """Close the module-level connection."""
-    global _conn, _conn_db_path
-    if _conn:
-        _conn.close()
-        _conn = None
-        _conn_db_path = None
+    """Close the module-level connections."""
+    storage.close(DB_PATH)
 
 
 # ---------------------------------------------------------------------------
@@ -196,35 +179,33 @@ def upsert_job(
     """
     dedupe_key = _make_dedupe_key(source, company, title, apply_url)
     conn = _get_connection(db_path)
-
-    existing = conn.execute(
-        "SELECT id FROM jobs WHERE dedupe_key = ?", (dedupe_key,)
-    ).fetchone()
-    if existing:
-        if db_path:
-            conn.close()
-        return existing["id"], False
-
-    job_id = str(uuid.uuid4())[:8]
-    now = datetime.now().isoformat()
-    conn.execute(
-        """
-        INSERT INTO jobs (
-            id, source, source_id, title, company, location, salary, description,
-            posted_at, apply_url, dedupe_key, raw_json,
-            status, discovered_at, updated_at
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'discovered', ?, ?)
-        """,
-        (
-            job_id, source, source_id, title, company, location, salary, description,
-            posted_at, apply_url, dedupe_key,
-            json.dumps(raw, ensure_ascii=False) if raw else None,
-            now, now,
-        ),
-    )
-    conn.commit()
+    # One transaction, so two discoveries of the same posting cannot both insert it
+    with storage.transaction(conn):
+        existing = conn.execute(
+            "SELECT id FROM jobs WHERE dedupe_key = ?", (dedupe_key,)
+        ).fetchone()
+        if not existing:
+            job_id = str(uuid.uuid4())[:8]
+            now = datetime.now().isoformat()
+            conn.execute(
+                """
+                INSERT INTO jobs (
+                    id, source, source_id, title, company, location, salary, description,
+                    posted_at, apply_url, dedupe_key, raw_json,
+                    status, discovered_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'discovered', ?, ?)
+                """,
+                (
+                    job_id, source, source_id, title, company, location, salary, description,
+                    posted_at, apply_url, dedupe_key,
+                    json.dumps(raw, ensure_ascii=False) if raw else None,
+                    now, now,
+                ),
+            )
     if db_path:
         conn.close()
+    if existing:
+        return existing["id"], False
     return job_id, True
 
 
@@ -275,8 +256,13 @@ def set_status(job_id: str, status: str, notes: str = None, db_path: str = None)
         )
     conn.commit()
     updated = cursor.rowcount > 0
+    job = conn.execute("SELECT title, company FROM jobs WHERE id = ?", (job_id,)).fetchone() if updated else None
     if db_path:
         conn.close()
+    if job:
+        # Triggers scheduled tasks waiting for this status (job_status:<status>)
+        at = f" at {job['company']}" if job["company"] else ""
+        events.emit("job_status", status, f"job {job_id} ({job['title']}{at}) moved to '{status}'")
     return updated
 
 
@@ -17,6 +17,8 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
 from pypdf import PdfReader
 
+import events
+
 
 KNOWLEDGE_DIR = os.path.join("sandbox", "knowledge")
 CHROMA_DIR = os.path.join("sandbox", "chroma_db")
@@ -128,6 +130,8 @@ class KnowledgeBase:
             metadatas=metadatas,
         )
 
+        # Triggers scheduled tasks waiting for it (kb_indexed:<filename>)
+        events.emit("kb_indexed", filename, f"the knowledge base indexed '{filename}' ({len(chunks)} chunks)")
         return f"Indexed '{filename}': {len(chunks)} chunks added to knowledge base."
 
     def index_all(self) -> str:
@@ -165,13 +169,10 @@ class KnowledgeBase:
 
         return f"Re-index complete ({len(files)} files scanned):\n" + "\n".join(results)
 
-    def search(self, query: str, k: int = 5) -> str:
-        """Search the knowledge base for chunks relevant to the query.
-
-        Returns a formatted string with the top-k results.
-        """
+    def search_results(self, query: str, k: int = 5) -> list[dict]:
+        """Return the top-k chunks for *query* as dicts (text, source, chunk_index, similarity)."""
         if self._collection.count() == 0:
-            return "The knowledge base is empty. Add documents first."
+            return []
 
         query_embedding = self._embeddings.embed_query(query)
 
@@ -181,20 +182,39 @@ class KnowledgeBase:
         )
 
         if not results["documents"] or not results["documents"][0]:
+            return []
+
+        return [
+            {
+                "text": doc,
+                "source": meta.get("source", "unknown"),
+                "chunk_index": meta.get("chunk_index", "?"),
+                "similarity": 1 - dist,  # cosine distance to similarity
+            }
+            for doc, meta, dist in zip(
+                results["documents"][0],
+                results["metadatas"][0],
+                results["distances"][0],
+            )
+        ]
+
+    def search(self, query: str, k: int = 5) -> str:
+        """Search the knowledge base for chunks relevant to the query.
+
+        Returns a formatted string with the top-k results.
+        """
+        if self._collection.count() == 0:
+            return "The knowledge base is empty. Add documents first."
+
+        hits = self.search_results(query, k)
+        if not hits:
             return "No relevant results found."
 
         output_parts = []
-        for i, (doc, meta, dist) in enumerate(zip(
-            results["documents"][0],
-            results["metadatas"][0],
-            results["distances"][0],
-        )):
-            similarity = 1 - dist  # cosine distance to similarity
-            source = meta.get("source", "unknown")
-            chunk_idx = meta.get("chunk_index", "?")
+        for i, hit in enumerate(hits):
             output_parts.append(
-                f"--- Result {i + 1} [source: {source}, chunk: {chunk_idx}, "
-                f"similarity: {similarity:.3f}] ---\n{doc}"
+                f"--- Result {i + 1} [source: {hit['source']}, chunk: {hit['chunk_index']}, "
+                f"similarity: {hit['similarity']:.3f}] ---\n{hit['text']}"
             )
 
         return "\n\n".join(output_parts)
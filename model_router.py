@@ -0,0 +1,198 @@
+"""
+Model routing: which model serves each LLM call.
+
+Every LLM call in ApexFlow names a *role* — ``worker``, ``evaluator``,
+``summary``, ``profile``, ``task_replay`` or ``agent:<name>`` — and
+``MODEL_ROLE_TIERS`` maps the role to a tier of ``MODEL_TIERS`` (ordered from
+smallest to largest).  A role routed to ``"auto"`` lets ``classify_complexity``
+pick the tier per request: short lookups and formatting go to the smallest
+tier, anything that looks like reasoning to the largest.
+
+When a smaller tier's reply fails validation (unparseable structured output,
+malformed or unknown tool calls, an empty answer) the call is retried on the
+next larger tier, and the fallback is counted.
+
+``tier_report`` compares latency, tokens and cost per tier from the LLM spans
+in the trace store (see tracing.py).
+"""
+
+import logging
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.exceptions import OutputParserException
+from langchain_openai import ChatOpenAI
+from pydantic import ValidationError
+
+import tracing
+from config import (
+    DEFAULT_MODEL_TIER,
+    MODEL_CLASSIFIER_COMPLEX_HINTS,
+    MODEL_CLASSIFIER_MAX_SMALL_WORDS,
+    MODEL_FALLBACK_ENABLED,
+    MODEL_PRICES,
+    MODEL_ROLE_TIERS,
+    MODEL_TIERS,
+)
+
+log = logging.getLogger(__name__)
+
+# Errors that mean "the model answered, but not in a usable shape"
+VALIDATION_ERRORS = (OutputParserException, ValidationError)
+
+_models: Dict[Tuple, ChatOpenAI] = {}
+_fallbacks: Counter = Counter()
+_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# Tiers
+# ---------------------------------------------------------------------------
+
+def classify_complexity(request: str) -> str:
+    """Pick a tier for *request* with a cheap heuristic (no LLM call).
+
+    Short, single-question requests without reasoning keywords go to the
+    smallest tier; everything else to the largest.
+    """
+    tiers = list(MODEL_TIERS)
+    text = str(request or "").strip().lower()
+    if (
+        len(text.split()) > MODEL_CLASSIFIER_MAX_SMALL_WORDS
+        or text.count("?") > 1
+        or "\n" in text
+        or any(hint in text for hint in MODEL_CLASSIFIER_COMPLEX_HINTS)
+    ):
+        return tiers[-1]
+    return tiers[0]
+
+
+def tier_for(role: str, request: str = "") -> str:
+    """The tier serving *role*; ``"auto"`` roles classify *request*."""
+    tier = MODEL_ROLE_TIERS.get(role, DEFAULT_MODEL_TIER)
+    if tier == "auto":
+        return classify_complexity(request)
+    return tier
+
+
+def initial_tiers(role: str) -> List[str]:
+    """The tiers *role* can start on (every tier for ``"auto"`` roles)."""
+    tier = MODEL_ROLE_TIERS.get(role, DEFAULT_MODEL_TIER)
+    return list(MODEL_TIERS) if tier == "auto" else [tier]
+
+
+def model_for(tier: str) -> str:
+    return MODEL_TIERS[tier]
+
+
+def next_tier(tier: str) -> Optional[str]:
+    """The tier to fall back to from *tier*, or None if there is none."""
+    if not MODEL_FALLBACK_ENABLED:
+        return None
+    tiers = list(MODEL_TIERS)
+    index = tiers.index(tier)
+    return tiers[index + 1] if index + 1 < len(tiers) else None
+
+
+def chat_model(tier: str, **kwargs) -> ChatOpenAI:
+    """A (shared) chat model of *tier*; *kwargs* are passed to ``ChatOpenAI``."""
+    key = (tier, tuple(sorted(kwargs.items())))
+    with _lock:
+        if key not in _models:
+            _models[key] = ChatOpenAI(model=model_for(tier), **kwargs)
+        return _models[key]
+
+
+def clear():
+    """Forget the shared chat models (e.g. after swapping the model class)."""
+    with _lock:
+        _models.clear()
+
+
+# ---------------------------------------------------------------------------
+# Validation and fallback
+# ---------------------------------------------------------------------------
+
+def is_valid_reply(message: Any, tool_names: Optional[Iterable[str]] = None) -> bool:
+    """True if *message* has well-formed tool calls (to known tools) or text."""
+    if getattr(message, "invalid_tool_calls", None):
+        return False
+    calls = getattr(message, "tool_calls", None) or []
+    if tool_names is not None:
+        known = set(tool_names)
+        if any(call["name"] not in known for call in calls):
+            return False
+    return bool(calls) or bool(str(getattr(message, "content", "") or "").strip())
+
+
+def record_fallback(role: str, from_tier: str, to_tier: str):
+    with _lock:
+        _fallbacks[(role, from_tier)] += 1
+    log.info("%s: %s tier reply failed validation, retrying on %s", role, from_tier, to_tier)
+
+
+def fallback_counts() -> Dict[Tuple[str, str], int]:
+    """Fallbacks since start-up, per ``(role, tier that failed)``."""
+    with _lock:
+        return dict(_fallbacks)
+
+
+async def ainvoke_structured(role: str, schema: Any, messages: List[Any],
+                             config: Optional[dict] = None, request: str = ""):
+    """Ask *role*'s model for a *schema* object, falling back on parse failures."""
+    tier = tier_for(role, request)
+    while True:
+        llm = chat_model(tier).with_structured_output(schema)
+        try:
+            return await llm.ainvoke(messages, config=config)
+        except VALIDATION_ERRORS:
+            bigger = next_tier(tier)
+            if bigger is None:
+                raise
+            record_fallback(role, tier, bigger)
+            tier = bigger
+
+
+# ---------------------------------------------------------------------------
+# Telemetry
+# ---------------------------------------------------------------------------
+
+def _cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def tier_report(since_hours: float = 24, db_path: str = None) -> List[Dict[str, Any]]:
+    """Latency, tokens, cost and fallbacks per tier from recorded LLM spans.
+
+    Spans are attributed to a tier by model name; models outside
+    ``MODEL_TIERS`` are reported under the tier ``"other"``.
+    """
+    tiers_by_model = {model: tier for tier, model in MODEL_TIERS.items()}
+    failed: Counter = Counter()
+    for (_, tier), count in fallback_counts().items():
+        failed[tier] += count
+
+    report = []
+    for row in tracing.summarize(since_hours=since_hours, db_path=db_path):
+        if row["kind"] != "llm":
+            continue
+        cost = _cost(row["name"], row["input_tokens"], row["output_tokens"])
+        tier = tiers_by_model.get(row["name"], "other")
+        report.append({
+            "tier": tier,
+            "model": row["name"],
+            "calls": row["calls"],
+            "errors": row["errors"],
+            "p50_ms": row["p50_ms"],
+            "p95_ms": row["p95_ms"],
+            "input_tokens": row["input_tokens"],
+            "output_tokens": row["output_tokens"],
+            "cost_usd": cost,
+            "cost_per_call_usd": cost / row["calls"],
+            "fallbacks": failed.pop(tier, 0),
+        })
+    order = {tier: i for i, tier in enumerate(MODEL_TIERS)}
+    report.sort(key=lambda r: order.get(r["tier"], len(order)))
+    return report
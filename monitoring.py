@@ -0,0 +1,73 @@
+"""
+Cheap change checks for monitoring-style scheduled tasks.
+
+A task with a ``monitor`` source ("check X and tell me if it changed") is
+first observed directly — a page fetch for a URL, a web search otherwise —
+without any LLM call.  The observation is reduced to a fingerprint, and the
+full agent run (and its push notification) only happens when the
+fingerprint differs from the one stored with the previous run.
+
+Observations are normalised before hashing so that markup, whitespace and
+relative timestamps ("3 hours ago") don't count as changes.
+"""
+
+import hashlib
+import logging
+import re
+
+import httpx
+from bs4 import BeautifulSoup
+
+from config import MONITOR_EXCERPT_CHARS, MONITOR_FETCH_TIMEOUT
+
+log = logging.getLogger(__name__)
+
+_RELATIVE_TIME = re.compile(
+    r"\b\d+\s+(?:second|minute|min|hour|hr|day|week|month|year)s?\s+ago\b", re.IGNORECASE
+)
+
+
+def is_url(monitor: str) -> bool:
+    return monitor.strip().lower().startswith(("http://", "https://"))
+
+
+def describe(monitor: str) -> str:
+    return f"page {monitor}" if is_url(monitor) else f"web search for '{monitor}'"
+
+
+def page_text(html: str) -> str:
+    """Visible text of an HTML page."""
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style", "noscript", "template", "svg"]):
+        tag.decompose()
+    return soup.get_text(" ")
+
+
+def observe(monitor: str) -> str:
+    """Fetch the current state of *monitor* (a URL or a search query)."""
+    monitor = monitor.strip()
+    if is_url(monitor):
+        response = httpx.get(monitor, timeout=MONITOR_FETCH_TIMEOUT, follow_redirects=True)
+        response.raise_for_status()
+        if "html" in response.headers.get("content-type", ""):
+            return page_text(response.text)
+        return response.text
+    from tools.research import search
+    return search(monitor)
+
+
+def normalize(text: str) -> str:
+    """Lower-case, drop relative timestamps and collapse whitespace."""
+    return re.sub(r"\s+", " ", _RELATIVE_TIME.sub("", text.lower())).strip()
+
+
+def fingerprint(text: str) -> str:
+    return hashlib.sha256(normalize(text).encode()).hexdigest()
+
+
+def excerpt(text: str) -> str:
+    """The start of an observation, for the agent's prompt."""
+    text = re.sub(r"\s+", " ", text).strip()
+    if len(text) <= MONITOR_EXCERPT_CHARS:
+        return text
+    return text[:MONITOR_EXCERPT_CHARS] + " …"
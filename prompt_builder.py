@@ -0,0 +1,115 @@
+"""
+Prompt assembly for the ApexFlow orchestrator.
+
+Provider-side prompt caching only reuses the longest unchanged *prefix* of a
+request, so the worker prompt is assembled from layers ordered by how often
+they change:
+
+1. static   — role, delegation guidelines and the agent list
+2. session  — user profile facts and the rolling summary of older turns
+3. volatile — current time, recent chat history (changes every turn),
+               success criteria and evaluator feedback
+
+The static and session layers form the leading SystemMessage.  The volatile
+layer is appended as a trailing SystemMessage *after* the conversation, so a
+new timestamp or a fresh piece of feedback never invalidates the cached
+prefix (system prompt + conversation so far).
+"""
+
+from datetime import datetime
+from typing import Any, List, Optional
+
+from langchain_core.messages import SystemMessage
+
+
+_STATIC_TEMPLATE = """You are an orchestrator that delegates tasks to specialized agents.
+
+You have these specialist agents available:
+{agent_list}
+
+DELEGATION GUIDELINES:
+- Delegate tasks to the right agent by calling them with a clear, specific instruction.
+- When a user request involves INDEPENDENT sub-tasks, call multiple agents in PARALLEL by including multiple tool calls in a single response.
+- When tasks are DEPENDENT (one needs the result of another), call them sequentially.
+- When an agent returns results, synthesize them into a clear response for the user.
+- For a simple lookup that one direct tool answers (e.g. listing scheduled tasks or reading a file), call that tool yourself instead of delegating.
+
+If you need clarification from the user, ask directly without calling any agent."""
+
+
+def build_static_prompt(agent_list: str) -> str:
+    """Return the part of the system prompt that never changes within a process."""
+    return _STATIC_TEMPLATE.format(agent_list=agent_list)
+
+
+def build_volatile_prompt(
+    now: datetime,
+    success_criteria: Optional[str] = None,
+    feedback: Optional[str] = None,
+    recent_history: str = "",
+) -> str:
+    """Return the per-call part of the prompt: time, recent history, criteria and feedback."""
+    # Minute resolution is plenty for the model and keeps repeated calls
+    # within the same minute byte-identical.
+    parts = [f"The current date and time is {now.strftime('%Y-%m-%d %H:%M')}."]
+
+    if recent_history:
+        parts.append(recent_history)
+
+    if success_criteria:
+        parts.append(
+            "The user provided these success criteria for this task:\n"
+            f"{success_criteria}"
+        )
+
+    if feedback:
+        parts.append(
+            "Previously your response was rejected because the success criteria were not met.\n"
+            f"Feedback: {feedback}\n"
+            "Please continue working to meet the criteria or ask the user for clarification."
+        )
+
+    return "\n\n".join(parts)
+
+
+def assemble_worker_messages(
+    conversation: List[Any],
+    agent_list: str,
+    memory_context: str = "",
+    conversation_summary: str = "",
+    success_criteria: Optional[str] = None,
+    feedback: Optional[str] = None,
+    now: Optional[datetime] = None,
+    recent_history: str = "",
+) -> List[Any]:
+    """Build the full message list for a worker LLM call.
+
+    *memory_context* (the profile block) leads the prompt; *recent_history*
+    changes every turn and goes into the trailing volatile message.  Any
+    SystemMessage already present in *conversation* is dropped — the
+    assembled prompt replaces it.
+    """
+    lead = build_static_prompt(agent_list)
+    if memory_context:
+        lead += "\n" + memory_context
+    if conversation_summary:
+        lead += f"\n\nSummary of the earlier part of this conversation:\n{conversation_summary}"
+
+    history = [m for m in conversation if not isinstance(m, SystemMessage)]
+    volatile = build_volatile_prompt(now or datetime.now(), success_criteria, feedback, recent_history)
+
+    return [SystemMessage(content=lead), *history, SystemMessage(content=volatile)]
+
+
+def cache_usage(response: Any) -> dict:
+    """Extract input, cached and output token counts from an LLM response.
+
+    Returns zeros when the provider does not report usage (e.g. mocks).
+    """
+    usage = getattr(response, "usage_metadata", None) or {}
+    details = usage.get("input_token_details") or {}
+    return {
+        "input_tokens": usage.get("input_tokens", 0),
+        "cached_tokens": details.get("cache_read", 0),
+        "output_tokens": usage.get("output_tokens", 0),
+    }
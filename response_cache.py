@@ -0,0 +1,359 @@
+"""
+Opt-in cache of final orchestrator answers.
+
+Repeated requests ("top tech headlines", "commute from X to Y") are answered
+from here instead of running worker → agents → tools again.  A request is
+keyed by its normalised text, the success criteria, the profile facts that
+can change the answer (``RESPONSE_CACHE_PROFILE_KEYS``) and the recent
+messages of its thread, so a follow-up like "and tomorrow?" only matches
+the same follow-up to the same conversation.  Lookups try an exact key
+match first and then, among unexpired entries with the same profile facts
+and context, the most similar stored request by embedding cosine
+similarity.
+
+Each entry expires after the shortest TTL of the agents that produced it
+(``RESPONSE_CACHE_AGENT_TTLS``): research answers go stale in minutes,
+location analyses last for days, and answers from agents with side effects
+(documents, system, interview) are never cached.  Answers that used no agent
+live for ``RESPONSE_CACHE_NO_AGENT_TTL`` (by default they are not cached).
+
+Hits, misses and the tokens/time the hits saved are counted per event in
+SQLite; ``stats()`` reports them.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import time
+from array import array
+from typing import Any, Awaitable, Callable, Iterable, List, Optional
+
+import storage
+from config import (
+    RESPONSE_CACHE_AGENT_TTLS,
+    RESPONSE_CACHE_DB_PATH,
+    RESPONSE_CACHE_DEFAULT_TTL,
+    RESPONSE_CACHE_EMBEDDING_MODEL,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_NO_AGENT_TTL,
+    RESPONSE_CACHE_PROFILE_KEYS,
+    RESPONSE_CACHE_SIMILARITY,
+)
+
+log = logging.getLogger(__name__)
+
+DB_PATH = RESPONSE_CACHE_DB_PATH
+
+_CREATE_TABLES_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS response_cache (
+        key          TEXT PRIMARY KEY,
+        profile_key  TEXT NOT NULL,
+        request      TEXT NOT NULL,
+        embedding    BLOB,
+        response     TEXT NOT NULL,
+        agents       TEXT NOT NULL DEFAULT '[]',
+        tokens       INTEGER NOT NULL DEFAULT 0,
+        duration_ms  REAL NOT NULL DEFAULT 0,
+        created_at   REAL NOT NULL,
+        expires_at   REAL NOT NULL,
+        hits         INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_response_cache_profile ON response_cache (profile_key, expires_at)",
+    """
+    CREATE TABLE IF NOT EXISTS response_cache_stats (
+        event        TEXT PRIMARY KEY,
+        count        INTEGER NOT NULL DEFAULT 0,
+        saved_tokens INTEGER NOT NULL DEFAULT 0,
+        saved_ms     REAL NOT NULL DEFAULT 0
+    )
+    """,
+)
+
+EVENTS = ("exact_hit", "semantic_hit", "miss", "bypass")
+
+
+# ---------------------------------------------------------------------------
+# Database helpers
+# ---------------------------------------------------------------------------
+
+def _ensure_schema(conn: sqlite3.Connection):
+    for sql in _CREATE_TABLES_SQL:
+        conn.execute(sql)
+    conn.commit()
+
+
+def _get_connection(db_path: str = None) -> sqlite3.Connection:
+    if db_path:
+        return storage.connect(db_path, _ensure_schema)
+    return storage.database(DB_PATH, _ensure_schema).connection()
+
+
+def close():
+    """Close the module-level database connections."""
+    storage.close(DB_PATH)
+
+
+# ---------------------------------------------------------------------------
+# Keys and TTLs
+# ---------------------------------------------------------------------------
+
+def normalize_request(text: str) -> str:
+    """Lower-case, collapse whitespace and drop trailing punctuation."""
+    return re.sub(r"\s+", " ", text.strip().lower()).rstrip(" ?!.")
+
+
+def profile_key(profile: dict) -> str:
+    """Stable digest of the profile facts that can change an answer."""
+    relevant = {k: profile[k] for k in RESPONSE_CACHE_PROFILE_KEYS if profile.get(k)}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def context_key(messages: Iterable[Any]) -> str:
+    """Stable digest of a thread's recent messages ("" for a new thread)."""
+    turns = [[getattr(m, "type", ""), m.content] for m in messages]
+    if not turns:
+        return ""
+    return hashlib.sha256(json.dumps(turns).encode()).hexdigest()[:16]
+
+
+def cache_key(request: str, success_criteria: str, profile_digest: str,
+              context_digest: str = "") -> str:
+    payload = [request, normalize_request(success_criteria or ""), profile_digest]
+    if context_digest:
+        payload.append(context_digest)
+    return hashlib.sha256(json.dumps(payload).encode()).hexdigest()
+
+
+def ttl_for_agents(agents: Iterable[str]) -> int:
+    """Seconds an answer produced with *agents* may be reused (0 = do not cache)."""
+    ttls = [RESPONSE_CACHE_AGENT_TTLS.get(a, RESPONSE_CACHE_DEFAULT_TTL) for a in agents]
+    return min(ttls, default=RESPONSE_CACHE_NO_AGENT_TTL)
+
+
+def _pack(vector: Optional[List[float]]) -> Optional[bytes]:
+    return array("f", vector).tobytes() if vector else None
+
+
+def _unpack(blob: bytes) -> array:
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector
+
+
+# ---------------------------------------------------------------------------
+# Storage
+# ---------------------------------------------------------------------------
+
+def get_exact(key: str, now: float = None, db_path: str = None) -> Optional[dict]:
+    conn = _get_connection(db_path)
+    row = conn.execute(
+        "SELECT * FROM response_cache WHERE key = ? AND expires_at > ?",
+        (key, now or time.time()),
+    ).fetchone()
+    if db_path:
+        conn.close()
+    return dict(row) if row else None
+
+
+def get_candidates(profile_digest: str, now: float = None, db_path: str = None) -> list[dict]:
+    """Unexpired entries with an embedding for the given profile facts."""
+    conn = _get_connection(db_path)
+    rows = conn.execute(
+        "SELECT * FROM response_cache "
+        "WHERE profile_key = ? AND expires_at > ? AND embedding IS NOT NULL",
+        (profile_digest, now or time.time()),
+    ).fetchall()
+    if db_path:
+        conn.close()
+    return [dict(r) for r in rows]
+
+
+def put(key: str, profile_digest: str, request: str, embedding: Optional[List[float]],
+        response: str, agents: Iterable[str], ttl: int, tokens: int = 0,
+        duration_ms: float = 0.0, db_path: str = None):
+    now = time.time()
+    conn = _get_connection(db_path)
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO response_cache
+            (key, profile_key, request, embedding, response, agents, tokens,
+             duration_ms, created_at, expires_at, hits)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+        """,
+        (key, profile_digest, request, _pack(embedding), response,
+         json.dumps(sorted(agents)), tokens, duration_ms, now, now + ttl),
+    )
+    # Expired rows go first, then the oldest beyond the size cap
+    conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+    conn.execute(
+        "DELETE FROM response_cache WHERE key IN ("
+        "  SELECT key FROM response_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+        (RESPONSE_CACHE_MAX_ENTRIES,),
+    )
+    conn.commit()
+    if db_path:
+        conn.close()
+
+
+def record_event(event: str, entry: Optional[dict] = None, db_path: str = None):
+    """Count a lookup outcome; hits also add the cost of the answer they reused."""
+    saved_tokens = entry["tokens"] if entry else 0
+    saved_ms = entry["duration_ms"] if entry else 0.0
+    conn = _get_connection(db_path)
+    conn.execute(
+        """
+        INSERT INTO response_cache_stats (event, count, saved_tokens, saved_ms)
+        VALUES (?, 1, ?, ?)
+        ON CONFLICT(event) DO UPDATE SET
+            count = count + 1,
+            saved_tokens = saved_tokens + excluded.saved_tokens,
+            saved_ms = saved_ms + excluded.saved_ms
+        """,
+        (event, saved_tokens, saved_ms),
+    )
+    if entry:
+        conn.execute("UPDATE response_cache SET hits = hits + 1 WHERE key = ?", (entry["key"],))
+    conn.commit()
+    if db_path:
+        conn.close()
+
+
+def stats(db_path: str = None) -> dict:
+    """Hit rates and savings since the cache was created."""
+    conn = _get_connection(db_path)
+    rows = {r["event"]: dict(r) for r in conn.execute("SELECT * FROM response_cache_stats")}
+    entries = conn.execute(
+        "SELECT COUNT(*) FROM response_cache WHERE expires_at > ?", (time.time(),)
+    ).fetchone()[0]
+    if db_path:
+        conn.close()
+
+    counts = {e: rows.get(e, {}).get("count", 0) for e in EVENTS}
+    hits = counts["exact_hit"] + counts["semantic_hit"]
+    lookups = hits + counts["miss"]
+    return {
+        **counts,
+        "lookups": lookups,
+        "hit_rate": hits / lookups if lookups else 0.0,
+        "saved_tokens": sum(r["saved_tokens"] for r in rows.values()),
+        "saved_seconds": sum(r["saved_ms"] for r in rows.values()) / 1000,
+        "entries": entries,
+    }
+
+
+def clear(db_path: str = None) -> int:
+    conn = _get_connection(db_path)
+    removed = conn.execute("DELETE FROM response_cache").rowcount
+    conn.commit()
+    if db_path:
+        conn.close()
+    return removed
+
+
+# ---------------------------------------------------------------------------
+# Cache front end used by the orchestrator
+# ---------------------------------------------------------------------------
+
+def _best_match(query: List[float], candidates: list[dict]) -> tuple[Optional[dict], float]:
+    """Return the candidate with the highest cosine similarity to *query*."""
+    import numpy as np
+
+    matrix = np.array([_unpack(c["embedding"]) for c in candidates], dtype=np.float32)
+    q = np.asarray(query, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(q) or 1.0)
+    scores = matrix @ q / np.where(norms == 0, 1.0, norms)
+    best = int(np.argmax(scores))
+    return candidates[best], float(scores[best])
+
+
+class CacheProbe:
+    """What a lookup learned about a request, reused when its answer is stored."""
+
+    def __init__(self, request: str, key: str, profile_digest: str,
+                 embedding: Optional[List[float]] = None, context_digest: str = ""):
+        self.request = request
+        self.key = key
+        self.profile_digest = profile_digest
+        self.context_digest = context_digest
+        self.embedding = embedding
+        self.started = time.perf_counter()
+
+
+class ResponseCache:
+    """Exact + semantic answer cache; DB work runs in a thread."""
+
+    def __init__(self, embed: Optional[Callable[[str], Awaitable[List[float]]]] = None,
+                 threshold: float = RESPONSE_CACHE_SIMILARITY, db_path: str = None):
+        self._embed = embed
+        self.threshold = threshold
+        self.db_path = db_path
+
+    async def _embedding(self, text: str) -> Optional[List[float]]:
+        if self._embed is None:
+            from langchain_openai import OpenAIEmbeddings
+            self._embed = OpenAIEmbeddings(model=RESPONSE_CACHE_EMBEDDING_MODEL).aembed_query
+        try:
+            return await self._embed(text)
+        except Exception as e:
+            log.warning("Response cache embedding failed, exact matching only: %s", e)
+            return None
+
+    async def lookup(self, message: str, success_criteria: str, profile: dict,
+                     context: Iterable[Any] = ()) -> tuple[Optional[dict], CacheProbe]:
+        """Return ``(entry or None, probe)`` for a request.
+
+        *context* is the thread's recent messages before this request.
+        """
+        request = normalize_request(message)
+        digest = profile_key(profile)
+        context_digest = context_key(context)
+        probe = CacheProbe(request, cache_key(request, success_criteria, digest, context_digest),
+                           digest, context_digest=context_digest)
+
+        entry = await storage.run(get_exact, probe.key, None, self.db_path)
+        if entry:
+            await storage.run(record_event, "exact_hit", entry, self.db_path)
+            return entry, probe
+
+        # Only pay for an embedding when there is something to compare with;
+        # the criteria and context are part of the key, so a candidate must
+        # share them
+        candidates = await storage.run(get_candidates, digest, None, self.db_path)
+        candidates = [
+            c for c in candidates
+            if c["key"] == cache_key(c["request"], success_criteria, digest, context_digest)
+        ]
+        if candidates:
+            probe.embedding = await self._embedding(request)
+        if candidates and probe.embedding:
+            best, score = _best_match(probe.embedding, candidates)
+            if score >= self.threshold:
+                log.info("Semantic cache hit (%.3f): %r ~ %r", score, request, best["request"])
+                await storage.run(record_event, "semantic_hit", best, self.db_path)
+                return best, probe
+
+        await storage.run(record_event, "miss", None, self.db_path)
+        return None, probe
+
+    async def store(self, probe: CacheProbe, response: str, agents: Iterable[str],
+                    tokens: int = 0) -> bool:
+        """Cache *response* unless one of *agents* forbids it; return whether it was stored."""
+        agents = set(agents)
+        ttl = ttl_for_agents(agents)
+        if ttl <= 0 or not response.strip():
+            return False
+        duration_ms = (time.perf_counter() - probe.started) * 1000
+        if probe.embedding is None:
+            probe.embedding = await self._embedding(probe.request)
+        await storage.run(
+            put, probe.key, probe.profile_digest, probe.request, probe.embedding,
+            response, agents, ttl, tokens, duration_ms, self.db_path,
+        )
+        return True
+
+    async def record_bypass(self):
+        await storage.run(record_event, "bypass", None, self.db_path)
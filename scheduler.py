@@ -4,19 +4,78 @@ Task Scheduling & Background Jobs for ApexFlow.
 Persists scheduled tasks to SQLite and runs them via APScheduler.
 Each task stores a natural-language description, a cron expression,
 and an optional callback (e.g. push notification with results).
+
+APScheduler only enqueues a fired task; a bounded ``TaskPool`` executes
+it, so a burst of tasks firing at the same minute queues up (by priority)
+instead of building a Sidekick each at once next to interactive turns.
+
+With ``SCHEDULER_MODE = "external"`` tasks are run by task_worker.py
+processes instead, which poll for due tasks (``next_run_at``).  Either way a
+run is claimed in the database first, as a ``task_runs`` row holding a lease,
+so no two runners execute the same fire.  Each task carries its run policy:
+jitter, misfire grace time, coalescing of missed fires, max concurrent
+instances and the external APIs it uses (rate-limited per API).
+
+A task with a ``monitor`` source is checked cheaply first (see
+monitoring.py); the agent only runs, and only notifies, when the source's
+fingerprint changed since the previous run.
+
+A task can have an ``event`` trigger instead of a cron expression (see
+events.py): a file change, a job status transition or a knowledge-base
+indexing makes its run due, and it is claimed and executed like a cron fire
+(``_execute_task``), with the events that triggered it passed to the run.
+
+The read-only tool calls of a successful run are kept as the task's plan
+(see task_plans.py); later runs replay them with a single LLM call and fall
+back to a full run when the replay fails.
+
+Every run is recorded in ``task_runs`` (timing, status, token usage) with
+its full result in ``task_run_results``; ``_compact_runs`` applies the
+retention policy and ``run_stats`` summarises durations and failures.
+``scheduler_metrics`` adds the runner's health (due backlog and lag, live
+runs, misfires, pool queue) and ``metrics_text`` renders it for Prometheus.
 """
 
 import asyncio
+import itertools
+import json
 import logging
+import os
+import random
 import sqlite3
+import time
 import uuid
-from datetime import datetime
-from typing import Optional
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-
-from config import TASKS_DB_PATH
+from langchain_core.callbacks import UsageMetadataCallbackHandler
+
+import events
+import monitoring
+import storage
+import task_plans
+from config import (
+    SCHEDULER_API_RATE_LIMITS,
+    SCHEDULER_DEFAULT_APIS,
+    SCHEDULER_DEFAULT_JITTER_SECONDS,
+    SCHEDULER_DEFAULT_MISFIRE_GRACE_SECONDS,
+    SCHEDULER_EVENT_POLL_SECONDS,
+    SCHEDULER_LEASE_SECONDS,
+    SCHEDULER_MAX_PENDING_EVENTS,
+    SCHEDULER_MAX_QUEUED,
+    SCHEDULER_METRICS_WINDOW_HOURS,
+    SCHEDULER_POOL_SIZE,
+    SCHEDULER_WAIT_SAMPLES,
+    TASK_PLAN_MAX_REPLAYS,
+    TASK_PLANS_ENABLED,
+    TASK_RUN_PREVIEW_CHARS,
+    TASK_RUN_RESULTS_PER_TASK,
+    TASK_RUNS_RETENTION_DAYS,
+    TASKS_DB_PATH,
+)
 
 log = logging.getLogger(__name__)
 
@@ -25,9 +84,11 @@ DB_PATH = TASKS_DB_PATH
 # Global reference to the running TaskRunner (set by TaskRunner.start())
 _runner: Optional["TaskRunner"] = None
 
-# Module-level reusable connection (for production use)
-_conn: Optional[sqlite3.Connection] = None
-_conn_db_path: Optional[str] = None
+# Actions of update_tasks (bulk operations)
+TASK_BULK_ACTIONS = ("enable", "disable", "delete")
+
+# Lease owner for runs started by this process's TaskRunner
+_LOCAL_OWNER = f"in-process-{os.getpid()}"
 
 _CREATE_TABLE_SQL = """
     CREATE TABLE IF NOT EXISTS scheduled_tasks (
@@ -38,53 +99,178 @@ _CREATE_TABLE_SQL = """
         enabled     INTEGER NOT NULL DEFAULT 1,
         last_run    TEXT,
         last_result TEXT,
-        notify      INTEGER NOT NULL DEFAULT 0
+        notify      INTEGER NOT NULL DEFAULT 0,
+        priority    INTEGER NOT NULL DEFAULT 0,
+        next_run_at REAL,
+        jitter_seconds        INTEGER NOT NULL DEFAULT 0,
+        misfire_grace_seconds INTEGER NOT NULL DEFAULT 300,
+        coalesce              INTEGER NOT NULL DEFAULT 1,
+        max_instances         INTEGER NOT NULL DEFAULT 1,
+        apis                  TEXT NOT NULL DEFAULT 'llm',
+        monitor     TEXT,
+        fingerprint TEXT,
+        plan         TEXT,
+        plan_replays INTEGER NOT NULL DEFAULT 0,
+        misfires     INTEGER NOT NULL DEFAULT 0,
+        event          TEXT,
+        pending_events TEXT,
+        event_state    TEXT
     )
 """
 
+# One row per run; the full result lives in task_run_results so that listing
+# and aggregating runs never reads result text. A run is claimed as 'queued'
+# with a lease, becomes 'running', and ends 'ok', 'error', 'cancelled' or
+# (lease expired) 'abandoned' — or 'unchanged' when a monitoring task's source
+# had not changed. ``events`` lists the events that triggered an event task's run.
+_CREATE_RUNS_SQL = """
+    CREATE TABLE IF NOT EXISTS task_runs (
+        id            INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id       TEXT NOT NULL,
+        runner        TEXT,
+        started_at    REAL NOT NULL,
+        finished_at   REAL,
+        duration_ms   REAL,
+        status        TEXT NOT NULL DEFAULT 'running',
+        input_tokens  INTEGER NOT NULL DEFAULT 0,
+        output_tokens INTEGER NOT NULL DEFAULT 0,
+        preview       TEXT,
+        result_id     INTEGER,
+        lease_expires_at REAL,
+        replayed      INTEGER NOT NULL DEFAULT 0,
+        events        TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_task_runs_task ON task_runs (task_id, started_at);
+    CREATE INDEX IF NOT EXISTS idx_task_runs_started ON task_runs (started_at);
+    CREATE TABLE IF NOT EXISTS task_run_results (
+        id     INTEGER PRIMARY KEY AUTOINCREMENT,
+        result TEXT NOT NULL
+    );
+"""
+
+# Indexes for listing tasks, claiming due ones and finding live runs, and a
+# change counter: every insert, update or delete of a task — by any process —
+# bumps tasks_version, so readers (the UI) can skip re-reading unchanged tasks
+_CREATE_STATE_SQL = """
+    CREATE INDEX IF NOT EXISTS idx_scheduled_tasks_created ON scheduled_tasks (created_at);
+    CREATE INDEX IF NOT EXISTS idx_scheduled_tasks_due ON scheduled_tasks (enabled, next_run_at);
+    CREATE INDEX IF NOT EXISTS idx_task_runs_live ON task_runs (task_id, lease_expires_at)
+        WHERE status IN ('queued', 'running');
+    CREATE TABLE IF NOT EXISTS scheduler_state (
+        id            INTEGER PRIMARY KEY CHECK (id = 1),
+        tasks_version INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO scheduler_state (id, tasks_version) VALUES (1, 0);
+    CREATE TRIGGER IF NOT EXISTS scheduled_tasks_inserted AFTER INSERT ON scheduled_tasks
+        BEGIN UPDATE scheduler_state SET tasks_version = tasks_version + 1; END;
+    CREATE TRIGGER IF NOT EXISTS scheduled_tasks_updated AFTER UPDATE ON scheduled_tasks
+        BEGIN UPDATE scheduler_state SET tasks_version = tasks_version + 1; END;
+    CREATE TRIGGER IF NOT EXISTS scheduled_tasks_deleted AFTER DELETE ON scheduled_tasks
+        BEGIN UPDATE scheduler_state SET tasks_version = tasks_version + 1; END;
+"""
+
+_RUN_COLUMNS = (
+    "id, task_id, runner, started_at, finished_at, duration_ms, status, "
+    "input_tokens, output_tokens, preview, result_id, lease_expires_at, replayed, events"
+)
+
+# Columns added after the tables were first released; older databases get
+# them on connect
+_ADDED_COLUMNS = {
+    "scheduled_tasks": {
+        "priority": "INTEGER NOT NULL DEFAULT 0",
+        "next_run_at": "REAL",
+        "jitter_seconds": "INTEGER NOT NULL DEFAULT 0",
+        "misfire_grace_seconds": "INTEGER NOT NULL DEFAULT 300",
+        "coalesce": "INTEGER NOT NULL DEFAULT 1",
+        "max_instances": "INTEGER NOT NULL DEFAULT 1",
+        "apis": "TEXT NOT NULL DEFAULT 'llm'",
+        "monitor": "TEXT",
+        "fingerprint": "TEXT",
+        "plan": "TEXT",
+        "plan_replays": "INTEGER NOT NULL DEFAULT 0",
+        "misfires": "INTEGER NOT NULL DEFAULT 0",
+        "event": "TEXT",
+        "pending_events": "TEXT",
+        "event_state": "TEXT",
+    },
+    "task_runs": {
+        "lease_expires_at": "REAL",
+        "replayed": "INTEGER NOT NULL DEFAULT 0",
+        "events": "TEXT",
+    },
+}
+
+# Runs that hold a live lease (the ? is the current time)
+_LIVE_RUN = "status IN ('queued', 'running') AND lease_expires_at >= ?"
+
+_TASK_COLUMNS = (
+    "id, description, cron_expr, created_at, enabled, last_run, last_result, notify, priority, "
+    "next_run_at, jitter_seconds, misfire_grace_seconds, coalesce, max_instances, apis, "
+    "monitor, fingerprint, plan, plan_replays, misfires, event, pending_events, "
+    # Runners currently holding a run of the task
+    "(SELECT group_concat(runner, ', ') FROM task_runs r WHERE r.task_id = scheduled_tasks.id "
+    "AND r.status IN ('queued', 'running') "
+    "AND r.lease_expires_at >= CAST(strftime('%s', 'now') AS REAL)) AS running_on"
+)
+
 # ---------------------------------------------------------------------------
 # Database helpers
 # ---------------------------------------------------------------------------
 
+def _ensure_schema(conn: sqlite3.Connection):
+    conn.execute(_CREATE_TABLE_SQL)
+    conn.executescript(_CREATE_RUNS_SQL)
+    for table, columns in _ADDED_COLUMNS.items():
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for column, definition in columns.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    conn.executescript(_CREATE_STATE_SQL)
+    conn.commit()
+
+
 def _get_connection(db_path: str = None) -> sqlite3.Connection:
-    global _conn, _conn_db_path
     # Custom db_path (used by tests) — always create a fresh connection
     if db_path:
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        conn.execute(_CREATE_TABLE_SQL)
-        conn.commit()
-        return conn
-    # Production — reuse the module-level connection (recreate if DB_PATH changed)
-    if _conn is None or _conn_db_path != DB_PATH:
-        if _conn is not None:
-            _conn.close()
-        _conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-        _conn.row_factory = sqlite3.Row
-        _conn.execute(_CREATE_TABLE_SQL)
-        _conn.commit()
-        _conn_db_path = DB_PATH
-    return _conn
+        return storage.connect(db_path, _ensure_schema)
+    # Production — this thread's connection from the shared pool
+    return storage.database(DB_PATH, _ensure_schema).connection()
 
 
 def close():
-    """Close the module-level database connection."""
-    global _conn, _conn_db_path
-    if _conn:
-        _conn.close()
-        _conn = None
-        _conn_db_path = None
+    """Close the module-level database connections."""
+    storage.close(DB_PATH)
 
 
-def _add_task(description: str, cron_expr: str, notify: bool = False,
+def _add_task(description: str, cron_expr: str, notify: bool = False, priority: int = 0,
+              jitter_seconds: int = SCHEDULER_DEFAULT_JITTER_SECONDS,
+              misfire_grace_seconds: int = SCHEDULER_DEFAULT_MISFIRE_GRACE_SECONDS,
+              coalesce: bool = True, max_instances: int = 1,
+              apis: str = SCHEDULER_DEFAULT_APIS, monitor: str = "", event: str = "",
               db_path: str = None) -> str:
-    """Insert a new task and return its ID."""
+    """Insert a new task and return its ID.
+
+    An event task (*event* set, *cron_expr* empty) has no ``next_run_at``
+    until an event makes its run due.
+    """
     task_id = str(uuid.uuid4())[:8]
+    event = ":".join(events.parse(event)) if event.strip() else None
+    apis = _parse_apis(apis)
+    monitor = monitor.strip()
+    if monitor and not monitoring.is_url(monitor) and "search" not in apis:
+        # The pre-check of a search monitor is itself a search
+        apis.append("search")
     conn = _get_connection(db_path)
     conn.execute(
-        "INSERT INTO scheduled_tasks (id, description, cron_expr, created_at, notify) "
-        "VALUES (?, ?, ?, ?, ?)",
-        (task_id, description, cron_expr, datetime.now().isoformat(), int(notify)),
+        "INSERT INTO scheduled_tasks "
+        "(id, description, cron_expr, created_at, notify, priority, next_run_at, jitter_seconds, "
+        "misfire_grace_seconds, coalesce, max_instances, apis, monitor, event) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (task_id, description, cron_expr, datetime.now().isoformat(), int(notify), int(priority),
+         _schedule_after(cron_expr, jitter_seconds, time.time()), int(jitter_seconds),
+         int(misfire_grace_seconds), int(coalesce), int(max_instances), ",".join(apis),
+         monitor or None, event),
     )
     conn.commit()
     if db_path:
@@ -92,23 +278,51 @@ def _add_task(description: str, cron_expr: str, notify: bool = False,
     return task_id
 
 
+def _placeholders(values: list) -> str:
+    return ", ".join("?" * len(values))
+
+
+def _remove_tasks(task_ids: list[str], db_path: str = None) -> list[str]:
+    """Delete several tasks and their run history in one transaction; return the deleted IDs."""
+    task_ids = list(dict.fromkeys(task_ids))
+    if not task_ids:
+        return []
+    marks = _placeholders(task_ids)
+    conn = _get_connection(db_path)
+    with storage.transaction(conn):
+        found = {row["id"] for row in conn.execute(
+            f"SELECT id FROM scheduled_tasks WHERE id IN ({marks})", task_ids)}
+        conn.execute(f"DELETE FROM scheduled_tasks WHERE id IN ({marks})", task_ids)
+        conn.execute(
+            f"DELETE FROM task_run_results WHERE id IN "
+            f"(SELECT result_id FROM task_runs WHERE task_id IN ({marks}))",
+            task_ids,
+        )
+        conn.execute(f"DELETE FROM task_runs WHERE task_id IN ({marks})", task_ids)
+    if db_path:
+        conn.close()
+    return [task_id for task_id in task_ids if task_id in found]
+
+
 def _remove_task(task_id: str, db_path: str = None) -> bool:
     """Delete a task by ID. Returns True if a row was deleted."""
+    return bool(_remove_tasks([task_id], db_path=db_path))
+
+
+def tasks_version(db_path: str = None) -> int:
+    """Counter bumped by every change to ``scheduled_tasks`` (from any process)."""
     conn = _get_connection(db_path)
-    cursor = conn.execute("DELETE FROM scheduled_tasks WHERE id = ?", (task_id,))
-    conn.commit()
-    deleted = cursor.rowcount > 0
+    version = conn.execute("SELECT tasks_version FROM scheduler_state WHERE id = 1").fetchone()[0]
     if db_path:
         conn.close()
-    return deleted
+    return version
 
 
 def _list_tasks(db_path: str = None) -> list[dict]:
     """Return all tasks as a list of dicts."""
     conn = _get_connection(db_path)
     rows = conn.execute(
-        "SELECT id, description, cron_expr, created_at, enabled, last_run, last_result, notify "
-        "FROM scheduled_tasks ORDER BY created_at DESC"
+        f"SELECT {_TASK_COLUMNS} FROM scheduled_tasks ORDER BY created_at DESC"
     ).fetchall()
     if db_path:
         conn.close()
@@ -119,8 +333,7 @@ def _get_task(task_id: str, db_path: str = None) -> Optional[dict]:
     """Return a single task dict or None."""
     conn = _get_connection(db_path)
     row = conn.execute(
-        "SELECT id, description, cron_expr, created_at, enabled, last_run, last_result, notify "
-        "FROM scheduled_tasks WHERE id = ?", (task_id,)
+        f"SELECT {_TASK_COLUMNS} FROM scheduled_tasks WHERE id = ?", (task_id,)
     ).fetchone()
     if db_path:
         conn.close()
@@ -139,18 +352,734 @@ def _update_task_result(task_id: str, result: str, db_path: str = None):
         conn.close()
 
 
+def _set_fingerprint(task_id: str, fingerprint: str, db_path: str = None):
+    """Remember the fingerprint of a monitoring task's source as of its last run."""
+    conn = _get_connection(db_path)
+    conn.execute("UPDATE scheduled_tasks SET fingerprint = ? WHERE id = ?", (fingerprint, task_id))
+    conn.commit()
+    if db_path:
+        conn.close()
+
+
+def _set_plan(task_id: str, plan: Optional[list], db_path: str = None):
+    """Store (or, with None, drop) the tool-call plan of a task."""
+    conn = _get_connection(db_path)
+    conn.execute(
+        "UPDATE scheduled_tasks SET plan = ?, plan_replays = 0 WHERE id = ?",
+        (json.dumps(plan) if plan else None, task_id),
+    )
+    conn.commit()
+    if db_path:
+        conn.close()
+
+
+def _set_tasks_enabled(task_ids: list[str], enabled: bool, db_path: str = None) -> list[str]:
+    """Enable or disable several tasks in one transaction; return the IDs that exist."""
+    task_ids = list(dict.fromkeys(task_ids))
+    if not task_ids:
+        return []
+    conn = _get_connection(db_path)
+    with storage.transaction(conn):
+        rows = conn.execute(
+            f"SELECT id, cron_expr, jitter_seconds, enabled FROM scheduled_tasks "
+            f"WHERE id IN ({_placeholders(task_ids)})",
+            task_ids,
+        ).fetchall()
+        now = time.time()
+        for row in rows:
+            if bool(row["enabled"]) == enabled:
+                continue
+            if enabled:
+                # Runs missed (and events received) while disabled are skipped, not caught up
+                conn.execute(
+                    "UPDATE scheduled_tasks SET enabled = 1, next_run_at = ?, pending_events = NULL "
+                    "WHERE id = ?",
+                    (_schedule_after(row["cron_expr"], row["jitter_seconds"], now), row["id"]),
+                )
+            else:
+                conn.execute("UPDATE scheduled_tasks SET enabled = 0 WHERE id = ?", (row["id"],))
+    if db_path:
+        conn.close()
+    found = {row["id"] for row in rows}
+    return [task_id for task_id in task_ids if task_id in found]
+
+
 def _set_task_enabled(task_id: str, enabled: bool, db_path: str = None) -> bool:
     """Enable or disable a task. Returns True if the task exists."""
+    return bool(_set_tasks_enabled([task_id], enabled, db_path=db_path))
+
+
+# ---------------------------------------------------------------------------
+# Run history
+# ---------------------------------------------------------------------------
+
+def _start_run(run_id: int, db_path: str = None):
+    """Mark a claimed run as running from now on."""
+    conn = _get_connection(db_path)
+    conn.execute(
+        "UPDATE task_runs SET status = 'running', started_at = ? WHERE id = ? AND status = 'queued'",
+        (time.time(), run_id),
+    )
+    conn.commit()
+    if db_path:
+        conn.close()
+
+
+def _finish_run(run_id: int, status: str, result: str, input_tokens: int = 0,
+                output_tokens: int = 0, replayed: bool = False, db_path: str = None):
+    """Record the outcome of run *run_id* and the task's latest result.
+
+    *replayed* marks a run answered from the task's plan, which counts
+    towards ``TASK_PLAN_MAX_REPLAYS``.
+    """
+    conn = _get_connection(db_path)
+    with storage.transaction(conn):
+        row = conn.execute("SELECT task_id, started_at FROM task_runs WHERE id = ?", (run_id,)).fetchone()
+        if row is not None:
+            now = time.time()
+            result_id = conn.execute("INSERT INTO task_run_results (result) VALUES (?)", (result,)).lastrowid
+            conn.execute(
+                "UPDATE task_runs SET finished_at = ?, duration_ms = ?, status = ?, input_tokens = ?, "
+                "output_tokens = ?, preview = ?, result_id = ?, lease_expires_at = NULL, replayed = ? "
+                "WHERE id = ?",
+                (now, (now - row["started_at"]) * 1000, status, input_tokens, output_tokens,
+                 result[:TASK_RUN_PREVIEW_CHARS], result_id, int(replayed), run_id),
+            )
+            if replayed:
+                conn.execute("UPDATE scheduled_tasks SET plan_replays = plan_replays + 1 WHERE id = ?",
+                             (row["task_id"],))
+            if status == "unchanged":
+                # The last result still describes the monitored source
+                conn.execute("UPDATE scheduled_tasks SET last_run = ? WHERE id = ?",
+                             (datetime.fromtimestamp(now).isoformat(), row["task_id"]))
+            else:
+                conn.execute(
+                    "UPDATE scheduled_tasks SET last_run = ?, last_result = ? WHERE id = ?",
+                    (datetime.fromtimestamp(now).isoformat(), result[:2000], row["task_id"]),
+                )
+    if db_path:
+        conn.close()
+    if row is not None:
+        _compact_runs(row["task_id"], db_path=db_path)
+
+
+def _list_runs(task_id: str = None, limit: int = 20, db_path: str = None) -> list[dict]:
+    """Latest runs, newest first (of *task_id* only, if given)."""
+    conn = _get_connection(db_path)
+    if task_id:
+        rows = conn.execute(
+            f"SELECT {_RUN_COLUMNS} FROM task_runs WHERE task_id = ? "
+            "ORDER BY started_at DESC LIMIT ?",
+            (task_id, limit),
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            f"SELECT {_RUN_COLUMNS} FROM task_runs ORDER BY started_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+    if db_path:
+        conn.close()
+    return [dict(r) for r in rows]
+
+
+def _get_run_result(run_id: int, db_path: str = None) -> Optional[str]:
+    """Full result text of a run, or None once compaction has dropped it."""
+    conn = _get_connection(db_path)
+    row = conn.execute(
+        "SELECT r.result FROM task_runs t JOIN task_run_results r ON r.id = t.result_id "
+        "WHERE t.id = ?",
+        (run_id,),
+    ).fetchone()
+    if db_path:
+        conn.close()
+    return row["result"] if row else None
+
+
+def _get_run_events(run_id: int, db_path: str = None) -> Optional[str]:
+    """The events that triggered run *run_id* (one per line), or None."""
+    conn = _get_connection(db_path)
+    row = conn.execute("SELECT events FROM task_runs WHERE id = ?", (run_id,)).fetchone()
+    if db_path:
+        conn.close()
+    return row["events"] if row else None
+
+
+def _compact_runs(task_id: str = None, now: float = None, db_path: str = None) -> dict:
+    """Apply the run-history retention policy (to *task_id* only, if given).
+
+    - runs older than ``TASK_RUNS_RETENTION_DAYS`` are deleted;
+    - only the latest ``TASK_RUN_RESULTS_PER_TASK`` runs of a task keep their
+      full result, older ones keep just the preview;
+    - unfinished runs whose lease expired (the runner crashed or was
+      killed) are marked ``abandoned``.
+
+    Returns the number of runs deleted, results dropped and runs abandoned.
+    """
+    now = now or time.time()
+    conn = _get_connection(db_path)
+    scope, args = ("task_id = ?", (task_id,)) if task_id else ("1 = 1", ())
+    cutoff = now - TASK_RUNS_RETENTION_DAYS * 86400
+
+    with storage.transaction(conn):
+        conn.execute(
+            f"DELETE FROM task_run_results WHERE id IN "
+            f"(SELECT result_id FROM task_runs WHERE {scope} AND started_at < ?)",
+            (*args, cutoff),
+        )
+        deleted = conn.execute(f"DELETE FROM task_runs WHERE {scope} AND started_at < ?",
+                               (*args, cutoff)).rowcount
+
+        # Results beyond the newest N per task
+        stale = [
+            (row["id"], row["result_id"]) for row in conn.execute(
+                f"SELECT id, result_id FROM ("
+                f"  SELECT id, result_id, ROW_NUMBER() OVER "
+                f"    (PARTITION BY task_id ORDER BY started_at DESC) AS n "
+                f"  FROM task_runs WHERE {scope} AND result_id IS NOT NULL"
+                f") WHERE n > ?",
+                (*args, TASK_RUN_RESULTS_PER_TASK),
+            )
+        ]
+        conn.executemany("DELETE FROM task_run_results WHERE id = ?", [(r,) for _, r in stale])
+        conn.executemany("UPDATE task_runs SET result_id = NULL WHERE id = ?", [(i,) for i, _ in stale])
+
+        abandoned = conn.execute(
+            f"UPDATE task_runs SET status = 'abandoned', lease_expires_at = NULL WHERE {scope} "
+            "AND status IN ('queued', 'running') AND lease_expires_at < ?",
+            (*args, now),
+        ).rowcount
+    if db_path:
+        conn.close()
+    return {"deleted": deleted, "results_dropped": len(stale), "abandoned": abandoned}
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_stats(since_hours: float = 24 * 7, db_path: str = None) -> dict:
+    """Durations, failures and token usage of recent runs, per task and overall.
+
+    ``mean_concurrency`` (busy time over the window) and ``peak_concurrency``
+    (most runs overlapping at once) show whether ``SCHEDULER_POOL_SIZE`` fits
+    the load.
+    """
+    since = time.time() - since_hours * 3600
+    conn = _get_connection(db_path)
+    rows = conn.execute(
+        "SELECT r.task_id, r.started_at, r.finished_at, r.duration_ms, r.status, "
+        "r.input_tokens, r.output_tokens, t.description "
+        "FROM task_runs r LEFT JOIN scheduled_tasks t ON t.id = r.task_id "
+        "WHERE r.started_at >= ? ORDER BY r.started_at",
+        (since,),
+    ).fetchall()
+    if db_path:
+        conn.close()
+
+    tasks: dict[str, dict] = {}
+    durations: dict[str, list[float]] = {}
+    edges = []
+    for row in rows:
+        entry = tasks.setdefault(row["task_id"], {
+            "task_id": row["task_id"], "description": row["description"] or "", "runs": 0,
+            "failed": 0, "input_tokens": 0, "output_tokens": 0, "last_status": "",
+        })
+        entry["runs"] += 1
+        entry["failed"] += row["status"] in ("error", "abandoned")
+        entry["input_tokens"] += row["input_tokens"]
+        entry["output_tokens"] += row["output_tokens"]
+        entry["last_status"] = row["status"]
+        if row["duration_ms"] is not None:
+            durations.setdefault(row["task_id"], []).append(row["duration_ms"])
+        edges += [(row["started_at"], 1), (row["finished_at"] or time.time(), -1)]
+
+    for task_id, entry in tasks.items():
+        values = durations.get(task_id, [])
+        entry["p50_ms"] = round(_percentile(values, 50), 1)
+        entry["p95_ms"] = round(_percentile(values, 95), 1)
+        entry["max_ms"] = round(max(values, default=0.0), 1)
+
+    # Ends sort before starts at the same instant, so back-to-back runs don't overlap
+    running = peak = 0
+    for _, step in sorted(edges):
+        running += step
+        peak = max(peak, running)
+    busy_ms = sum(sum(values) for values in durations.values())
+    return {
+        "runs": len(rows),
+        "failed": sum(entry["failed"] for entry in tasks.values()),
+        "mean_concurrency": round(busy_ms / 1000 / (since_hours * 3600), 3),
+        "peak_concurrency": peak,
+        "tasks": sorted(tasks.values(), key=lambda e: e["p95_ms"], reverse=True),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+def scheduler_metrics(since_hours: float = SCHEDULER_METRICS_WINDOW_HOURS, db_path: str = None) -> dict:
+    """Health of the scheduler, from the database (so it covers every runner).
+
+    ``due`` counts enabled tasks whose run is due but not yet claimed and
+    ``lag_seconds`` is how late the oldest of them is — both stay near zero
+    while the runners keep up.  Per task: next run, live runs, misfires
+    (fires skipped for being later than the grace time) and the runs,
+    failures and p50/p95 durations of the last *since_hours*.  ``pool``
+    holds this process's ``TaskPool`` stats when it runs a ``TaskRunner``.
+    """
+    now = time.time()
+    conn = _get_connection(db_path)
+    rows = conn.execute(
+        f"SELECT id, enabled, next_run_at, misfires, "
+        f"(SELECT COUNT(*) FROM task_runs r WHERE r.task_id = scheduled_tasks.id AND {_LIVE_RUN}) AS running "
+        f"FROM scheduled_tasks ORDER BY created_at",
+        (now,),
+    ).fetchall()
+    if db_path:
+        conn.close()
+    stats = run_stats(since_hours, db_path=db_path)
+    recent = {entry["task_id"]: entry for entry in stats["tasks"]}
+
+    tasks = []
+    for row in rows:
+        entry = recent.get(row["id"], {})
+        tasks.append({
+            "task_id": row["id"],
+            "enabled": bool(row["enabled"]),
+            "next_run_at": row["next_run_at"] if row["enabled"] else None,
+            "running": row["running"],
+            "misfires": row["misfires"],
+            "runs": entry.get("runs", 0),
+            "failed": entry.get("failed", 0),
+            "p50_ms": entry.get("p50_ms", 0.0),
+            "p95_ms": entry.get("p95_ms", 0.0),
+        })
+    due = [t["next_run_at"] for t in tasks if t["next_run_at"] is not None and t["next_run_at"] <= now]
+    return {
+        "window_hours": since_hours,
+        "enabled": sum(t["enabled"] for t in tasks),
+        "disabled": sum(not t["enabled"] for t in tasks),
+        "due": len(due),
+        "lag_seconds": round(now - min(due), 1) if due else 0.0,
+        "running": sum(t["running"] for t in tasks),
+        "misfires": sum(t["misfires"] for t in tasks),
+        "runs": stats["runs"],
+        "failed": stats["failed"],
+        "tasks": tasks,
+        "pool": _runner.stats() if _runner else None,
+    }
+
+
+# Pool stats exposed as metrics: stats key -> (metric name, type, help)
+_POOL_METRICS = {
+    "workers": ("pool_workers", "gauge", "Workers of this process's task pool."),
+    "running": ("pool_running", "gauge", "Tasks running in this process's task pool."),
+    "queued": ("queue_depth", "gauge", "Fired tasks waiting for a pool worker."),
+    "submitted": ("pool_submitted_total", "counter", "Fires queued on the task pool."),
+    "completed": ("pool_completed_total", "counter", "Tasks the pool finished."),
+    "failed": ("pool_failed_total", "counter", "Tasks that raised in the pool."),
+    "rejected": ("pool_rejected_total", "counter", "Fires dropped because the queue was full."),
+    "skipped_overlap": ("pool_skipped_total", "counter", "Fires skipped because max_instances runs were live."),
+}
+
+
+def _label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _sample(name: str, value, labels: Optional[dict] = None) -> str:
+    if labels:
+        pairs = ",".join(f'{key}="{_label_value(val)}"' for key, val in labels.items())
+        name = f"{name}{{{pairs}}}"
+    return f"apexflow_scheduler_{name} {value}"
+
+
+def metrics_text(metrics: dict) -> str:
+    """*metrics* (from ``scheduler_metrics``) in the Prometheus text exposition format."""
+    lines = []
+
+    def family(name: str, kind: str, help_text: str, samples: list):
+        lines.append(f"# HELP apexflow_scheduler_{name} {help_text}")
+        lines.append(f"# TYPE apexflow_scheduler_{name} {kind}")
+        lines.extend(_sample(name, value, labels) for labels, value in samples)
+
+    window = f"the last {metrics['window_hours']:g} hours"
+    family("tasks", "gauge", "Scheduled tasks by state.",
+           [({"state": "enabled"}, metrics["enabled"]), ({"state": "disabled"}, metrics["disabled"])])
+    family("due_tasks", "gauge", "Enabled tasks whose run is due but not claimed yet.",
+           [(None, metrics["due"])])
+    family("lag_seconds", "gauge", "How late the oldest unclaimed due run is.",
+           [(None, metrics["lag_seconds"])])
+    family("running_runs", "gauge", "Runs holding a live lease, across all runners.",
+           [(None, metrics["running"])])
+    family("misfires_total", "counter", "Fires skipped for being later than their grace time.",
+           [(None, metrics["misfires"])])
+    family("runs", "gauge", f"Runs started in {window}.", [(None, metrics["runs"])])
+    family("failed_runs", "gauge", f"Runs that failed or were abandoned in {window}.",
+           [(None, metrics["failed"])])
+
+    pool = metrics["pool"]
+    if pool:
+        for key, (name, kind, help_text) in _POOL_METRICS.items():
+            family(name, kind, help_text, [(None, pool[key])])
+        family("queue_wait_seconds", "gauge", "Time fired tasks waited for a pool worker.",
+               [({"quantile": q}, pool[f"wait_{p}_ms"] / 1000) for q, p in (("0.5", "p50"), ("0.95", "p95"))])
+
+    tasks = metrics["tasks"]
+    family("task_next_run_timestamp_seconds", "gauge", "When the task's next run is due.",
+           [({"task_id": t["task_id"]}, t["next_run_at"]) for t in tasks if t["next_run_at"] is not None])
+    family("task_running_runs", "gauge", "Live runs of the task.",
+           [({"task_id": t["task_id"]}, t["running"]) for t in tasks])
+    family("task_misfires_total", "counter", "Fires of the task skipped for being too late.",
+           [({"task_id": t["task_id"]}, t["misfires"]) for t in tasks])
+    family("task_runs", "gauge", f"Runs of the task started in {window}.",
+           [({"task_id": t["task_id"]}, t["runs"]) for t in tasks])
+    family("task_failed_runs", "gauge", f"Failed runs of the task in {window}.",
+           [({"task_id": t["task_id"]}, t["failed"]) for t in tasks])
+    family("task_duration_seconds", "gauge", f"Run duration quantiles of the task over {window}.",
+           [({"task_id": t["task_id"], "quantile": q}, t[f"{p}_ms"] / 1000)
+            for t in tasks if t["runs"] for q, p in (("0.5", "p50"), ("0.95", "p95"))])
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# Leases – one runner per run, across processes
+# ---------------------------------------------------------------------------
+
+def _cron_trigger(cron_expr: str, jitter_seconds: int = 0) -> CronTrigger:
+    minute, hour, day, month, day_of_week = cron_expr.split()
+    return CronTrigger(minute=minute, hour=hour, day=day, month=month, day_of_week=day_of_week,
+                       jitter=jitter_seconds or None)
+
+
+def _next_fire(cron_expr: str, after: float) -> Optional[float]:
+    """Epoch seconds of the first fire of *cron_expr* strictly after *after*."""
+    try:
+        trigger = _cron_trigger(cron_expr)
+    except ValueError:
+        return None
+    start = datetime.fromtimestamp(after).astimezone() + timedelta(seconds=1)
+    fire = trigger.get_next_fire_time(None, start)
+    return fire.timestamp() if fire else None
+
+
+def _schedule_after(cron_expr: str, jitter_seconds: int, after: float) -> Optional[float]:
+    """When the next run after *after* is due: the next fire plus random jitter."""
+    fire = _next_fire(cron_expr, after)
+    if fire is None or not jitter_seconds:
+        return fire
+    return fire + random.uniform(0, jitter_seconds)
+
+
+def _parse_apis(apis: str) -> list[str]:
+    return [api.strip().lower() for api in (apis or "").split(",") if api.strip()]
+
+
+def _rate_limit_wait(conn: sqlite3.Connection, task: dict, now: float) -> float:
+    """Seconds until every API *task* uses allows another run start (0: now)."""
+    wait = 0.0
+    for api in _parse_apis(task["apis"]):
+        if api not in SCHEDULER_API_RATE_LIMITS:
+            continue
+        max_starts, per_seconds = SCHEDULER_API_RATE_LIMITS[api]
+        starts = [row[0] for row in conn.execute(
+            "SELECT r.started_at FROM task_runs r JOIN scheduled_tasks t ON t.id = r.task_id "
+            "WHERE r.started_at > ? AND instr(',' || t.apis || ',', ?) > 0 "
+            "ORDER BY r.started_at DESC LIMIT ?",
+            (now - per_seconds, f",{api},", max_starts),
+        )]
+        if len(starts) >= max_starts:
+            # The oldest of the last max_starts starts leaving the window frees a slot
+            wait = max(wait, starts[-1] + per_seconds - now)
+    return wait
+
+
+def _due_fires(cron_expr: str, next_run_at: Optional[float], until: float) -> list[float]:
+    """Fires of *cron_expr* from *next_run_at* up to *until* (at most 1000)."""
+    fires = []
+    fire = next_run_at
+    while fire is not None and fire <= until and len(fires) < 1000:
+        fires.append(fire)
+        fire = _next_fire(cron_expr, fire)
+    return fires
+
+
+def _try_claim(conn: sqlite3.Connection, task: dict, owner: str, now: float,
+               early: float = 0.0) -> tuple[Optional[int], float]:
+    """Claim a run of *task* for *owner* inside the caller's transaction.
+
+    Fires up to *early* seconds ahead of ``next_run_at`` count as due (the
+    in-process scheduler applies its own jitter).  Fires later than the
+    task's grace time are skipped; with ``coalesce`` one run stands in for
+    every fire due so far, otherwise they run one after another.
+
+    Returns ``(run_id, 0)`` when claimed, ``(None, seconds)`` when an API
+    rate limit defers the run, and ``(None, 0)`` when nothing is due or the
+    task already runs ``max_instances`` times.
+    """
+    fires = _due_fires(task["cron_expr"], task["next_run_at"], now + early)
+    if not fires:
+        return None, 0.0
+
+    on_time = [f for f in fires if now - f <= task["misfire_grace_seconds"]]
+    missed = len(fires) - len(on_time)
+    if not on_time:
+        log.info("Task %s missed %d run(s) by more than %ds; skipping to the next one",
+                 task["id"], missed, task["misfire_grace_seconds"])
+        conn.execute(
+            "UPDATE scheduled_tasks SET next_run_at = ?, misfires = misfires + ?, pending_events = NULL "
+            "WHERE id = ?",
+            (_schedule_after(task["cron_expr"], task["jitter_seconds"], now), missed, task["id"]),
+        )
+        return None, 0.0
+
+    live = conn.execute(f"SELECT COUNT(*) FROM task_runs WHERE task_id = ? AND {_LIVE_RUN}",
+                        (task["id"], now)).fetchone()[0]
+    if live >= task["max_instances"]:
+        return None, 0.0
+    wait = _rate_limit_wait(conn, task, now)
+    if wait > 0:
+        return None, wait
+
+    if task["coalesce"] or len(on_time) == 1:
+        next_run_at = _schedule_after(task["cron_expr"], task["jitter_seconds"], max(now, on_time[-1]))
+    else:
+        next_run_at = on_time[1]
+    # Fires that were too late are dropped (and counted) along with the claim;
+    # the run takes over the events received so far
+    conn.execute(
+        "UPDATE scheduled_tasks SET next_run_at = ?, misfires = misfires + ?, pending_events = NULL "
+        "WHERE id = ?",
+        (next_run_at, missed, task["id"]),
+    )
+    received = json.loads(task.get("pending_events") or "[]")
+    cursor = conn.execute(
+        "INSERT INTO task_runs (task_id, runner, started_at, status, lease_expires_at, events) "
+        "VALUES (?, ?, ?, 'queued', ?, ?)",
+        (task["id"], owner, now, now + SCHEDULER_LEASE_SECONDS, "\n".join(received) or None),
+    )
+    return cursor.lastrowid, 0.0
+
+
+def _backfill_next_runs(conn: sqlite3.Connection, now: float):
+    """Schedule tasks from before next_run_at existed from *now* on (event tasks wait for events)."""
+    for row in conn.execute(
+        "SELECT id, cron_expr, jitter_seconds FROM scheduled_tasks "
+        "WHERE next_run_at IS NULL AND event IS NULL"
+    ).fetchall():
+        conn.execute("UPDATE scheduled_tasks SET next_run_at = ? WHERE id = ?",
+                     (_schedule_after(row["cron_expr"], row["jitter_seconds"], now), row["id"]))
+
+
+def _skip_missed_runs(now: float = None, db_path: str = None) -> int:
+    """Move tasks whose due run is later than their grace time to their next run."""
+    now = now or time.time()
+    conn = _get_connection(db_path)
+    with storage.transaction(conn):
+        rows = conn.execute(
+            "SELECT id, cron_expr, jitter_seconds, next_run_at FROM scheduled_tasks "
+            "WHERE enabled = 1 AND next_run_at < ? - misfire_grace_seconds",
+            (now,),
+        ).fetchall()
+        for row in rows:
+            log.info("Task %s missed its run while no runner was up; skipping to the next one", row["id"])
+            missed = len(_due_fires(row["cron_expr"], row["next_run_at"], now))
+            conn.execute(
+                "UPDATE scheduled_tasks SET next_run_at = ?, misfires = misfires + ?, pending_events = NULL "
+                "WHERE id = ?",
+                (_schedule_after(row["cron_expr"], row["jitter_seconds"], now), missed, row["id"]),
+            )
+    if db_path:
+        conn.close()
+    return len(rows)
+
+
+def _claim_due_tasks(owner: str, limit: int, now: float = None, db_path: str = None) -> list[dict]:
+    """Claim runs of up to *limit* due tasks for *owner*, highest priority first.
+
+    Returns the claimed tasks, each with the ``run_id`` of its run.
+
+    SQLite has no row locks, so the select and the claims share one
+    ``BEGIN IMMEDIATE`` transaction (``storage.transaction``): it holds the database write lock, and a
+    runner in another process claiming at the same moment waits for it and
+    then no longer sees these fires as due.
+    """
+    now = now or time.time()
+    conn = _get_connection(db_path)
+    claimed = []
+    try:
+        with storage.transaction(conn):
+            _backfill_next_runs(conn, now)
+            rows = conn.execute(
+                f"SELECT {_TASK_COLUMNS} FROM scheduled_tasks WHERE enabled = 1 AND next_run_at <= ? "
+                "ORDER BY priority DESC, next_run_at",
+                (now,),
+            ).fetchall()
+            for row in rows:
+                if len(claimed) >= limit:
+                    break
+                task = dict(row)
+                run_id, _ = _try_claim(conn, task, owner, now)
+                if run_id is not None:
+                    claimed.append({**task, "run_id": run_id})
+    finally:
+        if db_path:
+            conn.close()
+    return claimed
+
+
+def _claim_task(task_id: str, owner: str, now: float = None,
+                db_path: str = None) -> tuple[Optional[int], float]:
+    """Claim a run of *task_id* for *owner* if it is due (see ``_try_claim``)."""
+    now = now or time.time()
+    conn = _get_connection(db_path)
+    try:
+        with storage.transaction(conn):
+            _backfill_next_runs(conn, now)
+            row = conn.execute(
+                f"SELECT {_TASK_COLUMNS} FROM scheduled_tasks WHERE id = ? AND enabled = 1", (task_id,)
+            ).fetchone()
+            # APScheduler fires on the second and adds its own jitter
+            claim = _try_claim(conn, dict(row), owner, now, early=row["jitter_seconds"] + 1) if row else (None, 0.0)
+    finally:
+        if db_path:
+            conn.close()
+    return claim
+
+
+def _renew_lease(run_id: int, db_path: str = None) -> bool:
     conn = _get_connection(db_path)
     cursor = conn.execute(
-        "UPDATE scheduled_tasks SET enabled = ? WHERE id = ?",
-        (int(enabled), task_id),
+        "UPDATE task_runs SET lease_expires_at = ? WHERE id = ? AND status IN ('queued', 'running')",
+        (time.time() + SCHEDULER_LEASE_SECONDS, run_id),
     )
     conn.commit()
-    updated = cursor.rowcount > 0
+    renewed = cursor.rowcount > 0
+    if db_path:
+        conn.close()
+    return renewed
+
+
+def _release_run(run_id: int, db_path: str = None):
+    """Mark *run_id* cancelled unless it finished."""
+    conn = _get_connection(db_path)
+    conn.execute(
+        "UPDATE task_runs SET status = 'cancelled', finished_at = ?, lease_expires_at = NULL "
+        "WHERE id = ? AND status IN ('queued', 'running')",
+        (time.time(), run_id),
+    )
+    conn.commit()
+    if db_path:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Events – runs triggered by file changes, job status and KB indexing
+# ---------------------------------------------------------------------------
+
+def _trigger(conn: sqlite3.Connection, task: dict, received: list[str], now: float):
+    """Make a run of event task *task* due, keeping *received* for it (caller's transaction)."""
+    pending = json.loads(task["pending_events"] or "[]")
+    pending = list(dict.fromkeys(pending + received))[-SCHEDULER_MAX_PENDING_EVENTS:]
+    conn.execute(
+        "UPDATE scheduled_tasks SET pending_events = ?, next_run_at = min(coalesce(next_run_at, ?), ?) "
+        "WHERE id = ?",
+        (json.dumps(pending), now, now, task["id"]),
+    )
+
+
+def trigger_tasks(kind: str, key: str, detail: str, now: float = None, db_path: str = None) -> list[str]:
+    """Make runs of the enabled tasks whose trigger matches the event due; return their IDs."""
+    now = now or time.time()
+    conn = _get_connection(db_path)
+    try:
+        with storage.transaction(conn):
+            rows = conn.execute(
+                "SELECT id, event, pending_events FROM scheduled_tasks "
+                "WHERE enabled = 1 AND event IS NOT NULL"
+            ).fetchall()
+            triggered = [dict(row) for row in rows if events.matches(row["event"], kind, key)]
+            for task in triggered:
+                _trigger(conn, task, [detail], now)
+    finally:
+        if db_path:
+            conn.close()
+    return [task["id"] for task in triggered]
+
+
+def _scan_file_triggers(now: float = None, db_path: str = None) -> list[str]:
+    """Trigger the tasks whose watched files were added or modified; return their IDs.
+
+    The first scan of a task only records the files as they are.  A task's
+    snapshot is compared and replaced in one transaction, so when several
+    runners scan at once only one of them triggers a change.
+    """
+    now = now or time.time()
+    conn = _get_connection(db_path)
+    triggered = []
+    try:
+        rows = conn.execute(
+            "SELECT id, event FROM scheduled_tasks WHERE enabled = 1 AND event LIKE 'file:%'"
+        ).fetchall()
+        for row in rows:
+            # Stat the files outside the transaction
+            current = events.snapshot(events.parse(row["event"])[1])
+            with storage.transaction(conn):
+                task = conn.execute(
+                    "SELECT id, pending_events, event_state FROM scheduled_tasks WHERE id = ?", (row["id"],)
+                ).fetchone()
+                if task is None or task["event_state"] == json.dumps(current, sort_keys=True):
+                    continue
+                conn.execute("UPDATE scheduled_tasks SET event_state = ? WHERE id = ?",
+                             (json.dumps(current, sort_keys=True), task["id"]))
+                if task["event_state"] is None:
+                    continue
+                changes = events.changed_files(json.loads(task["event_state"]), current)
+                if changes:
+                    _trigger(conn, dict(task), changes, now)
+                    triggered.append(task["id"])
+    finally:
+        if db_path:
+            conn.close()
+    return triggered
+
+
+def _due_event_tasks(now: float = None, db_path: str = None) -> list[str]:
+    """IDs of the enabled event tasks whose run is due."""
+    conn = _get_connection(db_path)
+    rows = conn.execute(
+        "SELECT id FROM scheduled_tasks WHERE enabled = 1 AND event IS NOT NULL AND next_run_at <= ? "
+        "ORDER BY priority DESC, next_run_at",
+        (now or time.time(),),
+    ).fetchall()
     if db_path:
         conn.close()
-    return updated
+    return [row["id"] for row in rows]
+
+
+def _on_event(kind: str, key: str, detail: str):
+    task_ids = trigger_tasks(kind, key, detail)
+    if task_ids:
+        log.info("%s event '%s' triggered task(s) %s", kind, key, ", ".join(task_ids))
+        if _runner:
+            for task_id in task_ids:
+                _runner.fire_soon(task_id)
+
+
+def listen_for_events():
+    """Turn events emitted in this process into due runs of the tasks they trigger.
+
+    Runs are recorded in the database, so a runner in another process
+    (task_worker.py) picks them up as well.
+    """
+    events.subscribe(_on_event)
+
+
+def stop_listening():
+    events.unsubscribe(_on_event)
 
 
 # ---------------------------------------------------------------------------
@@ -166,15 +1095,132 @@ def validate_cron(cron_expr: str) -> tuple[bool, str]:
         return False, str(e)
 
 
+# ---------------------------------------------------------------------------
+# Task pool – bounded execution
+# ---------------------------------------------------------------------------
+
+class TaskPool:
+    """Runs scheduled tasks on a fixed number of workers fed by a priority queue.
+
+    At most *size* tasks execute at once.  Up to *max_queued* more wait,
+    higher priority first and FIFO within a priority; a fire that finds the
+    queue full is dropped (the task simply runs at its next fire).  A task
+    is not queued again while *max_instances* of its runs are queued or
+    running.
+    """
+
+    def __init__(self, size: int = SCHEDULER_POOL_SIZE, max_queued: int = SCHEDULER_MAX_QUEUED,
+                 execute: Optional[Callable[[str], Awaitable[None]]] = None):
+        self.size = size
+        self.max_queued = max_queued
+        self._execute = execute or _execute_task
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._order = itertools.count()
+        # Runs queued or running, per task ID (limited to the task's max_instances)
+        self._pending: Counter = Counter()
+        self._running: Counter = Counter()
+        self._workers: list[asyncio.Task] = []
+        # Seconds between enqueue and start of recent runs
+        self._waits: deque = deque(maxlen=SCHEDULER_WAIT_SAMPLES)
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.skipped = 0
+        self.max_depth = 0
+
+    def start(self):
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._work()) for _ in range(self.size)]
+
+    def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+
+    def submit(self, task_id: str, priority: int = 0, max_instances: int = 1) -> bool:
+        """Queue *task_id* for execution; False if it was skipped or rejected."""
+        if self._pending[task_id] >= max_instances:
+            self.skipped += 1
+            log.info("Task %s is still queued or running; skipping this fire", task_id)
+            return False
+        if self._queue.qsize() >= self.max_queued:
+            self.rejected += 1
+            log.warning("Task queue full (%d waiting); dropping fire of task %s",
+                        self._queue.qsize(), task_id)
+            return False
+        self._pending[task_id] += 1
+        self._queue.put_nowait((-priority, next(self._order), task_id, time.monotonic()))
+        self.submitted += 1
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+        return True
+
+    def is_pending(self, task_id: str) -> bool:
+        """Whether a run of *task_id* is queued or running."""
+        return self._pending[task_id] > 0
+
+    def idle_slots(self) -> int:
+        """Workers not busy with (or already assigned) a task."""
+        return max(0, self.size - sum(self._pending.values()))
+
+    async def join(self):
+        """Wait until every queued task has finished."""
+        await self._queue.join()
+
+    async def _work(self):
+        while True:
+            _, _, task_id, queued_at = await self._queue.get()
+            self._waits.append(time.monotonic() - queued_at)
+            self._running[task_id] += 1
+            try:
+                await self._execute(task_id)
+                self.completed += 1
+            except Exception:
+                self.failed += 1
+                log.exception("Task %s failed", task_id)
+            finally:
+                for counts in (self._running, self._pending):
+                    counts[task_id] -= 1
+                    if not counts[task_id]:
+                        del counts[task_id]
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+
+        def wait_ms(pct: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(round(pct / 100 * (len(waits) - 1))))] * 1000, 1)
+
+        return {
+            "workers": self.size,
+            "running": sum(self._running.values()),
+            "queued": self._queue.qsize(),
+            "max_queued": self.max_queued,
+            "max_depth": self.max_depth,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "skipped_overlap": self.skipped,
+            "wait_p50_ms": wait_ms(50),
+            "wait_p95_ms": wait_ms(95),
+            "wait_max_ms": wait_ms(100),
+        }
+
+
 # ---------------------------------------------------------------------------
 # Task Runner – APScheduler runtime engine
 # ---------------------------------------------------------------------------
 
 class TaskRunner:
-    """Manages the APScheduler instance that actually executes scheduled tasks."""
+    """Manages the APScheduler instance that fires scheduled tasks into a TaskPool."""
 
-    def __init__(self):
+    def __init__(self, pool_size: int = SCHEDULER_POOL_SIZE,
+                 max_queued: int = SCHEDULER_MAX_QUEUED):
         self._scheduler = AsyncIOScheduler()
+        self.pool = TaskPool(pool_size, max_queued)
         self._started = False
 
     # -- lifecycle -----------------------------------------------------------
@@ -186,18 +1232,34 @@ class TaskRunner:
         global _runner
         _runner = self
 
+        _skip_missed_runs()
         for task in _list_tasks():
             if task["enabled"]:
                 self._register_job(task)
+        listen_for_events()
+        # Also fires event tasks made due while no runner was up (or by other processes)
+        self._scheduler.add_job(
+            self._check_events,
+            trigger="interval",
+            seconds=SCHEDULER_EVENT_POLL_SECONDS,
+            id=":events",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+            next_run_time=datetime.now().astimezone(),
+        )
 
+        self.pool.start()
         self._scheduler.start()
         self._started = True
         log.info("TaskRunner started with %d job(s)", len(self._scheduler.get_jobs()))
 
     def stop(self):
         global _runner
+        stop_listening()
         if self._scheduler.running:
             self._scheduler.shutdown(wait=False)
+        self.pool.stop()
         _runner = None
         log.info("TaskRunner stopped")
 
@@ -205,16 +1267,69 @@ class TaskRunner:
 
     def _register_job(self, task: dict):
         """Add a cron job for *task* (dict from DB) to the scheduler."""
-        trigger = CronTrigger.from_crontab(task["cron_expr"])
+        if task["event"]:
+            return  # events fire it (see fire_soon and _check_events)
+        options = {}
+        if task["next_run_at"] and task["next_run_at"] < time.time():
+            # Fires missed while no runner was up: APScheduler applies the
+            # grace time and coalescing to them as to any late fire
+            options["next_run_time"] = datetime.fromtimestamp(task["next_run_at"]).astimezone()
         self._scheduler.add_job(
-            _execute_task,
-            trigger=trigger,
+            self._fire,
+            trigger=_cron_trigger(task["cron_expr"], task["jitter_seconds"]),
             id=task["id"],
             args=[task["id"]],
             replace_existing=True,
-            misfire_grace_time=300,
+            misfire_grace_time=max(1, task["misfire_grace_seconds"]),
+            coalesce=bool(task["coalesce"]),
+            # _fire returns at once; the pool enforces the task's max_instances
+            max_instances=1,
+            **options,
         )
 
+    async def _fire(self, task_id: str):
+        """APScheduler job: hand the task to the pool instead of running it here."""
+        task = await storage.run(_get_task, task_id)
+        if task and task["enabled"]:
+            self.pool.submit(task_id, task["priority"], task["max_instances"])
+
+    def retry_later(self, task_id: str, delay: float):
+        """Fire *task_id* again after *delay* seconds (e.g. when rate limited)."""
+        self._scheduler.add_job(
+            self._fire,
+            trigger="date",
+            run_date=datetime.now().astimezone() + timedelta(seconds=delay),
+            id=f"{task_id}:retry",
+            args=[task_id],
+            replace_existing=True,
+        )
+
+    def fire_soon(self, task_id: str):
+        """Fire event task *task_id* right away (safe to call from any thread)."""
+        self._scheduler.add_job(
+            self._fire_event,
+            trigger="date",
+            id=f"{task_id}:event",
+            args=[task_id],
+            replace_existing=True,
+        )
+
+    async def _fire_event(self, task_id: str):
+        # Events arriving while a run is queued or running wait for it to
+        # finish; _check_events then fires the run they made due
+        if not self.pool.is_pending(task_id):
+            await self._fire(task_id)
+
+    async def _check_events(self):
+        """Interval job: scan file triggers and fire the event tasks that are due."""
+        await storage.run(_scan_file_triggers)
+        for task_id in await storage.run(_due_event_tasks):
+            await self._fire_event(task_id)
+
+    def stats(self) -> dict:
+        """Queue depth, wait times and outcome counts of the task pool."""
+        return self.pool.stats()
+
     def add(self, task_id: str):
         """Register a newly-created task in the live scheduler."""
         task = _get_task(task_id)
@@ -223,27 +1338,156 @@ class TaskRunner:
 
     def remove(self, task_id: str):
         """Remove a task from the live scheduler (if present)."""
-        try:
-            self._scheduler.remove_job(task_id)
-        except Exception:
-            pass  # job may not exist if it was already disabled
+        for job_id in (task_id, f"{task_id}:retry", f"{task_id}:event"):
+            try:
+                self._scheduler.remove_job(job_id)
+            except Exception:
+                pass  # job may not exist if it was already disabled
+
+    def sync(self, task_ids: list[str]):
+        """Bring the jobs of *task_ids* in line with the database (after bulk changes)."""
+        for task_id in task_ids:
+            task = _get_task(task_id)
+            if task and task["enabled"]:
+                self._register_job(task)
+            else:
+                self.remove(task_id)
 
 
-async def _execute_task(task_id: str):
-    """Run a single scheduled task through a temporary Sidekick instance."""
-    task = _get_task(task_id)
+def _token_totals(usage: UsageMetadataCallbackHandler) -> tuple[int, int]:
+    """Input and output tokens across all models in *usage*."""
+    totals = usage.usage_metadata.values()
+    return sum(u.get("input_tokens", 0) for u in totals), sum(u.get("output_tokens", 0) for u in totals)
+
+
+async def _hold_lease(run_id: int):
+    """Keep renewing the lease of *run_id* until cancelled."""
+    while True:
+        await asyncio.sleep(SCHEDULER_LEASE_SECONDS / 3)
+        if not await storage.run(_renew_lease, run_id):
+            log.warning("Lost the lease on run %s", run_id)
+            return
+
+
+async def _execute_task(task_id: str, run_id: Optional[int] = None):
+    """Run a scheduled task under a lease.
+
+    Callers that already claimed the run (task_worker.py) pass its *run_id*;
+    otherwise the run is claimed here, and skipped if the fire was already
+    run elsewhere, was missed or the task runs its max_instances already.
+    """
+    if run_id is None:
+        run_id, retry_after = await storage.run(_claim_task, task_id, _LOCAL_OWNER)
+        if run_id is None:
+            if retry_after and _runner:
+                log.info("Task %s is rate limited; retrying in %.0fs", task_id, retry_after)
+                _runner.retry_later(task_id, retry_after)
+            else:
+                log.info("Task %s has no run due here; skipping", task_id)
+            return
+    keeper = asyncio.create_task(_hold_lease(run_id))
+    try:
+        await _run_task(task_id, run_id)
+    finally:
+        keeper.cancel()
+        await storage.run(_release_run, run_id)
+
+
+async def _complete_run(task: dict, run_id: int, result_text: str,
+                        usage: UsageMetadataCallbackHandler, fingerprint: Optional[str] = None,
+                        replayed: bool = False):
+    """Record a successful run of *task* and send its notification."""
+    await storage.run(_finish_run, run_id, "ok", result_text, *_token_totals(usage),
+                      replayed=replayed)
+    log.info("Task %s completed%s: %s", task["id"], " from its plan" if replayed else "",
+             result_text[:120])
+    # Stored only after a successful run, so a failed run is retried at the next check
+    if fingerprint:
+        await storage.run(_set_fingerprint, task["id"], fingerprint)
+
+    # Optional push notification (for monitoring tasks: on change, not for the first check)
+    if task["notify"] and (not task["monitor"] or task["fingerprint"]):
+        try:
+            from tools.system import push
+            # Not on the storage executor: a slow endpoint must not hold a database worker
+            await asyncio.to_thread(
+                push, f"Scheduled task completed: {task['description']}\n\n{result_text[:500]}"
+            )
+        except Exception as e:
+            log.warning("Push notification failed for task %s: %s", task["id"], e)
+
+
+async def _run_task(task_id: str, run_id: int):
+    """Run a single scheduled task: from its plan if it has one, else through a temporary Sidekick."""
+    task = await storage.run(_get_task, task_id)
     if not task or not task["enabled"]:
         return
 
+    await storage.run(_start_run, run_id)
+    observed = fingerprint = None
+    if task["monitor"]:
+        try:
+            observed = await asyncio.to_thread(monitoring.observe, task["monitor"])
+        except Exception as e:
+            await storage.run(_finish_run, run_id, "error",
+                              f"Error: pre-check of {monitoring.describe(task['monitor'])} failed: {e}")
+            log.warning("Pre-check of task %s failed: %s", task_id, e)
+            return
+        fingerprint = monitoring.fingerprint(observed)
+        if fingerprint == task["fingerprint"]:
+            await storage.run(_finish_run, run_id, "unchanged",
+                              f"No change in {monitoring.describe(task['monitor'])}.")
+            log.info("Task %s: monitored source unchanged; skipping the agent run", task_id)
+            return
+
+    context = []
+    if task["event"]:
+        received = await storage.run(_get_run_events, run_id)
+        context.append(
+            f"This run was triggered because {events.describe(task['event'])}:\n"
+            + "\n".join(f"- {line}" for line in (received or "(no details)").splitlines())
+        )
+    if observed is not None:
+        context.append(
+            f"The monitored {monitoring.describe(task['monitor'])} "
+            f"{'has changed since the last run' if task['fingerprint'] else 'is checked for the first time'}. "
+            f"Its current content:\n\n{monitoring.excerpt(observed)}"
+        )
+    context = "\n\n".join(context)
+    # An event run acts on whatever triggered it, which a plan's fixed tool
+    # arguments cannot follow
+    plannable = TASK_PLANS_ENABLED and not task["event"]
+
+    # Token usage of every LLM call in the run, sub-agents included
+    usage = UsageMetadataCallbackHandler()
+
+    if plannable and task["plan"] and task["plan_replays"] < TASK_PLAN_MAX_REPLAYS:
+        try:
+            result_text = await task_plans.replay(task["description"], json.loads(task["plan"]),
+                                                  context=context, callbacks=[usage])
+        except task_plans.PlanReplayError as e:
+            log.info("Plan of task %s could not be replayed (%s); running it in full", task_id, e)
+            usage = UsageMetadataCallbackHandler()
+        except Exception as e:
+            await storage.run(_finish_run, run_id, "error", f"Error: {e}", *_token_totals(usage),
+                              replayed=True)
+            log.exception("Task %s failed", task_id)
+            return
+        else:
+            await _complete_run(task, run_id, result_text, usage, fingerprint, replayed=True)
+            return
+
     log.info("Executing scheduled task %s: %s", task_id, task["description"])
 
     # Import here to avoid circular imports (sidekick imports scheduler tools)
     from sidekick import Sidekick
 
+    recorder = task_plans.PlanRecorder()
     sidekick = None
     try:
         session_id = f"scheduled-{task_id}-{uuid.uuid4().hex[:6]}"
         sidekick = Sidekick(session_id=session_id)
+        sidekick.callbacks.extend([usage, recorder])
         await sidekick.setup(include_browser=False)
 
         execution_prompt = (
@@ -253,40 +1497,33 @@ async def _execute_task(task_id: str):
             f"(web search, file writing, PDF creation, etc.):\n\n"
             f"{task['description']}"
         )
+        if context:
+            execution_prompt += f"\n\n{context}"
         success_criteria = (
             "The task must be fully executed — not planned, not scheduled, but actually done. "
             "All files mentioned must be created. Provide a concise summary of what was done."
         )
 
         result_text = ""
-        async for _ in sidekick.run_superstep(
-            execution_prompt,
-            success_criteria,
-            [],
-        ):
+        # A scheduled run must actually execute, never replay a cached answer
+        async for _ in sidekick.stream_deltas(execution_prompt, success_criteria, bypass_cache=True):
             pass  # consume the generator; we only care about the final state
 
         # Grab the last AI message from chat history
         messages = sidekick.chat_history.messages
         if messages:
-            result_text = messages[-1].content[:2000]
+            result_text = messages[-1].content
         else:
             result_text = "(no output)"
 
-        _update_task_result(task_id, result_text)
-        log.info("Task %s completed: %s", task_id, result_text[:120])
-
-        # Optional push notification
-        if task["notify"]:
-            try:
-                from tools.system import push
-                push(f"Scheduled task completed: {task['description']}\n\n{result_text[:500]}")
-            except Exception as e:
-                log.warning("Push notification failed for task %s: %s", task_id, e)
+        if plannable:
+            # A full run (re-)plans the task; runs with side effects leave it without a plan
+            await storage.run(_set_plan, task_id, recorder.plan())
+        await _complete_run(task, run_id, result_text, usage, fingerprint)
 
     except Exception as e:
         error_msg = f"Error: {e}"
-        _update_task_result(task_id, error_msg)
+        await storage.run(_finish_run, run_id, "error", error_msg, *_token_totals(usage))
         log.exception("Task %s failed", task_id)
     finally:
         if sidekick:
@@ -297,38 +1534,108 @@ async def _execute_task(task_id: str):
 # Tool-facing functions (called by LangChain tools)
 # ---------------------------------------------------------------------------
 
-def schedule_task(description: str, cron: str, notify: bool = False) -> str:
-    """Schedule a recurring background task.
+def update_tasks(action: str, task_ids: list[str]) -> list[str]:
+    """Apply a bulk *action* (one of ``TASK_BULK_ACTIONS``) to *task_ids*.
+
+    The database changes in one transaction and the live scheduler follows;
+    returns the IDs of the tasks that exist.
+    """
+    if action == "delete":
+        done = _remove_tasks(task_ids)
+    elif action in ("enable", "disable"):
+        done = _set_tasks_enabled(task_ids, action == "enable")
+    else:
+        raise ValueError(f"Unknown action '{action}'; expected one of {', '.join(TASK_BULK_ACTIONS)}")
+    if _runner:
+        _runner.sync(done)
+    return done
+
+
+def _format_policy(task: dict) -> str:
+    return (
+        f"jitter {task['jitter_seconds']}s, grace {task['misfire_grace_seconds']}s, "
+        f"{'coalesce' if task['coalesce'] else 'catch up'}, max {task['max_instances']} at once, "
+        f"APIs: {task['apis'] or 'none'}"
+    )
+
+
+def _format_schedule(task: dict) -> str:
+    if task["event"]:
+        return f"on {task['event']} (runs when {events.describe(task['event'])})"
+    return task["cron_expr"]
+
+
+def schedule_task(description: str, cron: str = "", notify: bool = False, priority: int = 0,
+                  jitter_seconds: int = SCHEDULER_DEFAULT_JITTER_SECONDS,
+                  misfire_grace_seconds: int = SCHEDULER_DEFAULT_MISFIRE_GRACE_SECONDS,
+                  coalesce: bool = True, max_instances: int = 1,
+                  apis: str = SCHEDULER_DEFAULT_APIS, monitor: str = "", event: str = "") -> str:
+    """Schedule a recurring background task, run on a cron schedule or on events.
 
     Args:
         description: What the task should do, e.g. 'Check BBC News for tech headlines'
         cron: A cron expression, e.g. '0 8 * * *' (daily at 8 AM), '*/30 * * * *' (every 30 min)
         notify: Whether to send a push notification with results (default False)
+        priority: Higher runs first when several tasks are waiting to run (default 0)
+        jitter_seconds: Start each run up to this many seconds after its scheduled time
+        misfire_grace_seconds: Skip a run that could not start within this many seconds
+        coalesce: Run once for several missed runs (True) or catch up on each (False)
+        max_instances: How many runs of this task may run at the same time
+        apis: Comma-separated external APIs the task uses (e.g. 'llm,search'); rate-limited per API
+        monitor: For "tell me if X changed" tasks: a URL or search query checked without the
+            LLM before each run; the task only runs (and notifies) when it changed
+        event: Instead of cron, run whenever an event happens: 'file:<glob>' (a sandbox file
+            was added or changed, e.g. 'file:knowledge/*.pdf'), 'job_status:<status>' (a job
+            moved to that status, e.g. 'job_status:interview') or 'kb_indexed:<filename>'
+            (the knowledge base indexed a document; '*' for any)
     """
     description = description.strip()
     cron = cron.strip()
+    monitor = monitor.strip()
+    event = event.strip()
 
     if not description:
         return "Error: 'description' is required."
-    if not cron:
-        return "Error: 'cron' expression is required."
-
-    valid, err = validate_cron(cron)
-    if not valid:
-        return f"Error: invalid cron expression '{cron}'. {err}"
-
-    task_id = _add_task(description, cron, notify=notify)
+    if not cron and not event:
+        return "Error: 'cron' expression is required (or an 'event' trigger)."
+    if cron and event:
+        return "Error: give either a 'cron' expression or an 'event' trigger, not both."
+
+    if cron:
+        valid, err = validate_cron(cron)
+        if not valid:
+            return f"Error: invalid cron expression '{cron}'. {err}"
+    else:
+        valid, err = events.validate(event)
+        if not valid:
+            return f"Error: invalid event trigger '{event}'. {err}"
+    if jitter_seconds < 0 or misfire_grace_seconds < 1 or max_instances < 1:
+        return "Error: jitter must be >= 0, misfire grace and max instances >= 1."
+    unknown = sorted(set(_parse_apis(apis)) - set(SCHEDULER_API_RATE_LIMITS))
+    if unknown:
+        return (f"Error: unknown API(s) {', '.join(unknown)}; "
+                f"known: {', '.join(SCHEDULER_API_RATE_LIMITS)}.")
+
+    task_id = _add_task(description, cron, notify=notify, priority=priority,
+                        jitter_seconds=jitter_seconds, misfire_grace_seconds=misfire_grace_seconds,
+                        coalesce=coalesce, max_instances=max_instances, apis=apis,
+                        monitor=monitor, event=event)
 
     # Register in the live scheduler so it starts running immediately
     if _runner:
         _runner.add(task_id)
 
+    task = _get_task(task_id)
     return (
         f"Task scheduled successfully.\n"
         f"  ID: {task_id}\n"
-        f"  Schedule: {cron}\n"
+        f"  Schedule: {_format_schedule(task)}\n"
         f"  Description: {description}\n"
-        f"  Notifications: {'on' if notify else 'off'}"
+        f"  Notifications: {'on' if notify else 'off'}\n"
+        f"  Priority: {priority}\n"
+        f"  Policy: {_format_policy(task)}"
+        + (f"\n  Monitoring: {monitoring.describe(monitor)} (the first run sets the baseline)"
+           if monitor else "")
     )
 
 
@@ -344,9 +1651,24 @@ def list_scheduled_tasks() -> str:
         last = t["last_run"] or "never"
         lines.append(
             f"  [{t['id']}] {t['description']}\n"
-            f"    Schedule: {t['cron_expr']}  |  Status: {status}  |  Last run: {last}\n"
-            f"    Notify: {'yes' if t['notify'] else 'no'}"
+            f"    Schedule: {_format_schedule(t)}  |  Status: {status}  |  Last run: {last}\n"
+            f"    Notify: {'yes' if t['notify'] else 'no'}  |  Priority: {t['priority']}\n"
+            f"    Policy: {_format_policy(t)}"
         )
+        if t["monitor"]:
+            lines.append(f"    Monitoring: {monitoring.describe(t['monitor'])} (runs only on change)")
+        if t["plan"]:
+            steps = json.loads(t["plan"])
+            lines.append(f"    Plan: {len(steps)} tool call(s) ({', '.join(sorted({s['tool'] for s in steps}))}), "
+                         f"replayed {t['plan_replays']}/{TASK_PLAN_MAX_REPLAYS} times")
+        runs = _list_runs(t["id"], limit=3)
+        if runs:
+            recent = " · ".join(
+                f"{r['status']} {r['duration_ms'] / 1000:.0f}s" if r["duration_ms"] is not None
+                else r["status"]
+                for r in runs
+            )
+            lines.append(f"    Recent runs: {recent}")
         if t["last_result"]:
             preview = t["last_result"][:200]
             lines.append(f"    Last result: {preview}")
@@ -0,0 +1,264 @@
+"""
+Shared-runtime serving mode for many concurrent users.
+
+In the default per-session mode app.py builds a complete Sidekick (compiled
+graph, sub-agents, Chromium, SQLite connections) for every browser session.
+``SharedRuntime`` instead sets up ONE Sidekick and serves every session from
+it: per-turn state is keyed by the LangGraph ``thread_id`` (= session id),
+stateless sub-agents are shared, and browsers — which cannot be shared by
+concurrent turns — are checked out of a small ``AgentPool``.  The user
+profile (user_profile.py) is global rather than per session, so one runtime
+should serve a single user, or users who may see each other's remembered
+facts.
+
+Turns pass through a ``FairScheduler`` first: at most ``max_active`` run at
+once, up to ``max_queued`` wait, and waiting turns are admitted round-robin
+across users so one user submitting many requests cannot starve the rest.
+Beyond that the runtime rejects with ``ServerBusy``.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from config import BROWSER_POOL_SIZE, SERVING_MAX_ACTIVE_TURNS, SERVING_MAX_QUEUED_TURNS
+from streaming import apply_event
+
+log = logging.getLogger(__name__)
+
+BUSY_MESSAGE = "The assistant is at capacity right now. Please try again in a moment."
+
+
+class ServerBusy(Exception):
+    """Raised when a turn is rejected by admission control."""
+
+
+# ---------------------------------------------------------------------------
+# Admission control
+# ---------------------------------------------------------------------------
+
+class FairScheduler:
+    """Bounded concurrency with a per-user round-robin wait queue."""
+
+    def __init__(self, max_active: int = SERVING_MAX_ACTIVE_TURNS,
+                 max_queued: int = SERVING_MAX_QUEUED_TURNS):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        # user_id -> waiters; dict order is the round-robin order
+        self._waiting: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+
+    @asynccontextmanager
+    async def slot(self, user_id: str):
+        """Hold one of the active slots for the duration of the block."""
+        await self._acquire(user_id)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, user_id: str):
+        if self.active < self.max_active and not self.queued:
+            self.active += 1
+            self.admitted += 1
+            return
+        if self.queued >= self.max_queued:
+            self.rejected += 1
+            raise ServerBusy(BUSY_MESSAGE)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(user_id, deque()).append(waiter)
+        self.queued += 1
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.cancelled():
+                # Still queued: withdraw the request
+                self._discard(user_id, waiter)
+            else:
+                # The slot was handed over just before cancellation: pass it on
+                self._release()
+            raise
+        self.admitted += 1
+
+    def _discard(self, user_id: str, waiter: asyncio.Future):
+        queue = self._waiting.get(user_id)
+        if queue and waiter in queue:
+            queue.remove(waiter)
+            self.queued -= 1
+            if not queue:
+                del self._waiting[user_id]
+
+    def _release(self):
+        # Hand the slot straight to the next user in rotation, if any
+        while self._waiting:
+            user_id, queue = next(iter(self._waiting.items()))
+            waiter = queue.popleft()
+            self.queued -= 1
+            if queue:
+                self._waiting.move_to_end(user_id)
+            else:
+                del self._waiting[user_id]
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "waiting_users": len(self._waiting),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Agent pool
+# ---------------------------------------------------------------------------
+
+class AgentPool:
+    """Fixed-size pool of agents that must not be used by two turns at once.
+
+    Quacks like an agent (``run``/``cleanup``), so the orchestrator can wrap it
+    as a tool exactly like a single agent.  Agents are created lazily by
+    *factory* up to *size*; further callers wait for one to be returned.
+    """
+
+    def __init__(self, factory: Callable[[], Awaitable[Any]], size: int = BROWSER_POOL_SIZE):
+        self._factory = factory
+        self.size = size
+        self._agents: List[Any] = []
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._creating = 0
+
+    async def _checkout(self):
+        if self._idle.empty() and len(self._agents) + self._creating < self.size:
+            self._creating += 1
+            try:
+                agent = await self._factory()
+            finally:
+                self._creating -= 1
+            self._agents.append(agent)
+            return agent
+        return await self._idle.get()
+
+    async def run(self, task: str, context: str = "") -> str:
+        agent = await self._checkout()
+        try:
+            return await agent.run(task, context=context)
+        finally:
+            self._idle.put_nowait(agent)
+
+    async def cleanup(self):
+        agents, self._agents = self._agents, []
+        for agent in agents:
+            try:
+                await agent.cleanup()
+            except Exception as e:
+                log.warning("Agent cleanup failed: %s", e)
+
+
+# ---------------------------------------------------------------------------
+# Shared runtime
+# ---------------------------------------------------------------------------
+
+class SharedRuntime:
+    """One Sidekick serving every session, behind a fair admission queue."""
+
+    def __init__(self, max_active: int = SERVING_MAX_ACTIVE_TURNS,
+                 max_queued: int = SERVING_MAX_QUEUED_TURNS,
+                 browser_pool_size: int = BROWSER_POOL_SIZE):
+        self.scheduler = FairScheduler(max_active, max_queued)
+        self.browser_pool_size = browser_pool_size
+        self.sidekick = None
+        self.browser_pool: Optional[AgentPool] = None
+        self._start_lock = asyncio.Lock()
+
+    async def start(self, include_browser: bool = True):
+        """Build the shared Sidekick once; later calls are no-ops."""
+        async with self._start_lock:
+            if self.sidekick is not None:
+                return
+            from agents.browser import BrowserAgent
+            from sidekick import Sidekick
+
+            if include_browser and self.browser_pool_size > 0:
+                self.browser_pool = AgentPool(BrowserAgent.create, self.browser_pool_size)
+            sidekick = Sidekick(session_id="shared-runtime")
+            await sidekick.setup(include_browser=False, browser_pool=self.browser_pool)
+            self.sidekick = sidekick
+
+    def session(self, session_id: str) -> "RuntimeSession":
+        return RuntimeSession(self, session_id)
+
+    async def stream_deltas(self, session_id: str, message, success_criteria,
+                            user_id: Optional[str] = None, bypass_cache: bool = False):
+        """Queue a turn for *session_id* and stream its append/patch events."""
+        enqueued = time.perf_counter()
+        async with self.scheduler.slot(user_id or session_id):
+            waited = time.perf_counter() - enqueued
+            if waited > 1:
+                log.info("Turn for session %s waited %.1fs for a slot", session_id, waited)
+            async for event in self.sidekick.stream_deltas(
+                message, success_criteria, thread_id=session_id, bypass_cache=bypass_cache
+            ):
+                yield event
+
+    async def run_superstep(self, session_id: str, message, success_criteria, history,
+                            user_id: Optional[str] = None, bypass_cache: bool = False):
+        """Queue a turn for *session_id* and stream its updated chat histories."""
+        history = list(history)
+        async for event in self.stream_deltas(session_id, message, success_criteria, user_id,
+                                              bypass_cache):
+            apply_event(history, event)
+            yield history
+
+    async def stop(self):
+        if self.browser_pool:
+            await self.browser_pool.cleanup()
+        if self.sidekick:
+            sidekick, self.sidekick = self.sidekick, None
+            await sidekick.aclose()
+
+
+_runtime: Optional[SharedRuntime] = None
+
+
+def get_runtime() -> SharedRuntime:
+    """Return the process-wide SharedRuntime (the UI and the HTTP API share it)."""
+    global _runtime
+    if _runtime is None:
+        _runtime = SharedRuntime()
+    return _runtime
+
+
+class RuntimeSession:
+    """Per-session handle onto a SharedRuntime, used where app.py keeps a Sidekick."""
+
+    def __init__(self, runtime: SharedRuntime, session_id: str):
+        self.runtime = runtime
+        self.sidekick_id = session_id
+
+    async def run_superstep(self, message, success_criteria, history, bypass_cache=False):
+        try:
+            async for updated in self.runtime.run_superstep(
+                self.sidekick_id, message, success_criteria, history, bypass_cache=bypass_cache
+            ):
+                yield updated
+        except ServerBusy as e:
+            yield history + [
+                {"role": "user", "content": message},
+                {"role": "assistant", "content": str(e)},
+            ]
+
+    def cleanup(self):
+        # Shared resources belong to the runtime, not to a session
+        pass
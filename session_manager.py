@@ -2,6 +2,7 @@ import sqlite3
 import uuid
 from datetime import datetime
 
+import storage
 from config import DB_PATH, CHECKPOINTS_DB_PATH
 from langchain_community.chat_message_histories import SQLChatMessageHistory
 
@@ -12,18 +13,22 @@ class SessionManager:
     def __init__(self, db_path: str = DB_PATH, checkpoints_db_path: str = CHECKPOINTS_DB_PATH):
         self._db_path = db_path
         self._checkpoints_db_path = checkpoints_db_path
-        self._conn = sqlite3.connect(db_path, check_same_thread=False)
-        self._ensure_table()
+        # One connection per thread that uses the manager (UI handlers run in a thread pool)
+        self._db = storage.Database(db_path, self._ensure_table, row_factory=None)
+        self._db.connection()
 
-    def _ensure_table(self):
-        self._conn.execute("""
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        return self._db.connection()
+
+    def _ensure_table(self, conn: sqlite3.Connection):
+        conn.execute("""
             CREATE TABLE IF NOT EXISTS sessions (
                 id         TEXT PRIMARY KEY,
                 name       TEXT NOT NULL,
                 created_at TEXT NOT NULL
             )
         """)
-        self._conn.commit()
 
     def create_session(self, name: str = None) -> str:
         session_id = str(uuid.uuid4())
@@ -81,15 +86,15 @@ class SessionManager:
         chat_history.clear()
 
         # 3. Clear checkpoint data
-        cp_conn = sqlite3.connect(self._checkpoints_db_path)
+        cp_conn = storage.connect(self._checkpoints_db_path, row_factory=None)
         try:
-            cp_conn.execute(
-                "DELETE FROM checkpoints WHERE thread_id = ?", (session_id,)
-            )
-            cp_conn.execute(
-                "DELETE FROM writes WHERE thread_id = ?", (session_id,)
-            )
-            cp_conn.commit()
+            with storage.transaction(cp_conn):
+                cp_conn.execute(
+                    "DELETE FROM checkpoints WHERE thread_id = ?", (session_id,)
+                )
+                cp_conn.execute(
+                    "DELETE FROM writes WHERE thread_id = ?", (session_id,)
+                )
         except sqlite3.OperationalError:
             pass  # tables may not exist yet
         finally:
@@ -98,4 +103,4 @@ class SessionManager:
         return True
 
     def close(self):
-        self._conn.close()
+        self._db.close()
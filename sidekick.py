@@ -9,20 +9,38 @@ The evaluator loop is **optional**: it only runs when the user provides
 explicit success criteria.
 """
 
-from typing import Annotated, List, Any, Optional, Dict
+from typing import Annotated, List, Any, Optional, Dict, Tuple
 from typing_extensions import TypedDict
 
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode
 from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
-from langchain_openai import ChatOpenAI
+from langchain_core.callbacks import UsageMetadataCallbackHandler
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import Tool
+from langchain_core.utils.function_calling import convert_to_openai_tool
 from langchain_community.chat_message_histories import SQLChatMessageHistory
 from pydantic import BaseModel, Field
-
-from config import DB_PATH, CHECKPOINTS_DB_PATH, DEFAULT_MODEL
+from sqlalchemy import create_engine, event
+
+from config import (
+    DB_PATH, CHECKPOINTS_DB_PATH, DEFAULT_MODEL, MAX_EVALUATION_ROUNDS,
+    TRACING_ENABLED, HISTORY_CACHE_SIZE, LLM_USAGE_HISTORY, RESPONSE_CACHE_ENABLED,
+    FAST_PATH_TOOLS, MEMORY_CONTEXT_MESSAGES,
+)
+from context_window import ContextWindow
+from evaluation import VerdictCache, conversation_delta
+from graph_cache import get_or_compile, runtime_tool
+from model_router import (
+    ainvoke_structured, chat_model, is_valid_reply, next_tier, record_fallback, tier_for,
+)
+from prompt_builder import assemble_worker_messages, cache_usage
+import storage
+from response_cache import ResponseCache
+from streaming import TokenCoalescer, append_event, apply_event, patch_event
+from tracing import TraceRecorder
 from user_profile import UserProfile
 
 from agents.research import ResearchAgent
@@ -41,11 +59,15 @@ from tools.location import get_tools as get_location_tools
 from tools.system import get_tools as get_system_tools
 from tools.jobsearch import get_tools as get_jobsearch_tools
 from tools.interview import get_tools as get_interview_tools
+from tools.artifacts import capped_tool, get_tools as get_artifact_tools
 
 import uuid
+import logging
 import aiosqlite
 import asyncio
-from datetime import datetime
+from collections import OrderedDict, deque
+
+log = logging.getLogger(__name__)
 
 
 # ---------------------------------------------------------------------------
@@ -59,6 +81,9 @@ class State(TypedDict):
     feedback_on_work: Optional[str]
     success_criteria_met: bool
     user_input_needed: bool
+    evaluation_count: int
+    evaluated_upto: int
+    last_evaluated_response: Optional[str]
 
 
 class EvaluatorOutput(BaseModel):
@@ -86,24 +111,51 @@ class ProfileUpdate(BaseModel):
 
 class Sidekick:
     def __init__(self, session_id: str = None):
-        self.worker_llm_with_tools = None
-        self.evaluator_llm_with_output = None
+        # Worker LLM with the orchestrator tools bound, per model tier
+        self._worker_llms: Dict[str, Any] = {}
+        self._tool_schemas: List[dict] = []
         self.tools = None
         self.graph = None
         self.sidekick_id = session_id or str(uuid.uuid4())
         self._db_conn = None
         self.memory = None
-        self.chat_history = SQLChatMessageHistory(
-            session_id=self.sidekick_id,
-            connection=f"sqlite:///{DB_PATH}",
-        )
+        # One engine for every thread's chat history, so serving many sessions
+        # from one Sidekick does not open a connection pool per session.
+        self._history_engine = create_engine(f"sqlite:///{DB_PATH}")
+        event.listen(self._history_engine, "connect", storage.apply_pragmas)
+        self._histories: "OrderedDict[str, SQLChatMessageHistory]" = OrderedDict()
+        self.chat_history = self._history_for(self.sidekick_id)
+        # The profile store has no user column: every thread and session of
+        # this instance (all of them in shared serving mode) reads and extends
+        # the same single user's profile.
         self.user_profile = UserProfile()
         self.browser_agent = None
         self._agents: Dict[str, Any] = {}
-        self._agent_context: str = ""
-
-    async def setup(self, include_browser=True):
+        # Memory context of each running turn, per turn_id: built once in the
+        # background when the turn starts and reused by every worker step.
+        # Keyed by turn rather than thread, so overlapping turns on one thread
+        # (two API calls, two tabs) each read the history as of their own start.
+        self._memory_tasks: Dict[str, "asyncio.Task[Tuple[str, str]]"] = {}
+        # Memory context handed to sub-agents, per turn_id of the running turn
+        self._agent_context: Dict[str, str] = {}
+        self._agent_list: str = ""
+        # Orchestrator tool name -> agent it belongs to (agent tools and fast-path tools)
+        self._tool_agents: Dict[str, str] = {}
+        self.context_window = ContextWindow(model=DEFAULT_MODEL)
+        self._verdicts = VerdictCache()
+        # Per-call token usage of the worker LLM (incl. provider-cached tokens)
+        self.llm_usage: deque = deque(maxlen=LLM_USAGE_HISTORY)
+        # thread_id -> trace of its latest turn, bounded like _histories
+        self.last_trace_ids: "OrderedDict[str, str]" = OrderedDict()
+        # Extra callback handlers attached to every turn (e.g. fixture recording)
+        self.callbacks: List[Any] = []
+        # Opt-in reuse of final answers to repeated requests (see response_cache.py)
+        self.response_cache: Optional[ResponseCache] = ResponseCache() if RESPONSE_CACHE_ENABLED else None
+
+    async def setup(self, include_browser=True, browser_pool=None):
         self._db_conn = await aiosqlite.connect(CHECKPOINTS_DB_PATH)
+        for statement in storage.pragma_statements():
+            await self._db_conn.execute(statement)
         self.memory = AsyncSqliteSaver(self._db_conn)
 
         # Create sub-agents with their tool sets
@@ -118,18 +170,25 @@ class Sidekick:
         if location_tools:
             self._agents["location"] = LocationAgent(location_tools)
 
-        if include_browser:
+        if browser_pool is not None:
+            # Shared runtime: concurrent turns check browsers out of a pool
+            self._agents["browser"] = browser_pool
+        elif include_browser:
             self.browser_agent = await BrowserAgent.create()
             self._agents["browser"] = self.browser_agent
 
-        # Wrap each agent as a tool for the orchestrator
-        self.tools = self._create_agent_tools()
-
-        worker_llm = ChatOpenAI(model=DEFAULT_MODEL)
-        self.worker_llm_with_tools = worker_llm.bind_tools(self.tools)
-
-        evaluator_llm = ChatOpenAI(model=DEFAULT_MODEL)
-        self.evaluator_llm_with_output = evaluator_llm.with_structured_output(EvaluatorOutput)
+        # Wrap each agent as a tool for the orchestrator, next to the agents'
+        # read-only tools it may call directly and the reader for the full
+        # outputs agents save as artifacts
+        self.tools = self._create_agent_tools() + self._create_fast_path_tools() + get_artifact_tools()
+        self._tools_by_name = {t.name: t for t in self.tools}
+        self._agent_list = self._build_agent_list()
+
+        # The tool schemas only depend on the tool set, so they are shared
+        self._tool_schemas = get_or_compile(
+            ("orchestrator_tool_schemas", tuple(self._tools_by_name)),
+            lambda: [convert_to_openai_tool(t) for t in self.tools],
+        )
 
         self.build_graph()
 
@@ -178,8 +237,9 @@ class Sidekick:
 
         tools = []
         for name, agent in self._agents.items():
-            async def _run_with_context(task: str, _agent=agent) -> str:
-                return await _agent.run(task, context=self._agent_context)
+            async def _run_with_context(task: str, config: RunnableConfig, _agent=agent) -> str:
+                turn_id = config["configurable"].get("turn_id")
+                return await _agent.run(task, context=self._agent_context.get(turn_id, ""))
 
             tools.append(Tool(
                 name=f"{name}_agent",
@@ -187,33 +247,93 @@ class Sidekick:
                 coroutine=_run_with_context,
                 description=agent_descriptions[name],
             ))
+            self._tool_agents[f"{name}_agent"] = name
+        return tools
+
+    def _create_fast_path_tools(self) -> list:
+        """Expose the FAST_PATH_TOOLS of loaded agents directly to the orchestrator.
+
+        A trivial request such as "list my scheduled tasks" then costs one tool
+        call instead of a sub-agent run (an LLM call to pick the tool and
+        another to summarise its output). Large outputs are saved as artifacts
+        and clipped, like an agent's raw tool outputs.
+        """
+        tools = []
+        for name, tool_names in FAST_PATH_TOOLS.items():
+            agent = self._agents.get(name)
+            for tool in getattr(agent, "tools", None) or []:
+                if tool.name in tool_names:
+                    tools.append(capped_tool(tool, name))
+                    self._tool_agents[tool.name] = name
         return tools
 
     # ------------------------------------------------------------------
     # Memory helpers
     # ------------------------------------------------------------------
 
-    def _get_memory_context(self) -> str:
-        """Build a compact memory block: user profile + last 3 conversation pairs."""
+    def _history_for(self, thread_id: str) -> SQLChatMessageHistory:
+        """Return the (cached) long-term chat history of *thread_id*."""
+        history = self._histories.get(thread_id)
+        if history is None:
+            history = SQLChatMessageHistory(session_id=thread_id, connection=self._history_engine)
+            self._histories[thread_id] = history
+            if len(self._histories) > HISTORY_CACHE_SIZE:
+                self._histories.popitem(last=False)
+        else:
+            self._histories.move_to_end(thread_id)
+        return history
+
+    def _recent_messages(self, thread_id: str, limit: int) -> List[Any]:
+        """The last *limit* messages of *thread_id*'s chat history, oldest first.
+
+        Unlike ``SQLChatMessageHistory.messages`` this only reads *limit* rows.
+        """
+        history = self._history_for(thread_id)
+        model = history.sql_model_class
+        with history.session_maker() as session:
+            rows = (
+                session.query(model)
+                .where(getattr(model, history.session_id_field_name) == thread_id)
+                .order_by(model.id.desc())
+                .limit(limit)
+                .all()
+            )
+            return [history.converter.from_sql_model(row) for row in reversed(rows)]
+
+    def _get_memory_context(self, thread_id: Optional[str] = None) -> Tuple[str, str]:
+        """Build compact memory blocks: (user profile, last 3 conversation pairs).
+
+        The profile block is stable and leads the worker prompt; the history
+        block changes every turn and goes into its volatile tail.
+        """
         profile_block = self.user_profile.get_prompt_block()
 
-        past = self.chat_history.messages[-6:]
+        past = self._recent_messages(thread_id or self.sidekick_id, MEMORY_CONTEXT_MESSAGES)
         if not past:
-            return profile_block
+            return profile_block, ""
 
         lines = []
         for msg in past:
             role = "User" if isinstance(msg, HumanMessage) else "Assistant"
             content = msg.content[:300]
             lines.append(f"  {role}: {content}")
-        recent_block = (
-            "\n\n    Recent conversation history:\n" + "\n".join(lines)
-        )
-        return profile_block + recent_block
-
-    async def _extract_and_update_profile(self, user_message: str, assistant_reply: str):
+        return profile_block, "Recent conversation history:\n" + "\n".join(lines)
+
+    def _prefetch_memory_context(self, turn_id: str, thread_id: str):
+        """Start building the memory context of turn *turn_id* on *thread_id* off the event loop."""
+        if turn_id not in self._memory_tasks:
+            self._memory_tasks[turn_id] = asyncio.create_task(
+                storage.run(self._get_memory_context, thread_id)
+            )
+
+    async def _memory_context(self, turn_id: str, thread_id: str) -> Tuple[str, str]:
+        """The memory context of the running turn (prefetched, or built now)."""
+        self._prefetch_memory_context(turn_id, thread_id)
+        return await self._memory_tasks[turn_id]
+
+    async def _extract_and_update_profile(self, user_message: str, assistant_reply: str,
+                                          callbacks: Optional[list] = None):
         """Use an LLM to extract user facts from the latest exchange and persist them."""
-        extractor_llm = ChatOpenAI(model=DEFAULT_MODEL).with_structured_output(ProfileUpdate)
         existing = self.user_profile.get_all()
         existing_summary = ", ".join(f"{k}={v}" for k, v in existing.items()) if existing else "none yet"
 
@@ -226,7 +346,9 @@ Do NOT invent facts. Return an empty list if nothing new is learned.
 User said: {user_message}
 Assistant replied: {assistant_reply[:500]}"""
 
-        result = await extractor_llm.ainvoke([HumanMessage(content=prompt)])
+        result = await ainvoke_structured(
+            "profile", ProfileUpdate, [HumanMessage(content=prompt)], config={"callbacks": callbacks}
+        )
         for fact in result.facts:
             self.user_profile.upsert(fact.key, fact.value)
 
@@ -235,55 +357,66 @@ Assistant replied: {assistant_reply[:500]}"""
     # ------------------------------------------------------------------
 
     def _build_agent_list(self) -> str:
-        """Build a short list of available agents for the system prompt."""
-        lines = []
-        for tool in self.tools:
-            lines.append(f"- {tool.name}: {tool.description}")
-        return "\n".join(lines)
-
-    async def worker(self, state: State) -> Dict[str, Any]:
-        memory_context = self._get_memory_context()
-        self._agent_context = memory_context
-
-        system_message = f"""You are an orchestrator that delegates tasks to specialized agents.
-The current date and time is {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-{memory_context}
-
-You have these specialist agents available:
-{self._build_agent_list()}
-
-DELEGATION GUIDELINES:
-- Delegate tasks to the right agent by calling them with a clear, specific instruction.
-- When a user request involves INDEPENDENT sub-tasks, call multiple agents in PARALLEL by including multiple tool calls in a single response.
-- When tasks are DEPENDENT (one needs the result of another), call them sequentially.
-- When an agent returns results, synthesize them into a clear response for the user.
-
-If you need clarification from the user, ask directly without calling any agent.
-"""
-
-        if state.get("has_explicit_criteria"):
-            system_message += f"""
-The user provided these success criteria for this task:
-{state["success_criteria"]}
-"""
+        """Build a short list of available agents (and direct tools) for the system prompt."""
+        agents = [f"- {t.name}: {t.description}" for t in self.tools if t.name.endswith("_agent")]
+        direct = [f"- {t.name}: {t.description}" for t in self.tools if not t.name.endswith("_agent")]
+        if direct:
+            agents.append("\nDirect tools for simple single-step lookups:")
+            agents.extend(direct)
+        return "\n".join(agents)
+
+    def _record_usage(self, node: str, response: Any):
+        """Remember token usage of an LLM call so prompt-cache savings are visible."""
+        usage = cache_usage(response)
+        usage["node"] = node
+        self.llm_usage.append(usage)
+        log.info(
+            "%s LLM call: %d input tokens (%d cached), %d output tokens",
+            node, usage["input_tokens"], usage["cached_tokens"], usage["output_tokens"],
+        )
 
-        if state.get("feedback_on_work"):
-            system_message += f"""
-Previously your response was rejected because the success criteria were not met.
-Feedback: {state["feedback_on_work"]}
-Please continue working to meet the criteria or ask the user for clarification."""
+    def _worker_llm(self, tier: str):
+        """The worker LLM of *tier* with the orchestrator tools bound."""
+        if tier not in self._worker_llms:
+            # stream_usage makes streamed responses report token usage, which is
+            # where the provider tells us how many prompt tokens were cache hits.
+            llm = chat_model(tier, stream_usage=True)
+            self._worker_llms[tier] = llm.bind_tools(self._tool_schemas)
+        return self._worker_llms[tier]
+
+    async def worker(self, state: State, config: RunnableConfig) -> Dict[str, Any]:
+        thread_id = config["configurable"].get("thread_id", self.sidekick_id)
+        turn_id = config["configurable"].get("turn_id", thread_id)
+        profile_block, recent_history = await self._memory_context(turn_id, thread_id)
+        self._agent_context[turn_id] = (
+            f"{profile_block}\n\n{recent_history}" if recent_history else profile_block
+        )
 
-        messages = [
-            SystemMessage(content=system_message) if isinstance(m, SystemMessage) else m
-            for m in state["messages"]
-        ]
-        if not any(isinstance(m, SystemMessage) for m in state["messages"]):
-            messages = [SystemMessage(content=system_message)] + messages
+        # Only a budgeted view of the thread is sent; the checkpoint keeps all
+        summary, conversation = await self.context_window.prepare(state["messages"])
+
+        messages = assemble_worker_messages(
+            conversation,
+            agent_list=self._agent_list,
+            memory_context=profile_block,
+            conversation_summary=summary,
+            success_criteria=state["success_criteria"] if state.get("has_explicit_criteria") else None,
+            feedback=state.get("feedback_on_work"),
+            recent_history=recent_history,
+        )
 
-        response = await self.worker_llm_with_tools.ainvoke(messages)
+        request = next((m.content for m in reversed(state["messages"]) if isinstance(m, HumanMessage)), "")
+        tier = tier_for("worker", request)
+        response = await self._worker_llm(tier).ainvoke(messages)
+        while not is_valid_reply(response, self._tools_by_name) and next_tier(tier):
+            record_fallback("worker", tier, next_tier(tier))
+            tier = next_tier(tier)
+            response = await self._worker_llm(tier).ainvoke(messages)
+        self._record_usage("worker", response)
         return {"messages": [response]}
 
-    def worker_router(self, state: State) -> str:
+    @staticmethod
+    def worker_router(state: State) -> str:
         last_message = state["messages"][-1]
         if hasattr(last_message, "tool_calls") and last_message.tool_calls:
             return "tools"
@@ -304,15 +437,57 @@ Please continue working to meet the criteria or ask the user for clarification."
 
     async def evaluator(self, state: State) -> State:
         last_response = state["messages"][-1].content
+        criteria = state["success_criteria"]
+
+        if last_response == state.get("last_evaluated_response"):
+            # The worker repeated a response that was already judged — another
+            # round (cached verdict or LLM) would end the same way. Checked
+            # before the cache, which holds the earlier rejecting verdict.
+            eval_result = EvaluatorOutput(
+                feedback="The Assistant repeated its previous response without addressing the feedback.",
+                success_criteria_met=False,
+                user_input_needed=True,
+            )
+        else:
+            eval_result = self._verdicts.get(criteria, last_response)
+            if eval_result is None:
+                eval_result = await self._evaluate(state, last_response)
+                self._verdicts.put(criteria, last_response, eval_result)
+
+        return {
+            "messages": [
+                {"role": "assistant", "content": f"Evaluator Feedback: {eval_result.feedback}"}
+            ],
+            "feedback_on_work": eval_result.feedback,
+            "success_criteria_met": eval_result.success_criteria_met,
+            "user_input_needed": eval_result.user_input_needed,
+            "evaluation_count": state.get("evaluation_count", 0) + 1,
+            # +1 skips the feedback message this node is about to append
+            "evaluated_upto": len(state["messages"]) + 1,
+            "last_evaluated_response": last_response,
+        }
 
+    async def _evaluate(self, state: State, last_response: str) -> EvaluatorOutput:
+        """Ask the evaluator LLM for a verdict on the conversation delta."""
         system_message = """You are an evaluator that determines if a task has been completed successfully by an Assistant.
 Assess the Assistant's last response based on the given criteria. Respond with your feedback, and with your decision on whether the success criteria has been met,
 and whether more input is needed from the user."""
 
+        delta = conversation_delta(state["messages"], state.get("evaluated_upto", 0))
+        request_block = ""
+        if state.get("evaluated_upto"):
+            delta_intro = "The conversation since your previous verdict is"
+            # The delta starts after the user's message; the verdict still needs it
+            request = next((m for m in reversed(state["messages"]) if isinstance(m, HumanMessage)), None)
+            if request is not None:
+                request_block = f"The User's request is:\n{request.content}\n\n"
+        else:
+            delta_intro = "The current exchange is"
+
         user_message = f"""You are evaluating a conversation between the User and Assistant.
 
-The entire conversation is:
-{self.format_conversation(state["messages"])}
+{request_block}{delta_intro}:
+{self.format_conversation(delta)}
 
 The success criteria for this assignment is:
 {state["success_criteria"]}
@@ -334,20 +509,15 @@ But reject if you feel that more work should go into this.
             SystemMessage(content=system_message),
             HumanMessage(content=user_message),
         ]
+        return await ainvoke_structured("evaluator", EvaluatorOutput, evaluator_messages)
 
-        eval_result = await self.evaluator_llm_with_output.ainvoke(evaluator_messages)
-        return {
-            "messages": [
-                {"role": "assistant", "content": f"Evaluator Feedback: {eval_result.feedback}"}
-            ],
-            "feedback_on_work": eval_result.feedback,
-            "success_criteria_met": eval_result.success_criteria_met,
-            "user_input_needed": eval_result.user_input_needed,
-        }
-
-    def route_based_on_evaluation(self, state: State) -> str:
+    @staticmethod
+    def route_based_on_evaluation(state: State) -> str:
         if state["success_criteria_met"] or state["user_input_needed"]:
             return "END"
+        if state.get("evaluation_count", 0) >= MAX_EVALUATION_ROUNDS:
+            log.info("Evaluator loop stopped after %d round(s)", MAX_EVALUATION_ROUNDS)
+            return "END"
         return "worker"
 
     # ------------------------------------------------------------------
@@ -355,11 +525,41 @@ But reject if you feel that more work should go into this.
     # ------------------------------------------------------------------
 
     def build_graph(self):
+        """Give this instance the shared orchestrator graph with its own checkpointer.
+
+        The graph is compiled once per process and tool set (see graph_cache.py);
+        its nodes find this Sidekick and its tools in the run's config.
+        """
+        shared = get_or_compile(("orchestrator", tuple(self._tools_by_name)), self._compile_graph)
+        self.graph = shared.copy(update={"checkpointer": self.memory})
+
+    def _run_config(self, thread_id: str, callbacks: List[Any],
+                    turn_id: Optional[str] = None) -> Dict[str, Any]:
+        """Config for one turn on the shared graph (*turn_id* keys the turn's memory context)."""
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "turn_id": turn_id or thread_id,
+                "sidekick": self,
+                "orchestrator_tools": self._tools_by_name,
+            },
+            "callbacks": callbacks,
+        }
+
+    def _compile_graph(self):
+        async def worker(state: State, config: RunnableConfig) -> Dict[str, Any]:
+            return await config["configurable"]["sidekick"].worker(state, config)
+
+        async def evaluator(state: State, config: RunnableConfig) -> State:
+            return await config["configurable"]["sidekick"].evaluator(state)
+
         graph_builder = StateGraph(State)
 
-        graph_builder.add_node("worker", self.worker)
-        graph_builder.add_node("tools", ToolNode(tools=self.tools))
-        graph_builder.add_node("evaluator", self.evaluator)
+        graph_builder.add_node("worker", worker)
+        graph_builder.add_node(
+            "tools", ToolNode(tools=[runtime_tool(t, "orchestrator_tools") for t in self.tools])
+        )
+        graph_builder.add_node("evaluator", evaluator)
 
         graph_builder.add_conditional_edges(
             "worker",
@@ -374,14 +574,106 @@ But reject if you feel that more work should go into this.
         )
         graph_builder.add_edge(START, "worker")
 
-        self.graph = graph_builder.compile(checkpointer=self.memory)
+        return graph_builder.compile()
 
     # ------------------------------------------------------------------
     # Execution
     # ------------------------------------------------------------------
 
-    async def run_superstep(self, message, success_criteria, history):
-        config = {"configurable": {"thread_id": self.sidekick_id}}
+    async def run_superstep(self, message, success_criteria, history, thread_id=None,
+                            bypass_cache=False):
+        """Stream a turn as updated chat histories (Gradio ``type="messages"`` format).
+
+        The history list is copied once and then updated in place from
+        ``stream_deltas``, so each yield costs O(1) rather than O(len(history)).
+        *thread_id* defaults to this Sidekick's own session.
+        """
+        history = list(history)
+        async for event in self.stream_deltas(message, success_criteria, thread_id, bypass_cache):
+            apply_event(history, event)
+            yield history
+
+    async def stream_deltas(self, message, success_criteria, thread_id=None, bypass_cache=False):
+        """Stream a turn as append/patch events (see streaming.py).
+
+        With the response cache enabled, a repeated request is answered from
+        the cache unless *bypass_cache* is set.
+        """
+        thread_id = thread_id or self.sidekick_id
+        turn_id = uuid.uuid4().hex
+        tracer = TraceRecorder(session_id=thread_id) if TRACING_ENABLED else None
+        error = None
+        # Profile and history are read while the cache lookup and the first
+        # worker step get going
+        self._prefetch_memory_context(turn_id, thread_id)
+        try:
+            async for event in self._stream_turn(message, success_criteria, thread_id, tracer,
+                                                 bypass_cache, turn_id):
+                yield event
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            prefetch = self._memory_tasks.pop(turn_id, None)
+            if prefetch:
+                prefetch.cancel()
+            self._agent_context.pop(turn_id, None)
+            if tracer:
+                self.last_trace_ids[thread_id] = tracer.trace_id
+                self.last_trace_ids.move_to_end(thread_id)
+                if len(self.last_trace_ids) > HISTORY_CACHE_SIZE:
+                    self.last_trace_ids.popitem(last=False)
+                await tracer.flush(error)
+
+    async def _lookup_cached(self, message, success_criteria, bypass_cache, tracer, thread_id):
+        """Return ``(cached entry or None, probe)``; the probe is None when not caching."""
+        if self.response_cache is None:
+            return None, None
+        if bypass_cache:
+            await self.response_cache.record_bypass()
+            return None, None
+        profile = await storage.run(self.user_profile.get_all)
+        # A follow-up only means the same thing after the same conversation
+        context = await storage.run(self._recent_messages, thread_id, MEMORY_CONTEXT_MESSAGES)
+        if tracer:
+            with tracer.span("response_cache"):
+                return await self.response_cache.lookup(message, success_criteria, profile, context)
+        return await self.response_cache.lookup(message, success_criteria, profile, context)
+
+    async def _answer_from_cache(self, message, reply, config, thread_id):
+        """Record a cached answer as this turn in the checkpoint and chat history."""
+        await self.graph.aupdate_state(
+            config,
+            {
+                "messages": [HumanMessage(content=message), AIMessage(content=reply)],
+                "has_explicit_criteria": False,
+            },
+            as_node="worker",
+        )
+        await storage.run(
+            self._history_for(thread_id).add_messages,
+            [HumanMessage(content=message), AIMessage(content=reply)],
+        )
+
+    async def _stream_turn(self, message, success_criteria, thread_id, tracer, bypass_cache=False,
+                           turn_id=None):
+        callbacks = self.callbacks + ([tracer] if tracer else [])
+        config = self._run_config(thread_id, callbacks, turn_id)
+
+        yield append_event({"role": "user", "content": message})
+
+        cached, probe = await self._lookup_cached(message, success_criteria, bypass_cache, tracer,
+                                                  thread_id)
+        if cached:
+            yield append_event({"role": "assistant", "content": cached["response"]})
+            await self._answer_from_cache(message, cached["response"], config, thread_id)
+            return
+        usage = None
+        if probe:
+            # Token cost of the answer, so later hits can report what they saved
+            usage = UsageMetadataCallbackHandler()
+            config["callbacks"] = callbacks + [usage]
+        agents_used = set()
 
         has_explicit = bool(success_criteria and success_criteria.strip())
 
@@ -392,14 +684,14 @@ But reject if you feel that more work should go into this.
             "feedback_on_work": None,
             "success_criteria_met": False,
             "user_input_needed": False,
+            "evaluation_count": 0,
+            "evaluated_upto": 0,
+            "last_evaluated_response": None,
         }
 
-        user_msg = {"role": "user", "content": message}
-        history = history + [user_msg]
-        yield history
-
         worker_reply_content = ""
-        current_assistant_msg = None
+        streaming_reply = False
+        tokens = TokenCoalescer()
 
         async for stream_mode, chunk in self.graph.astream(
             state, config=config, stream_mode=["messages", "updates"]
@@ -414,51 +706,56 @@ But reject if you feel that more work should go into this.
 
                     token = msg_chunk.content if hasattr(msg_chunk, "content") else ""
                     if token:
-                        if current_assistant_msg is None:
-                            current_assistant_msg = {"role": "assistant", "content": token}
-                            history = history + [current_assistant_msg]
+                        if not streaming_reply:
+                            # First token goes out immediately; the rest is coalesced
+                            streaming_reply = True
+                            tokens.flush()
+                            yield append_event({"role": "assistant", "content": token})
                         else:
-                            current_assistant_msg["content"] += token
-                            # Force Gradio to detect the change
-                            history = list(history)
-                            history[-1] = dict(current_assistant_msg)
-                        yield history
+                            delta = tokens.add(token)
+                            if delta:
+                                yield patch_event(delta)
 
             elif stream_mode == "updates":
+                # Anything buffered belongs before the node update that follows it
+                delta = tokens.flush()
+                if delta:
+                    yield patch_event(delta)
+
                 for node_name, node_output in chunk.items():
                     if node_name == "worker":
+                        streaming_reply = False
                         ai_msg = node_output["messages"][-1]
                         if hasattr(ai_msg, "tool_calls") and ai_msg.tool_calls:
                             # Tool calls — show delegation messages
-                            current_assistant_msg = None
                             for tc in ai_msg.tool_calls:
+                                agents_used.add(self._tool_agents.get(tc["name"], tc["name"]))
                                 args_summary = ", ".join(
                                     f"{k}={repr(v)[:80]}" for k, v in tc["args"].items()
                                 )
-                                tool_msg = {
+                                if tc["name"].endswith("_agent"):
+                                    title = f"\U0001f916 Delegating to: {tc['name']}"
+                                else:
+                                    title = f"\U0001f527 Using tool: {tc['name']}"
+                                yield append_event({
                                     "role": "assistant",
                                     "content": f"**{tc['name']}**({args_summary})",
-                                    "metadata": {"title": f"\U0001f916 Delegating to: {tc['name']}"},
-                                }
-                                history = history + [tool_msg]
-                            yield history
+                                    "metadata": {"title": title},
+                                })
                         else:
                             # Final worker response (already streamed via "messages" mode)
                             worker_reply_content = ai_msg.content
-                            current_assistant_msg = None
 
                     elif node_name == "tools":
                         for tool_result in node_output["messages"]:
                             content = tool_result.content if hasattr(tool_result, "content") else str(tool_result)
                             truncated = content[:500] + ("..." if len(content) > 500 else "")
                             tool_name = tool_result.name if hasattr(tool_result, "name") else "agent"
-                            result_msg = {
+                            yield append_event({
                                 "role": "assistant",
                                 "content": truncated,
                                 "metadata": {"title": f"\U0001f4cb Result: {tool_name}"},
-                            }
-                            history = history + [result_msg]
-                        yield history
+                            })
 
                     elif node_name == "evaluator":
                         eval_msgs = node_output.get("messages", [])
@@ -466,21 +763,39 @@ But reject if you feel that more work should go into this.
                             last_eval = eval_msgs[-1]
                             content = last_eval.get("content", "") if isinstance(last_eval, dict) else ""
                             if content:
-                                feedback = {"role": "assistant", "content": content}
-                                history = history + [feedback]
-                                yield history
+                                yield append_event({"role": "assistant", "content": content})
 
         # Persist to long-term memory
         if worker_reply_content:
-            self.chat_history.add_user_message(message)
-            self.chat_history.add_ai_message(worker_reply_content)
-            await self._extract_and_update_profile(message, worker_reply_content)
+            # One write for both messages, off the event loop
+            await storage.run(
+                self._history_for(thread_id).add_messages,
+                [HumanMessage(content=message), AIMessage(content=worker_reply_content)],
+            )
+            if tracer:
+                with tracer.span("profile_extraction"):
+                    await self._extract_and_update_profile(message, worker_reply_content, callbacks)
+            else:
+                await self._extract_and_update_profile(message, worker_reply_content, callbacks)
+            if probe:
+                spent_tokens = sum(u.get("total_tokens", 0) for u in usage.usage_metadata.values())
+                await self.response_cache.store(probe, worker_reply_content, agents_used, spent_tokens)
 
     # ------------------------------------------------------------------
     # Cleanup
     # ------------------------------------------------------------------
 
+    async def aclose(self):
+        """Release resources from async code, waiting until they are closed."""
+        self._history_engine.dispose()
+        if self.browser_agent:
+            await self.browser_agent.cleanup()
+        if self._db_conn:
+            await self._db_conn.close()
+            self._db_conn = None
+
     def cleanup(self):
+        self._history_engine.dispose()
         if self.browser_agent:
             try:
                 loop = asyncio.get_running_loop()
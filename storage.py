@@ -0,0 +1,178 @@
+"""
+Shared SQLite access for ApexFlow's persistence modules.
+
+Every module used to keep one ``check_same_thread=False`` connection in
+SQLite's default rollback-journal mode and share it between the event loop
+and whatever worker thread happened to call it.  This module replaces that:
+
+- ``connect`` opens a connection with ``STORAGE_PRAGMAS`` applied (WAL, so
+  readers never wait for the writer; ``busy_timeout``, so concurrent writers
+  from the UI, the scheduler and task workers wait briefly instead of
+  failing with "database is locked");
+- ``Database`` is a pool of such connections for one file — one per thread,
+  created on first use — so a connection is never used by two threads at
+  once; ``database(path, init)`` returns the process-wide pool of a file;
+- ``transaction`` groups several statements into one ``BEGIN IMMEDIATE`` …
+  ``COMMIT`` (one fsync, and no other writer in between);
+- ``run`` executes blocking database calls on a small dedicated executor
+  (``STORAGE_WORKERS`` threads), so async code neither blocks the loop nor
+  opens a connection in every thread of the default executor.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from config import STORAGE_PRAGMAS, STORAGE_WORKERS
+
+log = logging.getLogger(__name__)
+
+Init = Optional[Callable[[sqlite3.Connection], None]]
+
+_databases: Dict[Tuple[str, Init], "Database"] = {}
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+# ---------------------------------------------------------------------------
+# Connections
+# ---------------------------------------------------------------------------
+
+def pragma_statements() -> list[str]:
+    """``PRAGMA`` statements for ``STORAGE_PRAGMAS`` (also for aiosqlite connections)."""
+    return [f"PRAGMA {name} = {value}" for name, value in STORAGE_PRAGMAS.items()]
+
+
+def apply_pragmas(conn: sqlite3.Connection, *_):
+    """Apply ``STORAGE_PRAGMAS`` to *conn* (usable as a SQLAlchemy "connect" listener)."""
+    for statement in pragma_statements():
+        conn.execute(statement)
+
+
+def connect(path: str, init: Init = None, row_factory: Any = sqlite3.Row,
+            check_same_thread: bool = True) -> sqlite3.Connection:
+    """Open a tuned connection to *path* and run *init* (e.g. CREATE TABLEs) on it."""
+    conn = sqlite3.connect(path, check_same_thread=check_same_thread)
+    conn.row_factory = row_factory
+    apply_pragmas(conn)
+    if init:
+        init(conn)
+        conn.commit()
+    return conn
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection, immediate: bool = True) -> Iterator[sqlite3.Connection]:
+    """Run the block in one transaction on *conn*: commit on success, roll back on error.
+
+    ``immediate`` takes the write lock up front, so a read-then-write block
+    cannot be overtaken by another writer.  Inside an open transaction the
+    block simply joins it.
+    """
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+class Database:
+    """Connections to one SQLite file, one per thread, created on first use."""
+
+    def __init__(self, path: str, init: Init = None, row_factory: Any = sqlite3.Row):
+        self.path = path
+        self._init = init
+        self._row_factory = row_factory
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Every open connection by thread ident, so close() reaches all of them
+        self._conns: Dict[int, sqlite3.Connection] = {}
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # close() may run in another thread, hence check_same_thread=False;
+            # the connection itself is only ever used by this thread
+            conn = connect(self.path, self._init, self._row_factory, check_same_thread=False)
+            self._local.conn = conn
+            with self._lock:
+                self._prune()
+                # A new thread may reuse the ident of an exited one
+                stale = self._conns.pop(threading.get_ident(), None)
+                if stale is not None:
+                    stale.close()
+                self._conns[threading.get_ident()] = conn
+        return conn
+
+    def _prune(self):
+        """Close the connections of threads that have exited."""
+        alive = {t.ident for t in threading.enumerate()}
+        for ident in [i for i in self._conns if i not in alive]:
+            self._conns.pop(ident).close()
+
+    @contextmanager
+    def transaction(self, immediate: bool = True) -> Iterator[sqlite3.Connection]:
+        """This thread's connection inside one transaction (see ``transaction``)."""
+        with transaction(self.connection(), immediate) as conn:
+            yield conn
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._conns)
+
+    def close(self):
+        """Close every connection; threads reconnect on their next call."""
+        with self._lock:
+            conns, self._conns = list(self._conns.values()), {}
+            self._local = threading.local()
+        for conn in conns:
+            conn.close()
+
+
+def database(path: str, init: Init = None) -> Database:
+    """The process-wide ``Database`` for *path* (per *init*, so each module
+    sharing a file still gets its own schema applied)."""
+    key = (path, init)
+    with _lock:
+        if key not in _databases:
+            _databases[key] = Database(path, init)
+        return _databases[key]
+
+
+def close(path: Optional[str] = None):
+    """Close the shared connections to *path* (to every file if None)."""
+    with _lock:
+        keys = [key for key in _databases if path is None or key[0] == path]
+        closing = [_databases.pop(key) for key in keys]
+    for db in closing:
+        db.close()
+
+
+# ---------------------------------------------------------------------------
+# Async
+# ---------------------------------------------------------------------------
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=STORAGE_WORKERS, thread_name_prefix="storage")
+        return _executor
+
+
+async def run(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Await ``fn(*args, **kwargs)`` run on the storage executor (context variables included)."""
+    call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), call)
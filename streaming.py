@@ -0,0 +1,74 @@
+"""
+Delta-based chat streaming.
+
+A turn is streamed as a sequence of small events instead of full history
+snapshots:
+
+    {"op": "append", "message": {"role": ..., "content": ..., ...}}
+    {"op": "patch", "content": "<text to add to the last message>"}
+
+Worker tokens are batched by ``TokenCoalescer`` so a long answer produces a
+patch every ~50 ms rather than one per token, and ``apply_event`` updates a
+history list in place touching only its last message, so the cost of a
+streamed update does not grow with the length of the conversation.
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from config import STREAM_FLUSH_INTERVAL_MS, STREAM_FLUSH_MAX_CHARS
+
+
+def append_event(message: Dict[str, Any]) -> Dict[str, Any]:
+    return {"op": "append", "message": message}
+
+
+def patch_event(content: str) -> Dict[str, Any]:
+    return {"op": "patch", "content": content}
+
+
+def apply_event(history: List[Dict[str, Any]], event: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Apply a streaming event to *history* in place and return it."""
+    if event["op"] == "append":
+        history.append(dict(event["message"]))
+    elif event["op"] == "patch":
+        # Replace only the last message dict so UI frameworks comparing message
+        # objects see it change; the rest of the list is left untouched.
+        last = history[-1]
+        history[-1] = {**last, "content": last["content"] + event["content"]}
+    else:
+        raise ValueError(f"Unknown stream event op: {event['op']!r}")
+    return history
+
+
+class TokenCoalescer:
+    """Batch streamed tokens into deltas flushed by time or size."""
+
+    def __init__(
+        self,
+        interval_ms: float = STREAM_FLUSH_INTERVAL_MS,
+        max_chars: int = STREAM_FLUSH_MAX_CHARS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.interval = interval_ms / 1000
+        self.max_chars = max_chars
+        self._clock = clock
+        self._buffer: List[str] = []
+        self._size = 0
+        self._last_flush = clock()
+
+    def add(self, token: str) -> Optional[str]:
+        """Buffer *token*; return the pending delta if it is due for flushing."""
+        self._buffer.append(token)
+        self._size += len(token)
+        if self._size >= self.max_chars or self._clock() - self._last_flush >= self.interval:
+            return self.flush()
+        return None
+
+    def flush(self) -> str:
+        """Return and clear everything buffered so far ('' if nothing is pending)."""
+        delta = "".join(self._buffer)
+        self._buffer.clear()
+        self._size = 0
+        self._last_flush = self._clock()
+        return delta
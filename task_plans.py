@@ -0,0 +1,166 @@
+"""
+Precompiled plans for recurring scheduled tasks.
+
+Every run of a recurring task sends the same description through the
+orchestrator's planning and the sub-agents' tool selection, and mostly ends
+up making the same tool calls.  ``PlanRecorder`` captures the tool calls of
+a full run; if all of them are read-only (``TASK_PLAN_TOOLS``) and
+succeeded, ``plan()`` returns them and scheduler.py stores them with the
+task.
+
+Later runs ``replay`` the plan: the same tools are called directly (in
+parallel — a plan's arguments are fixed) and one LLM call turns their
+outputs into the task's result.  Any failure — an unknown tool, an
+exception, an ``"Error..."`` output, an empty answer — raises
+``PlanReplayError``, and the scheduler falls back to a full run, which
+captures a fresh plan.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.tools import BaseTool
+
+from config import TASK_PLAN_OUTPUT_CHARS, TASK_PLAN_TOOLS
+from graph_cache import DISPATCH_TAG
+from model_router import chat_model, is_valid_reply, tier_for
+
+log = logging.getLogger(__name__)
+
+# Orchestrator tools that only delegate — the sub-agents ("<name>_agent") and
+# the reader of their saved outputs; a plan consists of the calls below them
+_ARTIFACT_READER = "read_artifact"
+
+_REPLAY_PROMPT = (
+    "You are completing an automated scheduled task. The tools it needs have already been "
+    "called and their outputs are below. Using only these outputs, produce exactly the result "
+    "the task asks for, followed by a concise summary of it. Do not plan or schedule anything "
+    "and do not ask questions."
+)
+
+
+class PlanReplayError(Exception):
+    """A stored plan could not be replayed; the task needs a full run."""
+
+
+def _is_delegation(name: str) -> bool:
+    return name.endswith("_agent") or name == _ARTIFACT_READER
+
+
+# ---------------------------------------------------------------------------
+# Capture
+# ---------------------------------------------------------------------------
+
+class PlanRecorder(BaseCallbackHandler):
+    """Callback handler that collects the tool calls of a run."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.calls: List[Dict[str, Any]] = []
+        self.failed = False
+        self._pending: Dict[Any, Dict[str, Any]] = {}
+
+    def on_tool_start(self, serialized, input_str, *, run_id, tags=None, inputs=None, **kwargs):
+        if DISPATCH_TAG in (tags or []):
+            return
+        name = (serialized or {}).get("name") or kwargs.get("name", "tool")
+        self._pending[run_id] = {"tool": name, "args": inputs if inputs is not None else input_str}
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        call = self._pending.pop(run_id, None)
+        if call is None:
+            return
+        if str(getattr(output, "content", output)).startswith("Error"):
+            self.failed = True
+        self.calls.append(call)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        if self._pending.pop(run_id, None) is not None:
+            self.failed = True
+
+    def plan(self) -> Optional[List[Dict[str, Any]]]:
+        """The run's tool calls as a replayable plan, or None if it has none."""
+        if self.failed:
+            return None
+        steps, seen = [], set()
+        for call in self.calls:
+            if _is_delegation(call["tool"]):
+                continue
+            if call["tool"] not in TASK_PLAN_TOOLS:
+                return None
+            key = json.dumps(call, sort_keys=True, default=str)
+            if key not in seen:
+                seen.add(key)
+                steps.append(call)
+        return steps or None
+
+
+# ---------------------------------------------------------------------------
+# Replay
+# ---------------------------------------------------------------------------
+
+_tools: Optional[Dict[str, BaseTool]] = None
+
+
+def replay_tools() -> Dict[str, BaseTool]:
+    """The (memoized) tools plans may call, by name."""
+    global _tools
+    if _tools is None:
+        # Imported on first use: processes that never replay skip the tool modules
+        from tools.documents import get_tools as get_documents_tools
+        from tools.knowledge_tools import get_tools as get_knowledge_tools
+        from tools.memo import memoize_tools
+        from tools.research import get_tools as get_research_tools
+        tools = memoize_tools(get_research_tools() + get_documents_tools() + get_knowledge_tools())
+        _tools = {t.name: t for t in tools if t.name in TASK_PLAN_TOOLS}
+    return _tools
+
+
+async def _call(step: Dict[str, Any], tools: Dict[str, BaseTool]) -> str:
+    tool = tools.get(step["tool"])
+    if tool is None:
+        raise PlanReplayError(f"tool {step['tool']} is not available")
+    try:
+        output = str(await tool.ainvoke(step["args"]))
+    except Exception as e:
+        raise PlanReplayError(f"{step['tool']} failed: {e}") from e
+    if output.startswith("Error"):
+        raise PlanReplayError(f"{step['tool']} returned {output[:200]}")
+    return output
+
+
+def _format_step(step: Dict[str, Any], output: str) -> str:
+    args = step["args"]
+    if isinstance(args, dict) and len(args) == 1:
+        args = next(iter(args.values()))
+    if len(output) > TASK_PLAN_OUTPUT_CHARS:
+        output = output[:TASK_PLAN_OUTPUT_CHARS] + " …"
+    return f"### {step['tool']}({json.dumps(args, default=str)})\n{output}"
+
+
+async def replay(description: str, plan: List[Dict[str, Any]], context: str = "",
+                 tools: Optional[Dict[str, BaseTool]] = None,
+                 callbacks: Optional[List[Any]] = None) -> str:
+    """Run *plan*'s tool calls and answer *description* from their outputs."""
+    tools = replay_tools() if tools is None else tools
+    outputs = await asyncio.gather(*(_call(step, tools) for step in plan))
+    sections = "\n\n".join(_format_step(step, output) for step, output in zip(plan, outputs))
+    task = f"Task: {description}"
+    if context:
+        task += f"\n\n{context}"
+    messages = [
+        SystemMessage(content=_REPLAY_PROMPT),
+        HumanMessage(content=f"{task}\n\nTool outputs:\n\n{sections}"),
+    ]
+    reply = await chat_model(tier_for("task_replay", description)).ainvoke(
+        messages, config={"callbacks": callbacks or []}
+    )
+    if not is_valid_reply(reply, tool_names=[]):
+        raise PlanReplayError("the summary call returned no answer")
+    log.info("Replayed a plan of %d tool call(s)", len(plan))
+    return str(reply.content)
@@ -0,0 +1,117 @@
+"""
+Out-of-process runner for scheduled tasks.
+
+Polls the tasks database for due tasks (``next_run_at``), leases them and
+runs them on a bounded ``TaskPool``, writing results back to
+``scheduled_tasks`` like the in-process ``TaskRunner`` does.  Leases are
+taken inside a ``BEGIN IMMEDIATE`` transaction (see
+``scheduler._claim_due_tasks``), so any number of workers — and an
+in-process runner — can share one database without running a fire twice.
+
+Event-triggered tasks are due once an event was recorded for them; the
+worker also checks the tasks' file triggers on every poll and records the
+events emitted by the tasks it runs (see ``scheduler.listen_for_events``).
+
+Set ``SCHEDULER_MODE = "external"`` in config.py so the UI and the API only
+add tasks and show their results.
+
+Usage:
+    python task_worker.py                        # run until interrupted
+    python task_worker.py --concurrency 4 --poll 5
+    python task_worker.py --once                 # run what is due now, then exit
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import socket
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional
+
+import storage
+from config import SCHEDULER_POLL_SECONDS, SCHEDULER_POOL_SIZE
+from scheduler import (
+    TaskPool,
+    _claim_due_tasks,
+    _execute_task,
+    _release_run,
+    _scan_file_triggers,
+    listen_for_events,
+    stop_listening,
+)
+
+log = logging.getLogger(__name__)
+
+
+class TaskWorker:
+    """Claims runs of due tasks and runs them, *concurrency* at a time."""
+
+    def __init__(self, concurrency: int = SCHEDULER_POOL_SIZE,
+                 poll_seconds: float = SCHEDULER_POLL_SECONDS,
+                 worker_id: Optional[str] = None):
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.poll_seconds = poll_seconds
+        # Only claimed runs are queued, so the queue never holds more than the pool runs
+        self.pool = TaskPool(concurrency, concurrency, execute=self._execute)
+        # Claimed run IDs per task, in claim order
+        self._runs: Dict[str, Deque[int]] = defaultdict(deque)
+
+    async def _execute(self, task_id: str):
+        await _execute_task(task_id, run_id=self._runs[task_id].popleft())
+
+    def _queue(self, tasks: List[dict]) -> List[str]:
+        """Queue claimed *tasks* on the pool (releasing any it cannot take)."""
+        for task in tasks:
+            self._runs[task["id"]].append(task["run_id"])
+            if not self.pool.submit(task["id"], task["priority"], task["max_instances"]):
+                self._runs[task["id"]].pop()
+                _release_run(task["run_id"])
+        return [task["id"] for task in tasks]
+
+    def poll_once(self) -> List[str]:
+        """Claim runs of as many due tasks as there are idle workers and queue them."""
+        slots = self.pool.idle_slots()
+        if not slots:
+            return []
+        return self._queue(_claim_due_tasks(self.worker_id, slots))
+
+    async def run(self, once: bool = False):
+        self.pool.start()
+        listen_for_events()
+        log.info("Task worker %s started (%d slots)", self.worker_id, self.pool.size)
+        try:
+            while True:
+                await storage.run(_scan_file_triggers)
+                # Same as poll_once, with the claim off the event loop
+                slots = self.pool.idle_slots()
+                claimed = []
+                if slots:
+                    claimed = self._queue(await storage.run(_claim_due_tasks, self.worker_id, slots))
+                if claimed:
+                    log.info("Leased task(s) %s", ", ".join(claimed))
+                if once:
+                    await self.pool.join()
+                    return
+                await asyncio.sleep(self.poll_seconds)
+        finally:
+            stop_listening()
+            self.pool.stop()
+            log.info("Task worker %s stopped", self.worker_id)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Run ApexFlow scheduled tasks outside the UI process.")
+    parser.add_argument("--concurrency", type=int, default=SCHEDULER_POOL_SIZE,
+                        help="Tasks to run at once")
+    parser.add_argument("--poll", type=float, default=SCHEDULER_POLL_SECONDS,
+                        help="Seconds between checks for due tasks")
+    parser.add_argument("--once", action="store_true", help="Run the tasks due now, then exit")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(TaskWorker(args.concurrency, args.poll).run(once=args.once))
+
+
+if __name__ == "__main__":
+    main()
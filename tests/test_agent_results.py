@@ -0,0 +1,239 @@
+"""
+Unit tests for structured sub-agent results (agents/base.py) and artifacts (tools/artifacts.py).
+
+The agent's ReAct graph is replaced by a stub, so no LLM is involved.
+
+Run with:  pytest tests/test_agent_results.py -v --tb=short
+"""
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+
+class _StubGraph:
+    def __init__(self, messages=None, error=None):
+        self.messages = messages or []
+        self.error = error
+        self.inputs = []
+
+    async def ainvoke(self, state, config=None):
+        self.inputs.append(state)
+        if self.error:
+            raise self.error
+        return {"messages": state["messages"] + self.messages}
+
+
+def _use(agent, graph):
+    """Make *agent* run *graph* on every model tier."""
+    agent._graph_for = lambda tier: graph
+    return graph
+
+
+@pytest.fixture
+def agent(sandbox_cwd, monkeypatch):
+    """A research agent whose graph is a stub, writing artifacts under a temp sandbox."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    from agents.research import ResearchAgent
+    agent = ResearchAgent([])
+    agent.output_token_cap = 50
+    return agent
+
+
+# ===================================================================
+# Artifacts
+# ===================================================================
+
+class TestArtifacts:
+    """Tests for saving and paging through agent outputs."""
+
+    def test_write_and_page_through(self, sandbox_cwd, monkeypatch):
+        from tools import artifacts
+        monkeypatch.setattr(artifacts, "ARTIFACT_PAGE_CHARS", 10)
+        path = artifacts.write_artifact("research", "search", "0123456789abcdefghij")
+        assert path.startswith("agent_outputs/research-search-")
+
+        first = artifacts.read_artifact(path)
+        assert first.endswith("\n0123456789")
+        assert "offset=10" in first
+        last = artifacts.read_artifact(path, offset=10)
+        assert last.endswith("\nabcdefghij")
+        assert "offset=" not in last
+
+    def test_reader_is_confined_to_artifacts(self, sandbox_cwd):
+        from tools.artifacts import read_artifact
+        (sandbox_cwd / "secret.txt").write_text("x")
+        assert read_artifact("secret.txt").startswith("Error")
+        assert read_artifact("agent_outputs/../secret.txt").startswith("Error")
+
+    def test_old_artifacts_are_pruned(self, sandbox_cwd, monkeypatch):
+        from tools import artifacts
+        monkeypatch.setattr(artifacts, "AGENT_ARTIFACTS_MAX_FILES", 2)
+        for i in range(4):
+            artifacts.write_artifact("research", "search", f"output {i}")
+        assert len(list((sandbox_cwd / "agent_outputs").iterdir())) == 2
+
+
+    async def test_capped_tool_saves_large_outputs(self, sandbox_cwd, monkeypatch):
+        from langchain_core.tools import StructuredTool
+        from tools import artifacts
+        monkeypatch.setattr(artifacts, "AGENT_ARTIFACT_MIN_TOKENS", 10)
+
+        def read_file(path: str) -> str:
+            """Read a file."""
+            return "short" if path == "a.txt" else "word " * 100
+
+        tool = artifacts.capped_tool(StructuredTool.from_function(read_file), "documents")
+        assert tool.name == "read_file"
+        assert await tool.ainvoke({"path": "a.txt"}) == "short"
+
+        output = await tool.ainvoke({"path": "big.txt"})
+        path = output.splitlines()[-1].removeprefix("- ")
+        assert len(output) < 200
+        assert path.startswith("agent_outputs/documents-read_file-")
+        assert "word " * 100 in artifacts.read_artifact(path)
+
+    async def test_capped_tool_passes_the_run_config_on(self, sandbox_cwd):
+        from langchain_core.tools import StructuredTool
+        from tools import artifacts
+        configs = []
+
+        class _Spy(StructuredTool):
+            def invoke(self, input, config=None, **kwargs):
+                configs.append(config)
+                return "a.txt"
+
+            async def ainvoke(self, input, config=None, **kwargs):
+                configs.append(config)
+                return "a.txt"
+
+        def list_directory(path: str) -> str:
+            """List a directory."""
+
+        spy = _Spy.from_function(list_directory)
+        tool = artifacts.capped_tool(spy, "documents")
+        await tool.ainvoke({"path": "."}, config={"tags": ["turn"]})
+        tool.invoke({"path": "."}, config={"tags": ["turn"]})
+        assert [c and c.get("tags") for c in configs] == [["turn"], ["turn"]]
+
+
+# ===================================================================
+# BaseAgent.run_structured
+# ===================================================================
+
+class TestAgentResult:
+    """Tests for size-capped agent results."""
+
+    async def test_short_answer_is_returned_as_is(self, agent):
+        _use(agent, _StubGraph([AIMessage(content="Python 3.13.1")]))
+        result = await agent.run_structured("latest python?")
+        assert (result.agent, result.summary, result.artifacts) == ("research", "Python 3.13.1", [])
+        assert await agent.run("latest python?") == "Python 3.13.1"
+
+    async def test_long_answer_is_truncated_and_saved(self, agent, sandbox_cwd):
+        long_answer = "word " * 200
+        _use(agent, _StubGraph([AIMessage(content=long_answer)]))
+        result = await agent.run_structured("summarise")
+
+        assert result.truncated
+        assert len(result.summary) < len(long_answer) // 3
+        assert (sandbox_cwd / result.artifacts[0]).read_text() == long_answer
+        assert result.artifacts[0] in result.render()
+
+    async def test_artifacts_are_written_off_the_event_loop(self, agent, monkeypatch):
+        import threading
+        from tools import artifacts
+        threads = []
+        write = artifacts.write_artifact
+
+        def recording_write(*args):
+            threads.append(threading.get_ident())
+            return write(*args)
+
+        monkeypatch.setattr(artifacts, "write_artifact", recording_write)
+        _use(agent, _StubGraph([AIMessage(content="word " * 200)]))
+        await agent.run_structured("summarise")
+        assert threads and threading.get_ident() not in threads
+
+    async def test_large_tool_outputs_become_artifacts(self, agent, sandbox_cwd, monkeypatch):
+        import agents.base
+        monkeypatch.setattr(agents.base, "AGENT_ARTIFACT_MIN_TOKENS", 100)
+        dump = "page text " * 100
+        _use(agent, _StubGraph([
+            AIMessage(content="", tool_calls=[{"name": "read_pdf", "args": {"__arg1": "a.pdf"}, "id": "c1"}]),
+            ToolMessage(content=dump, name="read_pdf", tool_call_id="c1"),
+            ToolMessage(content="small", name="search", tool_call_id="c2"),
+            AIMessage(content="The PDF is a lease agreement."),
+        ]))
+        result = await agent.run_structured("read a.pdf")
+
+        assert result.summary == "The PDF is a lease agreement."
+        assert len(result.artifacts) == 1
+        assert "read_pdf" in result.artifacts[0]
+        assert (sandbox_cwd / result.artifacts[0]).read_text() == dump
+
+    async def test_cap_is_stated_in_system_prompt(self, agent):
+        graph = _use(agent, _StubGraph([AIMessage(content="ok")]))
+        await agent.run_structured("task", context="user lives in Berlin")
+        system = graph.inputs[0]["messages"][0].content
+        assert "user lives in Berlin" in system
+        assert "under 37 words" in system
+        assert isinstance(graph.inputs[0]["messages"][1], HumanMessage)
+
+    async def test_failure_becomes_error_result(self, agent):
+        _use(agent, _StubGraph(error=RuntimeError("boom")))
+        result = await agent.run_structured("task")
+        assert result.error == "RuntimeError: boom"
+        assert result.render() == "Error: Agent failed - RuntimeError: boom"
+
+    async def test_empty_answer_falls_back_to_larger_tier(self, agent, monkeypatch):
+        import model_router
+        monkeypatch.setitem(model_router.MODEL_ROLE_TIERS, "agent:research", "small")
+        graphs = {
+            "small": _StubGraph([AIMessage(content="")]),
+            "large": _StubGraph([AIMessage(content="Python 3.13.1")]),
+        }
+        agent._graph_for = graphs.__getitem__
+        before = model_router.fallback_counts().get(("agent:research", "small"), 0)
+
+        result = await agent.run_structured("latest python?")
+        assert result.summary == "Python 3.13.1"
+        assert len(graphs["small"].inputs) == len(graphs["large"].inputs) == 1
+        assert model_router.fallback_counts()[("agent:research", "small")] == before + 1
+
+    async def test_fallback_after_side_effects_only_retries_the_answer(self, agent, monkeypatch):
+        import agents.base
+        import model_router
+        monkeypatch.setitem(model_router.MODEL_ROLE_TIERS, "agent:research", "small")
+        run = [
+            AIMessage(content="", tool_calls=[{"name": "write_file", "args": {"path": "notes.txt"}, "id": "c1"}]),
+            ToolMessage(content="Saved notes.txt", tool_call_id="c1", name="write_file"),
+            AIMessage(content=""),
+        ]
+        graphs = {"small": _StubGraph(run), "large": _StubGraph([AIMessage(content="rerun")])}
+        agent._graph_for = graphs.__getitem__
+        prompts = []
+
+        class _Model:
+            async def ainvoke(self, messages):
+                prompts.append(messages)
+                return AIMessage(content="Wrote the notes to notes.txt")
+
+        monkeypatch.setattr(agents.base, "chat_model", lambda tier: _Model())
+        result = await agent.run_structured("save my notes")
+        assert result.summary == "Wrote the notes to notes.txt"
+        assert graphs["large"].inputs == []  # write_file is not called again
+        assert isinstance(prompts[0][-1], ToolMessage)
+
+    async def test_fallback_after_read_only_calls_reruns_the_agent(self, agent, monkeypatch):
+        import model_router
+        monkeypatch.setitem(model_router.MODEL_ROLE_TIERS, "agent:research", "small")
+        run = [
+            AIMessage(content="", tool_calls=[{"name": "search", "args": {"query": "python"}, "id": "c1"}]),
+            ToolMessage(content="results", tool_call_id="c1", name="search"),
+            AIMessage(content=""),
+        ]
+        graphs = {"small": _StubGraph(run), "large": _StubGraph([AIMessage(content="Python 3.13.1")])}
+        agent._graph_for = graphs.__getitem__
+        result = await agent.run_structured("latest python?")
+        assert result.summary == "Python 3.13.1"
+        assert len(graphs["large"].inputs) == 1
@@ -0,0 +1,215 @@
+"""
+Unit tests for api.py — the headless HTTP/SSE API.
+
+The shared runtime is given a fake Sidekick, so no LLM is involved.
+
+Run with:  pytest tests/test_api.py -v --tb=short
+"""
+
+import json
+
+import httpx
+import pytest
+
+
+class _FakeSidekick:
+    async def stream_deltas(self, message, success_criteria, thread_id=None, bypass_cache=False):
+        yield {"op": "append", "message": {"role": "user", "content": message}}
+        yield {"op": "append", "message": {"role": "assistant", "content": "Hel"}}
+        yield {"op": "patch", "content": f"lo {thread_id}"}
+
+
+class _FakeKnowledgeBase:
+    def search_results(self, query, k=5):
+        return [{"text": f"about {query}", "source": "notes.md", "chunk_index": 0, "similarity": 0.9}][:k]
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """Import api with all databases in a temp directory and a fake runtime."""
+    monkeypatch.chdir(tmp_path)
+    import scheduler
+    scheduler.close()
+    import api
+    from serving import FairScheduler
+    from session_manager import SessionManager
+    from sqlalchemy import create_engine
+
+    monkeypatch.setattr(api, "session_manager", SessionManager(
+        db_path=str(tmp_path / "chat.db"), checkpoints_db_path=str(tmp_path / "cp.db"),
+    ))
+    monkeypatch.setattr(api, "_history_engine", create_engine(f"sqlite:///{tmp_path / 'chat.db'}"))
+    monkeypatch.setattr(api, "_run_scheduler", False)
+    monkeypatch.setattr(api, "get_knowledge_base", lambda: _FakeKnowledgeBase())
+    monkeypatch.setattr(api.runtime, "sidekick", _FakeSidekick())
+    monkeypatch.setattr(api.runtime, "scheduler", FairScheduler(max_active=2, max_queued=2))
+    yield api
+    scheduler.close()
+
+
+def _client(api):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://test")
+
+
+def _parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+# ===================================================================
+# Sessions
+# ===================================================================
+
+class TestSessions:
+    """Tests for session CRUD endpoints."""
+
+    async def test_create_list_rename_delete(self, api):
+        async with _client(api) as client:
+            created = (await client.post("/sessions", json={"name": "Work"})).json()
+            assert created["name"] == "Work"
+
+            listed = (await client.get("/sessions")).json()
+            assert [s["id"] for s in listed] == [created["id"]]
+
+            renamed = await client.patch(f"/sessions/{created['id']}", json={"name": "Home"})
+            assert renamed.json()["name"] == "Home"
+
+            assert (await client.delete(f"/sessions/{created['id']}")).status_code == 204
+            assert (await client.get(f"/sessions/{created['id']}")).status_code == 404
+
+    async def test_unknown_session_is_404(self, api):
+        async with _client(api) as client:
+            assert (await client.get("/sessions/nope/messages")).status_code == 404
+            assert (await client.post("/sessions/nope/turns", json={"message": "hi"})).status_code == 404
+
+
+# ===================================================================
+# Turns
+# ===================================================================
+
+class TestTurns:
+    """Tests for the SSE turn endpoint."""
+
+    async def test_streams_delta_events(self, api):
+        async with _client(api) as client:
+            session_id = (await client.post("/sessions", json={})).json()["id"]
+            response = await client.post(f"/sessions/{session_id}/turns", json={"message": "hi"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert _parse_sse(response.text) == [
+            ("append", {"role": "user", "content": "hi"}),
+            ("append", {"role": "assistant", "content": "Hel"}),
+            ("patch", {"content": f"lo {session_id}"}),
+            ("done", {}),
+        ]
+        assert api.runtime.scheduler.active == 0
+
+    async def test_busy_runtime_returns_503(self, api, monkeypatch):
+        from serving import FairScheduler
+        monkeypatch.setattr(api.runtime, "scheduler", FairScheduler(max_active=0, max_queued=0))
+        async with _client(api) as client:
+            session_id = (await client.post("/sessions", json={})).json()["id"]
+            response = await client.post(f"/sessions/{session_id}/turns", json={"message": "hi"})
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "5"
+
+    async def test_empty_message_rejected(self, api):
+        async with _client(api) as client:
+            session_id = (await client.post("/sessions", json={})).json()["id"]
+            response = await client.post(f"/sessions/{session_id}/turns", json={"message": ""})
+        assert response.status_code == 422
+
+
+# ===================================================================
+# Tasks and knowledge base
+# ===================================================================
+
+class TestTasksAndKnowledge:
+    """Tests for scheduled-task and knowledge-base endpoints."""
+
+    async def test_task_lifecycle(self, api):
+        async with _client(api) as client:
+            task = (await client.post("/tasks", json={"description": "News", "cron": "0 8 * * *"})).json()
+            assert task["cron_expr"] == "0 8 * * *"
+            assert [t["id"] for t in (await client.get("/tasks")).json()] == [task["id"]]
+            assert (await client.delete(f"/tasks/{task['id']}")).status_code == 204
+            assert (await client.delete(f"/tasks/{task['id']}")).status_code == 404
+
+    async def test_task_runs(self, api):
+        import scheduler
+        async with _client(api) as client:
+            task = (await client.post("/tasks", json={"description": "News", "cron": "0 8 * * *"})).json()
+            run_id, _ = scheduler._claim_task(task["id"], "w1", now=task["next_run_at"])
+            scheduler._finish_run(run_id, "ok", "full report")
+            runs = (await client.get(f"/tasks/{task['id']}/runs")).json()
+            result = (await client.get(f"/tasks/runs/{runs[0]['id']}/result")).json()
+            missing = await client.get("/tasks/nope/runs")
+        assert [(r["status"], r["runner"], r["preview"]) for r in runs] == [("ok", "w1", "full report")]
+        assert result["result"] == "full report"
+        assert missing.status_code == 404
+
+    async def test_task_policy(self, api):
+        async with _client(api) as client:
+            body = {"description": "News", "cron": "0 8 * * *", "jitter_seconds": 90, "coalesce": False,
+                    "max_instances": 2, "apis": "llm,search"}
+            task = (await client.post("/tasks", json=body)).json()
+            bad = await client.post("/tasks", json={**body, "apis": "twitter"})
+        assert (task["jitter_seconds"], task["coalesce"], task["max_instances"], task["apis"]) == \
+            (90, 0, 2, "llm,search")
+        assert bad.status_code == 422
+
+    async def test_task_list_etag(self, api):
+        async with _client(api) as client:
+            first = await client.get("/tasks")
+            etag = first.headers["etag"]
+            unchanged = await client.get("/tasks", headers={"If-None-Match": etag})
+            await client.post("/tasks", json={"description": "News", "cron": "0 8 * * *"})
+            changed = await client.get("/tasks", headers={"If-None-Match": etag})
+        assert (unchanged.status_code, unchanged.content) == (304, b"")
+        assert changed.status_code == 200 and changed.headers["etag"] != etag
+        assert len(changed.json()) == 1
+
+    async def test_bulk_task_updates(self, api):
+        async with _client(api) as client:
+            ids = [(await client.post("/tasks", json={"description": f"t{i}", "cron": "0 8 * * *"})).json()["id"]
+                   for i in range(3)]
+            paused = (await client.post("/tasks/bulk", json={"action": "disable", "ids": ids[:2] + ["nope"]})).json()
+            states = {t["id"]: t["enabled"] for t in (await client.get("/tasks")).json()}
+            deleted = (await client.post("/tasks/bulk", json={"action": "delete", "ids": ids})).json()
+            bad = await client.post("/tasks/bulk", json={"action": "archive", "ids": ids})
+            remaining = (await client.get("/tasks")).json()
+        assert (paused["updated"], paused["unknown"]) == (ids[:2], ["nope"])
+        assert states == {ids[0]: 0, ids[1]: 0, ids[2]: 1}
+        assert sorted(deleted["updated"]) == sorted(ids)
+        assert bad.status_code == 422
+        assert remaining == []
+
+    async def test_metrics(self, api):
+        async with _client(api) as client:
+            task = (await client.post("/tasks", json={"description": "News", "cron": "0 8 * * *"})).json()
+            response = await client.get("/metrics")
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "apexflow_scheduler_due_tasks 0" in response.text
+        assert f'apexflow_scheduler_task_misfires_total{{task_id="{task["id"]}"}} 0' in response.text
+
+    async def test_invalid_cron_rejected(self, api):
+        async with _client(api) as client:
+            response = await client.post("/tasks", json={"description": "x", "cron": "not cron"})
+        assert response.status_code == 422
+
+    async def test_event_task(self, api):
+        async with _client(api) as client:
+            task = (await client.post("/tasks", json={"description": "x", "event": "job_status:offer"})).json()
+            neither = await client.post("/tasks", json={"description": "x"})
+            bad = await client.post("/tasks", json={"description": "x", "event": "file"})
+        assert (task["cron_expr"], task["event"], task["next_run_at"]) == ("", "job_status:offer", None)
+        assert (neither.status_code, bad.status_code) == (422, 422)
+
+    async def test_knowledge_search(self, api):
+        async with _client(api) as client:
+            response = await client.get("/knowledge/search", params={"q": "vectors", "k": 3})
+        assert response.json()["results"][0]["text"] == "about vectors"
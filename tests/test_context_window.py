@@ -0,0 +1,138 @@
+"""
+Unit tests for context_window.py — budgeted conversation view for the worker.
+
+The summariser LLM is replaced by a counting fake so no API calls are made.
+
+Run with:  pytest tests/test_context_window.py -v --tb=short
+"""
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+
+class CountingSummarizer:
+    """Fake LLM that returns a fixed summary and counts calls."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def ainvoke(self, messages, **kwargs):
+        self.calls.append(messages)
+        return AIMessage(content=f"summary #{len(self.calls)}")
+
+
+def _turn(i, tool_output=""):
+    msgs = [HumanMessage(content=f"question {i} " + "q" * 400)]
+    if tool_output:
+        msgs.append(AIMessage(content="", tool_calls=[
+            {"id": f"call_{i}", "name": "research_agent", "args": {"task": "x"}},
+        ]))
+        msgs.append(ToolMessage(content=tool_output, tool_call_id=f"call_{i}", name="research_agent"))
+    msgs.append(AIMessage(content=f"answer {i} " + "a" * 400))
+    return msgs
+
+
+@pytest.fixture
+def summarizer():
+    return CountingSummarizer()
+
+
+# ===================================================================
+# Helpers
+# ===================================================================
+
+class TestHelpers:
+    """Tests for token estimation and turn splitting."""
+
+    def test_split_turns_keeps_tool_messages_with_their_turn(self):
+        from context_window import split_turns
+        msgs = _turn(1, tool_output="result") + _turn(2)
+        turns = split_turns(msgs)
+        assert len(turns) == 2
+        assert isinstance(turns[0][2], ToolMessage)
+
+    def test_estimate_grows_with_content(self):
+        from context_window import estimate_tokens
+        small = estimate_tokens([HumanMessage(content="hi")])
+        big = estimate_tokens([HumanMessage(content="x" * 4000)])
+        assert big > small + 900
+
+    def test_budget_falls_back_to_default(self):
+        from context_window import budget_for_model
+        from config import DEFAULT_CONTEXT_TOKEN_BUDGET
+        assert budget_for_model("unknown-model") == DEFAULT_CONTEXT_TOKEN_BUDGET
+
+
+# ===================================================================
+# ContextWindow.prepare
+# ===================================================================
+
+class TestPrepare:
+    """Tests for the budgeted view."""
+
+    async def test_under_budget_is_unchanged(self, summarizer):
+        from context_window import ContextWindow
+        msgs = _turn(1) + _turn(2)
+        window = ContextWindow(budget=10_000, summarizer=summarizer)
+        summary, out = await window.prepare(msgs)
+        assert summary == ""
+        assert out == msgs
+        assert summarizer.calls == []
+
+    async def test_large_old_tool_output_is_summarised(self, summarizer):
+        from context_window import ContextWindow
+        msgs = _turn(1, tool_output="x" * 20_000) + _turn(2)
+        window = ContextWindow(budget=2_000, tool_output_max_tokens=500, summarizer=summarizer)
+        summary, out = await window.prepare(msgs)
+        assert summary == ""
+        tool_msg = [m for m in out if isinstance(m, ToolMessage)][0]
+        assert tool_msg.content.startswith("[Summarised")
+        assert tool_msg.tool_call_id == "call_1"
+        # The original message object is untouched (checkpoint keeps it)
+        assert msgs[2].content == "x" * 20_000
+
+    async def test_current_turn_tool_output_is_kept(self, summarizer):
+        from context_window import ContextWindow
+        msgs = _turn(1) + _turn(2, tool_output="y" * 20_000)
+        window = ContextWindow(budget=1_000, tool_output_max_tokens=500, summarizer=summarizer)
+        _, out = await window.prepare(msgs)
+        assert any(isinstance(m, ToolMessage) and m.content == "y" * 20_000 for m in out)
+
+    async def test_old_turns_fold_into_summary(self, summarizer):
+        from context_window import ContextWindow
+        msgs = [m for i in range(10) for m in _turn(i)]
+        window = ContextWindow(budget=800, recent_turns=2, summarizer=summarizer)
+        summary, out = await window.prepare(msgs)
+        assert summary == "summary #1"
+        assert out[0].content.startswith("question 8")
+        assert len(out) == 4
+
+    async def test_summary_is_extended_incrementally(self, summarizer):
+        from context_window import ContextWindow
+        window = ContextWindow(budget=800, recent_turns=2, summarizer=summarizer)
+        msgs = [m for i in range(10) for m in _turn(i)]
+        await window.prepare(msgs)
+        await window.prepare(msgs)
+        assert len(summarizer.calls) == 1  # cached
+
+        msgs += _turn(10)
+        summary, _ = await window.prepare(msgs)
+        assert summary == "summary #2"
+        prompt = summarizer.calls[-1][1].content
+        assert "Summary so far:\nsummary #1" in prompt
+        assert "question 8" in prompt
+        assert "question 0" not in prompt
+
+    async def test_summary_cache_is_bounded(self, summarizer):
+        from context_window import ContextWindow
+        window = ContextWindow(budget=2_000, tool_output_max_tokens=500, summarizer=summarizer,
+                               cache_size=2)
+        for i in range(4):
+            await window.prepare(_turn(i, tool_output=str(i) * 20_000) + _turn(10))
+        assert len(window._cache) == 2
+
+        await window.prepare(_turn(3, tool_output="3" * 20_000) + _turn(10))
+        assert len(summarizer.calls) == 4  # most recent summary reused
+        await window.prepare(_turn(0, tool_output="0" * 20_000) + _turn(10))
+        assert len(summarizer.calls) == 5  # oldest was evicted
+
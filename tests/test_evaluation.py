@@ -0,0 +1,69 @@
+"""
+Unit tests for evaluation.py — evaluator delta and verdict cache.
+
+Run with:  pytest tests/test_evaluation.py -v --tb=short
+"""
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+
+# ===================================================================
+# conversation_delta
+# ===================================================================
+
+class TestConversationDelta:
+    """Tests for selecting the unseen part of the conversation."""
+
+    def test_first_round_starts_at_latest_user_message(self):
+        from evaluation import conversation_delta
+        msgs = [
+            HumanMessage(content="old question"),
+            AIMessage(content="old answer"),
+            HumanMessage(content="new question"),
+            AIMessage(content="new answer"),
+        ]
+        delta = conversation_delta(msgs)
+        assert [m.content for m in delta] == ["new question", "new answer"]
+
+    def test_later_rounds_start_after_previous_verdict(self):
+        from evaluation import conversation_delta
+        msgs = [
+            HumanMessage(content="q"),
+            AIMessage(content="first try"),
+            AIMessage(content="Evaluator Feedback: no"),
+            AIMessage(content="second try"),
+        ]
+        delta = conversation_delta(msgs, evaluated_upto=3)
+        assert [m.content for m in delta] == ["second try"]
+
+    def test_no_user_message_returns_everything(self):
+        from evaluation import conversation_delta
+        msgs = [AIMessage(content="a"), AIMessage(content="b")]
+        assert conversation_delta(msgs) == msgs
+
+
+# ===================================================================
+# VerdictCache
+# ===================================================================
+
+class TestVerdictCache:
+    """Tests for the (criteria, response) verdict cache."""
+
+    def test_hit_and_miss(self):
+        from evaluation import VerdictCache
+        cache = VerdictCache()
+        cache.put("be brief", "ok", "verdict")
+        assert cache.get("be brief", "ok") == "verdict"
+        assert cache.get("be brief", "other") is None
+        assert cache.get("be verbose", "ok") is None
+
+    def test_evicts_least_recently_used(self):
+        from evaluation import VerdictCache
+        cache = VerdictCache(max_entries=2)
+        cache.put("c", "a", 1)
+        cache.put("c", "b", 2)
+        cache.get("c", "a")          # touch "a" so "b" is the oldest
+        cache.put("c", "d", 3)
+        assert len(cache) == 2
+        assert cache.get("c", "b") is None
+        assert cache.get("c", "a") == 1
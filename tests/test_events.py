@@ -0,0 +1,97 @@
+"""
+Unit tests for events.py — event triggers for scheduled tasks.
+
+File scans use a temporary directory; no scheduler database is involved.
+
+Run with:  pytest tests/test_events.py -v --tb=short
+"""
+
+import os
+
+import pytest
+
+
+# ===================================================================
+# Triggers
+# ===================================================================
+
+class TestTriggers:
+    """Tests for parsing, validating and matching triggers."""
+
+    @pytest.mark.parametrize("trigger, error", [
+        ("kb_indexed", ""),
+        ("job_status:interview", ""),
+        ("file:knowledge/*.pdf", ""),
+        ("email:*", "unknown event 'email'"),
+        ("file", "needs a glob"),
+        ("file:../secrets/*", "relative to the sandbox"),
+        ("file:/etc/*", "relative to the sandbox"),
+    ])
+    def test_validate(self, trigger, error):
+        from events import validate
+        valid, message = validate(trigger)
+        assert valid == (not error)
+        assert error in message
+
+    def test_matches_and_describe(self):
+        from events import describe, matches
+        assert matches("kb_indexed", "kb_indexed", "paper.pdf")
+        assert matches("kb_indexed:*.pdf", "kb_indexed", "paper.pdf")
+        assert not matches("kb_indexed:*.pdf", "kb_indexed", "notes.txt")
+        assert not matches("job_status:offer", "kb_indexed", "offer")
+        assert describe("job_status:offer") == "a job moves to status 'offer'"
+
+
+# ===================================================================
+# Dispatch
+# ===================================================================
+
+class TestDispatch:
+    """Tests for emitting events to subscribers."""
+
+    def test_failing_handler_does_not_break_emit(self):
+        import events
+        seen = []
+
+        def broken(kind, key, detail):
+            raise RuntimeError("boom")
+
+        def record(kind, key, detail):
+            seen.append((kind, key, detail))
+
+        for handler in (broken, record, record):
+            events.subscribe(handler)
+        try:
+            events.emit("kb_indexed", "a.pdf")
+        finally:
+            events.unsubscribe(broken)
+            events.unsubscribe(record)
+        events.emit("kb_indexed", "b.pdf")
+        assert seen == [("kb_indexed", "a.pdf", "kb_indexed a.pdf")]
+
+
+# ===================================================================
+# File triggers
+# ===================================================================
+
+class TestSnapshot:
+    """Tests for the stat scan behind file triggers."""
+
+    def test_snapshot_and_changes(self, tmp_path):
+        from events import changed_files, snapshot
+        (tmp_path / "knowledge" / "2024").mkdir(parents=True)
+        (tmp_path / "knowledge" / "a.pdf").write_text("a")
+        (tmp_path / "knowledge" / "2024" / "b.pdf").write_text("b")
+        (tmp_path / "other.pdf").write_text("outside")
+
+        before = snapshot("knowledge/*.pdf", root=str(tmp_path))
+        assert sorted(before) == ["knowledge/2024/b.pdf", "knowledge/a.pdf"]
+        assert snapshot("missing/*.pdf", root=str(tmp_path)) == {}
+
+        os.utime(tmp_path / "knowledge" / "a.pdf", (0, 1_000_000))
+        (tmp_path / "knowledge" / "c.pdf").write_text("c")
+        (tmp_path / "knowledge" / "2024" / "b.pdf").unlink()
+        after = snapshot("knowledge/*.pdf", root=str(tmp_path))
+        assert changed_files(before, after) == [
+            "file knowledge/a.pdf was modified", "file knowledge/c.pdf was added",
+        ]
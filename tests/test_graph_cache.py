@@ -0,0 +1,140 @@
+"""
+Unit tests for graph_cache.py — process-wide compiled graphs and runtime tool dispatch.
+
+Uses a tiny LangGraph graph with a ToolNode, so no API calls are made.
+
+Run with:  pytest tests/test_graph_cache.py -v --tb=short
+"""
+
+from typing import Annotated, Any, List
+
+import pytest
+from typing_extensions import TypedDict
+from langchain_core.messages import AIMessage
+from langchain_core.tools import StructuredTool, Tool
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+from langgraph.prebuilt import ToolNode
+from pydantic import BaseModel
+
+
+class _State(TypedDict):
+    messages: Annotated[List[Any], add_messages]
+
+
+class _Query(BaseModel):
+    query: str
+
+
+def _lookup(answer):
+    return Tool(name="lookup", func=lambda q: f"{answer}: {q}", description="Look something up.")
+
+
+def _build_graph(template):
+    from graph_cache import runtime_tool
+
+    def worker(state):
+        call = {"name": "lookup", "args": {"__arg1": "q"}, "id": "c1"}
+        return {"messages": [AIMessage(content="", tool_calls=[call])]}
+
+    builder = StateGraph(_State)
+    builder.add_node("worker", worker)
+    builder.add_node("tools", ToolNode([runtime_tool(template, "tools")]))
+    builder.add_edge(START, "worker")
+    builder.add_edge("worker", "tools")
+    builder.add_edge("tools", END)
+    return builder.compile()
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    import graph_cache
+    graph_cache.clear()
+    yield
+    graph_cache.clear()
+
+
+# ===================================================================
+# get_or_compile
+# ===================================================================
+
+class TestGetOrCompile:
+    """Tests for the compiled-graph cache."""
+
+    def test_builds_once_per_key(self):
+        import graph_cache
+        builds = []
+        first = graph_cache.get_or_compile(("agent", "a"), lambda: builds.append(1) or object())
+        second = graph_cache.get_or_compile(("agent", "a"), lambda: builds.append(1) or object())
+        graph_cache.get_or_compile(("agent", "b"), lambda: builds.append(1) or object())
+        assert first is second
+        assert len(builds) == 2
+
+    def test_clear_forces_rebuild(self):
+        import graph_cache
+        first = graph_cache.get_or_compile("k", object)
+        graph_cache.clear()
+        assert graph_cache.get_or_compile("k", object) is not first
+
+
+# ===================================================================
+# runtime_tool
+# ===================================================================
+
+class TestRuntimeTool:
+    """Tests for tool stand-ins resolved from the run's config."""
+
+    async def test_each_run_calls_its_own_tool(self):
+        from graph_cache import get_or_compile
+        graph = get_or_compile("g", lambda: _build_graph(_lookup("template")))
+
+        for answer in ("first", "second"):
+            config = {"configurable": {"tools": {"lookup": _lookup(answer)}}}
+            result = await graph.ainvoke({"messages": "hi"}, config)
+            assert result["messages"][-1].content == f"{answer}: q"
+
+    def test_structured_tool_keeps_schema(self):
+        from graph_cache import runtime_tool
+        tool = StructuredTool(name="wiki", description="Wiki.", args_schema=_Query,
+                              func=lambda query: query)
+        stand_in = runtime_tool(tool, "tools")
+        assert (stand_in.name, stand_in.description, stand_in.args) == (tool.name, tool.description, tool.args)
+
+    async def test_trace_records_one_span_per_tool_call(self):
+        from tracing import TraceRecorder
+        recorder = TraceRecorder(session_id="s1")
+        config = {"configurable": {"tools": {"lookup": _lookup("real")}}, "callbacks": [recorder]}
+        await _build_graph(_lookup("template")).ainvoke({"messages": "hi"}, config)
+        spans = recorder.finish()
+
+        tool_spans = [s for s in spans if s["kind"] == "tool"]
+        assert len(tool_spans) == 1
+        tools_node = next(s for s in spans if s["name"] == "tools")
+        assert tool_spans[0]["parent_id"] == tools_node["id"]
+
+    async def test_copies_keep_separate_checkpoints(self):
+        from langgraph.checkpoint.memory import InMemorySaver
+        shared = _build_graph(_lookup("template"))
+        one = shared.copy(update={"checkpointer": InMemorySaver()})
+        two = shared.copy(update={"checkpointer": InMemorySaver()})
+        config = {"configurable": {"thread_id": "t", "tools": {"lookup": _lookup("x")}}}
+
+        await one.ainvoke({"messages": "hi"}, config)
+        assert len((await one.aget_state(config)).values["messages"]) == 3
+        assert (await two.aget_state(config)).values == {}
+        assert shared.checkpointer is None
+
+    async def test_schemaless_base_tool_takes_a_string(self):
+        from langchain_core.tools import BaseTool
+        from graph_cache import runtime_tool
+
+        class Echo(BaseTool):
+            name: str = "echo"
+            description: str = "Echo the input."
+
+            def _run(self, text: str) -> str:
+                return text
+
+        stand_in = runtime_tool(Echo(), "tools")
+        config = {"configurable": {"tools": {"echo": Echo()}}}
+        assert await stand_in.ainvoke("print(1)", config) == "print(1)"
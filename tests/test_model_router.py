@@ -0,0 +1,147 @@
+"""
+Unit tests for model_router.py — model tiers, fallback and per-tier telemetry.
+
+Chat models are replaced by fakes, so no API calls are made.
+
+Run with:  pytest tests/test_model_router.py -v --tb=short
+"""
+
+from collections import Counter
+
+import pytest
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import AIMessage, HumanMessage
+from pydantic import BaseModel
+
+
+class _Verdict(BaseModel):
+    ok: bool
+
+
+class _FakeStructured:
+    def __init__(self, model, calls):
+        self.model = model
+        self.calls = calls
+
+    async def ainvoke(self, messages, config=None):
+        self.calls.append(self.model)
+        if self.model == "gpt-5-mini":
+            raise OutputParserException("not JSON")
+        return _Verdict(ok=True)
+
+
+class _FakeChatOpenAI:
+    calls: list = []
+
+    def __init__(self, model, **kwargs):
+        self.model = model
+        self.kwargs = kwargs
+
+    def with_structured_output(self, schema):
+        return _FakeStructured(self.model, self.calls)
+
+
+@pytest.fixture
+def router(monkeypatch):
+    """model_router with fake chat models and fresh model/fallback state."""
+    import model_router
+    _FakeChatOpenAI.calls = []
+    monkeypatch.setattr(model_router, "ChatOpenAI", _FakeChatOpenAI)
+    monkeypatch.setattr(model_router, "_models", {})
+    monkeypatch.setattr(model_router, "_fallbacks", Counter())
+    monkeypatch.setattr(model_router, "MODEL_TIERS", {"small": "gpt-5-mini", "large": "gpt-5.2-chat-latest"})
+    return model_router
+
+
+# ===================================================================
+# Tiers
+# ===================================================================
+
+class TestTiers:
+    """Tests for role → tier → model resolution."""
+
+    def test_classifier_sends_short_lookups_to_small_tier(self, router):
+        assert router.classify_complexity("list my scheduled tasks") == "small"
+        assert router.classify_complexity("compare these two job offers for me") == "large"
+        assert router.classify_complexity("what? and why?") == "large"
+        assert router.classify_complexity("word " * 40) == "large"
+
+    def test_auto_roles_use_classifier(self, router, monkeypatch):
+        monkeypatch.setitem(router.MODEL_ROLE_TIERS, "agent:documents", "auto")
+        assert router.tier_for("agent:documents", "read notes.txt") == "small"
+        assert router.tier_for("agent:documents", "write a report on notes.txt") == "large"
+        assert router.initial_tiers("agent:documents") == ["small", "large"]
+        assert router.tier_for("unknown-role") == router.DEFAULT_MODEL_TIER
+
+    def test_next_tier(self, router, monkeypatch):
+        assert router.next_tier("small") == "large"
+        assert router.next_tier("large") is None
+        monkeypatch.setattr(router, "MODEL_FALLBACK_ENABLED", False)
+        assert router.next_tier("small") is None
+
+    def test_chat_models_are_shared_per_tier_and_options(self, router):
+        assert router.chat_model("small") is router.chat_model("small")
+        assert router.chat_model("small", stream_usage=True) is not router.chat_model("small")
+        assert router.chat_model("large").model == "gpt-5.2-chat-latest"
+
+
+# ===================================================================
+# Validation and fallback
+# ===================================================================
+
+class TestFallback:
+    """Tests for retrying on a larger tier."""
+
+    def test_is_valid_reply(self, router):
+        call = {"name": "search", "args": {}, "id": "c1"}
+        assert router.is_valid_reply(AIMessage(content="hi"))
+        assert router.is_valid_reply(AIMessage(content="", tool_calls=[call]), ["search"])
+        assert not router.is_valid_reply(AIMessage(content="", tool_calls=[call]), ["wikipedia"])
+        assert not router.is_valid_reply(AIMessage(content="  "))
+        bad = AIMessage(content="", invalid_tool_calls=[
+            {"name": "search", "args": "{oops", "id": "c1", "error": "bad JSON", "type": "invalid_tool_call"}
+        ])
+        assert not router.is_valid_reply(bad)
+
+    async def test_structured_output_falls_back_on_parse_error(self, router, monkeypatch):
+        monkeypatch.setitem(router.MODEL_ROLE_TIERS, "evaluator", "small")
+        result = await router.ainvoke_structured("evaluator", _Verdict, [HumanMessage(content="ok?")])
+        assert result.ok
+        assert _FakeChatOpenAI.calls == ["gpt-5-mini", "gpt-5.2-chat-latest"]
+        assert router.fallback_counts() == {("evaluator", "small"): 1}
+
+    async def test_largest_tier_failure_is_raised(self, router, monkeypatch):
+        monkeypatch.setattr(router, "MODEL_TIERS", {"small": "gpt-5-mini"})
+        monkeypatch.setitem(router.MODEL_ROLE_TIERS, "evaluator", "small")
+        with pytest.raises(OutputParserException):
+            await router.ainvoke_structured("evaluator", _Verdict, [HumanMessage(content="ok?")])
+
+
+# ===================================================================
+# Telemetry
+# ===================================================================
+
+class TestTierReport:
+    """Tests for latency and cost per tier from trace spans."""
+
+    def test_report_groups_llm_spans_by_tier(self, router, tmp_path):
+        import time
+        import tracing
+        db = str(tmp_path / "traces.db")
+        now = time.time()
+        spans = [
+            {"id": f"s{i}", "trace_id": "t", "name": model, "kind": "llm", "started_at": now,
+             "duration_ms": ms, "input_tokens": 1000, "output_tokens": 100, "status": "ok"}
+            for i, (model, ms) in enumerate([("gpt-5-mini", 400), ("gpt-5-mini", 600),
+                                             ("gpt-5.2-chat-latest", 1500)])
+        ]
+        spans.append({"id": "n", "trace_id": "t", "name": "worker", "kind": "node", "started_at": now,
+                      "duration_ms": 2000, "status": "ok"})
+        tracing.save_spans(spans, db_path=db)
+        router.record_fallback("worker", "small", "large")
+
+        small, large = router.tier_report(db_path=db)
+        assert (small["tier"], small["calls"], small["fallbacks"]) == ("small", 2, 1)
+        assert small["cost_usd"] == pytest.approx(2 * (1000 * 0.25 + 100 * 2.00) / 1e6)
+        assert (large["tier"], large["calls"], large["p50_ms"]) == ("large", 1, 1500)
+        assert large["cost_per_call_usd"] > small["cost_per_call_usd"]
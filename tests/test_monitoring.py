@@ -0,0 +1,92 @@
+"""
+Unit tests for monitoring.py — cheap change checks for monitoring tasks.
+
+Page fetches and web searches are replaced by fakes, so no network is used.
+
+Run with:  pytest tests/test_monitoring.py -v --tb=short
+"""
+
+import pytest
+
+
+# ===================================================================
+# Fingerprints
+# ===================================================================
+
+class TestFingerprint:
+    """Tests for normalising observations before hashing them."""
+
+    def test_cosmetic_differences_keep_the_fingerprint(self):
+        from monitoring import fingerprint
+        before = "Python 3.13.1 released\n  Posted 3 hours ago"
+        after = "python 3.13.1   released Posted 5 hours ago"
+        assert fingerprint(before) == fingerprint(after)
+
+    def test_real_changes_change_the_fingerprint(self):
+        from monitoring import fingerprint
+        assert fingerprint("Python 3.13.1 released") != fingerprint("Python 3.13.2 released")
+
+    def test_page_text_drops_markup_and_scripts(self):
+        from monitoring import page_text
+        html = "<html><head><style>p {}</style><script>var t = Date.now()</script></head>" \
+               "<body><h1>Prices</h1><p>Plan: <b>9 EUR</b></p></body></html>"
+        assert page_text(html).split() == ["Prices", "Plan:", "9", "EUR"]
+
+    def test_excerpt_is_capped(self, monkeypatch):
+        import monitoring
+        monkeypatch.setattr(monitoring, "MONITOR_EXCERPT_CHARS", 10)
+        assert monitoring.excerpt("short\n text") == "short text"
+        assert monitoring.excerpt("a" * 20) == "a" * 10 + " …"
+
+
+# ===================================================================
+# Observing sources
+# ===================================================================
+
+class _Response:
+    def __init__(self, text, content_type):
+        self.text = text
+        self.headers = {"content-type": content_type}
+
+    def raise_for_status(self):
+        pass
+
+
+class TestObserve:
+    """Tests for fetching the current state of a URL or a search query."""
+
+    def test_url_is_fetched_as_page_text(self, monkeypatch):
+        import monitoring
+        fetched = []
+
+        def fake_get(url, **kwargs):
+            fetched.append(url)
+            return _Response("<p>Hello</p>", "text/html; charset=utf-8")
+
+        monkeypatch.setattr(monitoring.httpx, "get", fake_get)
+        assert monitoring.observe(" https://example.com/status ").strip() == "Hello"
+        assert fetched == ["https://example.com/status"]
+
+    def test_non_html_is_returned_as_is(self, monkeypatch):
+        import monitoring
+        monkeypatch.setattr(monitoring.httpx, "get", lambda url, **kw: _Response('{"v": 2}', "application/json"))
+        assert monitoring.observe("https://example.com/api") == '{"v": 2}'
+
+    def test_query_is_searched(self, monkeypatch):
+        import monitoring
+        import tools.research
+        monkeypatch.setattr(tools.research, "search", lambda query: f"results for {query}")
+        assert monitoring.observe("python release") == "results for python release"
+        assert monitoring.describe("python release") == "web search for 'python release'"
+        assert monitoring.describe("http://x.org") == "page http://x.org"
+
+    def test_fetch_errors_propagate(self, monkeypatch):
+        import httpx
+        import monitoring
+
+        def fail(url, **kwargs):
+            raise httpx.ConnectError("offline")
+
+        monkeypatch.setattr(monitoring.httpx, "get", fail)
+        with pytest.raises(httpx.ConnectError):
+            monitoring.observe("https://example.com")
@@ -0,0 +1,112 @@
+"""
+Unit tests for prompt_builder.py — cache-friendly worker prompt assembly.
+
+Run with:  pytest tests/test_prompt_builder.py -v --tb=short
+"""
+
+from datetime import datetime
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+
+AGENTS = "- research_agent: Research specialist\n- system_agent: System specialist"
+
+
+# ===================================================================
+# assemble_worker_messages
+# ===================================================================
+
+class TestAssembleWorkerMessages:
+    """Tests for the layered prompt assembly."""
+
+    def test_static_prefix_is_stable_across_calls(self):
+        from prompt_builder import assemble_worker_messages
+        convo = [HumanMessage(content="hi")]
+
+        first = assemble_worker_messages(
+            convo, AGENTS, "profile", now=datetime(2026, 1, 1, 8, 0, 1),
+        )
+        second = assemble_worker_messages(
+            convo, AGENTS, "profile", feedback="try again",
+            now=datetime(2026, 1, 1, 9, 30, 59),
+        )
+        assert first[0].content == second[0].content
+        assert first[1] is convo[0]
+
+    def test_volatile_parts_are_trailing(self):
+        from prompt_builder import assemble_worker_messages
+        msgs = assemble_worker_messages(
+            [HumanMessage(content="hi"), AIMessage(content="hello")],
+            AGENTS,
+            success_criteria="Be brief",
+            feedback="Too long",
+            now=datetime(2026, 3, 4, 5, 6, 7),
+        )
+        lead, trailing = msgs[0], msgs[-1]
+        assert isinstance(trailing, SystemMessage)
+        assert "2026-03-04 05:06" in trailing.content
+        assert "Be brief" in trailing.content
+        assert "Too long" in trailing.content
+        assert "2026-03-04" not in lead.content
+        assert "Be brief" not in lead.content
+
+    def test_static_parts_precede_profile(self):
+        from prompt_builder import assemble_worker_messages
+        msgs = assemble_worker_messages([], AGENTS, "Known facts: name=Ada")
+        lead = msgs[0].content
+        assert lead.index("research_agent") < lead.index("DELEGATION GUIDELINES")
+        assert lead.index("DELEGATION GUIDELINES") < lead.index("Known facts")
+
+    def test_recent_history_is_trailing(self):
+        from prompt_builder import assemble_worker_messages
+        convo = [HumanMessage(content="hi")]
+        first = assemble_worker_messages(convo, AGENTS, "Known facts: name=Ada",
+                                         recent_history="Recent conversation history:\n  User: a")
+        second = assemble_worker_messages(convo, AGENTS, "Known facts: name=Ada",
+                                          recent_history="Recent conversation history:\n  User: b")
+        assert first[0].content == second[0].content
+        assert "Recent conversation history" not in first[0].content
+        assert "User: a" in first[-1].content
+
+    def test_existing_system_messages_are_replaced(self):
+        from prompt_builder import assemble_worker_messages
+        msgs = assemble_worker_messages(
+            [SystemMessage(content="stale"), HumanMessage(content="hi")], AGENTS,
+        )
+        assert all(m.content != "stale" for m in msgs)
+        assert len(msgs) == 3
+
+    def test_time_has_minute_resolution(self):
+        from prompt_builder import build_volatile_prompt
+        a = build_volatile_prompt(datetime(2026, 1, 1, 8, 0, 1))
+        b = build_volatile_prompt(datetime(2026, 1, 1, 8, 0, 58))
+        assert a == b
+
+
+# ===================================================================
+# cache_usage
+# ===================================================================
+
+class TestCacheUsage:
+    """Tests for token usage extraction."""
+
+    def test_reads_cached_tokens(self):
+        from prompt_builder import cache_usage
+        msg = AIMessage(
+            content="ok",
+            usage_metadata={
+                "input_tokens": 1200,
+                "output_tokens": 30,
+                "total_tokens": 1230,
+                "input_token_details": {"cache_read": 1024},
+            },
+        )
+        assert cache_usage(msg) == {
+            "input_tokens": 1200, "cached_tokens": 1024, "output_tokens": 30,
+        }
+
+    def test_missing_usage_returns_zeros(self):
+        from prompt_builder import cache_usage
+        assert cache_usage(AIMessage(content="ok")) == {
+            "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0,
+        }
@@ -0,0 +1,154 @@
+"""
+Unit tests for benchmarks/replay.py — record/replay stand-ins for LLMs and tools.
+
+Run with:  pytest tests/test_replay.py -v --tb=short
+"""
+
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+from langchain_core.tools import Tool
+from pydantic import BaseModel
+
+
+class _Verdict(BaseModel):
+    ok: bool
+    reason: str
+
+
+FIXTURE = {
+    "llm": [
+        {"key": "human:hello", "response": {"content": "first answer"}},
+        {"key": "human:hello", "response": {"content": "second answer"}},
+        {"key": "human:look it up", "response": {
+            "content": "", "tool_calls": [{"name": "search", "args": {"__arg1": "cats"}, "id": "c1"}],
+        }},
+        {"key": "tool:cats are great", "response": {"content": "Cats are great."}},
+    ],
+    "tools": [{"name": "search", "args": "cats", "output": "cats are great"}],
+    "structured": {"_Verdict": {"ok": True, "reason": "default"}},
+}
+
+
+def _model(fixture=FIXTURE, **latency):
+    from benchmarks.replay import ReplayChatModel, ReplaySession, SimulatedLatency
+    session = ReplaySession(fixture, SimulatedLatency(**latency))
+    return ReplayChatModel(session=session), session
+
+
+# ===================================================================
+# Request matching
+# ===================================================================
+
+class TestRequestKey:
+    """Tests for request_key() and args_key()."""
+
+    def test_ignores_system_messages(self):
+        from benchmarks.replay import request_key
+        key = request_key([
+            SystemMessage(content="static"),
+            HumanMessage(content="  what   time\nis it "),
+            SystemMessage(content="Current date and time: 2024-01-01 10:00"),
+        ])
+        assert key == "human:what time is it"
+
+    def test_tool_message_key(self):
+        from benchmarks.replay import request_key
+        assert request_key([ToolMessage(content="result", tool_call_id="x")]) == "tool:result"
+
+    def test_single_arg_tool_calls_match_on_value(self):
+        from benchmarks.replay import args_key
+        assert args_key("search", {"__arg1": "cats"}) == args_key("search", "cats")
+        assert args_key("t", {"b": 1, "a": 2}) == args_key("t", {"a": 2, "b": 1})
+
+
+# ===================================================================
+# ReplayChatModel
+# ===================================================================
+
+class TestReplayChatModel:
+    """Tests for replaying chat responses."""
+
+    async def test_responses_consumed_in_order_last_repeats(self):
+        model, session = _model()
+        replies = [(await model.ainvoke([HumanMessage(content="hello")])).content for _ in range(3)]
+        assert replies == ["first answer", "second answer", "second answer"]
+        assert session.llm_calls == 3
+
+    async def test_replays_tool_calls(self):
+        model, _ = _model()
+        reply = await model.bind_tools([]).ainvoke([HumanMessage(content="look it up")])
+        assert reply.tool_calls[0]["name"] == "search"
+        assert reply.tool_calls[0]["args"] == {"__arg1": "cats"}
+
+    async def test_streaming_yields_tokens_and_tool_calls(self):
+        model, _ = _model()
+        chunks = [c async for c in model.astream([HumanMessage(content="hello")])]
+        assert len(chunks) > 1
+        assert "".join(c.content for c in chunks) == "first answer"
+
+        merged = None
+        async for c in model.astream([HumanMessage(content="look it up")]):
+            merged = c if merged is None else merged + c
+        assert merged.tool_calls[0]["args"] == {"__arg1": "cats"}
+
+    async def test_simulated_latency(self):
+        model, _ = _model(first_token=0.05, per_token=0.02)
+        start = time.perf_counter()
+        await model.ainvoke([HumanMessage(content="hello")])
+        assert time.perf_counter() - start >= 0.09
+
+    async def test_miss_raises_and_is_recorded(self):
+        model, session = _model()
+        with pytest.raises(KeyError):
+            await model.ainvoke([HumanMessage(content="unknown")])
+        assert session.misses == ["human:unknown"]
+
+    async def test_structured_output_falls_back_to_schema_default(self):
+        model, session = _model()
+        verdict = await model.with_structured_output(_Verdict).ainvoke(
+            [HumanMessage(content="judge this")]
+        )
+        assert verdict == _Verdict(ok=True, reason="default")
+        assert session.llm_calls == 1
+
+    async def test_structured_output_from_recorded_json(self):
+        fixture = {"llm": [{"key": "human:judge", "response": {"content": '{"ok": false, "reason": "r"}'}}]}
+        model, _ = _model(fixture)
+        verdict = await model.with_structured_output(_Verdict).ainvoke([HumanMessage(content="judge")])
+        assert verdict.ok is False
+
+
+# ===================================================================
+# Tools and recording
+# ===================================================================
+
+class TestReplayTools:
+    """Tests for replay_tools() and FixtureRecorder."""
+
+    async def test_stand_in_keeps_name_and_replays_output(self):
+        from benchmarks.replay import ReplaySession, replay_tools
+        session = ReplaySession(FIXTURE)
+        real = Tool(name="search", func=lambda q: 1 / 0, description="Search the web.")
+        (stand_in,) = replay_tools([real], session)
+        assert stand_in.name == "search"
+        assert stand_in.description == "Search the web."
+        assert await stand_in.ainvoke("cats") == "cats are great"
+        assert session.tool_calls == 1
+
+    async def test_recorded_fixture_replays(self):
+        from benchmarks.replay import FixtureRecorder, ReplaySession, replay_tools
+        from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+        from langchain_core.messages import AIMessage
+
+        recorder = FixtureRecorder()
+        live_model = GenericFakeChatModel(messages=iter([AIMessage(content="live reply")]))
+        live_tool = Tool(name="lookup", func=lambda q: f"found {q}", description="d")
+        await live_model.ainvoke([HumanMessage(content="question")], config={"callbacks": [recorder]})
+        await live_tool.ainvoke("x", config={"callbacks": [recorder]})
+
+        model, _ = _model(recorder.to_fixture())
+        assert (await model.ainvoke([HumanMessage(content="question")])).content == "live reply"
+        (replayed,) = replay_tools([live_tool], ReplaySession(recorder.to_fixture()))
+        assert await replayed.ainvoke("x") == "found x"
@@ -0,0 +1,136 @@
+"""
+Unit tests for response_cache.py — keys, TTLs, exact/semantic lookup and stats.
+
+Embeddings come from a fake bag-of-words function, so no API calls are made.
+
+Run with:  pytest tests/test_response_cache.py -v --tb=short
+"""
+
+import pytest
+
+_VOCAB = ["top", "tech", "headlines", "news", "today", "weather", "berlin", "latest"]
+
+
+async def _fake_embed(text):
+    words = text.split()
+    return [float(words.count(w)) for w in _VOCAB]
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "cache.db")
+
+
+@pytest.fixture
+def cache(db):
+    from response_cache import ResponseCache
+    return ResponseCache(embed=_fake_embed, threshold=0.8, db_path=db)
+
+
+# ===================================================================
+# Keys and TTLs
+# ===================================================================
+
+class TestKeys:
+    """Tests for request normalisation, profile digests and TTL selection."""
+
+    def test_normalize_request(self):
+        from response_cache import normalize_request
+        assert normalize_request("  Top   Tech\nHeadlines?! ") == "top tech headlines"
+
+    def test_profile_key_ignores_irrelevant_facts(self):
+        from response_cache import profile_key
+        base = profile_key({"location": "Berlin"})
+        assert profile_key({"location": "Berlin", "favourite_colour": "blue"}) == base
+        assert profile_key({"location": "Munich"}) != base
+
+    def test_ttl_is_shortest_of_agents_used(self):
+        from config import RESPONSE_CACHE_AGENT_TTLS, RESPONSE_CACHE_DEFAULT_TTL
+        from response_cache import ttl_for_agents
+        assert ttl_for_agents([]) == 0  # agent-less answers are not cached by default
+        assert ttl_for_agents(["unlisted"]) == RESPONSE_CACHE_DEFAULT_TTL
+        assert ttl_for_agents(["location", "research"]) == RESPONSE_CACHE_AGENT_TTLS["research"]
+        assert ttl_for_agents(["research", "documents"]) == 0
+
+
+# ===================================================================
+# ResponseCache
+# ===================================================================
+
+class TestResponseCache:
+    """Tests for lookup/store round trips."""
+
+    async def test_exact_hit_after_store(self, cache, db):
+        from response_cache import stats
+        entry, probe = await cache.lookup("Top tech headlines", "", {})
+        assert entry is None
+        assert await cache.store(probe, "Here are the headlines", {"research"}, tokens=1200)
+
+        entry, _ = await cache.lookup("top tech  headlines?", "", {})
+        assert entry["response"] == "Here are the headlines"
+
+        s = stats(db)
+        assert (s["exact_hit"], s["miss"], s["saved_tokens"]) == (1, 1, 1200)
+        assert s["hit_rate"] == 0.5
+
+    async def test_semantic_hit_for_similar_request(self, cache, db):
+        from response_cache import stats
+        _, probe = await cache.lookup("latest tech news today", "", {})
+        await cache.store(probe, "Tech news", {"research"})
+
+        entry, _ = await cache.lookup("tech news today", "", {})
+        assert entry["response"] == "Tech news"
+        assert stats(db)["semantic_hit"] == 1
+
+        entry, _ = await cache.lookup("weather berlin", "", {})
+        assert entry is None
+
+    async def test_profile_and_criteria_partition_entries(self, cache):
+        _, probe = await cache.lookup("weather today", "", {"location": "Berlin"})
+        await cache.store(probe, "Sunny in Berlin", {"location"})
+
+        assert (await cache.lookup("weather today", "", {"location": "Munich"}))[0] is None
+        assert (await cache.lookup("weather today", "cite sources", {"location": "Berlin"}))[0] is None
+        assert (await cache.lookup("weather today", "", {"location": "Berlin"}))[0] is not None
+
+    async def test_follow_up_in_another_thread_misses(self, cache):
+        from langchain_core.messages import AIMessage, HumanMessage
+        weather = [HumanMessage(content="weather in Berlin?"), AIMessage(content="Sunny, 21°C")]
+        trains = [HumanMessage(content="next train to Munich?"), AIMessage(content="At 14:05")]
+        _, probe = await cache.lookup("and tomorrow?", "", {}, weather)
+        await cache.store(probe, "Rain, 15°C", {"location"})
+
+        assert (await cache.lookup("and tomorrow?", "", {}, trains))[0] is None
+        assert (await cache.lookup("and tomorrow?", "", {}))[0] is None
+        assert (await cache.lookup("and tomorrow?", "", {}, weather))[0]["response"] == "Rain, 15°C"
+
+    async def test_answers_without_agents_are_not_stored(self, cache):
+        _, probe = await cache.lookup("thanks!", "", {})
+        assert not await cache.store(probe, "You're welcome!", set())
+
+    async def test_side_effect_agents_are_not_stored(self, cache, db):
+        from response_cache import stats
+        _, probe = await cache.lookup("write a report", "", {})
+        assert not await cache.store(probe, "Saved report.pdf", {"research", "documents"})
+        assert stats(db)["entries"] == 0
+
+    async def test_expired_entries_miss(self, cache, db, monkeypatch):
+        import response_cache
+        _, probe = await cache.lookup("top tech headlines", "", {})
+        await cache.store(probe, "old", {"research"})
+
+        real_time = response_cache.time.time
+        monkeypatch.setattr(response_cache.time, "time", lambda: real_time() + 3600)
+        assert (await cache.lookup("top tech headlines", "", {}))[0] is None
+
+    async def test_embedding_failure_falls_back_to_exact(self, db):
+        from response_cache import ResponseCache
+
+        async def broken(text):
+            raise RuntimeError("no network")
+
+        cache = ResponseCache(embed=broken, db_path=db)
+        _, probe = await cache.lookup("top tech headlines", "", {})
+        assert await cache.store(probe, "Headlines", {"knowledge"})
+        assert (await cache.lookup("top tech headlines", "", {}))[0]["response"] == "Headlines"
+        assert (await cache.lookup("tech headlines", "", {}))[0] is None
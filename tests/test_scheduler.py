@@ -7,6 +7,7 @@ tool-facing functions (schedule_task, list_scheduled_tasks, cancel_scheduled_tas
 Run with:  pytest tests/test_scheduler.py -v --tb=short
 """
 
+import asyncio
 import os
 
 import pytest
@@ -97,6 +98,88 @@ class TestDatabaseHelpers:
         assert _get_task("nope", db_path=db) is None
 
 
+# ===================================================================
+# Change counter, bulk operations and indexes
+# ===================================================================
+
+class TestBulkAndVersion:
+    """Tests for tasks_version and the bulk enable/disable/delete helpers."""
+
+    def test_every_change_bumps_the_version(self, db):
+        from scheduler import _add_task, _list_tasks, _set_task_enabled, tasks_version
+        start = tasks_version(db_path=db)
+        task_id = _add_task("Check news", "0 8 * * *", db_path=db)
+        added = tasks_version(db_path=db)
+        _list_tasks(db_path=db)
+        assert tasks_version(db_path=db) == added > start
+        _set_task_enabled(task_id, False, db_path=db)
+        assert tasks_version(db_path=db) > added
+
+    def test_version_sees_other_connections(self, db):
+        import sqlite3
+        from scheduler import _add_task, tasks_version
+        task_id = _add_task("Check news", "0 8 * * *", db_path=db)
+        before = tasks_version(db_path=db)
+        conn = sqlite3.connect(db)  # e.g. a task_worker process
+        conn.execute("UPDATE scheduled_tasks SET last_result = 'x' WHERE id = ?", (task_id,))
+        conn.commit()
+        conn.close()
+        assert tasks_version(db_path=db) == before + 1
+
+    def test_bulk_enable_disable(self, db):
+        from scheduler import _add_task, _get_task, _set_tasks_enabled, tasks_version
+        ids = [_add_task(f"t{i}", "0 8 * * *", db_path=db) for i in range(3)]
+        assert _set_tasks_enabled(ids[:2] + ["nope"], False, db_path=db) == ids[:2]
+        assert [_get_task(i, db_path=db)["enabled"] for i in ids] == [0, 0, 1]
+        # Tasks already in the requested state are left alone
+        version = tasks_version(db_path=db)
+        assert _set_tasks_enabled(ids[2:], True, db_path=db) == ids[2:]
+        assert tasks_version(db_path=db) == version
+
+    def test_bulk_delete_removes_runs(self, db):
+        from scheduler import _add_task, _finish_run, _list_runs, _list_tasks, _remove_tasks
+        ids = [_add_task(f"t{i}", "0 8 * * *", db_path=db) for i in range(3)]
+        _finish_run(_run(db, ids[0]), "ok", "done", db_path=db)
+        assert _remove_tasks([ids[0], ids[1], "nope"], db_path=db) == ids[:2]
+        assert [t["id"] for t in _list_tasks(db_path=db)] == [ids[2]]
+        assert _list_runs(db_path=db) == []
+
+    def test_update_tasks_syncs_the_runner(self, db, monkeypatch):
+        import scheduler
+        monkeypatch.setattr(scheduler, "DB_PATH", db)
+        runner = scheduler.TaskRunner()
+        monkeypatch.setattr(scheduler, "_runner", runner)
+        ids = [scheduler._add_task(f"t{i}", "0 8 * * *") for i in range(2)]
+        for task_id in ids:
+            runner.add(task_id)
+
+        assert scheduler.update_tasks("disable", ids) == ids
+        assert runner._scheduler.get_jobs() == []
+        scheduler.update_tasks("enable", ids[:1])
+        jobs = [job.id for job in runner._scheduler.get_jobs()]
+        with pytest.raises(ValueError):
+            scheduler.update_tasks("archive", ids)
+        scheduler.close()
+        assert jobs == ids[:1]
+
+    def test_queries_use_indexes(self, db):
+        import sqlite3
+        from scheduler import _TASK_COLUMNS, _add_task
+        _add_task("Check news", "0 8 * * *", db_path=db)
+        conn = sqlite3.connect(db)
+        plans = {
+            name: " ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", args))
+            for name, sql, args in [
+                ("list", f"SELECT {_TASK_COLUMNS} FROM scheduled_tasks ORDER BY created_at DESC", ()),
+                ("due", "SELECT id FROM scheduled_tasks WHERE enabled = 1 AND next_run_at <= ?", (0,)),
+            ]
+        }
+        conn.close()
+        assert "idx_scheduled_tasks_created" in plans["list"]
+        assert "idx_task_runs_live" in plans["list"]
+        assert "idx_scheduled_tasks_due" in plans["due"]
+
+
 # ===================================================================
 # Cron validation
 # ===================================================================
@@ -268,6 +351,803 @@ class TestCancelScheduledTask:
         assert "cancelled" in result.lower()
 
 
+# ===================================================================
+# Schema migration
+# ===================================================================
+
+class TestSchemaMigration:
+    """Databases created before a column existed get it on connect."""
+
+    def test_priority_column_is_added(self, db):
+        import sqlite3
+        from scheduler import _get_task
+        conn = sqlite3.connect(db)
+        conn.execute(
+            "CREATE TABLE scheduled_tasks (id TEXT PRIMARY KEY, description TEXT NOT NULL, "
+            "cron_expr TEXT NOT NULL, created_at TEXT NOT NULL, enabled INTEGER NOT NULL DEFAULT 1, "
+            "last_run TEXT, last_result TEXT, notify INTEGER NOT NULL DEFAULT 0)"
+        )
+        conn.execute("INSERT INTO scheduled_tasks (id, description, cron_expr, created_at) "
+                     "VALUES ('old1', 'Old task', '0 8 * * *', '2024-01-01')")
+        conn.commit()
+        conn.close()
+
+        assert _get_task("old1", db_path=db)["priority"] == 0
+
+
+# ===================================================================
+# TaskPool — bounded execution
+# ===================================================================
+
+class _Recorder:
+    """Stand-in for _execute_task that records order and peak concurrency."""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.order = []
+        self.active = 0
+        self.peak = 0
+
+    async def __call__(self, task_id):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        self.order.append(task_id)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+
+
+class TestTaskPool:
+    """Tests for concurrency limits, priority, overlap and backpressure."""
+
+    async def test_storm_runs_at_most_pool_size_at_once(self):
+        from scheduler import TaskPool
+        run = _Recorder()
+        pool = TaskPool(size=2, max_queued=50, execute=run)
+        pool.start()
+        for i in range(10):
+            assert pool.submit(f"t{i}")
+        await pool.join()
+        pool.stop()
+
+        assert run.peak == 2
+        assert len(run.order) == 10
+        stats = pool.stats()
+        assert (stats["completed"], stats["max_depth"], stats["running"]) == (10, 10, 0)
+        assert stats["wait_max_ms"] >= stats["wait_p50_ms"] > 0
+
+    async def test_higher_priority_runs_first(self):
+        from scheduler import TaskPool
+        run = _Recorder()
+        pool = TaskPool(size=1, execute=run)
+        pool.submit("low-1")
+        pool.submit("low-2")
+        pool.submit("urgent", priority=5)
+        pool.start()
+        await pool.join()
+        pool.stop()
+        assert run.order == ["urgent", "low-1", "low-2"]
+
+    async def test_same_task_never_overlaps(self):
+        from scheduler import TaskPool
+        run = _Recorder(delay=0.05)
+        pool = TaskPool(size=4, execute=run)
+        pool.start()
+        assert pool.submit("daily")
+        await asyncio.sleep(0.01)
+        assert not pool.submit("daily")
+        await pool.join()
+        assert pool.submit("daily")
+        await pool.join()
+        pool.stop()
+        assert run.order == ["daily", "daily"]
+        assert pool.stats()["skipped_overlap"] == 1
+
+    async def test_is_pending_while_queued_or_running(self):
+        from scheduler import TaskPool
+        pool = TaskPool(size=1, execute=_Recorder(delay=0.01))
+        assert not pool.is_pending("daily")
+        pool.submit("daily")
+        assert pool.is_pending("daily")
+        pool.start()
+        await pool.join()
+        pool.stop()
+        assert not pool.is_pending("daily")
+
+    async def test_full_queue_drops_fires(self):
+        from scheduler import TaskPool
+        pool = TaskPool(size=1, max_queued=2, execute=_Recorder())
+        results = [pool.submit(f"t{i}") for i in range(4)]
+        assert results == [True, True, False, False]
+        assert pool.stats()["rejected"] == 2
+
+    async def test_runner_fire_uses_task_priority(self, db, monkeypatch):
+        import scheduler
+        monkeypatch.setattr(scheduler, "DB_PATH", db)
+        task_id = scheduler._add_task("Urgent check", "0 8 * * *", priority=3)
+        runner = scheduler.TaskRunner()
+        submitted = []
+        monkeypatch.setattr(runner.pool, "submit", lambda t, p=0, m=1: submitted.append((t, p, m)))
+
+        await runner._fire(task_id)
+        scheduler._set_task_enabled(task_id, False)
+        await runner._fire(task_id)
+        scheduler.close()
+        assert submitted == [(task_id, 3, 1)]
+
+
+# ===================================================================
+# Claims — _claim_due_tasks, _claim_task, _execute_task
+# ===================================================================
+
+def _due(db, description="Check news", cron="*/5 * * * *", **policy):
+    """Add a task without jitter and return (task_id, a time at which it is due)."""
+    from scheduler import _add_task, _get_task
+    policy.setdefault("jitter_seconds", 0)
+    task_id = _add_task(description, cron, db_path=db, **policy)
+    return task_id, _get_task(task_id, db_path=db)["next_run_at"] + 1
+
+
+def _run(db, task_id, owner="w"):
+    """Claim a run of *task_id* (made due first) and return its ID."""
+    import sqlite3
+    import time
+    from scheduler import _claim_task
+    now = time.time()
+    conn = sqlite3.connect(db)
+    conn.execute("UPDATE scheduled_tasks SET next_run_at = ? WHERE id = ?", (now - 1, task_id))
+    conn.commit()
+    conn.close()
+    run_id, _ = _claim_task(task_id, owner, now=now, db_path=db)
+    return run_id
+
+
+class TestClaims:
+    """Tests for claiming runs so that no two runners execute the same fire."""
+
+    def test_new_task_gets_next_run(self, db):
+        import time
+        task_id, due = _due(db)
+        assert time.time() < due <= time.time() + 5 * 60 + 1
+
+    def test_two_runners_never_claim_the_same_fire(self, db):
+        from scheduler import _claim_due_tasks, _get_task, _list_runs
+        task_id, due = _due(db)
+        first = _claim_due_tasks("worker-a", 10, now=due, db_path=db)
+        second = _claim_due_tasks("worker-b", 10, now=due, db_path=db)
+
+        assert [t["id"] for t in first] == [task_id]
+        assert second == []
+        runs = _list_runs(task_id, db_path=db)
+        assert [(r["id"], r["runner"], r["status"]) for r in runs] == [(first[0]["run_id"], "worker-a", "queued")]
+        assert _get_task(task_id, db_path=db)["next_run_at"] > due
+
+    def test_expired_lease_frees_the_instance(self, db, monkeypatch):
+        import scheduler
+        monkeypatch.setattr(scheduler, "SCHEDULER_LEASE_SECONDS", 60)
+        task_id, due = _due(db, cron="* * * * *")
+        scheduler._claim_due_tasks("crashed", 10, now=due, db_path=db)
+        # The next fire is due, but the crashed worker's run still holds its lease
+        assert scheduler._claim_due_tasks("worker-b", 10, now=due + 59, db_path=db) == []
+        claimed = scheduler._claim_due_tasks("worker-b", 10, now=due + 61, db_path=db)
+        assert [t["id"] for t in claimed] == [task_id]
+
+    def test_claims_follow_priority_and_limit(self, db):
+        from scheduler import _claim_due_tasks, _set_task_enabled
+        low, due = _due(db, "low")
+        high, _ = _due(db, "high", priority=5)
+        off, _ = _due(db, "off", priority=9)
+        _set_task_enabled(off, False, db_path=db)
+
+        assert [t["id"] for t in _claim_due_tasks("w", 1, now=due, db_path=db)] == [high]
+        assert [t["id"] for t in _claim_due_tasks("w", 5, now=due, db_path=db)] == [low]
+
+    def test_claim_task_only_once_per_fire(self, db):
+        from scheduler import _claim_task, _release_run
+        task_id, due = _due(db)
+        run_id, _ = _claim_task(task_id, "worker-a", now=due, db_path=db)
+        assert run_id is not None
+        assert _claim_task(task_id, "worker-b", now=due, db_path=db) == (None, 0.0)
+        _release_run(run_id, db_path=db)
+        # Released, but this fire has already run
+        assert _claim_task(task_id, "worker-b", now=due, db_path=db) == (None, 0.0)
+
+    async def test_execute_skips_fire_run_elsewhere(self, db, monkeypatch):
+        import scheduler
+        monkeypatch.setattr(scheduler, "DB_PATH", db)
+        task_id, due = _due(db)
+        runs = []
+
+        async def fake_run(tid, run_id):
+            runs.append(run_id)
+
+        monkeypatch.setattr(scheduler, "_run_task", fake_run)
+        claimed = scheduler._claim_due_tasks("worker-a", 10, now=due)
+        await scheduler._execute_task(task_id)
+        await scheduler._execute_task(task_id, run_id=claimed[0]["run_id"])
+        statuses = [r["status"] for r in scheduler._list_runs(task_id)]
+        scheduler.close()
+        assert runs == [claimed[0]["run_id"]]
+        # fake_run never finished the run, so releasing it cancels it
+        assert statuses == ["cancelled"]
+
+
+# ===================================================================
+# Run policies — jitter, misfire grace, coalescing, instances, rate limits
+# ===================================================================
+
+class TestRunPolicies:
+    """Tests for the per-task run policies."""
+
+    def test_jitter_delays_next_run(self, db):
+        from scheduler import _add_task, _get_task, _next_fire
+        import time
+        task_id = _add_task("Report", "0 8 * * *", jitter_seconds=120, db_path=db)
+        fire = _next_fire("0 8 * * *", time.time())
+        assert fire <= _get_task(task_id, db_path=db)["next_run_at"] <= fire + 120
+
+    def test_fire_later_than_grace_is_skipped(self, db):
+        from scheduler import _claim_due_tasks, _get_task
+        task_id, due = _due(db, cron="0 8 * * *", misfire_grace_seconds=300)
+        assert _claim_due_tasks("w", 10, now=due + 600, db_path=db) == []
+        assert _get_task(task_id, db_path=db)["next_run_at"] > due + 600
+
+    def test_missed_runs_skipped_at_start(self, db):
+        from scheduler import _get_task, _skip_missed_runs
+        late, due = _due(db, cron="0 8 * * *", misfire_grace_seconds=300)
+        recent, _ = _due(db, cron="0 8 * * *", misfire_grace_seconds=3600)
+        assert _skip_missed_runs(now=due + 600, db_path=db) == 1
+        assert _get_task(late, db_path=db)["next_run_at"] > due + 600
+        assert _get_task(recent, db_path=db)["next_run_at"] < due
+
+    def test_coalesce_runs_missed_fires_once(self, db):
+        from scheduler import _claim_due_tasks, _get_task
+        task_id, due = _due(db, cron="* * * * *", misfire_grace_seconds=3600)
+        # Five fires are due; one run stands in for all of them
+        assert len(_claim_due_tasks("w", 10, now=due + 240, db_path=db)) == 1
+        assert _get_task(task_id, db_path=db)["next_run_at"] > due + 240
+
+    def test_without_coalesce_missed_fires_run_in_turn(self, db):
+        from scheduler import _claim_due_tasks, _get_task
+        task_id, due = _due(db, cron="* * * * *", misfire_grace_seconds=3600,
+                            coalesce=False, max_instances=5)
+        for _ in range(3):
+            assert len(_claim_due_tasks("w", 10, now=due + 120, db_path=db)) == 1
+        assert _claim_due_tasks("w", 10, now=due + 120, db_path=db) == []
+        assert _get_task(task_id, db_path=db)["next_run_at"] > due + 120
+
+    def test_max_instances_caps_live_runs(self, db):
+        from scheduler import _claim_due_tasks, _finish_run
+        task_id, due = _due(db, cron="* * * * *", max_instances=2)
+        first = _claim_due_tasks("a", 10, now=due, db_path=db)
+        second = _claim_due_tasks("b", 10, now=due + 60, db_path=db)
+        assert len(first) == len(second) == 1
+        assert _claim_due_tasks("c", 10, now=due + 120, db_path=db) == []
+        _finish_run(first[0]["run_id"], "ok", "done", db_path=db)
+        assert len(_claim_due_tasks("c", 10, now=due + 121, db_path=db)) == 1
+
+    def test_api_rate_limit_defers_runs(self, db, monkeypatch):
+        import scheduler
+        monkeypatch.setattr(scheduler, "SCHEDULER_API_RATE_LIMITS", {"search": (2, 60), "llm": (100, 60)})
+        ids = [_due(db, f"search {i}", apis="llm,search")[0] for i in range(3)]
+        other, due = _due(db, "llm only", apis="llm")
+
+        claimed = {t["id"] for t in scheduler._claim_due_tasks("w", 10, now=due, db_path=db)}
+        assert other in claimed
+        waiting = set(ids) - claimed
+        assert len(waiting) == 1
+        waiting = waiting.pop()
+        run_id, wait = scheduler._claim_task(waiting, "w", now=due + 10, db_path=db)
+        assert run_id is None and wait == pytest.approx(50)
+        assert scheduler._claim_task(waiting, "w", now=due + 61, db_path=db)[0] is not None
+
+    def test_schedule_task_validates_policy(self, db, monkeypatch):
+        import scheduler
+        monkeypatch.setattr(scheduler, "DB_PATH", db)
+        assert scheduler.schedule_task("x", "0 8 * * *", max_instances=0).startswith("Error")
+        assert "unknown API(s) twitter" in scheduler.schedule_task("x", "0 8 * * *", apis="llm,twitter")
+        output = scheduler.schedule_task("x", "0 8 * * *", jitter_seconds=30, coalesce=False, apis="search")
+        scheduler.close()
+        assert "Policy: jitter 30s, grace 300s, catch up, max 1 at once, APIs: search" in output
+
+    def test_runner_job_uses_task_policy(self, db, monkeypatch):
+        import scheduler
+        import time
+        monkeypatch.setattr(scheduler, "DB_PATH", db)
+        task_id = scheduler._add_task("Report", "0 8 * * *", jitter_seconds=45,
+                                      misfire_grace_seconds=900, coalesce=False)
+        missed = time.time() - 3600
+        scheduler._get_connection().execute(
+            "UPDATE scheduled_tasks SET next_run_at = ? WHERE id = ?", (missed, task_id))
+        runner = scheduler.TaskRunner()
+        runner._register_job(scheduler._get_task(task_id))
+        job = runner._scheduler.get_job(task_id)
+        scheduler.close()
+
+        assert (job.trigger.jitter, job.misfire_grace_time, job.coalesce) == (45, 900, False)
+        assert job.next_run_time.timestamp() == pytest.approx(missed)
+
+
+# ===================================================================
+# Monitoring tasks — pre-check, skip when unchanged
+# ===================================================================
+
+class _FakeSidekick:
+    """Stands in for sidekick.Sidekick; makes the (tool, input) calls in ``tool_calls``
+    and answers every prompt with a fixed reply."""
+    prompts: list = []
+    tool_calls: list = []
+
+    def __init__(self, session_id):
+        from langchain_core.chat_history import InMemoryChatMessageHistory
+        self.callbacks = []
+        self.chat_history = InMemoryChatMessageHistory()
+
+    async def setup(self, include_browser=True):
+        pass
+
+    async def stream_deltas(self, prompt, success_criteria, bypass_cache=False):
+        from langchain_core.messages import AIMessage
+        self.prompts.append(prompt)
+        for tool, tool_input in self.tool_calls:
+            await tool.ainvoke(tool_input, {"callbacks": self.callbacks})
+        self.chat_history.add_message(AIMessage(content="Version 2 is out."))
+        yield "Version 2 is out."
+
+    def cleanup(self):
+        pass
+
+
+class TestMonitoring:
+    """Tests for running monitoring tasks only when their source changed."""
+
+    @pytest.fixture
+    def env(self, db, monkeypatch):
+        """scheduler on *db* with a fake Sidekick, source and push; returns (scheduler, source, pushes)."""
+        import sys
+        import types
+        import scheduler
+        import tools.system
+        monkeypatch.setattr(scheduler, "DB_PATH", db)
+        _FakeSidekick.prompts = []
+        _FakeSidekick.tool_calls = []
+        monkeypatch.setitem(sys.modules, "sidekick", types.SimpleNamespace(Sidekick=_FakeSidekick))
+        source = {"text": "Version 1"}
+        monkeypatch.setattr(scheduler.monitoring, "observe", lambda monitor: source["text"])
+        pushes = []
+        monkeypatch.setattr(tools.system, "push", pushes.append)
+        yield scheduler, source, pushes
+        scheduler.close()
+
+    async def _check(self, scheduler, db, task_id):
+        run_id = _run(db, task_id)
+        await scheduler._run_task(task_id, run_id)
+        return scheduler._list_runs(task_id)[0]
+
+    async def test_agent_runs_only_on_change(self, env, db):
+        scheduler, source, pushes = env
+        task_id = scheduler._add_task("Tell me about new releases", "0 * * * *", notify=True,
+                                      monitor="https://example.com/releases")
+
+        first = await self._check(scheduler, db, task_id)
+        assert first["status"] == "ok"
+        assert "Version 1" in _FakeSidekick.prompts[0]
+        assert pushes == []  # the first run only sets the baseline
+
+        unchanged = await self._check(scheduler, db, task_id)
+        assert unchanged["status"] == "unchanged"
+        assert len(_FakeSidekick.prompts) == 1
+        assert scheduler._get_task(task_id)["last_result"] == "Version 2 is out."
+
+        source["text"] = "Version 2"
+        changed = await self._check(scheduler, db, task_id)
+        assert changed["status"] == "ok"
+        assert "has changed since the last run" in _FakeSidekick.prompts[1]
+        assert len(pushes) == 1 and "Version 2 is out." in pushes[0]
+
+    async def test_failed_pre_check_is_an_error_run(self, env, db, monkeypatch):
+        scheduler, _, _ = env
+
+        def offline(monitor):
+            raise OSError("offline")
+
+        monkeypatch.setattr(scheduler.monitoring, "observe", offline)
+        task_id = scheduler._add_task("Watch", "0 * * * *", monitor="https://example.com")
+        run = await self._check(scheduler, db, task_id)
+        assert run["status"] == "error"
+        assert "pre-check of page https://example.com failed: offline" in run["preview"]
+        assert _FakeSidekick.prompts == []
+
+    def test_search_monitor_uses_search_api(self, env):
+        scheduler, _, _ = env
+        output = scheduler.schedule_task("Watch releases", "0 * * * *", monitor="python release")
+        task = scheduler._list_tasks()[0]
+        assert task["apis"] == "llm,search"
+        assert "Monitoring: web search for 'python release'" in output
+        assert "Monitoring: web search for 'python release' (runs only on change)" in \
+            scheduler.list_scheduled_tasks()
+
+
+class TestTaskPlans:
+    """Tests for capturing a task's tool-call plan and replaying it on later runs."""
+
+    @pytest.fixture
+    def env(self, db, monkeypatch):
+        """scheduler on *db* with a fake Sidekick making one search and a fake replay summary."""
+        import sys
+        import types
+        from langchain_core.messages import AIMessage
+        from langchain_core.tools import Tool
+        import scheduler
+        monkeypatch.setattr(scheduler, "DB_PATH", db)
+        search = Tool(name="search", func=lambda q: f"news about {q}", description="search")
+        _FakeSidekick.prompts = []
+        _FakeSidekick.tool_calls = [(search, "python release")]
+        monkeypatch.setitem(sys.modules, "sidekick", types.SimpleNamespace(Sidekick=_FakeSidekick))
+        monkeypatch.setattr(scheduler.task_plans, "replay_tools", lambda: {"search": search})
+        summaries = []
+
+        class FakeChat:
+            async def ainvoke(self, messages, config=None):
+                summaries.append(messages[-1].content)
+                return AIMessage(content="Replayed summary.")
+
+        monkeypatch.setattr(scheduler.task_plans, "chat_model", lambda tier: FakeChat())
+        yield scheduler, summaries
+        scheduler.close()
+
+    async def _check(self, scheduler, db, task_id):
+        run_id = _run(db, task_id)
+        await scheduler._run_task(task_id, run_id)
+        return scheduler._list_runs(task_id)[0]
+
+    async def test_full_run_captures_plan_and_later_runs_replay_it(self, env, db):
+        scheduler, summaries = env
+        task_id = scheduler._add_task("Summarise Python news", "0 8 * * *")
+
+        first = await self._check(scheduler, db, task_id)
+        assert (first["status"], first["replayed"]) == ("ok", 0)
+        assert scheduler._get_task(task_id)["plan"] == '[{"tool": "search", "args": "python release"}]'
+
+        second = await self._check(scheduler, db, task_id)
+        assert (second["status"], second["replayed"]) == ("ok", 1)
+        assert len(_FakeSidekick.prompts) == 1
+        assert "news about python release" in summaries[0]
+        task = scheduler._get_task(task_id)
+        assert (task["last_result"], task["plan_replays"]) == ("Replayed summary.", 1)
+        assert "Plan: 1 tool call(s) (search), replayed 1/20 times" in scheduler.list_scheduled_tasks()
+
+    async def test_failed_replay_falls_back_to_full_run(self, env, db):
+        scheduler, _ = env
+        task_id = scheduler._add_task("Summarise Python news", "0 8 * * *")
+        scheduler._set_plan(task_id, [{"tool": "wikipedia", "args": "Python"}])
+
+        run = await self._check(scheduler, db, task_id)
+        assert (run["status"], run["replayed"]) == ("ok", 0)
+        assert len(_FakeSidekick.prompts) == 1
+        # The full run re-planned the task
+        assert '"search"' in scheduler._get_task(task_id)["plan"]
+
+    async def test_plan_is_refreshed_after_max_replays(self, env, db, monkeypatch):
+        scheduler, _ = env
+        monkeypatch.setattr(scheduler, "TASK_PLAN_MAX_REPLAYS", 1)
+        task_id = scheduler._add_task("Summarise Python news", "0 8 * * *")
+        statuses = [(await self._check(scheduler, db, task_id))["replayed"] for _ in range(4)]
+        assert statuses == [0, 1, 0, 1]
+
+    async def test_side_effect_runs_are_not_planned(self, env, db):
+        from langchain_core.tools import Tool
+        scheduler, _ = env
+        writer = Tool(name="write_file", func=lambda p: "written", description="write")
+        _FakeSidekick.tool_calls.append((writer, "report.txt"))
+        task_id = scheduler._add_task("Write a news report", "0 8 * * *")
+        await self._check(scheduler, db, task_id)
+        await self._check(scheduler, db, task_id)
+        assert scheduler._get_task(task_id)["plan"] is None
+        assert len(_FakeSidekick.prompts) == 2
+
+
+# ===================================================================
+# Run history — task_runs, retention, run_stats
+# ===================================================================
+
+class TestRunHistory:
+    """Tests for recording runs, compacting them and summarising durations."""
+
+    def _age(self, db, run_id, seconds):
+        """Move a run *seconds* into the past."""
+        import sqlite3
+        conn = sqlite3.connect(db)
+        conn.execute("UPDATE task_runs SET started_at = started_at - ?, finished_at = finished_at - ? "
+                     "WHERE id = ?", (seconds, seconds, run_id))
+        conn.commit()
+        conn.close()
+
+    def test_finish_records_run_and_latest_result(self, db):
+        from scheduler import _add_task, _finish_run, _get_run_result, _get_task, _list_runs, _start_run
+        task_id = _add_task("Report", "0 8 * * *", db_path=db)
+        run_id = _run(db, task_id, "worker-a")
+        assert _list_runs(task_id, db_path=db)[0]["status"] == "queued"
+        _start_run(run_id, db_path=db)
+        assert _list_runs(task_id, db_path=db)[0]["status"] == "running"
+
+        _finish_run(run_id, "ok", "x" * 5000, input_tokens=1200, output_tokens=300, db_path=db)
+        run = _list_runs(task_id, db_path=db)[0]
+        assert (run["status"], run["runner"], run["input_tokens"], run["output_tokens"]) == \
+            ("ok", "worker-a", 1200, 300)
+        assert run["duration_ms"] >= 0
+        assert run["lease_expires_at"] is None
+        assert len(run["preview"]) == 200
+        assert _get_run_result(run_id, db_path=db) == "x" * 5000
+        assert len(_get_task(task_id, db_path=db)["last_result"]) == 2000
+
+    def test_old_results_are_compacted_to_previews(self, db, monkeypatch):
+        import scheduler
+        monkeypatch.setattr(scheduler, "TASK_RUN_RESULTS_PER_TASK", 2)
+        task_id = scheduler._add_task("Report", "0 8 * * *", db_path=db)
+        run_ids = []
+        for i in range(4):
+            run_id = _run(db, task_id)
+            self._age(db, run_id, 100 - i)
+            scheduler._finish_run(run_id, "ok", f"result {i}", db_path=db)
+            run_ids.append(run_id)
+
+        assert [scheduler._get_run_result(r, db_path=db) for r in run_ids] == \
+            [None, None, "result 2", "result 3"]
+        assert len(scheduler._list_runs(task_id, db_path=db)) == 4
+
+    def test_runs_past_retention_are_deleted(self, db, monkeypatch):
+        import scheduler
+        monkeypatch.setattr(scheduler, "TASK_RUNS_RETENTION_DAYS", 30)
+        task_id = scheduler._add_task("Report", "0 8 * * *", db_path=db)
+        old = _run(db, task_id)
+        scheduler._finish_run(old, "ok", "old", db_path=db)
+        self._age(db, old, 31 * 86400)
+        scheduler._finish_run(_run(db, task_id), "ok", "new", db_path=db)
+
+        assert [r["preview"] for r in scheduler._list_runs(task_id, db_path=db)] == ["new"]
+        assert scheduler._get_run_result(old, db_path=db) is None
+
+    def test_runs_with_expired_leases_are_abandoned(self, db):
+        import sqlite3
+        import scheduler
+        task_id = scheduler._add_task("Report", "* * * * *", max_instances=2, db_path=db)
+        crashed = _run(db, task_id, "crashed")
+        _run(db, task_id, "alive")
+        conn = sqlite3.connect(db)
+        conn.execute("UPDATE task_runs SET lease_expires_at = 1 WHERE id = ?", (crashed,))
+        conn.commit()
+        conn.close()
+
+        assert scheduler._compact_runs(db_path=db)["abandoned"] == 1
+        statuses = {r["runner"]: r["status"] for r in scheduler._list_runs(task_id, db_path=db)}
+        assert statuses == {"alive": "queued", "crashed": "abandoned"}
+        assert not scheduler._renew_lease(crashed, db_path=db)
+
+    def test_run_stats_and_concurrency(self, db):
+        import sqlite3
+        import time
+        from scheduler import _add_task, run_stats
+        slow = _add_task("Slow", "0 8 * * *", db_path=db)
+        fast = _add_task("Fast", "0 9 * * *", db_path=db)
+        t0 = time.time() - 3600
+        conn = sqlite3.connect(db)
+        conn.executemany(
+            "INSERT INTO task_runs (task_id, started_at, finished_at, duration_ms, status, input_tokens) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(slow, t0, t0 + 60, 60_000, "ok", 100), (slow, t0 + 100, t0 + 220, 120_000, "error", 50),
+             (fast, t0 + 10, t0 + 15, 5_000, "ok", 10), (fast, t0 + 60, t0 + 62, 2_000, "ok", 10)],
+        )
+        conn.commit()
+        conn.close()
+
+        stats = run_stats(since_hours=2, db_path=db)
+        assert (stats["runs"], stats["failed"], stats["peak_concurrency"]) == (4, 1, 2)
+        assert stats["mean_concurrency"] == pytest.approx(187 / 7200, abs=1e-3)
+        first = stats["tasks"][0]
+        assert (first["task_id"], first["runs"], first["failed"], first["max_ms"]) == (slow, 2, 1, 120_000)
+        assert (first["last_status"], first["input_tokens"]) == ("error", 150)
+
+    def test_list_shows_recent_runs(self, db, monkeypatch):
+        import scheduler
+        monkeypatch.setattr(scheduler, "DB_PATH", db)
+        task_id = scheduler._add_task("Report", "0 8 * * *")
+        scheduler._finish_run(_run(db, task_id), "error", "Error: boom")
+        output = scheduler.list_scheduled_tasks()
+        scheduler.close()
+        assert "Recent runs: error 0s" in output
+
+    def test_remove_task_deletes_its_runs(self, db):
+        from scheduler import _add_task, _finish_run, _get_run_result, _list_runs, _remove_task
+        task_id = _add_task("Report", "0 8 * * *", db_path=db)
+        run_id = _run(db, task_id)
+        _finish_run(run_id, "ok", "done", db_path=db)
+        _remove_task(task_id, db_path=db)
+        assert _list_runs(db_path=db) == []
+        assert _get_run_result(run_id, db_path=db) is None
+
+
+# ===================================================================
+# Event triggers — job status, indexing and file changes
+# ===================================================================
+
+class TestEventTriggers:
+    """Tests for tasks run on events instead of a cron schedule."""
+
+    @pytest.fixture
+    def env(self, db, monkeypatch):
+        """scheduler on *db*, listening for events, with a fake Sidekick."""
+        import sys
+        import types
+        import scheduler
+        monkeypatch.setattr(scheduler, "DB_PATH", db)
+        _FakeSidekick.prompts = []
+        _FakeSidekick.tool_calls = []
+        monkeypatch.setitem(sys.modules, "sidekick", types.SimpleNamespace(Sidekick=_FakeSidekick))
+        scheduler.listen_for_events()
+        yield scheduler
+        scheduler.stop_listening()
+        scheduler.close()
+
+    def test_schedule_event_task(self, env):
+        scheduler = env
+        assert scheduler.schedule_task("x").startswith("Error: 'cron' expression is required")
+        assert "not both" in scheduler.schedule_task("x", "0 8 * * *", event="kb_indexed")
+        assert "needs a glob" in scheduler.schedule_task("x", event="file")
+        assert "unknown event 'email'" in scheduler.schedule_task("x", event="email:*")
+
+        output = scheduler.schedule_task("Summarise new documents", event="kb_indexed")
+        assert "Schedule: on kb_indexed:* (runs when the knowledge base indexes '*')" in output
+        task = scheduler._list_tasks()[0]
+        assert (task["cron_expr"], task["event"], task["next_run_at"]) == ("", "kb_indexed:*", None)
+        # No event yet: nothing is due, and no cron schedule is backfilled
+        assert scheduler._claim_due_tasks("w", 10) == []
+        assert scheduler._get_task(task["id"])["next_run_at"] is None
+
+    async def test_event_makes_a_run_due_that_gets_the_events(self, env):
+        from events import emit
+        scheduler = env
+        offer = scheduler._add_task("Prepare negotiation notes", "", event="job_status:offer")
+        scheduler._add_task("Other", "", event="job_status:rejected")
+
+        emit("job_status", "offer", "job 1 (Engineer at Acme) moved to 'offer'")
+        emit("job_status", "offer", "job 2 (Analyst) moved to 'offer'")
+        emit("job_status", "interview", "job 3 moved to 'interview'")
+        assert scheduler._due_event_tasks() == [offer]
+
+        claimed = scheduler._claim_due_tasks("w", 10)
+        assert [t["id"] for t in claimed] == [offer]
+        assert scheduler._get_task(offer)["pending_events"] is None
+        assert scheduler._claim_due_tasks("w", 10) == []
+
+        await scheduler._run_task(offer, claimed[0]["run_id"])
+        prompt = _FakeSidekick.prompts[0]
+        assert "triggered because a job moves to status 'offer'" in prompt
+        assert "- job 1 (Engineer at Acme) moved to 'offer'\n- job 2 (Analyst) moved to 'offer'" in prompt
+        assert "job 3" not in prompt
+        assert scheduler._list_runs(offer)[0]["events"].count("\n") == 1
+        assert scheduler._get_task(offer)["plan"] is None  # event runs are not planned
+
+    def test_job_status_change_emits_event(self, env, tmp_path):
+        import jobs
+        scheduler = env
+        task_id = scheduler._add_task("Prep", "", event="job_status:interview")
+        jobs_db = str(tmp_path / "jobs.db")
+        job_id, _ = jobs.upsert_job(source="test", title="Engineer", company="Acme", db_path=jobs_db)
+        jobs.set_status(job_id, "interview", db_path=jobs_db)
+        task = scheduler._get_task(task_id)
+        assert task["next_run_at"] is not None
+        assert "(Engineer at Acme) moved to 'interview'" in task["pending_events"]
+
+    def test_file_trigger_fires_on_added_and_modified_files(self, env, tmp_path, monkeypatch):
+        import events
+        scheduler = env
+        monkeypatch.setattr(events, "SANDBOX_DIR", str(tmp_path))
+        (tmp_path / "knowledge").mkdir()
+        report = tmp_path / "knowledge" / "report.pdf"
+        report.write_text("v1")
+        task_id = scheduler._add_task("Summarise new PDFs", "", event="file:knowledge/*.pdf")
+
+        assert scheduler._scan_file_triggers() == []  # the first scan sets the baseline
+        assert scheduler._scan_file_triggers() == []
+        version = scheduler.tasks_version()
+        assert scheduler._scan_file_triggers() == [] and scheduler.tasks_version() == version
+
+        os.utime(report, (0, 1_000_000))
+        (tmp_path / "knowledge" / "new.pdf").write_text("new")
+        (tmp_path / "knowledge" / "notes.txt").write_text("ignored")
+        assert scheduler._scan_file_triggers() == [task_id]
+        pending = scheduler._get_task(task_id)["pending_events"]
+        assert "file knowledge/new.pdf was added" in pending
+        assert "file knowledge/report.pdf was modified" in pending
+        assert "notes.txt" not in pending
+        assert scheduler._due_event_tasks() == [task_id]
+
+    async def test_runner_fires_due_event_tasks(self, env, monkeypatch):
+        from events import emit
+        scheduler = env
+        runner = scheduler.TaskRunner()
+        fired = []
+
+        async def fire(task_id):
+            fired.append(task_id)
+
+        monkeypatch.setattr(runner, "_fire", fire)
+        task_id = scheduler._add_task("React", "", event="kb_indexed:*.pdf")
+        runner._register_job(scheduler._get_task(task_id))
+        assert runner._scheduler.get_jobs() == []  # no cron job for an event task
+
+        emit("kb_indexed", "paper.pdf", "indexed paper.pdf")
+        await runner._check_events()
+        assert fired == [task_id]
+
+
+# ===================================================================
+# Metrics — misfires, backlog, Prometheus text
+# ===================================================================
+
+class TestMetrics:
+    """Tests for scheduler health metrics."""
+
+    def test_misfires_are_counted(self, db):
+        from scheduler import _claim_due_tasks, _get_task, _skip_missed_runs
+        daily, due = _due(db, cron="0 8 * * *", misfire_grace_seconds=300)
+        assert _claim_due_tasks("w", 10, now=due + 600, db_path=db) == []
+        assert _get_task(daily, db_path=db)["misfires"] == 1
+
+        # Fires 0-2 minutes late are out of the grace time; one run covers the rest
+        minutely, due = _due(db, "minutely", cron="* * * * *", misfire_grace_seconds=90)
+        assert len(_claim_due_tasks("w", 10, now=due + 240, db_path=db)) == 1
+        assert _get_task(minutely, db_path=db)["misfires"] == 3
+
+        late, due = _due(db, "late", cron="0 8 * * *", misfire_grace_seconds=300)
+        _skip_missed_runs(now=due + 600, db_path=db)
+        assert _get_task(late, db_path=db)["misfires"] == 1
+
+    def test_metrics_report_backlog_and_durations(self, db):
+        import sqlite3
+        import time
+        from scheduler import _add_task, _set_task_enabled, scheduler_metrics
+        behind = _add_task("Behind", "0 8 * * *", db_path=db)
+        paused = _add_task("Paused", "0 9 * * *", db_path=db)
+        _set_task_enabled(paused, False, db_path=db)
+        now = time.time()
+        conn = sqlite3.connect(db)
+        conn.execute("UPDATE scheduled_tasks SET next_run_at = ?, misfires = 2 WHERE id = ?", (now - 120, behind))
+        conn.executemany(
+            "INSERT INTO task_runs (task_id, started_at, finished_at, duration_ms, status) VALUES (?, ?, ?, ?, ?)",
+            [(behind, now - 600, now - 590, 10_000, "ok"), (behind, now - 300, now - 270, 30_000, "error")],
+        )
+        conn.execute("INSERT INTO task_runs (task_id, started_at, status, lease_expires_at) "
+                     "VALUES (?, ?, 'running', ?)", (behind, now - 10, now + 60))
+        conn.commit()
+        conn.close()
+
+        m = scheduler_metrics(since_hours=1, db_path=db)
+        assert (m["enabled"], m["disabled"], m["due"], m["running"], m["misfires"]) == (1, 1, 1, 1, 2)
+        assert m["lag_seconds"] == pytest.approx(120, abs=5)
+        assert (m["runs"], m["failed"], m["pool"]) == (3, 1, None)
+        tasks = {t["task_id"]: t for t in m["tasks"]}
+        assert (tasks[behind]["p50_ms"], tasks[behind]["p95_ms"]) == (10_000, 30_000)
+        assert tasks[paused]["next_run_at"] is None and tasks[paused]["runs"] == 0
+
+    def test_metrics_text_is_prometheus_format(self, db, monkeypatch):
+        import re
+        import scheduler
+        task_id = scheduler._add_task("Report", "0 8 * * *", db_path=db)
+        scheduler._finish_run(_run(db, task_id), "ok", "done", db_path=db)
+        monkeypatch.setattr(scheduler, "_runner", scheduler.TaskRunner(pool_size=3))
+
+        text = scheduler.metrics_text(scheduler.scheduler_metrics(db_path=db))
+        samples = [line for line in text.splitlines() if not line.startswith("#")]
+        assert all(re.fullmatch(r'apexflow_scheduler_\w+(\{[^}]*\})? [-0-9.e+]+', line) for line in samples)
+        assert "# TYPE apexflow_scheduler_misfires_total counter" in text
+        assert "apexflow_scheduler_pool_workers 3" in samples
+        assert "apexflow_scheduler_queue_depth 0" in samples
+        assert f'apexflow_scheduler_task_runs{{task_id="{task_id}"}} 1' in samples
+        assert any(line.startswith(f'apexflow_scheduler_task_duration_seconds{{task_id="{task_id}",quantile="0.95"}}')
+                   for line in samples)
+
+
 # ===================================================================
 # Scheduler tools registered in tools/system.py
 # ===================================================================
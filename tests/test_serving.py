@@ -0,0 +1,189 @@
+"""
+Unit tests for serving.py — admission control, agent pool and shared runtime.
+
+Run with:  pytest tests/test_serving.py -v --tb=short
+"""
+
+import asyncio
+
+import pytest
+
+
+class _FakeSidekick:
+    """Records which thread each turn ran on and blocks until released."""
+
+    def __init__(self):
+        self.threads = []
+        self.release = asyncio.Event()
+
+    async def stream_deltas(self, message, success_criteria, thread_id=None, bypass_cache=False):
+        self.threads.append(thread_id)
+        yield {"op": "append", "message": {"role": "user", "content": message}}
+        await self.release.wait()
+        yield {"op": "append", "message": {"role": "assistant", "content": f"done {thread_id}"}}
+
+
+# ===================================================================
+# FairScheduler
+# ===================================================================
+
+class TestFairScheduler:
+    """Tests for bounded concurrency and per-user round-robin."""
+
+    async def test_admits_up_to_max_active_then_queues(self):
+        from serving import FairScheduler
+        scheduler = FairScheduler(max_active=2, max_queued=5)
+        release = asyncio.Event()
+
+        async def turn(user):
+            async with scheduler.slot(user):
+                await release.wait()
+
+        tasks = [asyncio.create_task(turn(f"u{i}")) for i in range(4)]
+        await asyncio.sleep(0)
+        assert scheduler.stats()["active"] == 2
+        assert scheduler.stats()["queued"] == 2
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert scheduler.stats() == {
+            "active": 0, "queued": 0, "waiting_users": 0, "admitted": 4, "rejected": 0,
+        }
+
+    async def test_rejects_when_queue_full(self):
+        from serving import FairScheduler, ServerBusy
+        scheduler = FairScheduler(max_active=1, max_queued=1)
+        release = asyncio.Event()
+
+        async def turn():
+            async with scheduler.slot("u"):
+                await release.wait()
+
+        tasks = [asyncio.create_task(turn()) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(ServerBusy):
+            async with scheduler.slot("u"):
+                pass
+        assert scheduler.rejected == 1
+        release.set()
+        await asyncio.gather(*tasks)
+
+    async def test_round_robin_across_users(self):
+        from serving import FairScheduler
+        scheduler = FairScheduler(max_active=1, max_queued=10)
+        order = []
+        gate = asyncio.Event()
+
+        async def turn(user, label):
+            async with scheduler.slot(user):
+                order.append(label)
+                await gate.wait()
+
+        first = asyncio.create_task(turn("busy", "busy-0"))
+        await asyncio.sleep(0)
+        # A heavy user queues three requests before a light user queues one
+        tasks = [asyncio.create_task(turn("busy", f"busy-{i}")) for i in range(1, 4)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(turn("light", "light-0")))
+        await asyncio.sleep(0)
+
+        gate.set()
+        await asyncio.gather(first, *tasks)
+        assert order.index("light-0") == 2  # served right after one more "busy" turn
+
+    async def test_cancelled_waiter_leaves_queue(self):
+        from serving import FairScheduler
+        scheduler = FairScheduler(max_active=1, max_queued=5)
+        release = asyncio.Event()
+
+        async def turn():
+            async with scheduler.slot("u"):
+                await release.wait()
+
+        holder = asyncio.create_task(turn())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(turn())
+        await asyncio.sleep(0)
+        assert scheduler.queued == 1
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert scheduler.queued == 0
+        release.set()
+        await holder
+        assert scheduler.active == 0
+
+
+# ===================================================================
+# AgentPool
+# ===================================================================
+
+class TestAgentPool:
+    """Tests for lazily created, exclusively checked-out agents."""
+
+    async def test_limits_concurrency_and_reuses_agents(self):
+        from serving import AgentPool
+        created, running, peak = [], [0], [0]
+
+        class _Agent:
+            async def run(self, task, context=""):
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+                await asyncio.sleep(0.01)
+                running[0] -= 1
+                return f"{task}:{context}"
+
+            async def cleanup(self):
+                created.remove(self)
+
+        async def factory():
+            agent = _Agent()
+            created.append(agent)
+            return agent
+
+        pool = AgentPool(factory, size=2)
+        results = await asyncio.gather(*(pool.run(f"t{i}", context="c") for i in range(6)))
+        assert results == [f"t{i}:c" for i in range(6)]
+        assert len(created) == 2
+        assert peak[0] == 2
+
+        await pool.cleanup()
+        assert created == []
+
+
+# ===================================================================
+# SharedRuntime / RuntimeSession
+# ===================================================================
+
+class TestSharedRuntime:
+    """Tests for routing sessions through one shared Sidekick."""
+
+    async def test_sessions_run_on_their_own_thread(self):
+        from serving import SharedRuntime
+        runtime = SharedRuntime(max_active=4, max_queued=4)
+        runtime.sidekick = _FakeSidekick()
+        runtime.sidekick.release.set()
+
+        async def collect(session_id):
+            return [h async for h in runtime.session(session_id).run_superstep("hi", "", [])]
+
+        a, b = await asyncio.gather(collect("s1"), collect("s2"))
+        assert sorted(runtime.sidekick.threads) == ["s1", "s2"]
+        assert a[-1][-1]["content"] == "done s1"
+        assert b[-1][-1]["content"] == "done s2"
+
+    async def test_busy_runtime_answers_with_busy_message(self):
+        from serving import BUSY_MESSAGE, SharedRuntime
+        runtime = SharedRuntime(max_active=1, max_queued=0)
+        runtime.sidekick = _FakeSidekick()
+
+        holder = asyncio.create_task(
+            runtime.session("s1").run_superstep("first", "", []).__anext__()
+        )
+        await asyncio.sleep(0)
+        updates = [h async for h in runtime.session("s2").run_superstep("second", "", [])]
+        assert updates[-1][-1] == {"role": "assistant", "content": BUSY_MESSAGE}
+
+        runtime.sidekick.release.set()
+        await holder
@@ -0,0 +1,180 @@
+"""
+Unit tests for sidekick.py — the orchestrator's turn handling and evaluator.
+
+No graph is compiled and no LLM is called: turns and the worker and
+evaluator LLMs are replaced by fakes, and every database lives in a
+temporary directory.  Tool modules missing from a checkout (the job search
+and interview tools) are replaced by empty stand-ins while sidekick.py is
+imported.
+
+Run with:  pytest tests/test_sidekick.py -v --tb=short
+"""
+
+import asyncio
+import importlib
+import sys
+import types
+
+import pytest
+
+_OPTIONAL_TOOL_MODULES = ("tools.jobsearch", "tools.interview")
+
+
+@pytest.fixture
+def sidekick_module(monkeypatch):
+    """sidekick.py, with stand-ins for the agent tool modules this checkout lacks."""
+    for name in _OPTIONAL_TOOL_MODULES:
+        try:
+            importlib.import_module(name)
+        except ModuleNotFoundError:
+            stub = types.ModuleType(name)
+            stub.get_tools = lambda: []
+            monkeypatch.setitem(sys.modules, name, stub)
+    return importlib.import_module("sidekick")
+
+
+@pytest.fixture
+def sidekick(sidekick_module, tmp_path, monkeypatch):
+    """A Sidekick (without setup) whose databases live in *tmp_path*."""
+    module = sidekick_module
+    from user_profile import UserProfile
+    db = str(tmp_path / "history.db")
+    monkeypatch.setattr(module, "DB_PATH", db)
+    monkeypatch.setattr(module, "UserProfile", lambda: UserProfile(db))
+    monkeypatch.setattr(module, "TRACING_ENABLED", False)
+    monkeypatch.setattr(module, "RESPONSE_CACHE_ENABLED", False)
+    sk = module.Sidekick(session_id="s1")
+    yield sk
+    sk.user_profile.close()
+    sk._history_engine.dispose()
+
+
+# ===================================================================
+# Turns — memory context of overlapping turns
+# ===================================================================
+
+class TestOverlappingTurns:
+    """Tests for two turns running on one thread at once."""
+
+    async def test_each_turn_has_its_own_memory_context(self, sidekick):
+        history = ["before"]
+        sidekick._get_memory_context = lambda thread_id: ("", f"{thread_id}: {' | '.join(history)}")
+        release = {"first": asyncio.Event(), "second": asyncio.Event()}
+        seen = {}
+
+        async def stream_turn(message, success_criteria, thread_id, tracer, bypass_cache=False,
+                              turn_id=None):
+            seen[message] = await sidekick._memory_context(turn_id, thread_id)
+            yield {"op": "append", "message": {"role": "user", "content": message}}
+            await release[message].wait()
+
+        sidekick._stream_turn = stream_turn
+
+        async def turn(message):
+            return [event async for event in sidekick.stream_deltas(message, "", thread_id="t1")]
+
+        first = asyncio.create_task(turn("first"))
+        while "first" not in seen:
+            await asyncio.sleep(0)
+        history.append("first")  # the first turn's exchange lands in the history
+        second = asyncio.create_task(turn("second"))
+        while "second" not in seen:
+            await asyncio.sleep(0)
+
+        # The first turn ends while the second still runs
+        release["first"].set()
+        assert len(await first) == 1
+        release["second"].set()
+        assert len(await second) == 1
+
+        assert seen == {"first": ("", "t1: before"), "second": ("", "t1: before | first")}
+        assert sidekick._memory_tasks == {} and sidekick._agent_context == {}
+
+
+# ===================================================================
+# Worker — prompt layout
+# ===================================================================
+
+class TestWorkerPrompt:
+    """Tests for what the worker sends to its LLM."""
+
+    async def test_recent_history_is_outside_the_cached_prefix(self, sidekick):
+        from langchain_core.messages import AIMessage, HumanMessage
+        prompts = []
+
+        class _Llm:
+            async def ainvoke(self, messages):
+                prompts.append(messages)
+                return AIMessage(content="Hello Ada!")
+
+        sidekick._tools_by_name = {}
+        sidekick._worker_llm = lambda tier: _Llm()
+        sidekick._get_memory_context = lambda thread_id: (
+            "\n\n    Known facts about this user:\n  name: Ada",
+            "Recent conversation history:\n  User: what's the weather?",
+        )
+        state = {"messages": [HumanMessage(content="hi")], "success_criteria": "",
+                 "has_explicit_criteria": False}
+        config = {"configurable": {"thread_id": "t1", "turn_id": "turn1"}}
+
+        update = await sidekick.worker(state, config)
+        lead, trailing = prompts[0][0].content, prompts[0][-1].content
+        assert update["messages"][0].content == "Hello Ada!"
+        assert "name: Ada" in lead and "Recent conversation history" not in lead
+        assert "User: what's the weather?" in trailing
+        # Sub-agents still get both blocks
+        assert "what's the weather?" in sidekick._agent_context["turn1"]
+        sidekick._memory_tasks.pop("turn1")
+
+
+# ===================================================================
+# Evaluator — repeated responses and the round cap
+# ===================================================================
+
+class TestEvaluatorLoop:
+    """Tests for ending the evaluator loop early and capping it."""
+
+    @pytest.fixture
+    def verdicts(self, sidekick_module, monkeypatch):
+        """Make every evaluator LLM call reject; returns the prompts it got."""
+        module = sidekick_module
+        prompts = []
+
+        async def reject(role, schema, messages, config=None):
+            prompts.append(messages[-1].content)
+            return schema(feedback="Not yet.", success_criteria_met=False, user_input_needed=False)
+
+        monkeypatch.setattr(module, "ainvoke_structured", reject)
+        return prompts
+
+    async def _rounds(self, sidekick, replies):
+        """Run worker replies through the evaluator as the graph would, until it routes to END."""
+        from langchain_core.messages import AIMessage, HumanMessage
+        state = {
+            "messages": [HumanMessage(content="Write a haiku about rain")],
+            "success_criteria": "Three lines, 5-7-5 syllables", "has_explicit_criteria": True,
+            "feedback_on_work": None, "success_criteria_met": False, "user_input_needed": False,
+            "evaluation_count": 0, "evaluated_upto": 0, "last_evaluated_response": None,
+        }
+        for reply in replies:
+            state["messages"].append(AIMessage(content=reply))
+            update = await sidekick.evaluator(state)
+            state.update({key: value for key, value in update.items() if key != "messages"})
+            state["messages"].append(AIMessage(content=update["messages"][0]["content"]))
+            if sidekick.route_based_on_evaluation(state) == "END":
+                break
+        return state
+
+    async def test_repeated_response_needs_user_input(self, sidekick, verdicts):
+        state = await self._rounds(sidekick, ["Rain falls.", "Rain falls.", "Rain falls."])
+        assert len(verdicts) == 1  # the repeat is judged without the cache or the LLM
+        assert state["evaluation_count"] == 2
+        assert state["user_input_needed"] and not state["success_criteria_met"]
+
+    async def test_rounds_are_capped(self, sidekick, verdicts):
+        from config import MAX_EVALUATION_ROUNDS
+        state = await self._rounds(sidekick, [f"Draft {i}" for i in range(MAX_EVALUATION_ROUNDS + 2)])
+        assert len(verdicts) == state["evaluation_count"] == MAX_EVALUATION_ROUNDS
+        # Later rounds see only the new messages, plus the original request
+        assert "The User's request is:\nWrite a haiku about rain" in verdicts[1]
+        assert "Draft 0" not in verdicts[1].split("The final response")[0]
@@ -0,0 +1,137 @@
+"""
+Unit tests for storage.py — the shared SQLite access layer.
+
+Every test uses a temporary database file.
+
+Run with:  pytest tests/test_storage.py -v --tb=short
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+
+def _init(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS items (name TEXT PRIMARY KEY)")
+
+
+# ===================================================================
+# Connections
+# ===================================================================
+
+class TestConnect:
+    """Tests for tuned connections and transactions."""
+
+    def test_pragmas_and_schema_are_applied(self, tmp_path):
+        import storage
+        conn = storage.connect(str(tmp_path / "a.db"), _init)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+        assert conn.execute("SELECT count(*) AS n FROM items").fetchone()["n"] == 0
+        conn.close()
+
+    def test_transaction_commits_or_rolls_back(self, tmp_path):
+        import storage
+        conn = storage.connect(str(tmp_path / "a.db"), _init)
+        with storage.transaction(conn):
+            conn.execute("INSERT INTO items VALUES ('kept')")
+        with pytest.raises(sqlite3.IntegrityError):
+            with storage.transaction(conn):
+                conn.execute("INSERT INTO items VALUES ('dropped')")
+                conn.execute("INSERT INTO items VALUES ('kept')")
+        assert [r[0] for r in conn.execute("SELECT name FROM items")] == ["kept"]
+        conn.close()
+
+    def test_nested_transaction_joins_the_outer_one(self, tmp_path):
+        import storage
+        conn = storage.connect(str(tmp_path / "a.db"), _init)
+        with pytest.raises(RuntimeError):
+            with storage.transaction(conn):
+                with storage.transaction(conn):
+                    conn.execute("INSERT INTO items VALUES ('inner')")
+                raise RuntimeError("outer failed")
+        assert conn.execute("SELECT count(*) FROM items").fetchone()[0] == 0
+        conn.close()
+
+
+# ===================================================================
+# Pools
+# ===================================================================
+
+class TestDatabase:
+    """Tests for the per-thread connection pool."""
+
+    def test_one_connection_per_thread(self, tmp_path):
+        import storage
+        db = storage.Database(str(tmp_path / "a.db"), _init)
+        main = db.connection()
+        assert db.connection() is main
+
+        seen = []
+
+        def worker():
+            conn = db.connection()
+            conn.execute("INSERT INTO items VALUES ('from worker')")
+            conn.commit()
+            seen.append(conn)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        assert seen[0] is not main
+        assert main.execute("SELECT name FROM items").fetchone()["name"] == "from worker"
+        # The next new connection closes the one of the finished worker
+        thread = threading.Thread(target=db.connection)
+        thread.start()
+        thread.join()
+        assert db.size() == 2
+        with pytest.raises(sqlite3.ProgrammingError):
+            seen[0].execute("SELECT 1")
+        db.close()
+        assert db.size() == 0
+        assert db.connection() is not main
+        db.close()
+
+    def test_shared_database_per_path_and_close(self, tmp_path):
+        import storage
+        path = str(tmp_path / "a.db")
+        db = storage.database(path, _init)
+        assert storage.database(path, _init) is db
+        conn = db.connection()
+        storage.close(path)
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+        assert storage.database(path, _init) is not db
+        storage.close(path)
+
+
+# ===================================================================
+# Async
+# ===================================================================
+
+class TestRun:
+    """Tests for running database calls on the storage executor."""
+
+    async def test_run_returns_result_off_the_loop(self, tmp_path):
+        import storage
+        db = storage.database(str(tmp_path / "a.db"), _init)
+
+        def insert(name):
+            with db.transaction() as conn:
+                conn.execute("INSERT INTO items VALUES (?)", (name,))
+            return threading.current_thread().name
+
+        thread = await storage.run(insert, name="async")
+        assert thread.startswith("storage")
+        assert db.connection().execute("SELECT name FROM items").fetchone()["name"] == "async"
+        storage.close(str(tmp_path / "a.db"))
+
+    async def test_run_propagates_errors(self):
+        import storage
+
+        def fail():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError, match="boom"):
+            await storage.run(fail)
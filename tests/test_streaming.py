@@ -0,0 +1,104 @@
+"""
+Unit tests for streaming.py — delta events and token coalescing.
+
+Run with:  pytest tests/test_streaming.py -v --tb=short
+"""
+
+import pytest
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+# ===================================================================
+# apply_event
+# ===================================================================
+
+class TestApplyEvent:
+    """Tests for applying append/patch events to a history list."""
+
+    def test_append_and_patch(self):
+        from streaming import append_event, apply_event, patch_event
+        history = [{"role": "user", "content": "hi"}]
+        apply_event(history, append_event({"role": "assistant", "content": "Hel"}))
+        apply_event(history, patch_event("lo"))
+        assert history == [
+            {"role": "user", "content": "hi"},
+            {"role": "assistant", "content": "Hello"},
+        ]
+
+    def test_patch_touches_only_last_message(self):
+        from streaming import apply_event, patch_event
+        first = {"role": "user", "content": "hi"}
+        last = {"role": "assistant", "content": "a", "metadata": {"title": "t"}}
+        history = [first, last]
+        result = apply_event(history, patch_event("b"))
+        assert result is history
+        assert history[0] is first
+        assert history[1] is not last  # replaced, so UIs comparing objects see the change
+        assert history[1] == {"role": "assistant", "content": "ab", "metadata": {"title": "t"}}
+        assert last["content"] == "a"
+
+    def test_append_copies_message(self):
+        from streaming import append_event, apply_event
+        message = {"role": "assistant", "content": "x"}
+        history = apply_event([], append_event(message))
+        assert history[0] == message
+        assert history[0] is not message
+
+    def test_unknown_op_raises(self):
+        from streaming import apply_event
+        with pytest.raises(ValueError):
+            apply_event([], {"op": "delete"})
+
+
+# ===================================================================
+# TokenCoalescer
+# ===================================================================
+
+class TestTokenCoalescer:
+    """Tests for time- and size-based token batching."""
+
+    def test_batches_until_interval_elapses(self):
+        from streaming import TokenCoalescer
+        clock = _Clock()
+        tokens = TokenCoalescer(interval_ms=50, max_chars=1000, clock=clock)
+        assert tokens.add("a") is None
+        clock.now = 0.02
+        assert tokens.add("b") is None
+        clock.now = 0.06
+        assert tokens.add("c") == "abc"
+        assert tokens.add("d") is None
+
+    def test_flushes_when_size_limit_reached(self):
+        from streaming import TokenCoalescer
+        tokens = TokenCoalescer(interval_ms=10_000, max_chars=5, clock=_Clock())
+        assert tokens.add("abc") is None
+        assert tokens.add("def") == "abcdef"
+
+    def test_flush_returns_pending_and_clears(self):
+        from streaming import TokenCoalescer
+        tokens = TokenCoalescer(interval_ms=10_000, clock=_Clock())
+        tokens.add("x")
+        tokens.add("y")
+        assert tokens.flush() == "xy"
+        assert tokens.flush() == ""
+
+    def test_many_tokens_produce_few_deltas(self):
+        from streaming import TokenCoalescer
+        clock = _Clock()
+        tokens = TokenCoalescer(interval_ms=50, max_chars=10_000, clock=clock)
+        deltas = []
+        for i in range(1000):  # 1000 tokens arriving every 1 ms
+            clock.now = i / 1000
+            delta = tokens.add("t")
+            if delta:
+                deltas.append(delta)
+        deltas.append(tokens.flush())
+        assert "".join(deltas) == "t" * 1000
+        assert len(deltas) <= 21
@@ -0,0 +1,116 @@
+"""
+Unit tests for task_plans.py — capturing and replaying scheduled-task plans.
+
+Tools and the chat model are replaced by fakes, so no API calls are made.
+
+Run with:  pytest tests/test_task_plans.py -v --tb=short
+"""
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.tools import Tool
+
+
+def _tool(name, reply=None, error=None):
+    def run(arg):
+        if error:
+            raise error
+        return reply if reply is not None else f"{name} result for {arg}"
+    return Tool(name=name, func=run, description=name)
+
+
+class _FakeChat:
+    def __init__(self, reply):
+        self.reply = reply
+        self.prompts = []
+
+    async def ainvoke(self, messages, config=None):
+        self.prompts.append(messages[-1].content)
+        return AIMessage(content=self.reply)
+
+
+@pytest.fixture
+def chat(monkeypatch):
+    import task_plans
+    fake = _FakeChat("Three new releases.")
+    monkeypatch.setattr(task_plans, "chat_model", lambda tier: fake)
+    return fake
+
+
+# ===================================================================
+# Capture
+# ===================================================================
+
+class TestPlanRecorder:
+    """Tests for turning a run's tool calls into a plan."""
+
+    async def test_leaf_calls_below_agents_become_the_plan(self):
+        from graph_cache import DISPATCH_TAG
+        from task_plans import PlanRecorder
+        search = _tool("search")
+        dispatch = Tool(name="search", func=None, description="search", tags=[DISPATCH_TAG],
+                        coroutine=lambda q, config=None: search.ainvoke(q, config))
+
+        async def research_agent(task, config=None):
+            await dispatch.ainvoke(task, config)
+            await search.ainvoke(task, config)  # repeated call
+            return "done"
+
+        agent = Tool(name="research_agent", func=None, coroutine=research_agent, description="agent")
+        recorder = PlanRecorder()
+        await agent.ainvoke("python release", {"callbacks": [recorder]})
+
+        assert recorder.plan() == [{"tool": "search", "args": "python release"}]
+
+    async def test_side_effects_and_errors_leave_no_plan(self):
+        from task_plans import PlanRecorder
+        writer = PlanRecorder()
+        await _tool("search").ainvoke("x", {"callbacks": [writer]})
+        await _tool("write_file").ainvoke("notes.txt", {"callbacks": [writer]})
+        assert writer.plan() is None
+
+        failed = PlanRecorder()
+        await _tool("search", reply="Error: quota exceeded").ainvoke("x", {"callbacks": [failed]})
+        assert failed.plan() is None
+
+        assert PlanRecorder().plan() is None
+
+
+# ===================================================================
+# Replay
+# ===================================================================
+
+class TestReplay:
+    """Tests for answering a task from its plan's tool outputs."""
+
+    async def test_replay_calls_tools_and_summarises(self, chat):
+        from task_plans import replay
+        plan = [{"tool": "search", "args": "python release"},
+                {"tool": "wikipedia", "args": {"query": "Python"}}]
+        tools = {"search": _tool("search"), "wikipedia": _tool("wikipedia", reply="Python is a language")}
+
+        result = await replay("List new Python releases", plan, context="Focus on 3.x", tools=tools)
+        assert result == "Three new releases."
+        prompt = chat.prompts[0]
+        assert prompt.startswith("Task: List new Python releases\n\nFocus on 3.x")
+        assert '### search("python release")\nsearch result for python release' in prompt
+        assert '### wikipedia("Python")\nPython is a language' in prompt
+
+    async def test_tool_outputs_are_capped(self, chat, monkeypatch):
+        import task_plans
+        monkeypatch.setattr(task_plans, "TASK_PLAN_OUTPUT_CHARS", 5)
+        plan = [{"tool": "search", "args": "x"}]
+        await task_plans.replay("t", plan, tools={"search": _tool("search", reply="abcdefgh")})
+        assert "abcde …" in chat.prompts[0]
+
+    @pytest.mark.parametrize("tools, reply", [
+        ({}, "ok"),
+        ({"search": _tool("search", error=RuntimeError("quota"))}, "ok"),
+        ({"search": _tool("search", reply="Error: no results")}, "ok"),
+        ({"search": _tool("search")}, "  "),
+    ])
+    async def test_failures_raise_replay_error(self, chat, tools, reply):
+        from task_plans import PlanReplayError, replay
+        chat.reply = reply
+        with pytest.raises(PlanReplayError):
+            await replay("t", [{"tool": "search", "args": "x"}], tools=tools)
@@ -0,0 +1,75 @@
+"""
+Unit tests for task_worker.py — the out-of-process scheduled task runner.
+
+Task execution is replaced by a recorder, so no Sidekick is built.
+
+Run with:  pytest tests/test_task_worker.py -v --tb=short
+"""
+
+import pytest
+
+
+@pytest.fixture
+def tasks_db(tmp_path, monkeypatch):
+    """Point scheduler.py's shared connection at a fresh database."""
+    import scheduler
+    monkeypatch.setattr(scheduler, "DB_PATH", str(tmp_path / "tasks.db"))
+    yield scheduler
+    scheduler.close()
+
+
+def _make_due(scheduler, *task_ids):
+    import time
+    conn = scheduler._get_connection()
+    conn.executemany("UPDATE scheduled_tasks SET next_run_at = ? WHERE id = ?",
+                     [(time.time() - 1, t) for t in task_ids])
+    conn.commit()
+
+
+# ===================================================================
+# TaskWorker
+# ===================================================================
+
+class TestTaskWorker:
+    """Tests for polling, claiming and running due tasks."""
+
+    async def test_runs_each_due_task_once(self, tasks_db, monkeypatch):
+        from task_worker import TaskWorker
+        due = [tasks_db._add_task(f"task {i}", "0 8 * * *") for i in range(3)]
+        later = tasks_db._add_task("not yet", "0 8 * * *")
+        _make_due(tasks_db, *due)
+        runs = []
+
+        async def fake_run(task_id, run_id):
+            tasks_db._finish_run(run_id, "ok", f"ran {task_id}")
+            runs.append(task_id)
+
+        monkeypatch.setattr(tasks_db, "_run_task", fake_run)
+        worker = TaskWorker(concurrency=4, worker_id="w1")
+        await worker.run(once=True)
+
+        assert sorted(runs) == sorted(due)
+        assert {(r["task_id"], r["runner"], r["status"]) for r in tasks_db._list_runs()} == \
+            {(t, "w1", "ok") for t in due}
+        assert not any(t["running_on"] for t in tasks_db._list_tasks())
+        # Every fire was consumed, so a second pass finds nothing
+        assert worker.poll_once() == []
+
+    async def test_claims_no_more_than_idle_slots(self, tasks_db):
+        from task_worker import TaskWorker
+        ids = [tasks_db._add_task(f"task {i}", "0 8 * * *") for i in range(5)]
+        _make_due(tasks_db, *ids)
+        worker = TaskWorker(concurrency=2, worker_id="w1")
+
+        assert len(worker.poll_once()) == 2
+        assert worker.poll_once() == []
+        assert sum(t["running_on"] == "w1" for t in tasks_db._list_tasks()) == 2
+
+    async def test_two_workers_split_the_due_tasks(self, tasks_db):
+        from task_worker import TaskWorker
+        ids = [tasks_db._add_task(f"task {i}", "0 8 * * *") for i in range(4)]
+        _make_due(tasks_db, *ids)
+        first = TaskWorker(concurrency=3, worker_id="a").poll_once()
+        second = TaskWorker(concurrency=3, worker_id="b").poll_once()
+        assert len(first) == 3 and len(second) == 1
+        assert set(first) | set(second) == set(ids)
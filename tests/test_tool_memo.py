@@ -0,0 +1,126 @@
+"""
+Unit tests for tools/memo.py — tool-result memoization.
+
+Run with:  pytest tests/test_tool_memo.py -v --tb=short
+"""
+
+import asyncio
+
+import pytest
+from langchain_core.tools import StructuredTool, Tool
+from pydantic import BaseModel
+
+
+class _Query(BaseModel):
+    query: str
+
+
+def _counting_tool(calls, name="search", delay=0.0):
+    async def _acall(query):
+        calls.append(query)
+        await asyncio.sleep(delay)
+        return f"result for {query}"
+
+    return Tool(name=name, description="Look it up.", func=lambda q: calls.append(q) or f"result for {q}",
+                coroutine=_acall)
+
+
+@pytest.fixture
+def memo(tmp_path):
+    from tools.memo import ToolMemo
+    return ToolMemo(max_entries=8, db_path=str(tmp_path / "memo.db"))
+
+
+# ===================================================================
+# Keys
+# ===================================================================
+
+class TestKeys:
+    """Tests for argument canonicalisation."""
+
+    def test_whitespace_and_key_order_do_not_matter(self):
+        from tools.memo import memo_key
+        assert memo_key("search", "  python  release ") == memo_key("search", "python release")
+        assert memo_key("t", {"b": 1, "a": "x"}) == memo_key("t", {"a": " x", "b": 1})
+        assert memo_key("search", "a") != memo_key("wikipedia", "a")
+
+    def test_sandbox_file_version_changes_with_file(self, tmp_path, monkeypatch):
+        import os
+        from tools import memo as memo_module
+        monkeypatch.setattr(memo_module, "SANDBOX_DIR", str(tmp_path))
+        path = tmp_path / "data.csv"
+        assert memo_module.sandbox_file_version("data.csv") == "missing"
+
+        path.write_text("a,b\n")
+        first = memo_module.sandbox_file_version({"file_path": "data.csv"})
+        path.write_text("a,b\n1,2\n")
+        os.utime(path, ns=(1, 1))
+        assert memo_module.sandbox_file_version("data.csv") != first
+
+
+# ===================================================================
+# memoize_tools
+# ===================================================================
+
+class TestMemoizeTools:
+    """Tests for wrapping tools and reusing their results."""
+
+    async def test_repeated_call_runs_tool_once(self, memo):
+        from tools.memo import memoize_tools
+        calls = []
+        (tool,) = memoize_tools([_counting_tool(calls)], ttls={"search": 60}, memo=memo)
+
+        assert await tool.ainvoke("python") == "result for python"
+        assert await tool.ainvoke(" python ") == "result for python"
+        assert tool.invoke("python") == "result for python"
+        assert calls == ["python"]
+        assert memo.stats()["memory_hits"] == 2
+
+    async def test_parallel_calls_are_coalesced(self, memo):
+        from tools.memo import memoize_tools
+        calls = []
+        (tool,) = memoize_tools([_counting_tool(calls, delay=0.05)], ttls={"search": 60}, memo=memo)
+
+        results = await asyncio.gather(*(tool.ainvoke("same") for _ in range(5)))
+        assert set(results) == {"result for same"}
+        assert calls == ["same"]
+        assert memo.stats()["coalesced"] == 4
+
+    async def test_results_survive_in_sqlite_store(self, memo, tmp_path):
+        from tools.memo import ToolMemo, memoize_tools
+        calls = []
+        (tool,) = memoize_tools([_counting_tool(calls)], ttls={"search": 60}, memo=memo)
+        await tool.ainvoke("persisted")
+
+        fresh = ToolMemo(db_path=memo.db_path)
+        (tool,) = memoize_tools([_counting_tool(calls)], ttls={"search": 60}, memo=fresh)
+        assert await tool.ainvoke("persisted") == "result for persisted"
+        assert calls == ["persisted"]
+        assert fresh.stats()["disk_hits"] == 1
+
+    async def test_errors_are_not_memoized(self, memo):
+        from tools.memo import memoize_tools
+        calls = []
+        tool = Tool(name="read_pdf", description="Read a PDF.",
+                    func=lambda p: calls.append(p) or "Error: file not found")
+        (wrapped,) = memoize_tools([tool], ttls={"read_pdf": 60}, memo=memo)
+        wrapped.invoke("a.pdf")
+        wrapped.invoke("a.pdf")
+        assert calls == ["a.pdf", "a.pdf"]
+
+    def test_structured_tools_keep_schema(self, memo):
+        from tools.memo import memoize_tools
+        calls = []
+        tool = StructuredTool(name="wikipedia", description="Wiki.", args_schema=_Query,
+                              func=lambda query: calls.append(query) or query.upper())
+        (wrapped,) = memoize_tools([tool], ttls={"wikipedia": 60}, memo=memo)
+
+        assert wrapped.args == tool.args
+        assert wrapped.invoke({"query": "x"}) == "X"
+        assert wrapped.invoke({"query": "x"}) == "X"
+        assert calls == ["x"]
+
+    def test_tools_without_ttl_are_untouched(self, memo):
+        from tools.memo import memoize_tools
+        tool = _counting_tool([], name="write_file")
+        assert memoize_tools([tool], ttls={"search": 60}, memo=memo) == [tool]
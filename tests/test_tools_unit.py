@@ -263,12 +263,13 @@ class TestPushNotification:
 
     @patch("tools.system.requests.post")
     def test_sends_correct_payload(self, mock_post):
-        from tools.system import push, PUSHOVER_URL
+        from tools.system import push, PUSHOVER_TIMEOUT_SECONDS, PUSHOVER_URL
         with patch.dict(os.environ, {"PUSHOVER_TOKEN": "test-token", "PUSHOVER_USER": "test-user"}):
             push("Test msg")
         mock_post.assert_called_once_with(
             PUSHOVER_URL,
             data={"token": "test-token", "user": "test-user", "message": "Test msg"},
+            timeout=PUSHOVER_TIMEOUT_SECONDS,
         )
 
     @patch("tools.system.requests.post")
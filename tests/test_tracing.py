@@ -0,0 +1,173 @@
+"""
+Unit tests for tracing.py — span recording and the local trace store.
+
+Uses a tiny LangGraph graph with a fake chat model, so no API calls are made.
+
+Run with:  pytest tests/test_tracing.py -v --tb=short
+"""
+
+from typing import Annotated, Any, List
+
+import pytest
+from typing_extensions import TypedDict
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.tools import Tool
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+
+
+class _State(TypedDict):
+    messages: Annotated[List[Any], add_messages]
+
+
+def _build_graph():
+    llm = GenericFakeChatModel(messages=iter([AIMessage(content="hello there")]))
+    lookup = Tool(name="lookup", func=lambda q: "x" * 50, description="Look something up.")
+
+    async def worker(state):
+        return {"messages": [await llm.ainvoke(state["messages"])]}
+
+    async def tools(state):
+        await lookup.ainvoke("query")
+        return {}
+
+    builder = StateGraph(_State)
+    builder.add_node("worker", worker)
+    builder.add_node("tools", tools)
+    builder.add_edge(START, "worker")
+    builder.add_edge("worker", "tools")
+    builder.add_edge("tools", END)
+    return builder.compile()
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "traces.db")
+
+
+# ===================================================================
+# TraceRecorder
+# ===================================================================
+
+class TestTraceRecorder:
+    """Tests for the callback-based span recorder."""
+
+    async def test_records_nodes_llm_and_tools_as_tree(self):
+        from tracing import TraceRecorder
+        recorder = TraceRecorder(session_id="s1")
+        await _build_graph().ainvoke({"messages": "hi"}, config={"callbacks": [recorder]})
+        spans = {s["name"]: s for s in recorder.finish()}
+
+        assert spans["turn"]["kind"] == "turn"
+        assert spans["worker"]["kind"] == "node"
+        assert spans["tools"]["kind"] == "node"
+        assert spans["worker"]["parent_id"] == recorder.trace_id
+
+        llm = next(s for s in spans.values() if s["kind"] == "llm")
+        assert llm["parent_id"] == spans["worker"]["id"]
+        assert llm["input_bytes"] == 2
+
+        assert spans["lookup"]["kind"] == "tool"
+        assert spans["lookup"]["parent_id"] == spans["tools"]["id"]
+        assert spans["lookup"]["output_bytes"] == 50
+        # Graph plumbing (the LangGraph root chain) is not recorded
+        assert "LangGraph" not in spans
+
+    def test_manual_span_records_errors(self):
+        from tracing import TraceRecorder
+        recorder = TraceRecorder()
+        with pytest.raises(ValueError):
+            with recorder.span("profile_extraction"):
+                raise ValueError("boom")
+        span = next(s for s in recorder.finish() if s["name"] == "profile_extraction")
+        assert span["status"] == "error"
+        assert "boom" in span["error"]
+
+    def test_agent_tools_get_agent_kind(self):
+        from tracing import TraceRecorder
+        recorder = TraceRecorder()
+        tool = Tool(name="research_agent", func=lambda t: "done", description="d")
+        tool.invoke("task", config={"callbacks": [recorder]})
+        kinds = {s["name"]: s["kind"] for s in recorder.finish()}
+        assert kinds["research_agent"] == "agent"
+
+
+# ===================================================================
+# Trace store queries
+# ===================================================================
+
+class TestTraceStore:
+    """Tests for persistence and the report API."""
+
+    async def test_save_and_list(self, db):
+        from tracing import TraceRecorder, save_spans, list_traces, get_spans
+        recorder = TraceRecorder(session_id="s1")
+        await _build_graph().ainvoke({"messages": "hi"}, config={"callbacks": [recorder]})
+        save_spans(recorder.finish(), db_path=db)
+
+        traces = list_traces(db_path=db)
+        assert len(traces) == 1
+        assert traces[0]["trace_id"] == recorder.trace_id
+        assert traces[0]["llm_calls"] == 1
+        assert len(get_spans(recorder.trace_id, db_path=db)) == 5
+
+    def test_summarize_percentiles(self, db):
+        import time
+        from tracing import save_spans, summarize
+        now = time.time()
+        spans = [
+            {"id": str(i), "trace_id": "t", "name": "search", "kind": "tool",
+             "started_at": now, "duration_ms": float(d), "input_tokens": 0,
+             "output_tokens": 0, "cached_tokens": 0, "input_bytes": 0,
+             "output_bytes": 0, "status": "error" if i == 0 else "ok"}
+            for i, d in enumerate([10, 20, 30, 40, 1000])
+        ]
+        save_spans(spans, db_path=db)
+        report = summarize(db_path=db)
+        assert report[0]["name"] == "search"
+        assert report[0]["calls"] == 5
+        assert report[0]["errors"] == 1
+        assert report[0]["p50_ms"] == 30
+        assert report[0]["p95_ms"] == 1000
+
+    async def test_waterfall_rows_are_indented(self, db):
+        from tracing import TraceRecorder, save_spans, waterfall_rows
+        recorder = TraceRecorder()
+        await _build_graph().ainvoke({"messages": "hi"}, config={"callbacks": [recorder]})
+        save_spans(recorder.finish(), db_path=db)
+        rows = waterfall_rows(recorder.trace_id, db_path=db)
+        names = [r[2] for r in rows]
+        assert names[0] == "turn"
+        assert "  worker" in names
+        assert any(n.startswith("    ") for n in names)  # LLM under worker
+
+    def test_prune_removes_old_spans(self, db):
+        import time
+        from tracing import save_spans, prune, get_spans
+        old = time.time() - 30 * 86400
+        save_spans([{"id": "a", "trace_id": "t", "name": "turn", "kind": "turn",
+                     "started_at": old, "duration_ms": 1.0, "input_tokens": 0,
+                     "output_tokens": 0, "cached_tokens": 0, "input_bytes": 0,
+                     "output_bytes": 0, "status": "ok"}], db_path=db)
+        assert prune(older_than_days=14, db_path=db) == 1
+        assert get_spans("t", db_path=db) == []
+
+    async def test_flush_prunes_old_spans(self, db, monkeypatch):
+        import time
+        import tracing
+        monkeypatch.setattr(tracing, "DB_PATH", db)
+        monkeypatch.setattr(tracing, "_flushes", 0)
+        old = time.time() - (tracing.TRACE_RETENTION_DAYS + 1) * 86400
+        tracing.save_spans([{"id": "a", "trace_id": "old", "name": "turn", "kind": "turn",
+                             "started_at": old, "duration_ms": 1.0, "input_tokens": 0,
+                             "output_tokens": 0, "cached_tokens": 0, "input_bytes": 0,
+                             "output_bytes": 0, "status": "ok"}])
+        recorder = tracing.TraceRecorder()
+        await recorder.flush()
+        try:
+            assert tracing.get_spans("old") == []
+            assert tracing.get_spans(recorder.trace_id) != []
+        finally:
+            tracing.close()
+
@@ -0,0 +1,126 @@
+"""Agent output artifacts: large sub-agent results saved to the sandbox and read back in pages."""
+
+import asyncio
+import hashlib
+import os
+from datetime import datetime
+
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool, StructuredTool, Tool
+
+from config import (
+    AGENT_ARTIFACT_MIN_TOKENS,
+    AGENT_ARTIFACTS_DIR,
+    AGENT_ARTIFACTS_MAX_FILES,
+    ARTIFACT_PAGE_CHARS,
+    SANDBOX_DIR,
+)
+from context_window import clip_to_tokens
+
+
+def _prune():
+    """Keep only the newest AGENT_ARTIFACTS_MAX_FILES artifacts."""
+    entries = sorted(
+        (e for e in os.scandir(AGENT_ARTIFACTS_DIR) if e.is_file()),
+        key=lambda e: e.stat().st_mtime,
+        reverse=True,
+    )
+    for entry in entries[AGENT_ARTIFACTS_MAX_FILES:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def write_artifact(agent: str, label: str, text: str) -> str:
+    """Save *text* as an artifact and return its path relative to the sandbox."""
+    os.makedirs(AGENT_ARTIFACTS_DIR, exist_ok=True)
+    digest = hashlib.sha256(text.encode("utf-8", errors="replace")).hexdigest()[:8]
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    safe_label = "".join(c if c.isalnum() or c in "-_" else "_" for c in label)[:40]
+    filename = f"{agent}-{safe_label}-{stamp}-{digest}.md"
+    with open(os.path.join(AGENT_ARTIFACTS_DIR, filename), "w", encoding="utf-8") as f:
+        f.write(text)
+    _prune()
+    return os.path.relpath(os.path.join(AGENT_ARTIFACTS_DIR, filename), SANDBOX_DIR)
+
+
+async def awrite_artifact(agent: str, label: str, text: str) -> str:
+    """``write_artifact`` in a worker thread, for callers on the event loop."""
+    return await asyncio.to_thread(write_artifact, agent, label, text)
+
+
+def read_artifact(path: str, offset: int = 0) -> str:
+    """Read one page of a saved agent output, starting at character *offset*."""
+    root = os.path.realpath(AGENT_ARTIFACTS_DIR)
+    full_path = os.path.realpath(os.path.join(SANDBOX_DIR, path.strip()))
+    if os.path.dirname(full_path) != root:
+        return f"Error: {path} is not an agent output artifact"
+    if not os.path.isfile(full_path):
+        return f"Error: artifact not found at {path}"
+
+    with open(full_path, encoding="utf-8") as f:
+        text = f.read()
+    offset = max(0, offset)
+    end = min(len(text), offset + ARTIFACT_PAGE_CHARS)
+    header = f"[{path}: characters {offset}-{end} of {len(text)}"
+    if end < len(text):
+        header += f"; call again with offset={end} for more"
+    return f"{header}]\n{text[offset:end]}"
+
+
+def _clipped(output, path: str) -> str:
+    return (
+        f"{clip_to_tokens(output, AGENT_ARTIFACT_MIN_TOKENS)}\n\n"
+        f"[Output truncated; call read_artifact for the rest]\n- {path}"
+    )
+
+
+def capped_tool(tool: BaseTool, agent: str) -> BaseTool:
+    """Return a stand-in for *tool* that saves outputs over AGENT_ARTIFACT_MIN_TOKENS as artifacts.
+
+    The orchestrator gets the clipped start of such an output and its path,
+    as it does for a sub-agent's large tool outputs.
+    """
+
+    def _is_large(output) -> bool:
+        return isinstance(output, str) and clip_to_tokens(output, AGENT_ARTIFACT_MIN_TOKENS) != output
+
+    # The turn's config (callbacks, tags) is passed on, so the wrapped tool's
+    # run nests under the wrapper's in traces
+    def _call(*args, config: RunnableConfig, **kwargs):
+        output = tool.invoke(args[0] if args else kwargs, config=config)
+        if not _is_large(output):
+            return output
+        return _clipped(output, write_artifact(agent, tool.name, output))
+
+    async def _acall(*args, config: RunnableConfig, **kwargs):
+        output = await tool.ainvoke(args[0] if args else kwargs, config=config)
+        if not _is_large(output):
+            return output
+        return _clipped(output, await awrite_artifact(agent, tool.name, output))
+
+    if isinstance(tool, Tool):
+        return Tool(name=tool.name, description=tool.description, func=_call, coroutine=_acall)
+    return StructuredTool(
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+        func=_call,
+        coroutine=_acall,
+    )
+
+
+def get_tools():
+    """Return the artifact reader exposed to the orchestrator."""
+    return [
+        StructuredTool.from_function(
+            func=read_artifact,
+            name="read_artifact",
+            description=(
+                "Read the full raw output an agent saved as an artifact (path listed under its result), "
+                f"{ARTIFACT_PAGE_CHARS} characters at a time. Only use this when the agent's summary "
+                "is not enough to answer."
+            ),
+        )
+    ]
@@ -0,0 +1,299 @@
+"""
+Memoization of deterministic sub-agent tools.
+
+Sub-agents repeat the same calls — a web search for the same query, the same
+Wikipedia page, re-reading a PDF — within a turn and across turns.
+``memoize_tools`` wraps the tools listed in ``TOOL_MEMO_TTLS`` so that a call
+with the same (canonicalised) arguments is answered from:
+
+1. a process-wide in-memory LRU shared by every agent,
+2. a SQLite store that survives restarts (``TOOL_MEMO_DB_PATH``),
+
+and only then runs the tool.  Concurrent identical async calls (parallel
+agents asking the same thing) are coalesced into one execution.
+
+Results expire after the tool's TTL.  Sandbox file readers are additionally
+keyed by the file's mtime and size, so editing a file invalidates them.
+Exceptions and ``"Error..."`` results are never stored.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.tools import BaseTool, StructuredTool, Tool
+
+import storage
+from config import (
+    SANDBOX_DIR,
+    TOOL_MEMO_DB_PATH,
+    TOOL_MEMO_ENABLED,
+    TOOL_MEMO_MEMORY_ENTRIES,
+    TOOL_MEMO_TTLS,
+)
+
+log = logging.getLogger(__name__)
+
+DB_PATH = TOOL_MEMO_DB_PATH
+
+_CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS tool_memo (
+        key         TEXT PRIMARY KEY,
+        tool        TEXT NOT NULL,
+        result      TEXT NOT NULL,
+        created_at  REAL NOT NULL,
+        expires_at  REAL NOT NULL
+    )
+"""
+
+# Tools that read a sandbox file; their cache key includes the file version
+SANDBOX_FILE_TOOLS = {"read_pdf", "read_spreadsheet", "read_file"}
+
+
+# ---------------------------------------------------------------------------
+# Database helpers
+# ---------------------------------------------------------------------------
+
+def _ensure_schema(conn: sqlite3.Connection):
+    conn.execute(_CREATE_TABLE_SQL)
+
+
+def _get_connection(db_path: str = None) -> sqlite3.Connection:
+    if db_path:
+        return storage.connect(db_path, _ensure_schema)
+    return storage.database(DB_PATH, _ensure_schema).connection()
+
+
+def _db_get(key: str, db_path: str = None) -> Optional[tuple]:
+    conn = _get_connection(db_path)
+    row = conn.execute(
+        "SELECT result, expires_at FROM tool_memo WHERE key = ? AND expires_at > ?",
+        (key, time.time()),
+    ).fetchone()
+    if db_path:
+        conn.close()
+    return row
+
+
+def _db_put(key: str, tool: str, result: str, expires_at: float, db_path: str = None):
+    conn = _get_connection(db_path)
+    now = time.time()
+    conn.execute(
+        "INSERT OR REPLACE INTO tool_memo (key, tool, result, created_at, expires_at) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (key, tool, result, now, expires_at),
+    )
+    conn.execute("DELETE FROM tool_memo WHERE expires_at <= ?", (now,))
+    conn.commit()
+    if db_path:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Keys
+# ---------------------------------------------------------------------------
+
+def canonical_args(tool_input: Any) -> str:
+    """Stable text form of a tool input: stripped strings, sorted keys."""
+    def _canon(value):
+        if isinstance(value, str):
+            return " ".join(value.split())
+        if isinstance(value, dict):
+            return {k: _canon(v) for k, v in sorted(value.items())}
+        if isinstance(value, (list, tuple)):
+            return [_canon(v) for v in value]
+        return value
+
+    return json.dumps(_canon(tool_input), sort_keys=True, default=str)
+
+
+def sandbox_file_version(tool_input: Any) -> str:
+    """``mtime:size`` of the sandbox file a reader tool is asked for."""
+    path = tool_input.get("file_path", "") if isinstance(tool_input, dict) else tool_input
+    try:
+        stat = os.stat(os.path.join(SANDBOX_DIR, str(path).strip()))
+    except OSError:
+        return "missing"
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def memo_key(tool_name: str, tool_input: Any, version: str = "") -> str:
+    payload = f"{tool_name}\x00{canonical_args(tool_input)}\x00{version}"
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Memo store
+# ---------------------------------------------------------------------------
+
+class ToolMemo:
+    """In-memory LRU over a SQLite store, with in-flight call coalescing."""
+
+    def __init__(self, max_entries: int = TOOL_MEMO_MEMORY_ENTRIES, db_path: str = None):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (result, expires_at)
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.counts = {"memory_hits": 0, "disk_hits": 0, "coalesced": 0, "misses": 0}
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            self.counts["memory_hits"] += 1
+            return entry[0]
+
+    def _memory_put(self, key: str, result: str, expires_at: float):
+        with self._lock:
+            self._memory[key] = (result, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        row = _db_get(key, self.db_path)
+        if row is None:
+            return None
+        self._memory_put(key, row[0], row[1])
+        with self._lock:
+            self.counts["disk_hits"] += 1
+        return row[0]
+
+    def _store(self, key: str, tool_name: str, result: Any, ttl: float):
+        if not isinstance(result, str) or result.startswith("Error"):
+            return
+        expires_at = time.time() + ttl
+        self._memory_put(key, result, expires_at)
+        _db_put(key, tool_name, result, expires_at, self.db_path)
+
+    def call(self, key: str, tool_name: str, ttl: float, run: Callable[[], Any]) -> Any:
+        """Return the memoized result for *key*, running *run* on a miss."""
+        result = self._memory_get(key)
+        if result is None:
+            result = self._disk_get(key)
+        if result is not None:
+            return result
+        with self._lock:
+            self.counts["misses"] += 1
+        result = run()
+        self._store(key, tool_name, result, ttl)
+        return result
+
+    async def acall(self, key: str, tool_name: str, ttl: float, run: Callable[[], Any]) -> Any:
+        """Async :meth:`call`; concurrent calls with the same key share one run."""
+        result = self._memory_get(key)
+        if result is not None:
+            return result
+
+        pending = self._inflight.get(key)
+        if pending is not None and pending.get_loop() is asyncio.get_running_loop():
+            with self._lock:
+                self.counts["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await storage.run(self._disk_get, key)
+            if result is None:
+                with self._lock:
+                    self.counts["misses"] += 1
+                result = await run()
+                await storage.run(self._store, key, tool_name, result, ttl)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise it; mark it retrieved so an unwaited future is not logged
+            future.exception()
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counts, "memory_entries": len(self._memory)}
+
+
+_memo: Optional[ToolMemo] = None
+
+
+def get_memo() -> ToolMemo:
+    """Return the process-wide memo shared by all agents."""
+    global _memo
+    if _memo is None:
+        _memo = ToolMemo()
+    return _memo
+
+
+def close():
+    """Drop the in-memory memo and close the database connections."""
+    global _memo
+    _memo = None
+    storage.close(DB_PATH)
+
+
+# ---------------------------------------------------------------------------
+# Tool wrapping
+# ---------------------------------------------------------------------------
+
+def _memoized(tool: BaseTool, ttl: float, memo: ToolMemo) -> BaseTool:
+    """Return a stand-in for *tool* with the same name and schema that memoizes calls."""
+    name = tool.name
+    version_of = sandbox_file_version if name in SANDBOX_FILE_TOOLS else None
+
+    def _key(tool_input):
+        return memo_key(name, tool_input, version_of(tool_input) if version_of else "")
+
+    # The wrapper's own run is the one callbacks see (hits included), so the
+    # wrapped tool runs without callbacks instead of as a duplicate nested run
+    quiet = {"callbacks": []}
+
+    def _call(*args, **kwargs):
+        tool_input = args[0] if args else kwargs
+        return memo.call(_key(tool_input), name, ttl, lambda: tool.invoke(tool_input, quiet))
+
+    async def _acall(*args, **kwargs):
+        tool_input = args[0] if args else kwargs
+        return await memo.acall(_key(tool_input), name, ttl, lambda: tool.ainvoke(tool_input, quiet))
+
+    if isinstance(tool, Tool):
+        return Tool(name=name, description=tool.description, func=_call, coroutine=_acall)
+    return StructuredTool(
+        name=name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+        func=_call,
+        coroutine=_acall,
+    )
+
+
+def memoize_tools(tools: List[BaseTool], ttls: Dict[str, float] = None,
+                  memo: ToolMemo = None) -> List[BaseTool]:
+    """Wrap the tools that have a TTL in *ttls*; return the others unchanged."""
+    if ttls is None:
+        if not TOOL_MEMO_ENABLED:
+            return tools
+        ttls = TOOL_MEMO_TTLS
+    wrapped = []
+    for tool in tools:
+        ttl = ttls.get(tool.name, 0)
+        wrapped.append(_memoized(tool, ttl, memo or get_memo()) if ttl > 0 else tool)
+    return wrapped
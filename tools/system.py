@@ -11,13 +11,15 @@ from tools.docker_repl import DockerPythonREPL
 
 
 PUSHOVER_URL = "https://api.pushover.net/1/messages.json"
+PUSHOVER_TIMEOUT_SECONDS = 10
 
 
 def push(text: str) -> str:
     """Send a push notification to the user."""
     token = os.getenv("PUSHOVER_TOKEN")
     user = os.getenv("PUSHOVER_USER")
-    requests.post(PUSHOVER_URL, data={"token": token, "user": user, "message": text})
+    requests.post(PUSHOVER_URL, data={"token": token, "user": user, "message": text},
+                  timeout=PUSHOVER_TIMEOUT_SECONDS)
     return "success"
 
 
@@ -36,7 +38,16 @@ def get_tools():
         name="schedule_task",
         description=(
             "Schedule a recurring background task with a cron expression. "
-            "Example: description='Check BBC News for tech headlines', cron='0 8 * * *', notify=True"
+            "Example: description='Check BBC News for tech headlines', cron='0 8 * * *', notify=True. "
+            "Give time-sensitive tasks a higher priority (default 0) so they run first when several "
+            "tasks fire at once. The defaults for jitter, misfire grace, coalescing, max instances "
+            "and APIs suit most tasks; set apis='llm,search' for tasks that search the web. "
+            "For 'tell me if X changes' tasks set monitor to the page URL or a search query: "
+            "the task then only runs, and notifies, when that source changed. "
+            "For 'whenever X happens' tasks leave cron empty and set event instead: "
+            "'file:<glob>' (a sandbox file was added or changed, e.g. 'file:knowledge/*.pdf'), "
+            "'job_status:<status>' (a job moved to that status) or 'kb_indexed:<filename>' "
+            "(a document was indexed into the knowledge base)."
         ),
     )
 
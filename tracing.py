@@ -0,0 +1,434 @@
+"""
+Local latency/token tracing for ApexFlow turns.
+
+A ``TraceRecorder`` is a LangChain callback handler attached to one
+``run_superstep`` call.  Because LangChain propagates callbacks to nested
+runnables, a single recorder sees the whole turn as a tree of spans:
+
+    turn
+    ├── worker                (graph node)
+    │   └── gpt-5.2-chat-...  (LLM call: tokens, cached tokens)
+    ├── tools                 (graph node)
+    │   └── research_agent    (agent tool: payload sizes)
+    │       ├── agent         (sub-agent ReAct node)
+    │       │   └── ...       (sub-agent LLM call)
+    │       └── search        (inner tool)
+    └── evaluator / profile_extraction ...
+
+Spans are buffered in memory and written to a SQLite table when the turn
+ends; spans older than ``TRACE_RETENTION_DAYS`` are pruned as turns are
+flushed.  The query helpers at the bottom back the Traces panel in the UI and
+work entirely offline — no LangSmith required.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+import storage
+from config import TRACE_PRUNE_EVERY_FLUSHES, TRACE_RETENTION_DAYS, TRACES_DB_PATH
+from graph_cache import DISPATCH_TAG
+
+log = logging.getLogger(__name__)
+
+DB_PATH = TRACES_DB_PATH
+
+# Traces flushed by this process; retention runs on the first and every
+# TRACE_PRUNE_EVERY_FLUSHES-th
+_flushes = 0
+
+_CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS trace_spans (
+        id            TEXT PRIMARY KEY,
+        trace_id      TEXT NOT NULL,
+        parent_id     TEXT,
+        session_id    TEXT,
+        name          TEXT NOT NULL,
+        kind          TEXT NOT NULL,
+        started_at    REAL NOT NULL,
+        duration_ms   REAL NOT NULL,
+        input_tokens  INTEGER NOT NULL DEFAULT 0,
+        output_tokens INTEGER NOT NULL DEFAULT 0,
+        cached_tokens INTEGER NOT NULL DEFAULT 0,
+        input_bytes   INTEGER NOT NULL DEFAULT 0,
+        output_bytes  INTEGER NOT NULL DEFAULT 0,
+        status        TEXT NOT NULL DEFAULT 'ok',
+        error         TEXT
+    )
+"""
+
+_CREATE_INDEXES_SQL = (
+    "CREATE INDEX IF NOT EXISTS idx_trace_spans_trace ON trace_spans (trace_id, started_at)",
+    "CREATE INDEX IF NOT EXISTS idx_trace_spans_started ON trace_spans (started_at)",
+)
+
+_SPAN_COLUMNS = (
+    "id", "trace_id", "parent_id", "session_id", "name", "kind", "started_at",
+    "duration_ms", "input_tokens", "output_tokens", "cached_tokens",
+    "input_bytes", "output_bytes", "status", "error",
+)
+
+
+# ---------------------------------------------------------------------------
+# Database helpers
+# ---------------------------------------------------------------------------
+
+def _ensure_schema(conn: sqlite3.Connection):
+    conn.execute(_CREATE_TABLE_SQL)
+    for sql in _CREATE_INDEXES_SQL:
+        conn.execute(sql)
+    conn.commit()
+
+
+def _get_connection(db_path: str = None) -> sqlite3.Connection:
+    if db_path:
+        return storage.connect(db_path, _ensure_schema)
+    return storage.database(DB_PATH, _ensure_schema).connection()
+
+
+def close():
+    """Close the module-level database connections."""
+    storage.close(DB_PATH)
+
+
+def save_spans(spans: list[dict], db_path: str = None):
+    """Persist a batch of finished spans in one transaction."""
+    if not spans:
+        return
+    conn = _get_connection(db_path)
+    placeholders = ", ".join("?" for _ in _SPAN_COLUMNS)
+    conn.executemany(
+        f"INSERT OR REPLACE INTO trace_spans ({', '.join(_SPAN_COLUMNS)}) VALUES ({placeholders})",
+        [tuple(s.get(c) for c in _SPAN_COLUMNS) for s in spans],
+    )
+    conn.commit()
+    if db_path:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Recorder
+# ---------------------------------------------------------------------------
+
+def _usage_from_llm_result(response: Any) -> dict:
+    """Pull token usage out of an LLMResult's first generation."""
+    try:
+        message = response.generations[0][0].message
+    except (AttributeError, IndexError):
+        return {}
+    usage = getattr(message, "usage_metadata", None) or {}
+    details = usage.get("input_token_details") or {}
+    return {
+        "input_tokens": usage.get("input_tokens", 0),
+        "output_tokens": usage.get("output_tokens", 0),
+        "cached_tokens": details.get("cache_read", 0),
+        "output_bytes": len(str(message.content or "")),
+    }
+
+
+class TraceRecorder(BaseCallbackHandler):
+    """Callback handler that records one turn as a tree of timed spans."""
+
+    # Called directly (also from tool threads); state is guarded by a lock.
+    run_inline = True
+
+    def __init__(self, session_id: str = "", name: str = "turn"):
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.session_id = session_id
+        self.spans: list[dict] = []
+        self._open: dict[str, dict] = {}
+        self._parents: dict[str, Optional[str]] = {}
+        self._recorded: set[str] = {self.trace_id}
+        # Spans opened with span(); top-level LangChain runs nest under them
+        self._manual_stack: list[str] = []
+        self._lock = threading.Lock()
+        self._open[self.trace_id] = self._new_span(self.trace_id, None, name, "turn")
+
+    # -- span bookkeeping -----------------------------------------------------
+
+    def _new_span(self, span_id: str, parent_id: Optional[str], name: str, kind: str,
+                  input_bytes: int = 0) -> dict:
+        return {
+            "id": span_id,
+            "trace_id": self.trace_id,
+            "parent_id": parent_id,
+            "session_id": self.session_id,
+            "name": name,
+            "kind": kind,
+            "started_at": time.time(),
+            "duration_ms": 0.0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cached_tokens": 0,
+            "input_bytes": input_bytes,
+            "output_bytes": 0,
+            "status": "ok",
+            "error": None,
+        }
+
+    def _recorded_parent(self, parent_run_id: Optional[UUID]) -> str:
+        """Walk up unrecorded runs to the nearest recorded span (or the root)."""
+        run = str(parent_run_id) if parent_run_id else None
+        while run is not None:
+            if run in self._recorded:
+                return run
+            run = self._parents.get(run)
+        return self._manual_stack[-1] if self._manual_stack else self.trace_id
+
+    def _track(self, run_id: UUID, parent_run_id: Optional[UUID]):
+        with self._lock:
+            self._parents[str(run_id)] = str(parent_run_id) if parent_run_id else None
+
+    def _begin(self, run_id: UUID, parent_run_id: Optional[UUID], name: str, kind: str,
+               input_bytes: int = 0):
+        with self._lock:
+            self._parents[str(run_id)] = str(parent_run_id) if parent_run_id else None
+            parent = self._recorded_parent(parent_run_id)
+            self._recorded.add(str(run_id))
+            self._open[str(run_id)] = self._new_span(str(run_id), parent, name, kind, input_bytes)
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None, **fields):
+        with self._lock:
+            span = self._open.pop(str(run_id), None)
+            if span is None:
+                return
+            span["duration_ms"] = (time.time() - span["started_at"]) * 1000
+            span.update({k: v for k, v in fields.items() if v is not None})
+            if error is not None:
+                span["status"] = "error"
+                span["error"] = f"{type(error).__name__}: {error}"[:500]
+            self.spans.append(span)
+
+    @contextmanager
+    def span(self, name: str, kind: str = "node"):
+        """Time a block of work outside the graph as a child of the turn.
+
+        LangChain runs started inside the block with this recorder as callback
+        are nested under the span.
+        """
+        span_id = uuid.uuid4().hex
+        with self._lock:
+            parent = self._manual_stack[-1] if self._manual_stack else self.trace_id
+            self._recorded.add(span_id)
+            self._open[span_id] = self._new_span(span_id, parent, name, kind)
+            self._manual_stack.append(span_id)
+        try:
+            yield self._open[span_id]
+        except BaseException as e:
+            self._end(span_id, error=e)
+            raise
+        finally:
+            with self._lock:
+                self._manual_stack.remove(span_id)
+        self._end(span_id)
+
+    # -- LangChain callbacks --------------------------------------------------
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None,
+                       tags=None, metadata=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name", "")
+        # Only graph nodes are interesting; other chains are plumbing.
+        if name and (metadata or {}).get("langgraph_node") == name:
+            self._begin(run_id, parent_run_id, name, "node")
+        else:
+            self._track(run_id, parent_run_id)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None,
+                            tags=None, metadata=None, **kwargs):
+        name = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name", "llm")
+        size = sum(len(str(m.content)) for batch in messages for m in batch)
+        self._begin(run_id, parent_run_id, name, "llm", input_bytes=size)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id, **_usage_from_llm_result(response))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None,
+                      tags=None, metadata=None, inputs=None, **kwargs):
+        if DISPATCH_TAG in (tags or []):
+            # Stand-in of a shared graph; the real tool call nests under it
+            self._track(run_id, parent_run_id)
+            return
+        name = (serialized or {}).get("name") or kwargs.get("name", "tool")
+        kind = "agent" if name.endswith("_agent") else "tool"
+        self._begin(run_id, parent_run_id, name, kind, input_bytes=len(input_str or ""))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        content = getattr(output, "content", output)
+        self._end(run_id, output_bytes=len(str(content)))
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    # -- completion -----------------------------------------------------------
+
+    def finish(self, error: Optional[BaseException] = None) -> list[dict]:
+        """Close the root span and return every recorded span."""
+        self._end(self.trace_id, error=error)
+        with self._lock:
+            # Anything still open (e.g. cancelled) is closed as-is
+            for run_id in list(self._open):
+                span = self._open.pop(run_id)
+                span["duration_ms"] = (time.time() - span["started_at"]) * 1000
+                span["status"] = "cancelled"
+                self.spans.append(span)
+            return list(self.spans)
+
+    async def flush(self, error: Optional[BaseException] = None):
+        """Finish the trace and write it to SQLite off the event loop."""
+        global _flushes
+        spans = self.finish(error)
+        try:
+            await storage.run(save_spans, spans)
+        except Exception:
+            log.exception("Failed to persist trace %s", self.trace_id)
+        _flushes += 1
+        if (_flushes - 1) % TRACE_PRUNE_EVERY_FLUSHES == 0:
+            try:
+                removed = await storage.run(prune)
+                if removed:
+                    log.info("Pruned %d trace spans older than %d days", removed, TRACE_RETENTION_DAYS)
+            except Exception:
+                log.exception("Failed to prune old traces")
+
+
+# ---------------------------------------------------------------------------
+# Query / report API
+# ---------------------------------------------------------------------------
+
+def list_traces(limit: int = 20, session_id: str = None, db_path: str = None) -> list[dict]:
+    """Return the most recent turns (root spans), newest first."""
+    conn = _get_connection(db_path)
+    sql = (
+        "SELECT trace_id, session_id, started_at, duration_ms, status, "
+        "(SELECT COUNT(*) FROM trace_spans c WHERE c.trace_id = r.trace_id AND c.kind = 'llm') AS llm_calls, "
+        "(SELECT COALESCE(SUM(input_tokens + output_tokens), 0) FROM trace_spans c "
+        " WHERE c.trace_id = r.trace_id) AS tokens "
+        "FROM trace_spans r WHERE kind = 'turn'"
+    )
+    params: list = []
+    if session_id:
+        sql += " AND session_id = ?"
+        params.append(session_id)
+    sql += " ORDER BY started_at DESC LIMIT ?"
+    params.append(limit)
+    rows = conn.execute(sql, params).fetchall()
+    if db_path:
+        conn.close()
+    return [dict(r) for r in rows]
+
+
+def get_spans(trace_id: str, db_path: str = None) -> list[dict]:
+    """Return all spans of a trace ordered by start time."""
+    conn = _get_connection(db_path)
+    rows = conn.execute(
+        "SELECT * FROM trace_spans WHERE trace_id = ? ORDER BY started_at", (trace_id,)
+    ).fetchall()
+    if db_path:
+        conn.close()
+    return [dict(r) for r in rows]
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def summarize(since_hours: float = 24, db_path: str = None) -> list[dict]:
+    """Aggregate span durations and tokens per (kind, name) over a window."""
+    since = time.time() - since_hours * 3600
+    conn = _get_connection(db_path)
+    rows = conn.execute(
+        "SELECT kind, name, duration_ms, input_tokens, output_tokens, cached_tokens, status "
+        "FROM trace_spans WHERE started_at >= ?",
+        (since,),
+    ).fetchall()
+    if db_path:
+        conn.close()
+
+    groups: dict[tuple, dict] = {}
+    for r in rows:
+        g = groups.setdefault((r["kind"], r["name"]), {
+            "kind": r["kind"], "name": r["name"], "calls": 0, "errors": 0, "durations": [],
+            "input_tokens": 0, "output_tokens": 0, "cached_tokens": 0,
+        })
+        g["calls"] += 1
+        g["errors"] += r["status"] == "error"
+        g["durations"].append(r["duration_ms"])
+        g["input_tokens"] += r["input_tokens"]
+        g["output_tokens"] += r["output_tokens"]
+        g["cached_tokens"] += r["cached_tokens"]
+
+    report = []
+    for g in groups.values():
+        durations = g.pop("durations")
+        g["p50_ms"] = _percentile(durations, 50)
+        g["p95_ms"] = _percentile(durations, 95)
+        g["total_ms"] = sum(durations)
+        report.append(g)
+    report.sort(key=lambda g: g["total_ms"], reverse=True)
+    return report
+
+
+def waterfall_rows(trace_id: str, width: int = 40, db_path: str = None) -> list[list]:
+    """Render a trace as table rows with a text bar per span.
+
+    Each row is ``[offset_ms, duration_ms, name (indented), kind, tokens, bar]``.
+    """
+    spans = get_spans(trace_id, db_path=db_path)
+    if not spans:
+        return []
+    root = next((s for s in spans if s["kind"] == "turn"), spans[0])
+    t0 = root["started_at"]
+    total = max(root["duration_ms"], 1.0)
+
+    by_id = {s["id"]: s for s in spans}
+
+    def depth(span: dict) -> int:
+        d = 0
+        while span["parent_id"] and span["parent_id"] in by_id and d < 20:
+            span = by_id[span["parent_id"]]
+            d += 1
+        return d
+
+    rows = []
+    for s in spans:
+        offset = (s["started_at"] - t0) * 1000
+        start_col = int(offset / total * width)
+        length = max(1, int(s["duration_ms"] / total * width))
+        bar = " " * start_col + "█" * min(length, width - start_col)
+        tokens = s["input_tokens"] + s["output_tokens"]
+        name = "  " * depth(s) + s["name"] + (" ✗" if s["status"] == "error" else "")
+        rows.append([f"{offset:.0f}", f"{s['duration_ms']:.0f}", name, s["kind"], str(tokens or ""), bar])
+    return rows
+
+
+def prune(older_than_days: int = TRACE_RETENTION_DAYS, db_path: str = None) -> int:
+    """Delete spans older than *older_than_days*. Returns the number removed."""
+    cutoff = (datetime.now() - timedelta(days=older_than_days)).timestamp()
+    conn = _get_connection(db_path)
+    cursor = conn.execute("DELETE FROM trace_spans WHERE started_at < ?", (cutoff,))
+    conn.commit()
+    removed = cursor.rowcount
+    if db_path:
+        conn.close()
+    return removed
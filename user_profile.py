@@ -1,6 +1,7 @@
 import sqlite3
 from datetime import datetime
 
+import storage
 from config import DB_PATH
 
 
@@ -9,18 +10,22 @@ class UserProfile:
 
     def __init__(self, db_path: str = DB_PATH):
         self._db_path = db_path
-        self._conn = sqlite3.connect(db_path, check_same_thread=False)
-        self._ensure_table()
+        # One connection per thread that uses the profile (UI handlers, storage.run)
+        self._db = storage.Database(db_path, self._ensure_table, row_factory=None)
+        self._db.connection()
 
-    def _ensure_table(self):
-        self._conn.execute("""
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        return self._db.connection()
+
+    def _ensure_table(self, conn: sqlite3.Connection):
+        conn.execute("""
             CREATE TABLE IF NOT EXISTS user_profile (
                 key   TEXT PRIMARY KEY,
                 value TEXT NOT NULL,
                 updated_at TEXT NOT NULL
             )
         """)
-        self._conn.commit()
 
     def upsert(self, key: str, value: str):
         """Insert or update a profile fact."""
@@ -50,4 +55,4 @@ class UserProfile:
         return f"\n\n    Known facts about this user:\n{lines}"
 
     def close(self):
-        self._conn.close()
+        self._db.close()